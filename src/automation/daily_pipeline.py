@@ -1,7 +1,19 @@
 import sys
 import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import subprocess
 from datetime import datetime, timedelta
+from profiling import stage, start_run, add_profile_argument, get_profile_dir, PROFILE_DIR_ENV
+
+# RUN THIS (from src/automation):
+# python daily_pipeline.py
+# To also record cProfile stats and memory peaks for every step:
+# python daily_pipeline.py --profile
+# Each step writes its own timing report next to the pipeline's, in data/profiles/daily_pipeline_YYYYMMDD_HHMMSS/
+
+UPDATE_STATE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                 'data', 'models', 'update_state.json')
+
 
 def run_daily_pipeline():
     print("="*50)
@@ -17,11 +29,12 @@ def run_daily_pipeline():
     
     print("\nSTEP 1: Collect yesterday's games")
     print("-"*50)
-    result = subprocess.run([
-        sys.executable,
-        '../data_collection/update_yesterday_games.py',
-        str(yesterday)
-    ], capture_output=True, text=True)
+    with stage('collect_yesterday_games'):
+        result = subprocess.run([
+            sys.executable,
+            '../data_collection/update_yesterday_games.py',
+            str(yesterday)
+        ], capture_output=True, text=True)
     print(result.stdout)
     if result.stderr:
         print("ERROR:", result.stderr)
@@ -36,100 +49,135 @@ def run_daily_pipeline():
     
     print("\nSTEP 2: Update team ratings (teams that played yesterday)")
     print("-"*50)
-    result = subprocess.run([
-        sys.executable,
-        '../data_collection/update_team_ratings_incremental.py',
-        str(yesterday)
-    ], capture_output=True, text=True)
+    with stage('team_ratings'):
+        result = subprocess.run([
+            sys.executable,
+            '../data_collection/update_team_ratings_incremental.py',
+            str(yesterday)
+        ], capture_output=True, text=True)
     print(result.stdout)
     if result.stderr:
         print("ERROR:", result.stderr)
     
     print("\nSTEP 3: Update team defensive stats (teams that played yesterday)")
     print("-"*50)
-    result = subprocess.run([
-        sys.executable,
-        '../data_collection/update_team_defensive_stats_incremental.py',
-        str(yesterday)
-    ], capture_output=True, text=True)
+    with stage('team_defensive_stats'):
+        result = subprocess.run([
+            sys.executable,
+            '../data_collection/update_team_defensive_stats_incremental.py',
+            str(yesterday)
+        ], capture_output=True, text=True)
     print(result.stdout)
     if result.stderr:
         print("ERROR:", result.stderr)
     
     print("\nSTEP 4: Update position defense stats (teams that played yesterday)")
     print("-"*50)
-    result = subprocess.run([
-        sys.executable,
-        '../data_collection/update_position_defense_stats_incremental.py',
-        str(yesterday)
-    ], capture_output=True, text=True)
+    with stage('position_defense_stats'):
+        result = subprocess.run([
+            sys.executable,
+            '../data_collection/update_position_defense_stats_incremental.py',
+            str(yesterday)
+        ], capture_output=True, text=True)
     print(result.stdout)
     if result.stderr:
         print("ERROR:", result.stderr)
     
     print("\nSTEP 5: Update injury log (detect injuries and recoveries)")
     print("-"*50)
-    result = subprocess.run([
-        sys.executable,
-        '../data_collection/update_injury_log.py'
-    ], capture_output=True, text=True)
+    with stage('injury_log'):
+        result = subprocess.run([
+            sys.executable,
+            '../data_collection/update_injury_log.py'
+        ], capture_output=True, text=True)
     print(result.stdout)
     if result.stderr:
         print("ERROR:", result.stderr)
     
     print("\nSTEP 6: Detect and update player transactions (trades, signings, waivers)")
     print("-"*50)
-    result = subprocess.run([
-        sys.executable,
-        '../data_collection/detect_and_update_trades.py',
-        str(today)
-    ], capture_output=True, text=True)
+    with stage('transactions'):
+        result = subprocess.run([
+            sys.executable,
+            '../data_collection/detect_and_update_trades.py',
+            str(today)
+        ], capture_output=True, text=True)
     print(result.stdout)
     if result.stderr:
         print("ERROR:", result.stderr)
     
     print("\nSTEP 7: Update player teams from recent game data (backup)")
     print("-"*50)
-    result = subprocess.run([
-        sys.executable,
-        '../data_collection/detect_and_update_trades.py',
-        str(today),
-        '--from-games'
-    ], capture_output=True, text=True)
+    with stage('player_teams_from_games'):
+        result = subprocess.run([
+            sys.executable,
+            '../data_collection/detect_and_update_trades.py',
+            str(today),
+            '--from-games'
+        ], capture_output=True, text=True)
     print(result.stdout)
     if result.stderr:
         print("ERROR:", result.stderr)
     
-    print("\nSTEP 8: Collect today's schedule")
+    print("\nSTEP 8: Update models with yesterday's games (warm start)")
     print("-"*50)
-    result = subprocess.run([
-        sys.executable,
-        '../data_collection/collect_todays_schedule.py',
-        str(today)
-    ], capture_output=True, text=True)
+    # Only a full train leaves update_state.json behind; without it there is nothing to warm-start,
+    # so don't spend the feature build. Full retrains run from the weekly retrain workflow.
+    if os.path.exists(UPDATE_STATE_PATH):
+        with stage('build_features'):
+            result = subprocess.run([
+                sys.executable,
+                '../feature_engineering/build_features.py'
+            ], capture_output=True, text=True)
+        print(result.stdout)
+        if result.stderr:
+            print("ERROR:", result.stderr)
+        
+        with stage('update_models'):
+            result = subprocess.run([
+                sys.executable,
+                '../models/update_models.py',
+                '--skip-features'
+            ], capture_output=True, text=True)
+        print(result.stdout)
+        if result.stderr:
+            print("ERROR:", result.stderr)
+    else:
+        print(f"Skipping model update: {UPDATE_STATE_PATH} not found (no full train to update yet)")
+    
+    print("\nSTEP 9: Collect today's schedule")
+    print("-"*50)
+    with stage('todays_schedule'):
+        result = subprocess.run([
+            sys.executable,
+            '../data_collection/collect_todays_schedule.py',
+            str(today)
+        ], capture_output=True, text=True)
     print(result.stdout)
     if result.stderr:
         print("ERROR:", result.stderr)
     
-    print("\nSTEP 9: Generate predictions for today (all models)")
+    print("\nSTEP 10: Generate predictions for today (all models)")
     print("-"*50)
-    result = subprocess.run([
-        sys.executable,
-        '../predictions/predict_games.py',
-        str(today),
-        '--all'
-    ], capture_output=True, text=True)
+    with stage('predictions'):
+        result = subprocess.run([
+            sys.executable,
+            '../predictions/predict_games.py',
+            str(today),
+            '--all'
+        ], capture_output=True, text=True)
     print(result.stdout)
     if result.stderr:
         print("ERROR:", result.stderr)
     
-    print("\nSTEP 10: Evaluate yesterday's predictions")
+    print("\nSTEP 11: Evaluate yesterday's predictions")
     print("-"*50)
-    result = subprocess.run([
-        sys.executable,
-        '../predictions/evaluate_predictions.py',
-        str(yesterday)
-    ], capture_output=True, text=True)
+    with stage('evaluation'):
+        result = subprocess.run([
+            sys.executable,
+            '../predictions/evaluate_predictions.py',
+            str(yesterday)
+        ], capture_output=True, text=True)
     print(result.stdout)
     if result.stderr:
         print("ERROR:", result.stderr)
@@ -139,4 +187,13 @@ def run_daily_pipeline():
     print("="*50)
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Collect, update, predict and evaluate for the current day')
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    # Steps inherit PROFILE_DIR, so one run's reports end up in one directory.
+    run_dir = os.path.join(get_profile_dir(), f"daily_pipeline_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    os.environ[PROFILE_DIR_ENV] = run_dir
+    start_run('daily_pipeline', profile=args.profile or None, output_dir=run_dir)
     run_daily_pipeline()
\ No newline at end of file
@@ -0,0 +1,94 @@
+import tempfile
+import pandas as pd
+from typing import Dict, Iterator, List, Optional, Union
+
+try:
+    from data_collection.query_stats import raw_connection
+except ImportError:
+    from src.data_collection.query_stats import raw_connection
+
+# Bulk reads for large result sets. pd.read_sql on a psycopg2 connection builds a Python
+# tuple per row (and a Decimal per DECIMAL value) before the DataFrame exists. Here Postgres
+# writes the result as CSV through COPY, and pandas' C parser reads it straight into the
+# given dtypes. The CSV is spooled to a temporary file, so only the DataFrame (or one chunk
+# of it) is held in memory.
+
+__all__ = [
+    'read_sql_copy',
+]
+
+# Results up to this size stay in memory, larger ones spill to disk.
+SPOOL_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _supports_copy(conn) -> bool:
+    return type(raw_connection(conn)).__module__.startswith('psycopg2')
+
+
+def _bind_params(cur, query: str, params) -> str:
+    # COPY does not take parameters, so they are bound client-side with psycopg2's own quoting.
+    if not params:
+        return query
+    return cur.mogrify(query, params).decode('utf-8')
+
+
+def _apply_dtypes(df: pd.DataFrame, dtypes: Optional[Dict], parse_dates: Optional[List[str]]) -> pd.DataFrame:
+    for column in parse_dates or []:
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column])
+    for column, dtype in (dtypes or {}).items():
+        if column not in df.columns:
+            continue
+        if dtype in (str, 'str', object):
+            # Like read_csv with dtype=str: values become strings, NULLs stay missing.
+            df[column] = df[column].where(df[column].isna(), df[column].astype(str))
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+
+def read_sql_copy(query: str, conn, params=None, dtypes: Optional[Dict] = None,
+                  parse_dates: Optional[List[str]] = None,
+                  chunksize: Optional[int] = None) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+    """Drop-in for pd.read_sql(query, conn, params=params) on large SELECTs.
+
+    dtypes maps columns to pandas dtypes. Columns left out are inferred by the CSV parser,
+    so text columns that look numeric (game_id) must be listed as str. Boolean columns come
+    back from COPY as t/f and are converted. With chunksize, an iterator of DataFrames is
+    returned. Connections without COPY (the local SQLite/DuckDB backends) fall back to
+    pd.read_sql with the same dtypes applied.
+    """
+    if not _supports_copy(conn):
+        if chunksize:
+            return (_apply_dtypes(chunk, dtypes, parse_dates)
+                    for chunk in pd.read_sql(query, conn, params=params, chunksize=chunksize))
+        return _apply_dtypes(pd.read_sql(query, conn, params=params), dtypes, parse_dates)
+
+    cur = conn.cursor()
+    try:
+        copy_sql = f"COPY ({_bind_params(cur, query, params)}) TO STDOUT WITH (FORMAT CSV, HEADER TRUE)"
+        buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, mode='w+b')
+        cur.copy_expert(copy_sql, buffer)
+    finally:
+        cur.close()
+    buffer.seek(0)
+
+    csv_options = {
+        'dtype': dtypes,
+        'parse_dates': parse_dates,
+        'true_values': ['t'],
+        'false_values': ['f'],
+        'encoding': 'utf-8',
+    }
+    if chunksize:
+        def chunks():
+            try:
+                yield from pd.read_csv(buffer, chunksize=chunksize, **csv_options)
+            finally:
+                buffer.close()
+        return chunks()
+
+    try:
+        return pd.read_csv(buffer, **csv_options)
+    finally:
+        buffer.close()
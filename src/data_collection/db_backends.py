@@ -0,0 +1,282 @@
+import os
+import re
+import sqlite3
+import numpy as np
+import pandas as pd
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional
+
+try:
+    from data_collection.schema import LEAGUE_TABLES, TABLE_COLUMNS, get_column_names, create_table_sql, create_index_sql
+except ImportError:
+    from schema import LEAGUE_TABLES, TABLE_COLUMNS, get_column_names, create_table_sql, create_index_sql
+
+# Embedded backends for the read-heavy batch jobs. They expose the small part of the
+# psycopg2 connection/cursor API the pipeline uses (cursor, execute with %s params,
+# fetch*, commit, close), so code written against Postgres runs unchanged on a local copy.
+
+__all__ = [
+    'LOCAL_BACKENDS',
+    'LocalConnection',
+    'LocalCursor',
+    'get_local_db_path',
+    'translate_query',
+    'connect_local',
+    'write_local_tables',
+    'sync_local_database',
+]
+
+LOCAL_BACKENDS = ('sqlite', 'duckdb')
+LOCAL_DB_FILENAMES = {
+    'sqlite': 'analytics.db',
+    'duckdb': 'analytics.duckdb',
+}
+
+
+def _adapt_datetime(value):
+    # Midnight timestamps are stored as plain dates so they compare equal to date parameters,
+    # like a Postgres TIMESTAMP = DATE comparison.
+    if value.tzinfo is None and value.time() == datetime.min.time():
+        return value.strftime('%Y-%m-%d')
+    return value.isoformat(sep=' ')
+
+
+sqlite3.register_adapter(np.int64, int)
+sqlite3.register_adapter(np.int32, int)
+sqlite3.register_adapter(np.float64, float)
+sqlite3.register_adapter(np.float32, float)
+sqlite3.register_adapter(np.bool_, bool)
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(datetime, _adapt_datetime)
+sqlite3.register_adapter(pd.Timestamp, _adapt_datetime)
+sqlite3.register_converter('DATE', lambda value: date.fromisoformat(value.decode()[:10]))
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+
+_SQLITE_REWRITES = [
+    (re.compile(r"%s::date\s*-\s*INTERVAL\s*'(\d+) days?'", re.IGNORECASE), r"date(%s, '-\1 days')"),
+    (re.compile(r"%s::date", re.IGNORECASE), "date(%s)"),
+    (re.compile(r"\bILIKE\b", re.IGNORECASE), "LIKE"),
+]
+_DML_KEYWORDS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def get_local_db_path(backend: str) -> str:
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(os.path.dirname(script_dir))
+    return os.path.join(project_root, 'data', 'local', LOCAL_DB_FILENAMES[backend])
+
+
+def translate_query(query: str, backend: str, has_params: bool) -> str:
+    """Rewrite a psycopg2-style query for an embedded backend.
+
+    DuckDB understands the Postgres casts and intervals used in this repo, so only the
+    placeholders change. SQLite also gets the few date expressions rewritten.
+    """
+    if backend == 'sqlite':
+        for pattern, replacement in _SQLITE_REWRITES:
+            query = pattern.sub(replacement, query)
+    if has_params:
+        query = query.replace('%s', '?').replace('%%', '%')
+    return query
+
+
+class LocalCursor:
+    def __init__(self, connection: 'LocalConnection'):
+        self.connection = connection
+        self._cursor = connection.raw.cursor()
+        self._rowcount = None
+
+    def execute(self, query, params=None):
+        has_params = params is not None
+        query = translate_query(query, self.connection.backend, has_params)
+        if has_params:
+            self._cursor.execute(query, list(params))
+        else:
+            self._cursor.execute(query)
+        self._rowcount = None
+        if self.connection.backend == 'duckdb' and query.lstrip().upper().startswith(_DML_KEYWORDS):
+            # DuckDB returns the affected row count as a result row instead of setting rowcount.
+            self._rowcount = self._cursor.fetchone()[0]
+        return self
+
+    def executemany(self, query, params_seq):
+        self._cursor.executemany(translate_query(query, self.connection.backend, True),
+                                 [list(params) for params in params_seq])
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=None):
+        return self._cursor.fetchmany(size) if size else self._cursor.fetchmany()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._rowcount if self._rowcount is not None else self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LocalConnection:
+    def __init__(self, raw, backend: str, path: str):
+        self.raw = raw
+        self.backend = backend
+        self.path = path
+        self.closed = 0
+
+    def cursor(self) -> LocalCursor:
+        return LocalCursor(self)
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def close(self):
+        if not self.closed:
+            self.raw.close()
+            self.closed = 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _connect_raw(backend: str, path: str, read_only: bool):
+    if backend == 'sqlite':
+        if read_only:
+            return sqlite3.connect(f"file:{path}?mode=ro", uri=True, detect_types=sqlite3.PARSE_DECLTYPES,
+                                   check_same_thread=False)
+        return sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+    if backend == 'duckdb':
+        try:
+            import duckdb
+        except ImportError:
+            raise ImportError("The duckdb backend needs the duckdb package: pip install duckdb")
+        return duckdb.connect(path, read_only=read_only)
+    raise ValueError(f"Unknown local backend '{backend}', expected one of {LOCAL_BACKENDS}")
+
+
+def connect_local(backend: str, path: Optional[str] = None, read_only: bool = False) -> LocalConnection:
+    path = path or get_local_db_path(backend)
+    if read_only and not os.path.exists(path):
+        raise FileNotFoundError(f"No local {backend} database at {path}. "
+                                f"Create one with: python src/data_collection/db_backends.py --backend {backend}")
+    if not read_only:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return LocalConnection(_connect_raw(backend, path, read_only), backend, path)
+
+
+def _replace_table(conn: LocalConnection, table: str):
+    conn.raw.execute(f"DROP TABLE IF EXISTS {table}")
+    conn.raw.execute(create_table_sql(table, conn.backend))
+
+
+def _append_rows(conn: LocalConnection, table: str, df: pd.DataFrame):
+    if df.empty:
+        return
+    df = df.reindex(columns=get_column_names(table))
+    if conn.backend == 'duckdb':
+        conn.raw.register('_append_rows_df', df)
+        conn.raw.execute(f"INSERT INTO {table} SELECT * FROM _append_rows_df")
+        conn.raw.unregister('_append_rows_df')
+    else:
+        df.to_sql(table, conn.raw, if_exists='append', index=False, chunksize=10000)
+
+
+def write_local_tables(tables: Dict[str, pd.DataFrame], backend: str, path: Optional[str] = None) -> str:
+    """Replace the given tables in a local database with these DataFrames."""
+    conn = connect_local(backend, path)
+    try:
+        for table, df in tables.items():
+            _replace_table(conn, table)
+            _append_rows(conn, table, df)
+            for index_sql in create_index_sql(table):
+                conn.raw.execute(index_sql)
+        conn.commit()
+    finally:
+        conn.close()
+    return conn.path
+
+
+def sync_local_database(backend: str = 'duckdb', path: Optional[str] = None,
+                        tables: Iterable[str] = LEAGUE_TABLES, source_conn=None,
+                        chunksize: int = 100000) -> Dict[str, int]:
+    """Full copy of tables from the production database into a local backend.
+
+    Rows are streamed in chunks so memory stays bounded for player_game_stats.
+    """
+    if source_conn is None:
+        try:
+            from data_collection.utils import get_db_connection
+        except ImportError:
+            from utils import get_db_connection
+        source_conn = get_db_connection(backend='postgres')
+        close_source = True
+    else:
+        close_source = False
+
+    conn = connect_local(backend, path)
+    counts = {}
+    try:
+        for table in tables:
+            columns = ', '.join(get_column_names(table))
+            _replace_table(conn, table)
+            counts[table] = 0
+            for chunk in pd.read_sql(f"SELECT {columns} FROM {table}", source_conn, chunksize=chunksize):
+                _append_rows(conn, table, chunk)
+                counts[table] += len(chunk)
+            for index_sql in create_index_sql(table):
+                conn.raw.execute(index_sql)
+            conn.commit()
+            print(f"  {table:25s}: {counts[table]:>10,} rows")
+    finally:
+        conn.close()
+        if close_source:
+            source_conn.close()
+    return counts
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    import warnings
+    warnings.filterwarnings('ignore', message='pandas only supports SQLAlchemy')
+
+    # RUN THIS (copy the production tables into a local DuckDB file for batch jobs):
+    # python src/data_collection/db_backends.py --backend duckdb
+    # Then point the read-heavy jobs at it:
+    # ANALYTICS_DB_BACKEND=duckdb python src/feature_engineering/build_features.py
+    parser = argparse.ArgumentParser(description='Sync production tables into a local SQLite/DuckDB database')
+    parser.add_argument('--backend', choices=LOCAL_BACKENDS, default='duckdb', help='Local database engine')
+    parser.add_argument('--path', default=None, help='Database file (default: data/local/analytics.*)')
+    parser.add_argument('--tables', nargs='+', default=LEAGUE_TABLES, choices=list(TABLE_COLUMNS),
+                       help='Tables to copy')
+    args = parser.parse_args()
+
+    print("="*50)
+    print(f"SYNCING LOCAL {args.backend.upper()} DATABASE")
+    print("="*50)
+    start = time.time()
+    sync_local_database(args.backend, args.path, args.tables)
+    print(f"\nDone in {time.time() - start:.1f}s: {args.path or get_local_db_path(args.backend)}")
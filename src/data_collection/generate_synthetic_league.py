@@ -0,0 +1,732 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# RUN THIS (3 seasons, 30 teams, written to a local SQLite database):
+# python src/data_collection/generate_synthetic_league.py --sqlite data/synthetic/league.db
+# Ten times the real volume (300 teams), as a CSV snapshot:
+# python src/data_collection/generate_synthetic_league.py --scale 10 --snapshot data/synthetic/league_10x
+
+import json
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, asdict
+from datetime import date, datetime, timedelta
+
+from data_collection.schema import TABLE_COLUMNS, LEAGUE_TABLES, get_column_names
+from data_collection.db_backends import write_local_tables
+
+TIMEZONES = [
+    # (timezone, conference, latitude, longitude)
+    ('America/New_York', 'East', 40.7, -74.0),
+    ('America/Chicago', 'East', 41.9, -87.6),
+    ('America/Chicago', 'West', 29.8, -95.4),
+    ('America/Denver', 'West', 39.7, -105.0),
+    ('America/Los_Angeles', 'West', 34.0, -118.3),
+]
+
+POSITIONS = ['Guard', 'Guard', 'Guard-Forward', 'Forward', 'Forward', 'Forward-Center', 'Center']
+
+# Per-36 minute rates by defense position (G/F/C): two-point attempts, three-point attempts,
+# free throw attempts, offensive and defensive rebounds, assists, steals, blocks, turnovers.
+PER_36_RATES = {
+    'G': {'fg2a': 7.0, 'fg3a': 6.2, 'fta': 3.3, 'oreb': 0.7, 'dreb': 3.5, 'ast': 6.0, 'stl': 1.3, 'blk': 0.3, 'tov': 2.4},
+    'F': {'fg2a': 8.0, 'fg3a': 4.4, 'fta': 3.3, 'oreb': 1.5, 'dreb': 5.5, 'ast': 3.0, 'stl': 1.0, 'blk': 0.7, 'tov': 1.9},
+    'C': {'fg2a': 9.0, 'fg3a': 1.3, 'fta': 3.8, 'oreb': 3.0, 'dreb': 7.5, 'ast': 2.2, 'stl': 0.8, 'blk': 1.6, 'tov': 2.0},
+}
+SHOOTING_PCT = {
+    'G': {'fg2': 0.50, 'fg3': 0.36, 'ft': 0.82},
+    'F': {'fg2': 0.53, 'fg3': 0.35, 'ft': 0.77},
+    'C': {'fg2': 0.60, 'fg3': 0.32, 'ft': 0.68},
+}
+
+PREDICTION_MODELS = ['xgboost', 'lightgbm', 'catboost', 'random_forest']
+PLAYOFF_ROUNDS = ['First Round', 'Conference Semifinals', 'Conference Finals', 'Finals']
+
+
+@dataclass
+class LeagueConfig:
+    seasons: int = 3
+    first_season: int = 2022
+    teams: int = 30
+    roster_size: int = 15
+    games_per_team: int = 82
+    playoff_teams: int = 16
+    offseason_churn: float = 0.25
+    retirement_rate: float = 0.08
+    trades_per_season: int = 20
+    injury_rate: float = 0.006
+    scheduled_days: int = 2
+    prediction_days: int = 30
+    seed: int = 42
+
+
+def _defense_position(position):
+    if position == 'Center':
+        return 'C'
+    if 'Forward' in position:
+        return 'F'
+    return 'G'
+
+
+def _season_name(start_year):
+    return f"{start_year}-{str(start_year + 1)[2:]}"
+
+
+def _abbreviation(i):
+    return chr(65 + i // 676 % 26) + chr(65 + i // 26 % 26) + chr(65 + i % 26)
+
+
+class LeagueGenerator:
+    def __init__(self, config: LeagueConfig):
+        self.config = config
+        self.rng = np.random.default_rng(config.seed)
+        self.rows = {table: [] for table in LEAGUE_TABLES}
+        self.next_player_id = 1000001
+        self.players = {}
+        self.rosters = {}
+        self.out_until = {}
+
+    # ----- league setup -----
+
+    def create_teams(self):
+        rng = self.rng
+        n = self.config.teams
+        self.team_ids = list(range(1610612737, 1610612737 + n))
+        self.team_strength = {}
+        for i, team_id in enumerate(self.team_ids):
+            tz, conference, lat, lon = TIMEZONES[i % len(TIMEZONES)]
+            altitude = 5280 if tz == 'America/Denver' and i < len(TIMEZONES) else int(rng.integers(0, 1000))
+            self.rows['teams'].append({
+                'team_id': team_id,
+                'abbreviation': _abbreviation(i),
+                'full_name': f"Synthetic City {i + 1} Team",
+                'city': f"Synthetic City {i + 1}",
+                'state': None,
+                'arena_name': f"Arena {i + 1}",
+                'arena_altitude': altitude,
+                'conference': conference,
+                'division': f"{conference} {i % 3 + 1}",
+                'latitude': round(lat + rng.normal(0, 2), 6),
+                'longitude': round(lon + rng.normal(0, 2), 6),
+                'timezone': tz,
+            })
+            self.team_strength[team_id] = {
+                'offense': rng.normal(1.0, 0.04),
+                'defense': rng.normal(1.0, 0.04),
+                'pace': rng.normal(1.0, 0.03),
+            }
+            self.rosters[team_id] = []
+            for _ in range(self.config.roster_size):
+                self.create_player(team_id, self.config.first_season - int(rng.integers(0, 12)))
+
+    def create_player(self, team_id, draft_year):
+        rng = self.rng
+        player_id = self.next_player_id
+        self.next_player_id += 1
+        position = POSITIONS[int(rng.integers(0, len(POSITIONS)))]
+        defense_position = _defense_position(position)
+        height = {'G': 76, 'F': 80, 'C': 84}[defense_position] + int(rng.integers(-2, 3))
+        first_name, last_name = f"Player{player_id % 10000}", f"Synthetic{player_id}"
+
+        self.players[player_id] = {
+            'team_id': team_id,
+            'position': position,
+            'defense_position': defense_position,
+            'minutes': float(np.clip(rng.normal(22, 8), 6, 37)),
+            'talent': float(rng.lognormal(0, 0.25)),
+            'is_active': True,
+        }
+        self.rosters[team_id].append(player_id)
+        self.rows['players'].append({
+            'player_id': player_id,
+            'full_name': f"{first_name} {last_name}",
+            'first_name': first_name,
+            'last_name': last_name,
+            'is_active': True,
+            'team_id': team_id,
+            'jersey_number': str(int(rng.integers(0, 100))),
+            'position': position,
+            'height_inches': height,
+            'weight_lbs': int(height * 2.9 + rng.normal(0, 10)),
+            'birth_date': date(draft_year - 20, int(rng.integers(1, 13)), int(rng.integers(1, 29))),
+            'draft_year': draft_year,
+            'draft_round': int(rng.integers(1, 3)),
+            'draft_number': int(rng.integers(1, 31)),
+        })
+        return player_id
+
+    def move_player(self, player_id, to_team_id, transaction_type, transaction_date, season):
+        from_team_id = self.players[player_id]['team_id']
+        if from_team_id is not None:
+            self.rosters[from_team_id].remove(player_id)
+        if to_team_id is not None:
+            self.rosters[to_team_id].append(player_id)
+        self.players[player_id]['team_id'] = to_team_id
+        self.rows['player_transactions'].append({
+            'player_id': player_id,
+            'from_team_id': from_team_id,
+            'to_team_id': to_team_id,
+            'transaction_type': transaction_type,
+            'transaction_date': transaction_date,
+            'season': season,
+            'source': 'synthetic',
+            'confidence_score': 100,
+        })
+
+    def offseason(self, start_year, season):
+        """Retirements are replaced by rookies; a share of the league signs elsewhere."""
+        rng = self.rng
+        moves_date = date(start_year, 7, 6)
+        for player_id in [p for team in self.team_ids for p in self.rosters[team]]:
+            if rng.random() < self.config.retirement_rate:
+                team_id = self.players[player_id]['team_id']
+                self.move_player(player_id, None, 'waiver', moves_date, season)
+                self.players[player_id]['is_active'] = False
+                self.create_player(team_id, start_year)
+
+        for player_id in [p for team in self.team_ids for p in self.rosters[team]]:
+            if rng.random() < self.config.offseason_churn:
+                from_team_id = self.players[player_id]['team_id']
+                to_team_id = self.team_ids[int(rng.integers(0, len(self.team_ids)))]
+                if to_team_id != from_team_id:
+                    self.move_player(player_id, to_team_id, 'signing', moves_date, season)
+
+        # Keep every roster at roster_size after the moves.
+        for team_id in self.team_ids:
+            while len(self.rosters[team_id]) > self.config.roster_size:
+                player_id = min(self.rosters[team_id], key=lambda p: self.players[p]['minutes'])
+                self.move_player(player_id, None, 'waiver', moves_date, season)
+            while len(self.rosters[team_id]) < self.config.roster_size:
+                self.create_player(team_id, start_year)
+
+    def trade(self, trade_date, season):
+        rng = self.rng
+        team_a, team_b = rng.choice(self.team_ids, size=2, replace=False)
+        player_a = self.rosters[int(team_a)][int(rng.integers(0, len(self.rosters[int(team_a)])))]
+        player_b = self.rosters[int(team_b)][int(rng.integers(0, len(self.rosters[int(team_b)])))]
+        self.move_player(player_a, int(team_b), 'trade', trade_date, season)
+        self.move_player(player_b, int(team_a), 'trade', trade_date, season)
+
+    # ----- schedule -----
+
+    def regular_season_schedule(self, start_year):
+        """(date, home, away) so every team plays about games_per_team games, at most one per day."""
+        rng = self.rng
+        days = (date(start_year + 1, 4, 13) - date(start_year, 10, 22)).days
+        target = self.config.games_per_team
+        played = {team_id: 0 for team_id in self.team_ids}
+        play_prob = min(0.95, target / days * 1.1)
+
+        schedule = []
+        for day in range(days):
+            game_date = date(start_year, 10, 22) + timedelta(days=day)
+            remaining_days = days - day
+            available = [t for t in self.team_ids if played[t] < target
+                         and rng.random() < max(play_prob, (target - played[t]) / remaining_days)]
+            rng.shuffle(available)
+            for home, away in zip(available[0::2], available[1::2]):
+                if rng.random() < 0.5:
+                    home, away = away, home
+                schedule.append((game_date, int(home), int(away)))
+                played[home] += 1
+                played[away] += 1
+        return schedule
+
+    # ----- games -----
+
+    def available_players(self, team_id, game_date):
+        return [p for p in self.rosters[team_id] if self.out_until.get(p, date.min) <= game_date]
+
+    def maybe_injure(self, players, game_date, season):
+        rng = self.rng
+        for player_id in players:
+            if rng.random() < self.config.injury_rate:
+                days_out = int(rng.geometric(0.12)) + 1
+                return_date = game_date + timedelta(days=days_out)
+                self.out_until[player_id] = return_date
+                self.rows['injuries'].append({
+                    'player_id': player_id,
+                    'report_date': game_date + timedelta(days=1),
+                    'injury_status': 'Out',
+                    'injury_description': ['Ankle', 'Knee', 'Hamstring', 'Back', 'Illness'][int(rng.integers(0, 5))],
+                    'return_date': return_date,
+                    'games_missed': max(1, int(round(days_out * 0.5))),
+                    'source': 'synthetic',
+                })
+
+    def box_score(self, team_id, opponent_id, players):
+        """One row per player who played, plus the team's possessions."""
+        rng = self.rng
+        if not players:
+            return [], 0.0
+        offense = self.team_strength[team_id]['offense'] / self.team_strength[opponent_id]['defense']
+        pace = (self.team_strength[team_id]['pace'] + self.team_strength[opponent_id]['pace']) / 2
+
+        players = sorted(players, key=lambda p: -self.players[p]['minutes'])[:13]
+        base_minutes = np.array([self.players[p]['minutes'] for p in players])
+        minutes = np.clip(base_minutes + rng.normal(0, 4, len(players)), 1, 44)
+        minutes = minutes * 240.0 / minutes.sum()
+
+        rows = []
+        for i, player_id in enumerate(players):
+            player = self.players[player_id]
+            rates = PER_36_RATES[player['defense_position']]
+            pct = SHOOTING_PCT[player['defense_position']]
+            scale = minutes[i] / 36.0 * pace * rng.gamma(8, 1 / 8)
+            usage = player['talent'] * offense
+
+            fg2a = rng.poisson(rates['fg2a'] * scale * usage)
+            fg3a = rng.poisson(rates['fg3a'] * scale * usage)
+            fta = rng.poisson(rates['fta'] * scale * usage)
+            fg2m = rng.binomial(fg2a, min(0.8, pct['fg2'] * offense))
+            fg3m = rng.binomial(fg3a, min(0.6, pct['fg3'] * offense))
+            ftm = rng.binomial(fta, pct['ft'])
+            oreb = rng.poisson(rates['oreb'] * scale)
+            dreb = rng.poisson(rates['dreb'] * scale)
+
+            rows.append({
+                'player_id': player_id,
+                'team_id': team_id,
+                'is_starter': i < 5,
+                'minutes_played': round(float(minutes[i]), 2),
+                'points': int(2 * fg2m + 3 * fg3m + ftm),
+                'rebounds_offensive': int(oreb),
+                'rebounds_defensive': int(dreb),
+                'rebounds_total': int(oreb + dreb),
+                'assists': int(rng.poisson(rates['ast'] * scale * player['talent'])),
+                'steals': int(rng.poisson(rates['stl'] * scale)),
+                'blocks': int(rng.poisson(rates['blk'] * scale)),
+                'turnovers': int(rng.poisson(rates['tov'] * scale * player['talent'])),
+                'personal_fouls': int(min(6, rng.poisson(2.5 * minutes[i] / 36))),
+                'field_goals_made': int(fg2m + fg3m),
+                'field_goals_attempted': int(fg2a + fg3a),
+                'three_pointers_made': int(fg3m),
+                'three_pointers_attempted': int(fg3a),
+                'free_throws_made': int(ftm),
+                'free_throws_attempted': int(fta),
+            })
+
+        team_fga = sum(r['field_goals_attempted'] for r in rows)
+        team_fta = sum(r['free_throws_attempted'] for r in rows)
+        team_tov = sum(r['turnovers'] for r in rows)
+        team_oreb = sum(r['rebounds_offensive'] for r in rows)
+        possessions = max(1.0, team_fga - team_oreb + team_tov + 0.44 * team_fta)
+        team_used = max(1.0, team_fga + 0.44 * team_fta + team_tov)
+
+        for r in rows:
+            used = r['field_goals_attempted'] + 0.44 * r['free_throws_attempted'] + r['turnovers']
+            shots = r['field_goals_attempted'] + 0.44 * r['free_throws_attempted']
+            r['usage_rate'] = round(100 * used * 48 / (r['minutes_played'] * team_used), 1)
+            r['true_shooting_pct'] = round(100 * r['points'] / (2 * shots), 1) if shots > 0 else None
+            r['offensive_rating'] = round(100 * r['points'] / max(1.0, used) * 1.05, 1) if used > 0 else None
+        return rows, possessions
+
+    def play_game(self, game_id, game_date, season, home, away, game_type, playoff_round=None, completed=True):
+        game = {
+            'game_id': game_id,
+            'game_date': game_date,
+            'season': season,
+            'home_team_id': home,
+            'away_team_id': away,
+            'home_score': None,
+            'away_score': None,
+            'game_status': 'completed' if completed else 'scheduled',
+            'attendance': None,
+            'game_duration_minutes': None,
+            'home_pace': None,
+            'away_pace': None,
+            'game_type': game_type,
+            'playoff_round': playoff_round,
+            'is_in_season_tournament': False,
+            'is_national_tv': bool(self.rng.random() < 0.15),
+            'tv_broadcaster': None,
+        }
+        self.rows['games'].append(game)
+        if not completed:
+            return None
+
+        home_players = self.available_players(home, game_date)
+        away_players = self.available_players(away, game_date)
+        home_rows, home_poss = self.box_score(home, away, home_players)
+        away_rows, away_poss = self.box_score(away, home, away_players)
+
+        home_score = sum(r['points'] for r in home_rows)
+        away_score = sum(r['points'] for r in away_rows)
+        if home_score == away_score:
+            # Overtime, decided by one basket.
+            winner_rows = home_rows if self.rng.random() < 0.55 else away_rows
+            winner_rows[0]['points'] += 2
+            winner_rows[0]['field_goals_made'] += 1
+            winner_rows[0]['field_goals_attempted'] += 1
+            home_score = sum(r['points'] for r in home_rows)
+            away_score = sum(r['points'] for r in away_rows)
+
+        possessions = (home_poss + away_poss) / 2
+        for rows, margin, opp_score in ((home_rows, home_score - away_score, away_score),
+                                        (away_rows, away_score - home_score, home_score)):
+            for r in rows:
+                r['game_id'] = game_id
+                r['plus_minus'] = int(round(margin * r['minutes_played'] / 48 + self.rng.normal(0, 3)))
+                r['defensive_rating'] = round(100 * opp_score / possessions + self.rng.normal(0, 4), 1)
+                self.rows['player_game_stats'].append(r)
+
+        game.update({
+            'home_score': home_score,
+            'away_score': away_score,
+            'attendance': int(self.rng.integers(14000, 21000)),
+            'game_duration_minutes': int(self.rng.integers(125, 150)),
+            'home_pace': round(possessions, 2),
+            'away_pace': round(possessions, 2),
+        })
+
+        self.maybe_injure(home_players + away_players, game_date, season)
+        return home_score > away_score
+
+    def playoffs(self, start_year, season, wins, game_number):
+        """Best-of-7 bracket of the top playoff_teams by regular season wins."""
+        n_teams = 2 ** int(np.log2(max(2, min(self.config.playoff_teams, len(self.team_ids)))))
+        seeds = sorted(self.team_ids, key=lambda t: -wins[t])[:n_teams]
+        bracket = [seeds[i // 2] if i % 2 == 0 else seeds[n_teams - 1 - i // 2] for i in range(n_teams)]
+
+        game_date = date(start_year + 1, 4, 19)
+        round_index = len(PLAYOFF_ROUNDS) - int(np.log2(n_teams))
+        while len(bracket) > 1:
+            playoff_round = PLAYOFF_ROUNDS[max(0, round_index)]
+            winners = []
+            round_end = game_date
+            for high, low in zip(bracket[0::2], bracket[1::2]):
+                series = {high: 0, low: 0}
+                series_date = game_date
+                game_in_series = 0
+                while max(series.values()) < 4:
+                    home, away = (high, low) if game_in_series in (0, 1, 4, 6) else (low, high)
+                    game_id = f"004{str(start_year)[2:]}{game_number:05d}"
+                    game_number += 1
+                    home_won = self.play_game(game_id, series_date, season, home, away, 'playoff', playoff_round)
+                    series[home if home_won else away] += 1
+                    series_date += timedelta(days=2)
+                    game_in_series += 1
+                winners.append(max(series, key=series.get))
+                round_end = max(round_end, series_date)
+            bracket = winners
+            game_date = round_end + timedelta(days=1)
+            round_index += 1
+
+    def play_season(self, season_index):
+        start_year = self.config.first_season + season_index
+        season = _season_name(start_year)
+        is_last_season = season_index == self.config.seasons - 1
+        print(f"Simulating {season}...")
+
+        if season_index > 0:
+            self.offseason(start_year, season)
+
+        schedule = self.regular_season_schedule(start_year)
+        scheduled_dates = sorted({d for d, _, _ in schedule})
+        cutoff = scheduled_dates[-self.config.scheduled_days] if is_last_season and self.config.scheduled_days else None
+
+        trade_deadline = date(start_year + 1, 2, 8)
+        trade_days = sorted(self.rng.choice(range((trade_deadline - date(start_year, 11, 15)).days),
+                                            size=self.config.trades_per_season))
+        trade_dates = [date(start_year, 11, 15) + timedelta(days=int(d)) for d in trade_days]
+
+        wins = {team_id: 0 for team_id in self.team_ids}
+        for game_number, (game_date, home, away) in enumerate(schedule, start=1):
+            while trade_dates and trade_dates[0] <= game_date:
+                self.trade(trade_dates.pop(0), season)
+            completed = cutoff is None or game_date < cutoff
+            game_id = f"002{str(start_year)[2:]}{game_number:05d}"
+            home_won = self.play_game(game_id, game_date, season, home, away, 'regular_season', completed=completed)
+            if home_won is not None:
+                wins[home if home_won else away] += 1
+
+        # The league's last season stops at the scheduled games, like the live database mid-season.
+        if not is_last_season:
+            self.playoffs(start_year, season, wins, 1)
+
+    # ----- derived tables -----
+
+    def team_tables(self, games, stats):
+        completed = games[(games['game_status'] == 'completed') & (games['game_type'] == 'regular_season')]
+        team_games = pd.concat([
+            completed.assign(team_id=completed['home_team_id'], opponent_id=completed['away_team_id'],
+                             points_for=completed['home_score'], points_against=completed['away_score']),
+            completed.assign(team_id=completed['away_team_id'], opponent_id=completed['home_team_id'],
+                             points_for=completed['away_score'], points_against=completed['home_score']),
+        ]).sort_values('game_date')
+        team_games['won'] = team_games['points_for'] > team_games['points_against']
+
+        # Elo over every regular season game in date order.
+        elo = {team_id: 1500.0 for team_id in self.team_ids}
+        elo_by_team_season = {}
+        for _, g in completed.sort_values('game_date').iterrows():
+            home, away = g['home_team_id'], g['away_team_id']
+            expected = 1 / (1 + 10 ** ((elo[away] - elo[home] - 100) / 400))
+            result = 1.0 if g['home_score'] > g['away_score'] else 0.0
+            elo[home] += 20 * (result - expected)
+            elo[away] -= 20 * (result - expected)
+            elo_by_team_season[(home, g['season'])] = elo[home]
+            elo_by_team_season[(away, g['season'])] = elo[away]
+
+        pgs = stats.merge(completed[['game_id', 'season', 'home_team_id', 'away_team_id']], on='game_id')
+        pgs['opponent_id'] = np.where(pgs['team_id'] == pgs['home_team_id'], pgs['away_team_id'], pgs['home_team_id'])
+        pgs['possessions'] = (pgs['field_goals_attempted'] - pgs['rebounds_offensive'] + pgs['turnovers']
+                              + 0.44 * pgs['free_throws_attempted'])
+        team_box = pgs.groupby(['season', 'game_id', 'team_id', 'opponent_id']).sum(numeric_only=True).reset_index()
+
+        for (team_id, season), tg in team_games.groupby(['team_id', 'season']):
+            own = team_box[(team_box['team_id'] == team_id) & (team_box['season'] == season)]
+            opp = team_box[(team_box['opponent_id'] == team_id) & (team_box['season'] == season)]
+            possessions = max(1.0, own['possessions'].sum())
+            n_games = len(tg)
+            offensive_rating = 100 * tg['points_for'].sum() / possessions
+            defensive_rating = 100 * tg['points_against'].sum() / max(1.0, opp['possessions'].sum())
+
+            self.rows['team_ratings'].append({
+                'team_id': team_id,
+                'season': season,
+                'rating_date': tg['game_date'].max(),
+                'elo_rating': round(elo_by_team_season.get((team_id, season), 1500.0), 2),
+                'offensive_rating': round(offensive_rating, 2),
+                'defensive_rating': round(defensive_rating, 2),
+                'net_rating': round(offensive_rating - defensive_rating, 2),
+                'win_pct': round(tg['won'].mean(), 3),
+                'games_played': n_games,
+                'wins': int(tg['won'].sum()),
+                'losses': int(n_games - tg['won'].sum()),
+                'pace': round(possessions / n_games, 1),
+            })
+
+            opp_fga = max(1, opp['field_goals_attempted'].sum())
+            opp_3pa = max(1, opp['three_pointers_attempted'].sum())
+            opp_2pa = max(1, opp_fga - opp['three_pointers_attempted'].sum())
+            opp_fta = max(1, opp['free_throws_attempted'].sum())
+            opp_fg_pct = opp['field_goals_made'].sum() / opp_fga
+            opp_3p_pct = opp['three_pointers_made'].sum() / opp_3pa
+            dreb = own['rebounds_defensive'].sum()
+            self.rows['team_defensive_stats'].append({
+                'team_id': team_id,
+                'season': season,
+                'stat_date': tg['game_date'].max(),
+                'games_played': n_games,
+                'opp_points_per_game': round(tg['points_against'].mean(), 2),
+                'opp_rebounds_per_game': round(opp['rebounds_total'].sum() / n_games, 2),
+                'opp_assists_per_game': round(opp['assists'].sum() / n_games, 2),
+                'opp_steals_per_game': round(opp['steals'].sum() / n_games, 2),
+                'opp_blocks_per_game': round(opp['blocks'].sum() / n_games, 2),
+                'opp_turnovers_per_game': round(opp['turnovers'].sum() / n_games, 2),
+                'opp_fg_pct': round(opp_fg_pct, 3),
+                'opp_three_pt_pct': round(opp_3p_pct, 3),
+                'defensive_rating': round(defensive_rating, 2),
+                'defensive_rebound_pct': round(dreb / max(1, dreb + opp['rebounds_offensive'].sum()), 3),
+                'opponent_offensive_rebound_pct': round(opp['rebounds_offensive'].sum()
+                                                        / max(1, dreb + opp['rebounds_offensive'].sum()), 3),
+                'rim_fg_pct_allowed': None,
+                'three_pt_fg_pct_allowed': round(opp_3p_pct, 3),
+                'mid_range_fg_pct_allowed': None,
+                'opp_field_goal_pct': round(100 * opp_fg_pct, 1),
+                'opp_three_point_pct': round(100 * opp_3p_pct, 1),
+                'opp_two_point_pct': round(100 * (opp['field_goals_made'].sum() - opp['three_pointers_made'].sum())
+                                           / opp_2pa, 1),
+                'opp_free_throw_pct': round(100 * opp['free_throws_made'].sum() / opp_fta, 1),
+                'opp_three_point_attempts_pg': round(opp['three_pointers_attempted'].sum() / n_games, 1),
+                'opp_free_throw_attempts_pg': round(opp['free_throws_attempted'].sum() / n_games, 1),
+                'opp_free_throw_rate': round(opp['free_throws_attempted'].sum() / opp_fga, 3),
+            })
+
+        positions = pd.DataFrame(self.rows['players'])[['player_id', 'position']]
+        pgs = pgs.merge(positions, on='player_id')
+        pgs['defense_position'] = pgs['position'].map(_defense_position)
+        for (team_id, season, position), allowed in pgs.groupby(['opponent_id', 'season', 'defense_position']):
+            n_games = allowed['game_id'].nunique()
+            fga = max(1, allowed['field_goals_attempted'].sum())
+            fg3a = max(1, allowed['three_pointers_attempted'].sum())
+            self.rows['position_defense_stats'].append({
+                'team_id': team_id,
+                'season': season,
+                'position': position,
+                'points_allowed_per_game': round(allowed['points'].sum() / n_games, 2),
+                'rebounds_allowed_per_game': round(allowed['rebounds_total'].sum() / n_games, 2),
+                'assists_allowed_per_game': round(allowed['assists'].sum() / n_games, 2),
+                'fg_pct_allowed': round(allowed['field_goals_made'].sum() / fga, 3),
+                'games_played': n_games,
+                'opp_points_per_game': round(allowed['points'].sum() / n_games, 1),
+                'opp_field_goal_pct': round(100 * allowed['field_goals_made'].sum() / fga, 1),
+                'opp_three_point_pct': round(100 * allowed['three_pointers_made'].sum() / fg3a, 1),
+                'steals_allowed_per_game': round(allowed['steals'].sum() / n_games, 2),
+                'blocks_allowed_per_game': round(allowed['blocks'].sum() / n_games, 2),
+                'turnovers_forced_per_game': round(allowed['turnovers'].sum() / n_games, 2),
+                'three_pointers_made_allowed_per_game': round(allowed['three_pointers_made'].sum() / n_games, 2),
+            })
+
+    def predictions(self, games, stats):
+        """Stored predictions with actuals for the last prediction_days of completed games."""
+        if not self.config.prediction_days:
+            return
+        completed = games[games['game_status'] == 'completed']
+        last_date = completed['game_date'].max()
+        recent = completed[completed['game_date'] > last_date - timedelta(days=self.config.prediction_days)]
+
+        stat_cols = {'points': 'points', 'rebounds': 'rebounds_total', 'assists': 'assists', 'steals': 'steals',
+                     'blocks': 'blocks', 'turnovers': 'turnovers', 'three_pointers_made': 'three_pointers_made'}
+        player_means = stats.groupby('player_id')[list(stat_cols.values())].mean()
+        rows = stats[stats['game_id'].isin(recent['game_id'])].merge(recent[['game_id', 'game_date']], on='game_id')
+        means = player_means.loc[rows['player_id']].to_numpy()
+        actual = rows[list(stat_cols.values())].to_numpy(dtype=float)
+
+        for model_version in PREDICTION_MODELS:
+            noise = self.rng.normal(0, 1, actual.shape) * np.sqrt(means + 0.5)
+            predicted = np.clip(0.85 * means + 0.15 * actual + noise * 0.5, 0, None)
+            for i, r in enumerate(rows.itertuples(index=False)):
+                prediction = {
+                    'player_id': r.player_id,
+                    'game_id': r.game_id,
+                    'prediction_date': datetime.combine(r.game_date, datetime.min.time()),
+                    'confidence_score': int(self.rng.integers(40, 90)),
+                    'model_version': model_version,
+                }
+                for j, name in enumerate(stat_cols):
+                    prediction[f'predicted_{name}'] = round(float(predicted[i, j]), 1)
+                    prediction[f'actual_{name}'] = float(actual[i, j])
+                prediction['prediction_error'] = round(float(np.abs(predicted[i] - actual[i]).mean()), 2)
+                self.rows['predictions'].append(prediction)
+
+    # ----- output -----
+
+    def generate(self):
+        self.create_teams()
+        for season_index in range(self.config.seasons):
+            self.play_season(season_index)
+
+        for player_row in self.rows['players']:
+            player = self.players[player_row['player_id']]
+            player_row['team_id'] = player['team_id']
+            player_row['is_active'] = player['is_active']
+
+        games = pd.DataFrame(self.rows['games'])
+        stats = pd.DataFrame(self.rows['player_game_stats'])
+        print("Deriving team ratings, defensive and position defense stats...")
+        self.team_tables(games, stats)
+        self.predictions(games, stats)
+
+        return {table: self.to_frame(table) for table in LEAGUE_TABLES}
+
+    def to_frame(self, table):
+        """Rows as a DataFrame with every production column, surrogate keys filled 1..n."""
+        df = pd.DataFrame(self.rows[table])
+        columns = get_column_names(table)
+        key, key_type = TABLE_COLUMNS[table][0]
+        if key not in df.columns and key_type.startswith('INTEGER'):
+            df.insert(0, key, np.arange(1, len(df) + 1))
+        if 'created_at' in columns:
+            df['created_at'] = datetime(self.config.first_season + self.config.seasons, 4, 15)
+        if 'updated_at' in columns:
+            df['updated_at'] = df['created_at']
+        return df.reindex(columns=columns)
+
+
+def write_database(tables, backend, db_path):
+    """Every production table, including the ones the generator leaves empty."""
+    empty = {table: pd.DataFrame(columns=get_column_names(table)) for table in TABLE_COLUMNS if table not in tables}
+    return write_local_tables({**tables, **empty}, backend, db_path)
+
+
+def write_snapshot(tables, snapshot_dir, file_format='csv', metadata=None):
+    os.makedirs(snapshot_dir, exist_ok=True)
+    for table, df in tables.items():
+        if file_format == 'parquet':
+            df.to_parquet(os.path.join(snapshot_dir, f'{table}.parquet'), index=False)
+        else:
+            df.to_csv(os.path.join(snapshot_dir, f'{table}.csv'), index=False)
+
+    manifest = {
+        'generated_at': datetime.now().isoformat(),
+        'format': file_format,
+        'tables': {table: len(df) for table, df in tables.items()},
+        **(metadata or {})
+    }
+    with open(os.path.join(snapshot_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, default=str)
+    return snapshot_dir
+
+
+def generate_synthetic_league(config=None, sqlite_path=None, duckdb_path=None, snapshot_dir=None, file_format='csv'):
+    config = config or LeagueConfig()
+    print("="*70)
+    print("GENERATING SYNTHETIC LEAGUE")
+    print("="*70)
+    print(f"{config.seasons} seasons from {_season_name(config.first_season)}, {config.teams} teams, "
+          f"{config.roster_size} players per roster\n")
+
+    tables = LeagueGenerator(config).generate()
+
+    print("\nRows per table:")
+    for table, df in tables.items():
+        print(f"  {table:25s}: {len(df):>10,}")
+
+    if sqlite_path:
+        write_database(tables, 'sqlite', sqlite_path)
+        print(f"\nSQLite database written to {sqlite_path}")
+    if duckdb_path:
+        write_database(tables, 'duckdb', duckdb_path)
+        print(f"\nDuckDB database written to {duckdb_path}")
+    if snapshot_dir:
+        write_snapshot(tables, snapshot_dir, file_format, {'config': asdict(config)})
+        print(f"\nSnapshot written to {snapshot_dir}")
+
+    return tables
+
+
+if __name__ == "__main__":
+    import argparse
+    defaults = LeagueConfig()
+    parser = argparse.ArgumentParser(description='Generate a synthetic league with the production database schema')
+    parser.add_argument('--sqlite', default=None, help='Write the league to this SQLite database (tables are replaced)')
+    parser.add_argument('--duckdb', default=None, help='Write the league to this DuckDB database (tables are replaced)')
+    parser.add_argument('--snapshot', default=None, help='Write one file per table into this directory')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help='Snapshot file format')
+    parser.add_argument('--seasons', type=int, default=defaults.seasons, help='Number of seasons')
+    parser.add_argument('--first-season', type=int, default=defaults.first_season,
+                       help='Start year of the first season (2022 -> 2022-23)')
+    parser.add_argument('--teams', type=int, default=defaults.teams, help='Number of teams')
+    parser.add_argument('--scale', type=int, default=1,
+                       help='Multiply the number of teams (10 gives about 10x the real data volume)')
+    parser.add_argument('--roster-size', type=int, default=defaults.roster_size, help='Players per roster')
+    parser.add_argument('--games-per-team', type=int, default=defaults.games_per_team,
+                       help='Regular season games per team')
+    parser.add_argument('--churn', type=float, default=defaults.offseason_churn,
+                       help='Share of players who change teams each offseason')
+    parser.add_argument('--trades-per-season', type=int, default=defaults.trades_per_season,
+                       help='Two-player trades before each trade deadline')
+    parser.add_argument('--injury-rate', type=float, default=defaults.injury_rate,
+                       help='Chance per player per game of an injury')
+    parser.add_argument('--scheduled-days', type=int, default=defaults.scheduled_days,
+                       help="Last days of the final season left as 'scheduled' for predict_games.py")
+    parser.add_argument('--prediction-days', type=int, default=defaults.prediction_days,
+                       help='Days of stored predictions with actuals (0 for none)')
+    parser.add_argument('--seed', type=int, default=defaults.seed, help='Random seed')
+    args = parser.parse_args()
+
+    if not args.sqlite and not args.duckdb and not args.snapshot:
+        parser.error('Specify --sqlite, --duckdb and/or --snapshot')
+
+    generate_synthetic_league(
+        LeagueConfig(
+            seasons=args.seasons,
+            first_season=args.first_season,
+            teams=args.teams * args.scale,
+            roster_size=args.roster_size,
+            games_per_team=args.games_per_team,
+            offseason_churn=args.churn,
+            trades_per_season=args.trades_per_season * args.scale,
+            injury_rate=args.injury_rate,
+            scheduled_days=args.scheduled_days,
+            prediction_days=args.prediction_days,
+            seed=args.seed
+        ),
+        sqlite_path=args.sqlite,
+        duckdb_path=args.duckdb,
+        snapshot_dir=args.snapshot,
+        file_format=args.format
+    )
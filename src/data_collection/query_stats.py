@@ -0,0 +1,362 @@
+import os
+import re
+import sys
+import json
+import time
+import atexit
+import hashlib
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Query counts and latency per statement shape. get_db_connection() wraps its connection when
+# QUERY_STATS=1 (or PROFILE=1, which --profile sets): every cur.execute, executemany, COPY and
+# pd.read_sql through it is fingerprinted by its normalized text (literals, placeholders and
+# IN/VALUES lists collapsed), so the same f-string query with different ids counts as one.
+# Fingerprints executed more than N_PLUS_ONE_THRESHOLD times in a run are flagged as N+1
+# patterns with the lines that issued them. The summary prints at exit; the JSON report uses
+# the benchmark 'results' layout, so compare_benchmarks.py --files can diff two runs.
+
+__all__ = [
+    'QUERY_STATS_ENV',
+    'QUERY_STATS_OUTPUT_ENV',
+    'N_PLUS_ONE_ENV',
+    'N_PLUS_ONE_THRESHOLD',
+    'QueryStats',
+    'InstrumentedConnection',
+    'InstrumentedCursor',
+    'normalize_query',
+    'fingerprint_query',
+    'query_stats_enabled',
+    'instrument_connection',
+    'raw_connection',
+    'get_query_stats',
+]
+
+QUERY_STATS_ENV = 'QUERY_STATS'
+QUERY_STATS_OUTPUT_ENV = 'QUERY_STATS_OUTPUT'
+N_PLUS_ONE_ENV = 'QUERY_STATS_N_PLUS_ONE'
+N_PLUS_ONE_THRESHOLD = 50
+SUMMARY_QUERIES = 15
+TOP_CALLERS = 3
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDERS = re.compile(r"%\(\w+\)s|%s|\$\d+|\?|(?<!:):[a-z_]\w*", re.IGNORECASE)
+_NUMBERS = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?\b", re.IGNORECASE)
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_VALUES_ROWS = re.compile(r"(\(\?\.\.\.\))(?:\s*,\s*\(\?\.\.\.\))+")
+_WHITESPACE = re.compile(r"\s+")
+_DML = ('insert', 'update', 'delete', 'copy')
+
+# Frames from these files are skipped when attributing a query to the line that issued it.
+_SKIP_CALLER_PARTS = (os.sep + 'pandas' + os.sep, os.sep + 'psycopg2' + os.sep, os.sep + 'sqlalchemy' + os.sep)
+_SKIP_CALLER_FILES = ('query_stats.py', 'db_backends.py', 'bulk_read.py', 'utils.py')
+
+
+def normalize_query(query) -> str:
+    """Query text with comments, literals and parameter lists reduced to a stable shape."""
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', errors='replace')
+    query = str(query)
+    query = _COMMENTS.sub(' ', query)
+    query = _STRINGS.sub('?', query)
+    query = _PLACEHOLDERS.sub('?', query)
+    query = _NUMBERS.sub('?', query)
+    query = _WHITESPACE.sub(' ', query).strip().rstrip(';').strip()
+    query = _LISTS.sub('(?...)', query)
+    query = _VALUES_ROWS.sub(r'\1', query)
+    return query.lower()
+
+
+def fingerprint_query(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:12]
+
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, '').lower() in ('1', 'true', 'yes')
+
+
+def query_stats_enabled() -> bool:
+    # PROFILE is the variable --profile exports (see src/profiling.py).
+    return _env_flag(QUERY_STATS_ENV) or _env_flag('PROFILE')
+
+
+def _caller() -> str:
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not (any(part in filename for part in _SKIP_CALLER_PARTS)
+                or os.path.basename(filename) in _SKIP_CALLER_FILES):
+            return f"{os.path.basename(filename)}:{frame.f_lineno}"
+        frame = frame.f_back
+    return 'unknown'
+
+
+class QueryStats:
+    """Per-fingerprint count, time and rows for every instrumented connection in this process."""
+
+    def __init__(self, n_plus_one_threshold: Optional[int] = None):
+        if n_plus_one_threshold is None:
+            n_plus_one_threshold = int(os.environ.get(N_PLUS_ONE_ENV, N_PLUS_ONE_THRESHOLD))
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.started_at = datetime.now()
+        self.pid = os.getpid()
+        self.entries: Dict[str, Dict] = {}
+        self.connections = 0
+        self._normalized_cache: Dict[str, tuple] = {}
+        self._finished = False
+
+    def _entry(self, query) -> Dict:
+        key = query if isinstance(query, str) else None
+        cached = self._normalized_cache.get(key) if key is not None else None
+        if cached is None:
+            normalized = normalize_query(query)
+            cached = (fingerprint_query(normalized), normalized)
+            if key is not None and len(self._normalized_cache) < 10000:
+                self._normalized_cache[key] = cached
+        fingerprint, normalized = cached
+        entry = self.entries.get(fingerprint)
+        if entry is None:
+            entry = self.entries[fingerprint] = {
+                'query': normalized, 'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0,
+                'rows': 0, 'callers': Counter(),
+            }
+        return entry
+
+    def record(self, query, seconds: float, caller: str) -> Dict:
+        entry = self._entry(query)
+        entry['calls'] += 1
+        entry['seconds'] += seconds
+        entry['max_seconds'] = max(entry['max_seconds'], seconds)
+        entry['callers'][caller] += 1
+        return entry
+
+    def n_plus_one(self) -> List[Dict]:
+        flagged = [(fingerprint, entry) for fingerprint, entry in self.entries.items()
+                   if entry['calls'] > self.n_plus_one_threshold]
+        flagged.sort(key=lambda x: x[1]['calls'], reverse=True)
+        return [{'fingerprint': fingerprint, 'calls': entry['calls'], 'seconds': round(entry['seconds'], 4),
+                 'callers': dict(entry['callers'].most_common(TOP_CALLERS)), 'query': entry['query']}
+                for fingerprint, entry in flagged]
+
+    def report(self, run_name: Optional[str] = None) -> Dict:
+        results = {}
+        for fingerprint, entry in sorted(self.entries.items(), key=lambda x: x[1]['seconds'], reverse=True):
+            results[f'sql/{fingerprint}'] = {
+                'seconds': round(entry['seconds'], 4),
+                'calls': entry['calls'],
+                'rows': entry['rows'],
+                'max_seconds': round(entry['max_seconds'], 4),
+                'callers': dict(entry['callers'].most_common(TOP_CALLERS)),
+                'query': entry['query'],
+            }
+        results['sql/total'] = {
+            'seconds': round(sum(e['seconds'] for e in self.entries.values()), 4),
+            'calls': sum(e['calls'] for e in self.entries.values()),
+            'rows': sum(e['rows'] for e in self.entries.values()),
+        }
+        return {
+            'run': run_name,
+            'timestamp': self.started_at.isoformat(),
+            'argv': sys.argv,
+            'rows': None,
+            'cpu_budget': None,
+            'connections': self.connections,
+            'n_plus_one_threshold': self.n_plus_one_threshold,
+            'n_plus_one': self.n_plus_one(),
+            'results': results,
+        }
+
+    def print_summary(self):
+        total = sum(e['seconds'] for e in self.entries.values())
+        calls = sum(e['calls'] for e in self.entries.values())
+        print("\n" + "="*70)
+        print(f"SQL QUERIES: {calls} executions of {len(self.entries)} distinct queries, {total:.2f}s")
+        print("="*70)
+        print(f"{'Fingerprint':<13} {'Calls':>7} {'Seconds':>9} {'Mean ms':>9} {'Rows':>9}  Query")
+        top = sorted(self.entries.items(), key=lambda x: x[1]['seconds'], reverse=True)[:SUMMARY_QUERIES]
+        for fingerprint, entry in top:
+            mean_ms = 1000 * entry['seconds'] / entry['calls']
+            print(f"{fingerprint:<13} {entry['calls']:>7} {entry['seconds']:>9.2f} {mean_ms:>9.1f} "
+                  f"{entry['rows']:>9}  {entry['query'][:70]}")
+        if len(self.entries) > SUMMARY_QUERIES:
+            print(f"... {len(self.entries) - SUMMARY_QUERIES} more in the JSON report")
+
+        flagged = self.n_plus_one()
+        if flagged:
+            print(f"\nPossible N+1 queries (more than {self.n_plus_one_threshold} executions):")
+            for item in flagged:
+                callers = ', '.join(f"{caller} ({count}x)" for caller, count in item['callers'].items())
+                print(f"  {item['fingerprint']}: {item['calls']} calls, {item['seconds']:.2f}s from {callers}")
+                print(f"    {item['query'][:120]}")
+
+    def _report_path(self) -> Optional[str]:
+        if os.environ.get(QUERY_STATS_OUTPUT_ENV):
+            return os.environ[QUERY_STATS_OUTPUT_ENV]
+        # Inside a timed run, the report goes next to the stage timing report.
+        try:
+            from profiling import get_profiler
+        except ImportError:
+            return None
+        profiler = get_profiler()
+        if profiler is None:
+            return None
+        stamp = profiler.started_at.strftime('%Y%m%d_%H%M%S')
+        return os.path.join(profiler.output_dir, f'{profiler.run_name}_{stamp}_queries.json')
+
+    def finish(self, output_path: Optional[str] = None) -> Optional[str]:
+        """Print the summary and write the JSON report (QUERY_STATS_OUTPUT, or next to the timing report)."""
+        if self._finished or os.getpid() != self.pid or not self.entries:
+            return None
+        self._finished = True
+        self.print_summary()
+
+        output_path = output_path or self._report_path()
+        if output_path is None:
+            return None
+        run_name = None
+        try:
+            from profiling import get_profiler
+            profiler = get_profiler()
+            run_name = profiler.run_name if profiler is not None else None
+        except ImportError:
+            pass
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        with open(output_path, 'w') as f:
+            json.dump(self.report(run_name), f, indent=2)
+        print(f"\nQuery report saved to {output_path}")
+        return output_path
+
+
+_query_stats: Optional[QueryStats] = None
+
+
+def get_query_stats() -> Optional[QueryStats]:
+    return _query_stats
+
+
+def _get_or_create_stats() -> QueryStats:
+    global _query_stats
+    if _query_stats is None or _query_stats.pid != os.getpid():
+        _query_stats = QueryStats()
+        atexit.register(_query_stats.finish)
+    return _query_stats
+
+
+class InstrumentedCursor:
+    """Times execute/executemany/copy_expert and counts the rows fetched or affected."""
+
+    def __init__(self, cursor, stats: QueryStats):
+        self._cursor = cursor
+        self._stats = stats
+        self._entry = None
+        self._count_fetched = False
+
+    def _timed(self, method, query, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = method(query, *args, **kwargs)
+        finally:
+            self._entry = self._stats.record(query, time.perf_counter() - start, _caller())
+        # DML and COPY report affected rows (DuckDB DML also returns a count row, and
+        # INSERT ... RETURNING returns the rows themselves); queries count the rows fetched.
+        rowcount = self._cursor.rowcount
+        has_rowcount = rowcount is not None and rowcount > 0 and self._entry['query'].startswith(_DML)
+        self._count_fetched = self._cursor.description is not None and not has_rowcount
+        if has_rowcount or (self._cursor.description is None and rowcount is not None and rowcount > 0):
+            self._entry['rows'] += rowcount
+        return result
+
+    def execute(self, query, params=None):
+        if params is None:
+            result = self._timed(self._cursor.execute, query)
+        else:
+            result = self._timed(self._cursor.execute, query, params)
+        # LocalCursor.execute returns itself (DuckDB style); psycopg2 returns None.
+        return self if result is self._cursor else result
+
+    def executemany(self, query, params_seq):
+        result = self._timed(self._cursor.executemany, query, params_seq)
+        return self if result is self._cursor else result
+
+    def copy_expert(self, sql, file, *args, **kwargs):
+        return self._timed(self._cursor.copy_expert, sql, file, *args, **kwargs)
+
+    def _fetched(self, rows, start):
+        # Fetch time counts toward the statement: embedded backends do most of their work here.
+        if self._entry is not None:
+            self._entry['seconds'] += time.perf_counter() - start
+            if self._count_fetched and rows is not None:
+                self._entry['rows'] += len(rows)
+        return rows
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = self._cursor.fetchone()
+        if self._entry is not None:
+            self._entry['seconds'] += time.perf_counter() - start
+            if self._count_fetched and row is not None:
+                self._entry['rows'] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = self._cursor.fetchmany(size) if size else self._cursor.fetchmany()
+        return self._fetched(rows, start)
+
+    def fetchall(self):
+        start = time.perf_counter()
+        return self._fetched(self._cursor.fetchall(), start)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __enter__(self):
+        self._cursor.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._cursor.__exit__(*exc)
+
+
+class InstrumentedConnection:
+    """Connection proxy whose cursors are instrumented; everything else goes to the wrapped connection."""
+
+    def __init__(self, connection, stats: QueryStats):
+        self.__dict__['wrapped'] = connection
+        self.__dict__['_stats'] = stats
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self.wrapped.cursor(*args, **kwargs), self._stats)
+
+    def __getattr__(self, name):
+        return getattr(self.wrapped, name)
+
+    def __setattr__(self, name, value):
+        # e.g. conn.autocommit = True must reach the real connection.
+        setattr(self.wrapped, name, value)
+
+    def __enter__(self):
+        self.wrapped.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self.wrapped.__exit__(*exc)
+
+
+def instrument_connection(conn, force: bool = False):
+    """Wrap conn for query stats when QUERY_STATS=1 or PROFILE=1 (or force); otherwise return it as is."""
+    if isinstance(conn, InstrumentedConnection) or not (force or query_stats_enabled()):
+        return conn
+    stats = _get_or_create_stats()
+    stats.connections += 1
+    return InstrumentedConnection(conn, stats)
+
+
+def raw_connection(conn):
+    """The driver connection behind an instrumented one, for driver-specific paths (COPY, execute_values)."""
+    return conn.wrapped if isinstance(conn, InstrumentedConnection) else conn
@@ -0,0 +1,340 @@
+from typing import Dict, List, Tuple
+
+# Column layout of the production Postgres database (see database_structure.txt),
+# used to create local SQLite/DuckDB copies and file snapshots with the same shape.
+
+__all__ = [
+    'TABLE_COLUMNS',
+    'UNIQUE_KEYS',
+    'LEAGUE_TABLES',
+    'get_column_names',
+    'LOCAL_INDEXES',
+    'create_table_sql',
+    'create_index_sql',
+]
+
+TABLE_COLUMNS: Dict[str, List[Tuple[str, str]]] = {
+    'confidence_components': [
+        ('component_id', 'INTEGER PRIMARY KEY'),
+        ('prediction_id', 'INTEGER'),
+        ('player_id', 'INTEGER'),
+        ('game_id', 'INTEGER'),
+        ('prediction_date', 'DATE'),
+        ('model_version', 'VARCHAR(50)'),
+        ('stat_name', 'VARCHAR(50)'),
+        ('ensemble_score', 'DECIMAL(6,2)'),
+        ('variance_score', 'DECIMAL(6,2)'),
+        ('feature_score', 'DECIMAL(6,2)'),
+        ('experience_score', 'DECIMAL(6,2)'),
+        ('transaction_score', 'DECIMAL(6,2)'),
+        ('opponent_adj', 'DECIMAL(6,2)'),
+        ('injury_adj', 'DECIMAL(6,2)'),
+        ('playoff_adj', 'DECIMAL(6,2)'),
+        ('back_to_back_adj', 'DECIMAL(6,2)'),
+        ('raw_score', 'DECIMAL(6,2)'),
+        ('calibrated_score', 'DECIMAL(6,2)'),
+        ('n_models', 'INTEGER'),
+        ('created_at', 'TIMESTAMP'),
+    ],
+    'games': [
+        ('game_id', 'VARCHAR(10) PRIMARY KEY'),
+        ('game_date', 'DATE'),
+        ('season', 'VARCHAR(7)'),
+        ('home_team_id', 'INTEGER'),
+        ('away_team_id', 'INTEGER'),
+        ('home_score', 'INTEGER'),
+        ('away_score', 'INTEGER'),
+        ('game_status', 'VARCHAR(20)'),
+        ('attendance', 'INTEGER'),
+        ('game_duration_minutes', 'INTEGER'),
+        ('referee_1_id', 'INTEGER'),
+        ('referee_2_id', 'INTEGER'),
+        ('referee_3_id', 'INTEGER'),
+        ('home_pace', 'DECIMAL(5,2)'),
+        ('away_pace', 'DECIMAL(5,2)'),
+        ('created_at', 'TIMESTAMP'),
+        ('game_type', 'VARCHAR(20)'),
+        ('playoff_round', 'VARCHAR(20)'),
+        ('is_in_season_tournament', 'BOOLEAN'),
+        ('is_national_tv', 'BOOLEAN'),
+        ('tv_broadcaster', 'VARCHAR(50)'),
+    ],
+    'injuries': [
+        ('injury_id', 'INTEGER PRIMARY KEY'),
+        ('player_id', 'INTEGER'),
+        ('report_date', 'DATE'),
+        ('injury_status', 'VARCHAR(50)'),
+        ('injury_description', 'TEXT'),
+        ('return_date', 'DATE'),
+        ('games_missed', 'INTEGER'),
+        ('source', 'VARCHAR(100)'),
+        ('created_at', 'TIMESTAMP'),
+        ('updated_at', 'TIMESTAMP'),
+    ],
+    'player_game_stats': [
+        ('stat_id', 'INTEGER PRIMARY KEY'),
+        ('player_id', 'INTEGER'),
+        ('game_id', 'VARCHAR(10)'),
+        ('team_id', 'INTEGER'),
+        ('is_starter', 'BOOLEAN'),
+        ('minutes_played', 'DECIMAL(5,2)'),
+        ('points', 'INTEGER'),
+        ('rebounds_offensive', 'INTEGER'),
+        ('rebounds_defensive', 'INTEGER'),
+        ('rebounds_total', 'INTEGER'),
+        ('assists', 'INTEGER'),
+        ('steals', 'INTEGER'),
+        ('blocks', 'INTEGER'),
+        ('turnovers', 'INTEGER'),
+        ('personal_fouls', 'INTEGER'),
+        ('field_goals_made', 'INTEGER'),
+        ('field_goals_attempted', 'INTEGER'),
+        ('three_pointers_made', 'INTEGER'),
+        ('three_pointers_attempted', 'INTEGER'),
+        ('free_throws_made', 'INTEGER'),
+        ('free_throws_attempted', 'INTEGER'),
+        ('plus_minus', 'INTEGER'),
+        ('usage_rate', 'DECIMAL(6,1)'),
+        ('true_shooting_pct', 'DECIMAL(6,1)'),
+        ('offensive_rating', 'DECIMAL(8,1)'),
+        ('defensive_rating', 'DECIMAL(8,1)'),
+        ('created_at', 'TIMESTAMP'),
+    ],
+    'player_transactions': [
+        ('transaction_id', 'INTEGER PRIMARY KEY'),
+        ('player_id', 'INTEGER'),
+        ('from_team_id', 'INTEGER'),
+        ('to_team_id', 'INTEGER'),
+        ('transaction_type', 'VARCHAR(20)'),
+        ('transaction_date', 'DATE'),
+        ('season', 'VARCHAR(7)'),
+        ('created_at', 'TIMESTAMP'),
+        ('source', 'VARCHAR(50)'),
+        ('confidence_score', 'INTEGER'),
+    ],
+    'players': [
+        ('player_id', 'INTEGER PRIMARY KEY'),
+        ('full_name', 'VARCHAR(100)'),
+        ('first_name', 'VARCHAR(50)'),
+        ('last_name', 'VARCHAR(50)'),
+        ('is_active', 'BOOLEAN'),
+        ('team_id', 'INTEGER'),
+        ('jersey_number', 'VARCHAR(3)'),
+        ('position', 'VARCHAR(50)'),
+        ('height_inches', 'INTEGER'),
+        ('weight_lbs', 'INTEGER'),
+        ('birth_date', 'DATE'),
+        ('draft_year', 'INTEGER'),
+        ('draft_round', 'INTEGER'),
+        ('draft_number', 'INTEGER'),
+        ('created_at', 'TIMESTAMP'),
+    ],
+    'position_defense_stats': [
+        ('pos_stat_id', 'INTEGER PRIMARY KEY'),
+        ('team_id', 'INTEGER'),
+        ('season', 'VARCHAR(7)'),
+        ('position', 'VARCHAR(50)'),
+        ('points_allowed_per_game', 'DECIMAL(6,2)'),
+        ('rebounds_allowed_per_game', 'DECIMAL(6,2)'),
+        ('assists_allowed_per_game', 'DECIMAL(6,2)'),
+        ('fg_pct_allowed', 'DECIMAL(5,3)'),
+        ('created_at', 'TIMESTAMP'),
+        ('games_played', 'INTEGER'),
+        ('opp_points_per_game', 'DECIMAL(6,1)'),
+        ('opp_field_goal_pct', 'DECIMAL(5,1)'),
+        ('opp_three_point_pct', 'DECIMAL(5,1)'),
+        ('steals_allowed_per_game', 'DECIMAL(6,2)'),
+        ('blocks_allowed_per_game', 'DECIMAL(6,2)'),
+        ('turnovers_forced_per_game', 'DECIMAL(6,2)'),
+        ('three_pointers_made_allowed_per_game', 'DECIMAL(6,2)'),
+    ],
+    # Not in the dump: maintained by src/predictions/prediction_metrics.py
+    # (see src/database/add_prediction_metrics_table.sql).
+    'prediction_metrics': [
+        ('metric_date', 'DATE'),
+        ('model_version', 'VARCHAR(100)'),
+        ('stat', 'VARCHAR(20)'),
+        ('n_predictions', 'INTEGER'),
+        ('sum_abs_error', 'DECIMAL(14,4)'),
+        ('sum_squared_error', 'DECIMAL(16,4)'),
+        ('sum_error', 'DECIMAL(14,4)'),
+        ('sum_accuracy', 'DECIMAL(16,4)'),
+        ('n_accuracy', 'INTEGER'),
+        ('hits_within_1', 'INTEGER'),
+        ('hits_within_2', 'INTEGER'),
+        ('hits_within_5', 'INTEGER'),
+        ('updated_at', 'TIMESTAMP'),
+    ],
+    'predictions': [
+        ('prediction_id', 'INTEGER PRIMARY KEY'),
+        ('player_id', 'INTEGER'),
+        ('game_id', 'VARCHAR(10)'),
+        ('prediction_date', 'TIMESTAMP'),
+        ('predicted_points', 'DECIMAL(5,2)'),
+        ('predicted_rebounds', 'DECIMAL(5,2)'),
+        ('predicted_assists', 'DECIMAL(5,2)'),
+        ('predicted_steals', 'DECIMAL(5,2)'),
+        ('predicted_blocks', 'DECIMAL(5,2)'),
+        ('predicted_turnovers', 'DECIMAL(5,2)'),
+        ('confidence_score', 'INTEGER'),
+        ('model_version', 'VARCHAR(50)'),
+        ('created_at', 'TIMESTAMP'),
+        ('predicted_three_pointers_made', 'DECIMAL(5,1)'),
+        ('actual_points', 'DECIMAL(5,1)'),
+        ('actual_rebounds', 'DECIMAL(5,1)'),
+        ('actual_assists', 'DECIMAL(5,1)'),
+        ('actual_steals', 'DECIMAL(5,1)'),
+        ('actual_blocks', 'DECIMAL(5,1)'),
+        ('actual_turnovers', 'DECIMAL(5,1)'),
+        ('actual_three_pointers_made', 'DECIMAL(5,1)'),
+        ('prediction_error', 'DECIMAL(6,2)'),
+        ('feature_explanations', 'JSONB'),
+    ],
+    'team_defensive_stats': [
+        ('stat_id', 'INTEGER PRIMARY KEY'),
+        ('team_id', 'INTEGER'),
+        ('season', 'VARCHAR(7)'),
+        ('stat_date', 'DATE'),
+        ('games_played', 'INTEGER'),
+        ('opp_points_per_game', 'DECIMAL(6,2)'),
+        ('opp_rebounds_per_game', 'DECIMAL(6,2)'),
+        ('opp_assists_per_game', 'DECIMAL(6,2)'),
+        ('opp_steals_per_game', 'DECIMAL(6,2)'),
+        ('opp_blocks_per_game', 'DECIMAL(6,2)'),
+        ('opp_turnovers_per_game', 'DECIMAL(6,2)'),
+        ('opp_fg_pct', 'DECIMAL(5,3)'),
+        ('opp_three_pt_pct', 'DECIMAL(5,3)'),
+        ('defensive_rating', 'DECIMAL(6,2)'),
+        ('defensive_rebound_pct', 'DECIMAL(5,3)'),
+        ('opponent_offensive_rebound_pct', 'DECIMAL(5,3)'),
+        ('rim_fg_pct_allowed', 'DECIMAL(5,3)'),
+        ('three_pt_fg_pct_allowed', 'DECIMAL(5,3)'),
+        ('mid_range_fg_pct_allowed', 'DECIMAL(5,3)'),
+        ('created_at', 'TIMESTAMP'),
+        ('opp_field_goal_pct', 'DECIMAL(5,1)'),
+        ('opp_three_point_pct', 'DECIMAL(5,1)'),
+        ('opp_two_point_pct', 'DECIMAL(5,1)'),
+        ('opp_free_throw_pct', 'DECIMAL(5,1)'),
+        ('opp_three_point_attempts_pg', 'DECIMAL(6,1)'),
+        ('opp_free_throw_attempts_pg', 'DECIMAL(6,1)'),
+        ('opp_free_throw_rate', 'DECIMAL(5,3)'),
+    ],
+    'team_ratings': [
+        ('rating_id', 'INTEGER PRIMARY KEY'),
+        ('team_id', 'INTEGER'),
+        ('season', 'VARCHAR(7)'),
+        ('rating_date', 'DATE'),
+        ('elo_rating', 'DECIMAL(8,2)'),
+        ('offensive_rating', 'DECIMAL(6,2)'),
+        ('defensive_rating', 'DECIMAL(6,2)'),
+        ('net_rating', 'DECIMAL(6,2)'),
+        ('win_pct', 'DECIMAL(5,3)'),
+        ('created_at', 'TIMESTAMP'),
+        ('games_played', 'INTEGER'),
+        ('wins', 'INTEGER'),
+        ('losses', 'INTEGER'),
+        ('pace', 'DECIMAL(6,1)'),
+    ],
+    'teammate_dependency': [
+        ('dependency_id', 'INTEGER PRIMARY KEY'),
+        ('player_id', 'INTEGER'),
+        ('teammate_id', 'INTEGER'),
+        ('season', 'VARCHAR(10)'),
+        ('games_with_teammate', 'INTEGER'),
+        ('games_without_teammate', 'INTEGER'),
+        ('ppg_with', 'DECIMAL(5,2)'),
+        ('ppg_without', 'DECIMAL(5,2)'),
+        ('rpg_with', 'DECIMAL(5,2)'),
+        ('rpg_without', 'DECIMAL(5,2)'),
+        ('apg_with', 'DECIMAL(5,2)'),
+        ('apg_without', 'DECIMAL(5,2)'),
+        ('ppg_boost', 'DECIMAL(5,2)'),
+        ('rpg_boost', 'DECIMAL(5,2)'),
+        ('apg_boost', 'DECIMAL(5,2)'),
+        ('created_at', 'TIMESTAMP'),
+    ],
+    'teams': [
+        ('team_id', 'INTEGER PRIMARY KEY'),
+        ('abbreviation', 'VARCHAR(3)'),
+        ('full_name', 'VARCHAR(100)'),
+        ('city', 'VARCHAR(50)'),
+        ('state', 'VARCHAR(50)'),
+        ('arena_name', 'VARCHAR(100)'),
+        ('arena_altitude', 'INTEGER'),
+        ('conference', 'VARCHAR(10)'),
+        ('division', 'VARCHAR(20)'),
+        ('created_at', 'TIMESTAMP'),
+        ('latitude', 'DECIMAL(10,6)'),
+        ('longitude', 'DECIMAL(10,6)'),
+        ('timezone', 'VARCHAR(50)'),
+    ],
+}
+
+UNIQUE_KEYS: Dict[str, List[Tuple[str, ...]]] = {
+    'confidence_components': [('prediction_id', 'stat_name')],
+    'player_game_stats': [('player_id', 'game_id')],
+    'position_defense_stats': [('team_id', 'season', 'position')],
+    'prediction_metrics': [('metric_date', 'model_version', 'stat')],
+    'predictions': [('player_id', 'game_id', 'model_version')],
+    'team_defensive_stats': [('team_id', 'season')],
+    # Not in the dump, but calculate_team_ratings.py upserts ON CONFLICT (team_id, season).
+    'team_ratings': [('team_id', 'season')],
+    'teammate_dependency': [('player_id', 'teammate_id', 'season')],
+    'teams': [('abbreviation',)],
+}
+
+# Tables written by the data collection scripts, in foreign key order.
+LEAGUE_TABLES = [
+    'teams', 'players', 'games', 'player_game_stats', 'injuries', 'player_transactions',
+    'team_ratings', 'team_defensive_stats', 'position_defense_stats', 'predictions'
+]
+
+# Lookup indexes for local copies, matching the columns the feature and prediction queries filter on.
+LOCAL_INDEXES: Dict[str, List[Tuple[str, ...]]] = {
+    'games': [('game_date',), ('season',)],
+    'player_game_stats': [('player_id',), ('game_id',), ('team_id',)],
+    'injuries': [('player_id',)],
+    'player_transactions': [('player_id',)],
+    'predictions': [('game_id',)],
+}
+
+_SQLITE_TYPES = {
+    'INTEGER': 'INTEGER',
+    'BOOLEAN': 'INTEGER',
+    'DECIMAL': 'REAL',
+    'VARCHAR': 'TEXT',
+    'TEXT': 'TEXT',
+    # Kept as declared types so sqlite3 converters return date/datetime objects like psycopg2.
+    'DATE': 'DATE',
+    'TIMESTAMP': 'TIMESTAMP',
+    'JSONB': 'TEXT',
+}
+
+_DUCKDB_TYPES = {
+    'JSONB': 'JSON',
+}
+
+
+def get_column_names(table: str) -> List[str]:
+    return [name for name, _ in TABLE_COLUMNS[table]]
+
+
+def _column_type(col_type: str, dialect: str) -> str:
+    base = col_type.split('(')[0].split(' ')[0]
+    primary_key = ' PRIMARY KEY' if col_type.endswith('PRIMARY KEY') else ''
+    if dialect == 'sqlite':
+        return _SQLITE_TYPES[base] + primary_key
+    if dialect == 'duckdb':
+        return col_type.replace(base, _DUCKDB_TYPES.get(base, base), 1)
+    return col_type
+
+
+def create_table_sql(table: str, dialect: str = 'postgres') -> str:
+    columns = [f"{name} {_column_type(col_type, dialect)}" for name, col_type in TABLE_COLUMNS[table]]
+    columns += [f"UNIQUE ({', '.join(key)})" for key in UNIQUE_KEYS.get(table, [])]
+    return f"CREATE TABLE IF NOT EXISTS {table} (\n    " + ",\n    ".join(columns) + "\n)"
+
+
+def create_index_sql(table: str) -> List[str]:
+    return [f"CREATE INDEX IF NOT EXISTS idx_{table}_{'_'.join(columns)} ON {table} ({', '.join(columns)})"
+            for columns in LOCAL_INDEXES.get(table, [])]
@@ -0,0 +1,262 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# RUN THIS (nightly, after data collection; only new/changed rows are pulled):
+# python src/data_collection/snapshot.py
+# Rebuild every table from scratch:
+# python src/data_collection/snapshot.py --full
+
+import json
+import time
+import pandas as pd
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from data_collection.schema import TABLE_COLUMNS, get_column_names
+
+import warnings
+warnings.filterwarnings('ignore', message='pandas only supports SQLAlchemy')
+
+__all__ = [
+    'SnapshotTable',
+    'SNAPSHOT_TABLES',
+    'get_snapshot_dir',
+    'load_manifest',
+    'sync_snapshot',
+    'read_snapshot_table',
+    'connect_snapshot',
+]
+
+MANIFEST_FILENAME = 'manifest.json'
+
+
+@dataclass
+class SnapshotTable:
+    """How one table is kept in sync.
+
+    Without watermark_sql the table is small and re-read in full. Otherwise watermark_sql
+    returns the newest watermark in the source, and delta_where selects the rows at or after
+    the previous watermark minus lookback_days (rows that can still change in place).
+    """
+    key: Tuple[str, ...]
+    watermark_sql: Optional[str] = None
+    delta_where: Optional[str] = None
+    lookback_days: int = 0
+
+
+SNAPSHOT_TABLES: Dict[str, SnapshotTable] = {
+    'teams': SnapshotTable(key=('team_id',)),
+    # Trades update players.team_id in place and there is no updated_at, so re-read (a few thousand rows).
+    'players': SnapshotTable(key=('player_id',)),
+    # Scheduled games are completed in place and late score corrections happen, so games and
+    # their box scores (advanced stats are filled in by a later UPDATE) are re-pulled by game_date.
+    'games': SnapshotTable(
+        key=('game_id',),
+        watermark_sql="SELECT MAX(game_date) FROM games WHERE game_status = 'completed'",
+        delta_where="game_date >= %s",
+        lookback_days=3
+    ),
+    'player_game_stats': SnapshotTable(
+        key=('player_id', 'game_id'),
+        watermark_sql="SELECT MAX(game_date) FROM games WHERE game_status = 'completed'",
+        delta_where="game_id IN (SELECT game_id FROM games WHERE game_date >= %s)",
+        lookback_days=3
+    ),
+    'injuries': SnapshotTable(
+        key=('injury_id',),
+        watermark_sql="SELECT MAX(COALESCE(updated_at, created_at)) FROM injuries",
+        delta_where="COALESCE(updated_at, created_at) >= %s"
+    ),
+    'player_transactions': SnapshotTable(
+        key=('transaction_id',),
+        watermark_sql="SELECT MAX(created_at) FROM player_transactions",
+        delta_where="created_at >= %s"
+    ),
+    # One row per team (and position) per season, upserted daily: cheaper to re-read than to track.
+    'team_ratings': SnapshotTable(key=('team_id', 'season')),
+    'team_defensive_stats': SnapshotTable(key=('team_id', 'season')),
+    'position_defense_stats': SnapshotTable(key=('team_id', 'season', 'position')),
+}
+
+
+def get_snapshot_dir() -> str:
+    if os.getenv('SNAPSHOT_DIR'):
+        return os.getenv('SNAPSHOT_DIR')
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(os.path.dirname(script_dir))
+    return os.path.join(project_root, 'data', 'snapshot')
+
+
+def _table_path(snapshot_dir: str, table: str) -> str:
+    return os.path.join(snapshot_dir, f'{table}.parquet')
+
+
+def load_manifest(snapshot_dir: Optional[str] = None) -> Dict:
+    manifest_path = os.path.join(snapshot_dir or get_snapshot_dir(), MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        return {'tables': {}}
+    with open(manifest_path, 'r') as f:
+        return json.load(f)
+
+
+def _save_manifest(snapshot_dir: str, manifest: Dict):
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_FILENAME)
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2, default=str)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+
+def _coerce_types(df: pd.DataFrame, table: str) -> pd.DataFrame:
+    """Stable column types, so deltas concatenate with the stored file and Parquet keeps dates as dates."""
+    df = df.reindex(columns=get_column_names(table))
+    for name, col_type in TABLE_COLUMNS[table]:
+        base = col_type.split('(')[0].split(' ')[0]
+        if base == 'INTEGER':
+            df[name] = pd.to_numeric(df[name], errors='coerce').astype('Int64')
+        elif base == 'DECIMAL':
+            df[name] = pd.to_numeric(df[name], errors='coerce').astype('float64')
+        elif base == 'BOOLEAN':
+            df[name] = df[name].astype('boolean')
+        elif base == 'DATE':
+            values = pd.to_datetime(df[name], errors='coerce')
+            df[name] = pd.Series([v.date() if pd.notna(v) else None for v in values], index=df.index, dtype=object)
+        elif base == 'TIMESTAMP':
+            df[name] = pd.to_datetime(df[name], errors='coerce')
+        else:
+            df[name] = df[name].astype(object).where(df[name].notna(), None)
+    return df
+
+
+def _to_watermark(value):
+    if value is None or pd.isna(value):
+        return None
+    if isinstance(value, str):
+        value = pd.Timestamp(value)
+    if isinstance(value, pd.Timestamp):
+        value = value.to_pydatetime()
+    return value
+
+
+def _delta_start(watermark, lookback_days: int):
+    return _to_watermark(watermark) - timedelta(days=lookback_days)
+
+
+def _read_query(conn, query: str, params=None) -> pd.DataFrame:
+    return pd.read_sql(query, conn, params=params)
+
+
+def sync_table(conn, table: str, spec: SnapshotTable, snapshot_dir: str, previous: Dict, full: bool = False) -> Dict:
+    path = _table_path(snapshot_dir, table)
+    columns = ', '.join(get_column_names(table))
+
+    new_watermark = None
+    if spec.watermark_sql:
+        cur = conn.cursor()
+        cur.execute(spec.watermark_sql)
+        new_watermark = _to_watermark(cur.fetchone()[0])
+        cur.close()
+
+    incremental = (not full and spec.watermark_sql and os.path.exists(path)
+                   and previous.get('watermark') is not None)
+
+    if incremental:
+        start = _delta_start(previous['watermark'], spec.lookback_days)
+        delta = _coerce_types(_read_query(conn, f"SELECT {columns} FROM {table} WHERE {spec.delta_where}",
+                                          (start,)), table)
+        existing = pd.read_parquet(path)
+        existing = _coerce_types(existing, table)
+        combined = pd.concat([existing, delta], ignore_index=True) if len(delta) else existing
+        combined = combined.drop_duplicates(subset=list(spec.key), keep='last')
+        rows_pulled = len(delta)
+    else:
+        combined = _coerce_types(_read_query(conn, f"SELECT {columns} FROM {table}"), table)
+        rows_pulled = len(combined)
+
+    if rows_pulled or not os.path.exists(path):
+        combined.to_parquet(path + '.tmp', index=False)
+        os.replace(path + '.tmp', path)
+
+    return {
+        'mode': 'delta' if incremental else 'full',
+        'watermark': new_watermark if new_watermark is not None else previous.get('watermark'),
+        'rows': len(combined),
+        'rows_pulled': rows_pulled,
+        'synced_at': datetime.now().isoformat(),
+    }
+
+
+def sync_snapshot(tables: Optional[List[str]] = None, snapshot_dir: Optional[str] = None,
+                  full: bool = False, conn=None) -> Dict:
+    """Bring the Parquet snapshot up to date with the production database."""
+    snapshot_dir = snapshot_dir or get_snapshot_dir()
+    os.makedirs(snapshot_dir, exist_ok=True)
+    tables = tables or list(SNAPSHOT_TABLES)
+
+    close_conn = conn is None
+    if conn is None:
+        from data_collection.utils import get_db_connection
+        conn = get_db_connection(backend='postgres')
+
+    manifest = load_manifest(snapshot_dir)
+    try:
+        for table in tables:
+            start = time.time()
+            result = sync_table(conn, table, SNAPSHOT_TABLES[table], snapshot_dir,
+                                manifest['tables'].get(table, {}), full)
+            manifest['tables'][table] = result
+            # Saved after every table so an interrupted sync resumes from the right watermarks.
+            _save_manifest(snapshot_dir, manifest)
+            print(f"  {table:25s}: {result['mode']:5s} {result['rows_pulled']:>10,} pulled, "
+                  f"{result['rows']:>10,} stored ({time.time() - start:.1f}s)")
+    finally:
+        if close_conn:
+            conn.close()
+
+    return manifest
+
+
+def read_snapshot_table(table: str, columns: Optional[List[str]] = None,
+                        snapshot_dir: Optional[str] = None) -> pd.DataFrame:
+    path = _table_path(snapshot_dir or get_snapshot_dir(), table)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No snapshot of {table} at {path}. Run: python src/data_collection/snapshot.py")
+    return pd.read_parquet(path, columns=columns)
+
+
+def connect_snapshot(snapshot_dir: Optional[str] = None):
+    """In-memory DuckDB connection with each snapshot file loaded as a table.
+
+    Returned as a LocalConnection, so it takes the same %s queries as the other backends.
+    """
+    from data_collection.db_backends import LocalConnection
+    try:
+        import duckdb
+    except ImportError:
+        raise ImportError("Querying the snapshot needs the duckdb package: pip install duckdb")
+
+    snapshot_dir = snapshot_dir or get_snapshot_dir()
+    raw = duckdb.connect(':memory:')
+    for table in SNAPSHOT_TABLES:
+        path = _table_path(snapshot_dir, table)
+        if os.path.exists(path):
+            raw.execute(f"CREATE TABLE {table} AS SELECT * FROM read_parquet('{path}')")
+    return LocalConnection(raw, 'duckdb', snapshot_dir)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Sync the local Parquet snapshot of the core tables')
+    parser.add_argument('--tables', nargs='+', choices=list(SNAPSHOT_TABLES), default=None,
+                       help='Tables to sync (default: all)')
+    parser.add_argument('--full', action='store_true', help='Ignore watermarks and re-read every table')
+    parser.add_argument('--snapshot-dir', default=None, help='Snapshot directory (default: data/snapshot)')
+    args = parser.parse_args()
+
+    print("="*50)
+    print("SYNCING SNAPSHOT")
+    print("="*50)
+    start = time.time()
+    manifest = sync_snapshot(args.tables, args.snapshot_dir, args.full)
+    print(f"\nDone in {time.time() - start:.1f}s: {args.snapshot_dir or get_snapshot_dir()}")
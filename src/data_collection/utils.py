@@ -1,4 +1,3 @@
-import psycopg2
 import os
 import time    
 import random 
@@ -7,7 +6,24 @@ from urllib.parse import urlparse
 
 load_dotenv()
 
-def get_db_connection():
+def get_db_connection(backend=None, path=None, read_only=False):
+    # DB_BACKEND=sqlite/duckdb points every script at a local copy (see db_backends.py),
+    # DB_BACKEND=snapshot at the Parquet snapshot (see snapshot.py, read only).
+    backend = backend or os.getenv('DB_BACKEND', 'postgres')
+    if backend == 'snapshot':
+        try:
+            from data_collection.snapshot import connect_snapshot
+        except ImportError:
+            from snapshot import connect_snapshot
+        return _instrument(connect_snapshot(path or os.getenv('SNAPSHOT_DIR')))
+    if backend != 'postgres':
+        try:
+            from data_collection.db_backends import connect_local
+        except ImportError:
+            from db_backends import connect_local
+        return _instrument(connect_local(backend, path or os.getenv('DB_LOCAL_PATH'), read_only=read_only))
+
+    import psycopg2
     connection_params = {
         'connect_timeout': 10,
         'keepalives': 1,
@@ -43,7 +59,27 @@ def get_db_connection():
             **connection_params
         )
     
-    return conn
+    return _instrument(conn)
+
+def _instrument(conn):
+    # QUERY_STATS=1 (or --profile) records every query per fingerprint, see query_stats.py.
+    # Imported as data_collection.utils, src.data_collection.utils (Streamlit) or plain utils.
+    if __package__:
+        from .query_stats import instrument_connection
+    else:
+        from query_stats import instrument_connection
+    return instrument_connection(conn)
+
+def get_analytics_connection():
+    # Read-only connection for batch jobs that only scan history (feature builds, evaluation,
+    # backtests). ANALYTICS_DB_BACKEND=duckdb/sqlite/snapshot moves them to a local copy while
+    # everything that writes keeps using Postgres. Unset, they read wherever DB_BACKEND points.
+    backend = os.getenv('ANALYTICS_DB_BACKEND')
+    if backend is None:
+        return get_db_connection(read_only=os.getenv('DB_BACKEND', 'postgres') != 'postgres')
+    if backend == 'postgres':
+        return get_db_connection(backend='postgres')
+    return get_db_connection(backend=backend, path=os.getenv('ANALYTICS_DB_PATH'), read_only=True)
 
 def check_connection(conn):
     try:
@@ -0,0 +1,22 @@
+CREATE TABLE IF NOT EXISTS prediction_metrics (
+    metric_date DATE NOT NULL,
+    model_version VARCHAR(100) NOT NULL,
+    stat VARCHAR(20) NOT NULL,
+
+    n_predictions INTEGER NOT NULL DEFAULT 0,
+    sum_abs_error DECIMAL(14,4) NOT NULL DEFAULT 0,
+    sum_squared_error DECIMAL(16,4) NOT NULL DEFAULT 0,
+    sum_error DECIMAL(14,4) NOT NULL DEFAULT 0,
+    sum_accuracy DECIMAL(16,4) NOT NULL DEFAULT 0,
+    n_accuracy INTEGER NOT NULL DEFAULT 0,
+    hits_within_1 INTEGER NOT NULL DEFAULT 0,
+    hits_within_2 INTEGER NOT NULL DEFAULT 0,
+    hits_within_5 INTEGER NOT NULL DEFAULT 0,
+
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    UNIQUE(metric_date, model_version, stat)
+);
+
+CREATE INDEX IF NOT EXISTS idx_prediction_metrics_model_stat_date
+    ON prediction_metrics(model_version, stat, metric_date);
@@ -0,0 +1,436 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models'))
+
+# RUN THIS (replays the last season, models trained once on everything before it):
+# python src/evaluation/backtest.py
+# Retrain every 14 days, two families, over a date range:
+# python src/evaluation/backtest.py --families xgboost lightgbm --retrain-every 14 --start 2024-01-01 --end 2024-04-14
+# Fit boosted models the way train_all_models.py --early-stopping does:
+# python src/evaluation/backtest.py --early-stopping
+
+import time
+import json
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from joblib import Parallel, delayed, parallel_backend, cpu_count
+from sklearn.preprocessing import StandardScaler
+
+import warnings
+warnings.filterwarnings('ignore', category=FutureWarning)
+warnings.filterwarnings('ignore', category=UserWarning)
+from training_data import (
+    TARGETS, get_project_root, load_training_features, select_feature_cols,
+    compute_league_means, impute_features, load_feature_schema, create_season_splits,
+    EARLY_STOPPING_ROUNDS
+)
+from parallel_training import MODEL_FAMILIES, EARLY_STOPPING_FAMILIES, _get_family_functions, plan_cpu_budget
+from data_collection.schema import get_column_names
+
+# predict_games.py skips players with fewer completed games this season, and its variance
+# term looks at the last RECENT_GAMES of them.
+MIN_SEASON_GAMES = 5
+RECENT_GAMES = 20
+CONFIDENCE_BUCKETS = [0, 50, 60, 70, 80, 101]
+
+
+class AsOfIndex:
+    """Per-player game history sorted by date, answering "what was known before date D".
+
+    Lookups are binary searches plus differences of cumulative sums, so a whole slate
+    is resolved in one vectorized call instead of one SQL query per player.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        order = np.lexsort((df['game_date'].to_numpy(), df['player_id'].to_numpy()))
+        history = df.iloc[order]
+
+        self.season_codes = {season: i for i, season in enumerate(sorted(history['season'].unique()))}
+        player_ids = history['player_id'].to_numpy(dtype=np.int64)
+        days = history['game_date'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+        seasons = history['season'].map(self.season_codes).to_numpy(dtype=np.int64)
+
+        self._player_key = player_ids
+        self._date_key = player_ids * 1_000_000 + days
+        self._season_key = player_ids * 1_000 + seasons
+
+        values = np.nan_to_num(history[list(TARGETS.values())].to_numpy(dtype=np.float64))
+        self._sums = np.vstack([np.zeros(values.shape[1]), np.cumsum(values, axis=0)])
+        self._squares = np.vstack([np.zeros(values.shape[1]), np.cumsum(values ** 2, axis=0)])
+
+    def lookup(self, player_ids, dates, seasons, window: int = RECENT_GAMES) -> dict:
+        player_ids = np.asarray(player_ids, dtype=np.int64)
+        days = np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+        seasons = np.array([self.season_codes.get(s, -1) for s in seasons], dtype=np.int64)
+
+        end = np.searchsorted(self._date_key, player_ids * 1_000_000 + days, side='left')
+        player_start = np.searchsorted(self._player_key, player_ids, side='left')
+        season_start = np.maximum(np.searchsorted(self._season_key, player_ids * 1_000 + seasons, side='left'),
+                                  player_start)
+        season_games = np.maximum(end - season_start, 0)
+        lo = np.maximum(season_start, end - window)
+        n = np.maximum(end - lo, 0)
+
+        sums = self._sums[end] - self._sums[lo]
+        squares = self._squares[end] - self._squares[lo]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(n[:, None] > 0, sums / np.maximum(n, 1)[:, None], 0.0)
+            var = (squares - n[:, None] * mean ** 2) / np.maximum(n - 1, 1)[:, None]
+        std = np.where(n[:, None] > 1, np.sqrt(np.maximum(var, 0.0)), 0.0)
+
+        return {
+            'season_games': season_games,
+            'recent_games': n,
+            'career_games': end - player_start,
+            'mean': {name: mean[:, i] for i, name in enumerate(TARGETS)},
+            'std': {name: std[:, i] for i, name in enumerate(TARGETS)},
+        }
+
+
+def plan_windows(dates, retrain_every: int):
+    """(train cutoff, serving dates) pairs. Models for a window see only games before its cutoff."""
+    dates = sorted(dates)
+    if not retrain_every or retrain_every <= 0:
+        return [(dates[0], dates)]
+
+    windows = []
+    for d in dates:
+        if not windows or d >= windows[-1][0] + timedelta(days=retrain_every):
+            windows.append((d, []))
+        windows[-1][1].append(d)
+    return windows
+
+
+def _fit_and_predict(model_type, target_name, X_train, y_train, X_serve, feature_names, tuned_params, n_jobs,
+                     split_indices=None, early_stopping_rounds=None):
+    module, build_fn, fit_fn = _get_family_functions(model_type)
+    X_train = pd.DataFrame(X_train, columns=feature_names)
+
+    n_estimators = None
+    if early_stopping_rounds and split_indices and model_type in EARLY_STOPPING_FAMILIES:
+        # As in parallel_training: each season fold picks its rounds, the window's model uses the median.
+        best_iterations = []
+        for train_idx, val_idx in split_indices:
+            fold_model = build_fn(target_name, tuned_params, n_jobs=n_jobs)
+            fit_fn(fold_model, X_train.iloc[train_idx], y_train[train_idx],
+                   (X_train.iloc[val_idx], y_train[val_idx]), early_stopping_rounds)
+            best_iterations.append(getattr(module, f'get_{model_type}_best_iteration')(fold_model))
+        n_estimators = max(1, int(np.median(best_iterations)))
+
+    if model_type in EARLY_STOPPING_FAMILIES:
+        model = build_fn(target_name, tuned_params, n_jobs=n_jobs, n_estimators=n_estimators)
+    else:
+        model = build_fn(target_name, tuned_params, n_jobs=n_jobs)
+    fit_fn(model, X_train, y_train)
+    predictions = model.predict(pd.DataFrame(X_serve, columns=feature_names))
+    # Stored the way predict_games.py stores them.
+    return np.round(np.maximum(np.asarray(predictions, dtype=np.float64), 0.0), 1)
+
+
+def predict_windows(df, X, feature_cols, windows, families, servable, use_tuned_params=False, cpu_budget=None,
+                    early_stopping_rounds=None):
+    """Train every (window, family, stat) model and predict its serving rows, in parallel.
+
+    With early_stopping_rounds, boosted families pick their rounds on season folds of each
+    window's training rows, like train_all_models.py --early-stopping.
+    """
+    dates = df['game_date'].dt.date.to_numpy()
+    tasks, serve_rows = [], []
+    payloads = []
+    for w, (cutoff, serve_dates) in enumerate(windows):
+        train_mask = dates < cutoff
+        serve_mask = np.isin(dates, serve_dates) & servable
+        if not train_mask.any():
+            raise ValueError(f"No training rows before {cutoff}; start the backtest later")
+
+        # Imputation and scaling are refit on the training rows only, as a fresh training run would.
+        league_means = compute_league_means(df[train_mask], feature_cols)
+        X_window = impute_features(df, feature_cols, league_means) if X is None else X
+        scaler = StandardScaler()
+        X_train = scaler.fit_transform(X_window[train_mask])
+        X_serve = np.nan_to_num(scaler.transform(X_window[serve_mask]))
+        split_indices = create_season_splits(df[train_mask].reset_index(drop=True)) if early_stopping_rounds else None
+        payloads.append((X_train, X_serve, train_mask, split_indices))
+        serve_rows.append(np.where(serve_mask)[0])
+
+        for model_type in families:
+            module, _, _ = _get_family_functions(model_type)
+            for target_name in TARGETS:
+                tuned_params = module.load_tuned_params(model_type, target_name, True) if use_tuned_params else None
+                tasks.append((w, model_type, target_name, tuned_params))
+
+    outer, inner = plan_cpu_budget(len(tasks), cpu_budget)
+    print(f"Training {len(tasks)} models over {len(windows)} window(s) ({outer} workers x {inner} threads)...")
+    with parallel_backend('loky', inner_max_num_threads=inner):
+        results = Parallel(n_jobs=outer)(
+            delayed(_fit_and_predict)(
+                model_type, target_name, payloads[w][0],
+                df[TARGETS[target_name]].to_numpy()[payloads[w][2]],
+                payloads[w][1], feature_cols, tuned_params, inner,
+                split_indices=payloads[w][3], early_stopping_rounds=early_stopping_rounds
+            )
+            for w, model_type, target_name, tuned_params in tasks
+        )
+
+    predictions = {model_type: {t: np.full(len(df), np.nan) for t in TARGETS} for model_type in families}
+    for (w, model_type, target_name, _), values in zip(tasks, results):
+        predictions[model_type][target_name][serve_rows[w]] = values
+    return predictions
+
+
+def _score_rows(rows, predictions, families, history, available, feature_importances, feature_groups):
+    from predictions.confidence_scoring import calculate_confidence_score_per_stat, CONFIDENCE_CONFIG
+
+    scores = []
+    for i, row in enumerate(rows):
+        player_stats = {name: {'mean': float(history['mean'][name][i]), 'std': float(history['std'][name][i])}
+                        for name in TARGETS}
+        stat_scores = []
+        for target_name in TARGETS:
+            score, _ = calculate_confidence_score_per_stat(
+                stat_name=target_name,
+                predictions_by_model={target_name: {m: float(predictions[m][target_name][i]) for m in families}},
+                selected_models=families,
+                player_stats=player_stats,
+                available_features=available[i],
+                feature_importances=feature_importances,
+                feature_groups=feature_groups,
+                games_this_season=int(history['recent_games'][i]),
+                career_games=int(history['career_games'][i]),
+                days_since_transaction=None,
+                games_with_team=int(row['games_with_team']),
+                opponent_def_rating=float(row['opponent_def_rating']),
+                config=CONFIDENCE_CONFIG,
+                is_playoff=bool(row['is_playoff']),
+                is_back_to_back=bool(row['is_back_to_back'])
+            )
+            stat_scores.append(score)
+        scores.append(int(round(sum(stat_scores) / len(stat_scores))))
+    return scores
+
+
+def score_confidence(df_serve, predictions, families, index, n_jobs=1):
+    """Confidence with every family's predictions, as recalculate_all_confidence_scores stores it.
+
+    Transaction and injury recency are not in the feature table, so those terms use their
+    no-information values.
+    """
+    from predictions.confidence_helpers import load_feature_importances, get_feature_groups
+
+    history = index.lookup(df_serve['player_id'], df_serve['game_date'], df_serve['season'])
+    feature_cols = [c for c in df_serve.columns if c not in ('player_id', 'game_id', 'team_id')]
+    present = df_serve[feature_cols].notna().to_numpy()
+    feature_cols = np.array(feature_cols)
+    available = [set(feature_cols[mask]) for mask in present]
+
+    context = pd.DataFrame({
+        'games_with_team': df_serve.get('games_played_season', pd.Series(history['recent_games'], index=df_serve.index))
+                               .fillna(pd.Series(history['recent_games'], index=df_serve.index)),
+        'opponent_def_rating': df_serve.get('defensive_rating_opp', pd.Series(114.0, index=df_serve.index)).fillna(114.0),
+        'is_playoff': df_serve.get('is_playoff', pd.Series(0, index=df_serve.index)).fillna(0),
+        'is_back_to_back': df_serve.get('is_back_to_back', pd.Series(0, index=df_serve.index)).fillna(0),
+    }).to_dict('records')
+
+    feature_importances = load_feature_importances(get_project_root())
+    feature_groups = get_feature_groups()
+
+    n_jobs = max(1, n_jobs)
+    chunks = np.array_split(np.arange(len(df_serve)), n_jobs)
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_score_rows)(
+            [context[i] for i in chunk],
+            {m: {t: predictions[m][t][chunk] for t in TARGETS} for m in families},
+            families,
+            {'mean': {t: history['mean'][t][chunk] for t in TARGETS},
+             'std': {t: history['std'][t][chunk] for t in TARGETS},
+             'recent_games': history['recent_games'][chunk],
+             'career_games': history['career_games'][chunk]},
+            [available[i] for i in chunk],
+            feature_importances, feature_groups
+        )
+        for chunk in chunks if len(chunk)
+    )
+    return np.concatenate([np.asarray(r, dtype=np.int64) for r in results]) if results else np.array([], dtype=np.int64)
+
+
+def to_predictions_table(df_serve, predictions, confidence, families):
+    """One row per (player, game, family) with the columns of the predictions table."""
+    frames = []
+    for model_type in families:
+        frame = pd.DataFrame({
+            'player_id': df_serve['player_id'].to_numpy(),
+            'game_id': df_serve['game_id'].to_numpy(),
+            'prediction_date': df_serve['game_date'].to_numpy(),
+            'confidence_score': confidence,
+            'model_version': model_type,
+        })
+        errors = []
+        for target_name, target_col in TARGETS.items():
+            predicted = predictions[model_type][target_name]
+            actual = df_serve[target_col].to_numpy(dtype=np.float64)
+            frame[f'predicted_{target_name}'] = predicted
+            frame[f'actual_{target_name}'] = actual
+            errors.append(np.abs(predicted - actual))
+        frame['prediction_error'] = np.round(np.mean(errors, axis=0), 2)
+        frames.append(frame)
+
+    table = pd.concat(frames, ignore_index=True)
+    table['prediction_id'] = np.arange(1, len(table) + 1)
+    table['created_at'] = datetime.now()
+    return table.reindex(columns=get_column_names('predictions'))
+
+
+def summarize(table):
+    summary = {}
+    for model_type, group in table.groupby('model_version'):
+        summary[model_type] = {
+            'rows': len(group),
+            'overall_mae': float(group['prediction_error'].mean()),
+            'mae': {t: float((group[f'predicted_{t}'] - group[f'actual_{t}']).abs().mean()) for t in TARGETS},
+        }
+
+    buckets = pd.cut(table['confidence_score'], CONFIDENCE_BUCKETS, right=False)
+    by_confidence = table.groupby(buckets, observed=True)['prediction_error'].agg(['mean', 'count'])
+    monthly = table.groupby([pd.to_datetime(table['prediction_date']).dt.to_period('M').astype(str),
+                             'model_version'])['prediction_error'].mean().unstack()
+
+    return {
+        'by_model': summary,
+        'mae_by_confidence': {str(k): {'mae': float(v['mean']), 'rows': int(v['count'])}
+                              for k, v in by_confidence.iterrows()},
+        'monthly_mae': {month: {m: float(v) for m, v in row.items() if pd.notna(v)}
+                        for month, row in monthly.iterrows()},
+    }
+
+
+def run_backtest(start=None, end=None, families=None, retrain_every=0, use_tuned_params=False,
+                 cpu_budget=None, features_path=None, use_schema=True, output_path=None, early_stopping=False):
+    families = families or list(MODEL_FAMILIES.keys())
+    print("="*70)
+    print("WALK-FORWARD BACKTEST")
+    print("="*70)
+
+    df = load_training_features(features_path)
+    df['game_date'] = pd.to_datetime(df['game_date'])
+    df = df.sort_values(['game_date', 'player_id']).reset_index(drop=True)
+    feature_cols = select_feature_cols(df, load_feature_schema() if use_schema else None)
+
+    if start is None:
+        last_season = sorted(df['season'].unique())[-1]
+        start = df.loc[df['season'] == last_season, 'game_date'].min().date()
+    start = pd.Timestamp(start).date()
+    end = pd.Timestamp(end).date() if end else df['game_date'].max().date()
+
+    index = AsOfIndex(df)
+    history = index.lookup(df['player_id'], df['game_date'], df['season'])
+    dates = df['game_date'].dt.date
+    servable = (dates >= start) & (dates <= end) & (history['season_games'] >= MIN_SEASON_GAMES)
+    serve_dates = sorted(dates[servable].unique())
+    if not serve_dates:
+        print(f"No games between {start} and {end}")
+        return None
+
+    windows = plan_windows(serve_dates, retrain_every)
+    print(f"Dates: {serve_dates[0]} to {serve_dates[-1]} ({len(serve_dates)} game days, {servable.sum()} player-games)")
+    print(f"Families: {', '.join(families)}; {len(windows)} training window(s)"
+          f"{f', retrained every {retrain_every} days' if retrain_every else ''}"
+          f"{', early stopping on season folds' if early_stopping else ''}\n")
+
+    timings = {}
+    start_time = time.perf_counter()
+    # Every row's features are already as-of its game date, so one imputed matrix serves all
+    # windows when a single window is used; otherwise league means are refit per window.
+    X = None
+    if len(windows) == 1:
+        league_means = compute_league_means(df[dates < windows[0][0]], feature_cols)
+        X = impute_features(df, feature_cols, league_means)
+    predictions = predict_windows(df, X, feature_cols, windows, families, servable.to_numpy(),
+                                  use_tuned_params, cpu_budget,
+                                  early_stopping_rounds=EARLY_STOPPING_ROUNDS if early_stopping else None)
+    timings['train_and_predict_seconds'] = time.perf_counter() - start_time
+
+    serve_idx = np.where(servable.to_numpy())[0]
+    df_serve = df.iloc[serve_idx]
+    served = {m: {t: predictions[m][t][serve_idx] for t in TARGETS} for m in families}
+
+    print(f"Scoring confidence for {len(df_serve)} player-games...")
+    start_time = time.perf_counter()
+    confidence = score_confidence(df_serve, served, families, index, n_jobs=cpu_budget or cpu_count())
+    timings['confidence_seconds'] = time.perf_counter() - start_time
+
+    table = to_predictions_table(df_serve, served, confidence, families)
+    summary = summarize(table)
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    if output_path is None:
+        output_path = os.path.join(get_project_root(), 'data', 'backtests', f'backtest_{timestamp}.csv')
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    table.to_csv(output_path, index=False)
+
+    report = {
+        'timestamp': timestamp,
+        'start': str(serve_dates[0]),
+        'end': str(serve_dates[-1]),
+        'families': families,
+        'retrain_every': retrain_every,
+        'early_stopping': early_stopping,
+        'windows': [{'cutoff': str(cutoff), 'dates': len(window_dates)} for cutoff, window_dates in windows],
+        'features': len(feature_cols),
+        'player_games': int(len(df_serve)),
+        'predictions_path': output_path,
+        'timings': timings,
+        **summary
+    }
+    report_path = os.path.join(get_project_root(), 'data', 'evaluation', f'backtest_{timestamp}_report.json')
+    os.makedirs(os.path.dirname(report_path), exist_ok=True)
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print("\n" + "="*70)
+    print("BACKTEST RESULTS")
+    print("="*70)
+    for model_type, metrics in summary['by_model'].items():
+        stat_maes = ', '.join(f"{t}={v:.2f}" for t, v in metrics['mae'].items())
+        print(f"{model_type:15s} overall MAE {metrics['overall_mae']:.3f} ({stat_maes})")
+    print("\nMAE by confidence:")
+    for bucket, values in summary['mae_by_confidence'].items():
+        print(f"  {bucket:10s}: {values['mae']:.3f} ({values['rows']} rows)")
+    print(f"\nTrain/predict {timings['train_and_predict_seconds']:.1f}s, confidence {timings['confidence_seconds']:.1f}s")
+    print(f"Predictions: {output_path}")
+    print(f"Report: {report_path}")
+
+    return table
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Replay daily predictions over historical dates')
+    parser.add_argument('--start', default=None, help='First date to predict (default: start of the last season)')
+    parser.add_argument('--end', default=None, help='Last date to predict (default: last date in the features)')
+    parser.add_argument('--families', nargs='+', choices=list(MODEL_FAMILIES.keys()), default=None,
+                       help='Model families to backtest (default: all)')
+    parser.add_argument('--retrain-every', type=int, default=0,
+                       help='Retrain on all earlier games every N days (default: train once before --start)')
+    parser.add_argument('--use-tuned', action='store_true', help='Use tuned hyperparameters')
+    parser.add_argument('--early-stopping', action='store_true',
+                       help='Pick boosting rounds on season folds of each window, as train_all_models.py --early-stopping')
+    parser.add_argument('--cpu-budget', type=int, default=None, help='Total CPU cores to use')
+    parser.add_argument('--features', default=None, help='Feature CSV (default: data/processed/training_features.csv)')
+    parser.add_argument('--no-schema', action='store_true', help='Ignore the pruned feature schema')
+    parser.add_argument('--output', default=None, help='Predictions CSV path (default: data/backtests/)')
+    args = parser.parse_args()
+
+    run_backtest(
+        start=args.start,
+        end=args.end,
+        families=args.families,
+        retrain_every=args.retrain_every,
+        use_tuned_params=args.use_tuned,
+        cpu_budget=args.cpu_budget,
+        features_path=args.features,
+        use_schema=not args.no_schema,
+        output_path=args.output,
+        early_stopping=args.early_stopping
+    )
@@ -0,0 +1,178 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# RUN THIS:
+# Compare the stored baseline with the most recent benchmark:
+# python src/evaluation/compare_benchmarks.py --baseline-vs-newest
+# Compare second most recent with newest:
+# python src/evaluation/compare_benchmarks.py --recent-vs-newest
+# Compare any two reports, e.g. timing reports from data/profiles/:
+# python src/evaluation/compare_benchmarks.py --files data/profiles/predict_games_A.json data/profiles/predict_games_B.json
+# Exits with status 1 when a regression is flagged.
+
+import json
+import argparse
+from pathlib import Path
+from datetime import datetime
+
+BASELINE_FILENAME = 'benchmark_baseline.json'
+REGRESSION_THRESHOLD = 0.10
+MIN_SECONDS = 0.05
+
+def get_benchmark_files_sorted():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(os.path.dirname(script_dir))
+    eval_dir = Path(project_root) / 'data' / 'evaluation'
+
+    if not eval_dir.exists():
+        print(f"Directory {eval_dir} does not exist")
+        return []
+
+    json_files = []
+    for file_path in eval_dir.glob('benchmark_*.json'):
+        stat = file_path.stat()
+        json_files.append({
+            'name': file_path.name,
+            'path': str(file_path),
+            'modified': datetime.fromtimestamp(stat.st_mtime)
+        })
+
+    json_files.sort(key=lambda x: x['modified'])
+    return json_files
+
+def describe_report(report):
+    # Timing reports from data/profiles/ only carry rows/cpu_budget when the run recorded them.
+    details = []
+    if report.get('run'):
+        details.append(report['run'])
+    if report.get('rows') is not None:
+        details.append(f"{report['rows']} rows")
+    if report.get('cpu_budget') is not None:
+        details.append(f"{report['cpu_budget']} CPUs")
+    return f"{report['timestamp']} ({', '.join(details)})" if details else report['timestamp']
+
+def find_regressions(baseline, current, threshold=REGRESSION_THRESHOLD, min_seconds=MIN_SECONDS):
+    regressions = []
+    rows = []
+
+    for name, base in baseline['results'].items():
+        if name not in current['results']:
+            continue
+        new = current['results'][name]
+
+        checks = []
+        # Timings this short are mostly noise, so they are shown but never flagged.
+        if max(base['seconds'], new['seconds']) >= min_seconds:
+            checks.append(('seconds', base['seconds'], new['seconds'], new['seconds'] / base['seconds'] - 1))
+        if base.get('peak_mb') and new.get('peak_mb') is not None:
+            checks.append(('peak_mb', base['peak_mb'], new['peak_mb'], new['peak_mb'] / base['peak_mb'] - 1))
+        # Timing and query reports count executions; more of them on the same input is how N+1 patterns creep in.
+        if base.get('calls') and new.get('calls') is not None:
+            checks.append(('calls', base['calls'], new['calls'], new['calls'] / base['calls'] - 1))
+
+        for metric, old_value, new_value, change in checks:
+            regressed = change > threshold
+            rows.append((name, metric, old_value, new_value, change, regressed))
+            if regressed:
+                regressions.append({'name': name, 'metric': metric, 'baseline': old_value,
+                                    'current': new_value, 'change': change})
+
+    return regressions, rows
+
+def compare_benchmarks(baseline_path, current_path, threshold=REGRESSION_THRESHOLD):
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+
+    with open(current_path, 'r') as f:
+        current = json.load(f)
+
+    print("\n" + "="*70)
+    print("BENCHMARK COMPARISON")
+    print("="*70)
+    print(f"\nBaseline: {describe_report(baseline)}")
+    print(f"Current:  {describe_report(current)}")
+    if (baseline['rows'], baseline['cpu_budget']) != (current['rows'], current['cpu_budget']):
+        print("WARNING: Dataset size or CPU budget differs, timings are not directly comparable")
+    if baseline.get('profile') != current.get('profile'):
+        print("WARNING: Only one run was profiled (cProfile/tracemalloc), timings are not directly comparable")
+    print()
+
+    regressions, rows = find_regressions(baseline, current, threshold)
+
+    for name, metric, old_value, new_value, change, regressed in rows:
+        marker = '  <- REGRESSION' if regressed else ''
+        print(f"{name:40s} {metric:8s}: {old_value:10.3f} → {new_value:10.3f} ({change:+.1%}){marker}")
+
+    missing = [name for name in baseline['results'] if name not in current['results']]
+    if missing:
+        print(f"\nNot in current run: {', '.join(missing)}")
+
+    print("\n" + "="*70)
+    if regressions:
+        print(f"{len(regressions)} REGRESSION(S) over {threshold:.0%}")
+    else:
+        print(f"No regressions over {threshold:.0%}")
+    print("="*70)
+
+    return regressions
+
+def compare_baseline_vs_newest(threshold=REGRESSION_THRESHOLD):
+    files = get_benchmark_files_sorted()
+
+    baseline_file = None
+    for f in files:
+        if f['name'] == BASELINE_FILENAME:
+            baseline_file = f
+            break
+
+    runs = [f for f in files if f['name'] != BASELINE_FILENAME]
+    if not baseline_file or not runs:
+        print("Error: Need a baseline (run_benchmarks.py --save-baseline) and at least one other benchmark")
+        return None
+
+    newest_file = runs[-1]
+
+    print(f"Comparing: {baseline_file['name']} (baseline) vs {newest_file['name']} (newest)")
+
+    return compare_benchmarks(baseline_file['path'], newest_file['path'], threshold)
+
+def compare_recent_vs_newest(threshold=REGRESSION_THRESHOLD):
+    runs = [f for f in get_benchmark_files_sorted() if f['name'] != BASELINE_FILENAME]
+
+    if len(runs) < 2:
+        print("Error: Need at least 2 benchmark files to compare")
+        return None
+
+    second_most_recent = runs[-2]
+    newest_file = runs[-1]
+
+    print(f"Comparing: {second_most_recent['name']} (second most recent) vs {newest_file['name']} (newest)")
+
+    return compare_benchmarks(second_most_recent['path'], newest_file['path'], threshold)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare benchmark files and flag regressions')
+    parser.add_argument('--baseline-vs-newest', action='store_true',
+                       help='Compare benchmark_baseline.json with the most recent benchmark')
+    parser.add_argument('--recent-vs-newest', action='store_true',
+                       help='Compare second most recent with newest')
+    parser.add_argument('--files', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                       help='Compare two report files (benchmarks or timing reports)')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                       help='Relative increase in time or memory flagged as a regression')
+
+    args = parser.parse_args()
+
+    if args.files:
+        regressions = compare_benchmarks(args.files[0], args.files[1], args.threshold)
+    elif args.baseline_vs_newest:
+        regressions = compare_baseline_vs_newest(args.threshold)
+    elif args.recent_vs_newest:
+        regressions = compare_recent_vs_newest(args.threshold)
+    else:
+        print("Error: Must specify --baseline-vs-newest, --recent-vs-newest or --files")
+        parser.print_help()
+        sys.exit(2)
+
+    sys.exit(1 if regressions else 0)
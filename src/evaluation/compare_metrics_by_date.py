@@ -25,6 +25,9 @@ def get_metrics_files_sorted():
     
     json_files = []
     for file_path in eval_dir.glob('*.json'):
+        # Benchmarks and the other *_report.json files are not metrics files.
+        if file_path.name.startswith('benchmark_') or file_path.name.endswith('_report.json'):
+            continue
         stat = file_path.stat()
         json_files.append({
             'name': file_path.name,
@@ -9,7 +9,6 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # To compare two metric files:
 # python src/evaluation/evaluate_models.py --compare data/evaluation/baseline_metrics.json data/evaluation/tuned_metrics.json
 
-import pandas as pd
 import numpy as np
 import json
 from pathlib import Path
@@ -18,33 +17,14 @@ import joblib
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore', category=UserWarning)
+from models.training_data import prepare_training_data, load_scaler
 
 def evaluate_all_models(models_dir='data/models', features_path='data/processed/training_features.csv', 
                        output_path='data/evaluation/metrics.json'):
     print("Loading training data...")
-    df = pd.read_csv(features_path)
-    
-    feature_cols = [col for col in df.columns if any(x in col for x in 
-        ['_l5', '_l10', '_l20', '_weighted', 'is_', 'days_rest', 'games_played',
-         'offensive_rating', 'defensive_rating', 'net_rating', 'pace', 'opp_',
-         'altitude', 'playoff', 'star_teammate', 'games_without_star',
-         'usage_rate', 'minutes_played', 'minutes_trend', 'per_36',
-         '_pct', '_ratio', 'pts_per', 'ast_to', 'reb_rate', 'position_',
-         'games_in_last', 'is_heavy', 'is_well', 'consecutive_games', 'season_progress',
-         'is_early', 'is_mid', 'is_late', 'games_remaining', 'tz_difference', 'west_to_east',
-         'east_to_west', 'days_since_asb', 'post_asb'])]
-    
-    feature_cols = [col for col in feature_cols 
-                    if 'team_id' not in col and 'player_id' not in col and 'game_id' not in col]
-    
-    raw_leakage_cols = ['offensive_rating', 'defensive_rating', 'usage_rate', 'true_shooting_pct',
-                        'points', 'rebounds_total', 'assists', 'steals', 'blocks', 'turnovers',
-                        'three_pointers_made', 'minutes_played', 'is_starter', 'field_goals_made',
-                        'field_goals_attempted', 'three_pointers_attempted', 'free_throws_made',
-                        'free_throws_attempted']
-    feature_cols = [col for col in feature_cols if col not in raw_leakage_cols]
-    
-    X = df[feature_cols].fillna(0)
+    data = prepare_training_data(features_path)
+    df = data.df
+    X = data.X
     
     seasons = sorted(df['season'].unique())
     val_season = seasons[-1]
@@ -71,6 +51,12 @@ def evaluate_all_models(models_dir='data/models', features_path='data/processed/
         'models': {}
     }
     
+    X_val_by_family = {}
+    for model_type in models:
+        family_scaler = load_scaler(model_type, str(models_dir))
+        if family_scaler is not None:
+            X_val_by_family[model_type] = family_scaler.transform(X_val[list(family_scaler.feature_names_in_)])
+    
     for model_type in models:
         results['models'][model_type] = {}
         
@@ -85,11 +71,14 @@ def evaluate_all_models(models_dir='data/models', features_path='data/processed/
                     continue
                 
                 model = joblib.load(model_path)
-                scaler = joblib.load(scaler_path)
                 
                 y_val = df[val_mask][stat]
                 
-                X_val_scaled = scaler.transform(X_val)
+                if model_type in X_val_by_family:
+                    X_val_scaled = X_val_by_family[model_type]
+                else:
+                    scaler = joblib.load(scaler_path)
+                    X_val_scaled = scaler.transform(X_val)
                 
                 y_pred = model.predict(X_val_scaled)
                 
@@ -125,9 +114,12 @@ def evaluate_all_models(models_dir='data/models', features_path='data/processed/
                     continue
                 
                 model = joblib.load(model_path)
-                scaler = joblib.load(scaler_path)
                 
-                X_val_scaled = scaler.transform(X_val)
+                if model_type in X_val_by_family:
+                    X_val_scaled = X_val_by_family[model_type]
+                else:
+                    scaler = joblib.load(scaler_path)
+                    X_val_scaled = scaler.transform(X_val)
                 y_pred = model.predict(X_val_scaled)
                 predictions.append(y_pred)
                 
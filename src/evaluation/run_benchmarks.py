@@ -0,0 +1,319 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models'))
+
+# RUN THIS (after training, times feature prep, training, inference, confidence and explanations):
+# python src/evaluation/run_benchmarks.py
+# To store the run as the baseline that compare_benchmarks.py checks against:
+# python src/evaluation/run_benchmarks.py --save-baseline
+# To skip the training timings (inference only):
+# python src/evaluation/run_benchmarks.py --skip-training
+
+import time
+import json
+import shutil
+import tracemalloc
+from datetime import datetime
+from joblib import cpu_count
+
+import warnings
+warnings.filterwarnings('ignore', message='pandas only supports SQLAlchemy')
+warnings.filterwarnings('ignore', category=FutureWarning)
+warnings.filterwarnings('ignore', category=UserWarning)
+from training_data import TARGETS, get_project_root, prepare_training_data
+from model_bundle import load_model_bundle, build_model_bundle
+from parallel_training import MODEL_FAMILIES, _get_family_functions
+
+BENCHMARK_PREFIX = 'benchmark_'
+BASELINE_FILENAME = 'benchmark_baseline.json'
+TRACE_MEMORY = True
+
+
+def get_benchmark_dir():
+    return os.path.join(get_project_root(), 'data', 'evaluation')
+
+
+def measure(fn, *args, **kwargs):
+    """Return (result, seconds, peak traced memory in MB) for fn(*args, **kwargs).
+
+    tracemalloc slows Python-heavy code down, so the timed run is untraced and the
+    memory peak comes from a second, traced run (skipped with --skip-memory).
+    """
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    if not TRACE_MEMORY:
+        return result, seconds, None
+
+    tracemalloc.start()
+    try:
+        fn(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak / (1024 * 1024)
+
+
+def benchmark_feature_prep(results):
+    print("Feature prep (load CSV + imputation, no cache)...")
+    data, seconds, peak_mb = measure(prepare_training_data, use_cache=False)
+    results['features/prepare_training_data'] = {
+        'seconds': seconds,
+        'peak_mb': peak_mb,
+        'rows': len(data.df),
+        'rows_per_second': len(data.df) / seconds
+    }
+
+    from prune_features import time_feature_build
+    per_player = time_feature_build(data.df)
+    if per_player is not None:
+        results['features/build_features_for_player'] = {
+            'seconds': per_player,
+            'rows_per_second': 1.0 / per_player
+        }
+    return data
+
+
+def benchmark_training(results, data, model_types, train_rows, cpu_budget):
+    X_scaled = data.scaled()
+    if train_rows and train_rows < len(X_scaled):
+        X_train = X_scaled.iloc[:train_rows]
+    else:
+        X_train = X_scaled
+
+    for model_type in model_types:
+        _, build_fn, fit_fn = _get_family_functions(model_type)
+        for target_name in TARGETS:
+            y = data.target(target_name).iloc[:len(X_train)].to_numpy()
+            model = build_fn(target_name, None, n_jobs=cpu_budget)
+            _, seconds, peak_mb = measure(fit_fn, model, X_train, y)
+            results[f'train/{model_type}/{target_name}'] = {
+                'seconds': seconds,
+                'peak_mb': peak_mb,
+                'rows': len(X_train)
+            }
+            print(f"  {model_type}-{target_name}: {seconds:.2f}s")
+
+
+def benchmark_inference(results, X_slate, model_types, single_rows):
+    bundles = {}
+    for model_type in model_types:
+        bundle = load_model_bundle(model_type) or build_model_bundle(model_type)
+        if bundle is None:
+            print(f"  {model_type}: no saved models, skipping inference")
+            continue
+        try:
+            bundle.predict_matrix(X_slate.iloc[:1])
+        except Exception as e:
+            print(f"  {model_type}: saved models do not match the current features ({e}), skipping")
+            continue
+        bundles[model_type] = bundle
+
+        _, seconds, peak_mb = measure(bundle.predict_matrix, X_slate)
+        results[f'inference/{model_type}/slate'] = {
+            'seconds': seconds,
+            'peak_mb': peak_mb,
+            'rows': len(X_slate),
+            'rows_per_second': len(X_slate) / seconds
+        }
+
+        rows = X_slate.iloc[:single_rows]
+        start = time.perf_counter()
+        for i in range(len(rows)):
+            bundle.predict_matrix(rows.iloc[[i]])
+        seconds = time.perf_counter() - start
+        results[f'inference/{model_type}/single_row'] = {
+            'seconds': seconds,
+            'rows': len(rows),
+            'rows_per_second': len(rows) / seconds
+        }
+
+        if len(bundle.compiled) == len(bundle.targets):
+            _, seconds, peak_mb = measure(bundle.predict_matrix, X_slate, use_compiled=True)
+            results[f'inference/{model_type}/slate_compiled'] = {
+                'seconds': seconds,
+                'peak_mb': peak_mb,
+                'rows': len(X_slate),
+                'rows_per_second': len(X_slate) / seconds
+            }
+
+        print(f"  {model_type}: {results[f'inference/{model_type}/slate']['rows_per_second']:.0f} rows/s (slate), "
+              f"{results[f'inference/{model_type}/single_row']['rows_per_second']:.0f} rows/s (one at a time)")
+    return bundles
+
+
+def _player_stats(df_history):
+    # Mean/std per player over the fixed dataset, the shape calculate_confidence_score_per_stat expects.
+    player_stats = {}
+    for target_name, target_col in TARGETS.items():
+        grouped = df_history.groupby('player_id')[target_col].agg(['mean', 'std']).fillna(0.0)
+        for player_id, row in grouped.iterrows():
+            player_stats.setdefault(player_id, {})[target_name] = {'mean': float(row['mean']), 'std': float(row['std'])}
+    return player_stats
+
+
+def benchmark_confidence(results, df_slate, df_history, bundles, X_slate):
+    from predictions.confidence_scoring import calculate_confidence_score_per_stat, CONFIDENCE_CONFIG
+    from predictions.confidence_helpers import load_feature_importances, get_feature_groups, get_available_features
+
+    if not bundles:
+        print("  No model predictions available, skipping confidence scoring")
+        return
+
+    predictions = {m: b.predict_matrix(X_slate) for m, b in bundles.items()}
+    selected_models = list(bundles.keys())
+    player_stats = _player_stats(df_history)
+    feature_importances = load_feature_importances(get_project_root())
+    feature_groups = get_feature_groups()
+
+    def score_slate():
+        for i, (_, row) in enumerate(df_slate.iterrows()):
+            available = get_available_features(df_slate.iloc[[i]])
+            for target_name in TARGETS:
+                calculate_confidence_score_per_stat(
+                    stat_name=target_name,
+                    predictions_by_model={target_name: {m: float(predictions[m][target_name].iloc[i])
+                                                        for m in selected_models}},
+                    selected_models=selected_models,
+                    player_stats=player_stats.get(row['player_id'], {}),
+                    available_features=available,
+                    feature_importances=feature_importances,
+                    feature_groups=feature_groups,
+                    games_this_season=int(row.get('games_played_season', 20) or 20),
+                    career_games=100,
+                    days_since_transaction=None,
+                    games_with_team=50,
+                    opponent_def_rating=float(row.get('defensive_rating_opp', 114.0) or 114.0),
+                    config=CONFIDENCE_CONFIG
+                )
+
+    _, seconds, peak_mb = measure(score_slate)
+    results['confidence/slate'] = {
+        'seconds': seconds,
+        'peak_mb': peak_mb,
+        'rows': len(df_slate),
+        'rows_per_second': len(df_slate) / seconds
+    }
+    print(f"  Confidence: {len(df_slate) / seconds:.0f} rows/s")
+
+
+def benchmark_explanations(results, df_slate, league_means, model_type='xgboost'):
+    from predictions.feature_explanations import get_top_features_with_impact
+
+    records = df_slate.to_dict(orient='records')
+
+    def explain_slate():
+        n_explained = 0
+        for features_dict in records:
+            for target_name in TARGETS:
+                if get_top_features_with_impact(features_dict, model_type, target_name, league_means):
+                    n_explained += 1
+        return n_explained
+
+    n_explained, seconds, peak_mb = measure(explain_slate)
+    if n_explained == 0:
+        print(f"  No {model_type} feature importance files, skipping explanations")
+        return
+    results['explanations/slate'] = {
+        'seconds': seconds,
+        'peak_mb': peak_mb,
+        'rows': len(df_slate),
+        'rows_per_second': len(df_slate) / seconds
+    }
+    print(f"  Explanations: {len(df_slate) / seconds:.0f} rows/s")
+
+
+def run_benchmarks(model_types=None, skip_training=False, train_rows=None, slate_size=300, single_rows=50,
+                   cpu_budget=None, trace_memory=True, save_baseline=False, output_path=None):
+    global TRACE_MEMORY
+    TRACE_MEMORY = trace_memory
+    print("="*70)
+    print("BENCHMARKS")
+    print("="*70)
+    print(f"Started at: {datetime.now()}\n")
+
+    model_types = model_types or list(MODEL_FAMILIES.keys())
+    cpu_budget = cpu_budget or cpu_count()
+    results = {}
+
+    data = benchmark_feature_prep(results)
+    print(f"  {results['features/prepare_training_data']['seconds']:.2f}s for {len(data.df)} rows\n")
+
+    if not skip_training:
+        print(f"Training one model per family and stat ({cpu_budget} CPUs)...")
+        benchmark_training(results, data, model_types, train_rows, cpu_budget)
+        print()
+
+    # The slate is the most recent rows, the closest thing to one day of predictions.
+    df_slate = data.df.iloc[-slate_size:]
+    X_slate = data.X.iloc[-slate_size:]
+    df_history = data.df.iloc[:-slate_size] if len(data.df) > slate_size else data.df
+
+    print(f"Inference on a slate of {len(X_slate)} rows...")
+    bundles = benchmark_inference(results, X_slate, model_types, single_rows)
+    print()
+
+    print("Confidence scoring and explanations...")
+    benchmark_confidence(results, df_slate, df_history, bundles, X_slate)
+    benchmark_explanations(results, df_slate, data.league_means)
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'rows': len(data.df),
+        'features': len(data.feature_cols),
+        'cpu_budget': cpu_budget,
+        'slate_size': len(X_slate),
+        'train_rows': None if skip_training else min(train_rows or len(data.df), len(data.df)),
+        'trace_memory': trace_memory,
+        'results': results
+    }
+
+    output_path = output_path or os.path.join(
+        get_benchmark_dir(), f"{BENCHMARK_PREFIX}{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nBenchmark saved to {output_path}")
+
+    if save_baseline:
+        baseline_path = os.path.join(get_benchmark_dir(), BASELINE_FILENAME)
+        shutil.copy(output_path, baseline_path)
+        print(f"Baseline saved to {baseline_path}")
+
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Time and memory-profile the training and prediction pipeline')
+    parser.add_argument('--models', nargs='+', default=list(MODEL_FAMILIES.keys()),
+                       choices=list(MODEL_FAMILIES.keys()), help='Model families to benchmark')
+    parser.add_argument('--skip-training', action='store_true',
+                       help='Skip the per-stat training timings')
+    parser.add_argument('--train-rows', type=int, default=None,
+                       help='Train on the first N rows only (default: all rows)')
+    parser.add_argument('--slate-size', type=int, default=300,
+                       help='Rows in the inference, confidence and explanation slate')
+    parser.add_argument('--single-rows', type=int, default=50,
+                       help='Rows predicted one at a time for the per-row latency')
+    parser.add_argument('--cpu-budget', type=int, default=None,
+                       help='Threads per model when timing training (default: all)')
+    parser.add_argument('--skip-memory', action='store_true',
+                       help='Skip the traced second run of each step (no peak_mb, half the time)')
+    parser.add_argument('--save-baseline', action='store_true',
+                       help='Also store this run as data/evaluation/benchmark_baseline.json')
+    parser.add_argument('--output', default=None,
+                       help='Output path (default: data/evaluation/benchmark_YYYYMMDD_HHMMSS.json)')
+    args = parser.parse_args()
+    run_benchmarks(
+        model_types=args.models,
+        skip_training=args.skip_training,
+        train_rows=args.train_rows,
+        slate_size=args.slate_size,
+        single_rows=args.single_rows,
+        cpu_budget=args.cpu_budget,
+        trace_memory=not args.skip_memory,
+        save_baseline=args.save_baseline,
+        output_path=args.output
+    )
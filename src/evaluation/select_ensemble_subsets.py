@@ -0,0 +1,237 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models'))
+
+# RUN THIS (after training, scores every subset of the 4 families on out-of-fold predictions):
+# python src/evaluation/select_ensemble_subsets.py
+# To score stored predictions that already have actual results instead:
+# python src/evaluation/select_ensemble_subsets.py --source history --from 2025-11-01
+# To only print the report without writing data/models/ensemble_subsets.json:
+# python src/evaluation/select_ensemble_subsets.py --no-write
+
+import time
+import json
+import numpy as np
+import pandas as pd
+import joblib
+from itertools import combinations
+from datetime import datetime
+from sklearn.metrics import mean_absolute_error
+
+import warnings
+warnings.filterwarnings('ignore', message='pandas only supports SQLAlchemy')
+warnings.filterwarnings('ignore', category=FutureWarning)
+from training_data import TARGETS, get_project_root, get_models_dir, load_scaler, save_ensemble_subsets
+
+ENSEMBLE_FAMILIES = ['xgboost', 'lightgbm', 'catboost', 'random_forest']
+MAX_MAE_INCREASE = 0.005
+
+
+def load_oof_predictions(use_tuned_params=False, cpu_budget=None, refit=False):
+    from training_data import prepare_training_data
+    from oof_store import get_oof_predictions
+
+    data = prepare_training_data()
+    oof_idx, oof_predictions = get_oof_predictions(data, ENSEMBLE_FAMILIES, use_tuned_params,
+                                                   cpu_budget=cpu_budget, refit=refit)
+    df_oof = data.df.iloc[oof_idx]
+
+    by_stat = {}
+    for target_name, target_col in TARGETS.items():
+        by_stat[target_name] = (
+            df_oof[target_col].to_numpy(dtype=float),
+            {m: oof_predictions[(m, target_name)] for m in ENSEMBLE_FAMILIES}
+        )
+    return by_stat
+
+
+def load_history_predictions(start_date=None, end_date=None):
+    from data_collection.utils import get_analytics_connection
+
+    where_conditions = ["p.actual_points IS NOT NULL", "p.model_version IN (%s, %s, %s, %s)"]
+    params = list(ENSEMBLE_FAMILIES)
+    if start_date:
+        where_conditions.append("p.prediction_date >= %s")
+        params.append(start_date)
+    if end_date:
+        where_conditions.append("p.prediction_date <= %s")
+        params.append(end_date)
+
+    stat_cols = ', '.join(f"p.predicted_{t}, p.actual_{t}" for t in TARGETS)
+    query = f"""
+        SELECT p.player_id, p.game_id, p.model_version, {stat_cols}
+        FROM predictions p
+        WHERE {' AND '.join(where_conditions)}
+    """
+
+    conn = get_analytics_connection()
+    try:
+        df = pd.read_sql(query, conn, params=params)
+    finally:
+        conn.close()
+
+    by_stat = {}
+    for target_name in TARGETS:
+        wide = df.pivot_table(index=['player_id', 'game_id'], columns='model_version',
+                              values=f'predicted_{target_name}', aggfunc='first')
+        actual = df.groupby(['player_id', 'game_id'])[f'actual_{target_name}'].first()
+        # Only games every family predicted, so every subset is scored on the same rows.
+        wide = wide.reindex(columns=ENSEMBLE_FAMILIES).dropna()
+        actual = actual.reindex(wide.index)
+        mask = actual.notna().to_numpy()
+        by_stat[target_name] = (
+            actual.to_numpy(dtype=float)[mask],
+            {m: wide[m].to_numpy(dtype=float)[mask] for m in ENSEMBLE_FAMILIES}
+        )
+    return by_stat
+
+
+def measure_inference_costs(models_dir=None, slate_size=300):
+    """Seconds to predict a slate one player at a time with each saved (family, stat) model."""
+    models_dir = models_dir or get_models_dir()
+    rng = np.random.default_rng(42)
+
+    costs = {}
+    for model_type in ENSEMBLE_FAMILIES:
+        scaler = load_scaler(model_type, models_dir)
+        if scaler is None:
+            print(f"Scaler for {model_type} not found, skipping its inference timing")
+            continue
+        feature_names = list(scaler.feature_names_in_)
+        X_slate = pd.DataFrame(rng.standard_normal((slate_size, len(feature_names))), columns=feature_names)
+
+        for target_name in TARGETS:
+            model_path = os.path.join(models_dir, f'{model_type}_{target_name}.pkl')
+            if not os.path.exists(model_path):
+                continue
+            model = joblib.load(model_path)
+            try:
+                start = time.perf_counter()
+                for i in range(len(X_slate)):
+                    model.predict(X_slate.iloc[[i]])
+                costs[(model_type, target_name)] = time.perf_counter() - start
+            except Exception as e:
+                print(f"Warning: Could not time {model_type}-{target_name}: {e}")
+    return costs
+
+
+def score_subsets(actual, family_predictions, family_costs):
+    rows = []
+    for size in range(1, len(ENSEMBLE_FAMILIES) + 1):
+        for subset in combinations(ENSEMBLE_FAMILIES, size):
+            prediction = np.mean([family_predictions[m] for m in subset], axis=0)
+            costs = [family_costs.get(m) for m in subset]
+            rows.append({
+                'models': list(subset),
+                'mae': float(mean_absolute_error(actual, prediction)),
+                'slate_seconds': float(sum(costs)) if all(c is not None for c in costs) else None
+            })
+    return rows
+
+
+def recommend_subset(rows, max_mae_increase=MAX_MAE_INCREASE):
+    """Cheapest subset whose MAE is within max_mae_increase (relative) of the best subset."""
+    best_mae = min(r['mae'] for r in rows)
+    candidates = [r for r in rows if r['mae'] <= best_mae * (1 + max_mae_increase)]
+    if all(r['slate_seconds'] is not None for r in candidates):
+        return min(candidates, key=lambda r: (r['slate_seconds'], r['mae']))
+    return min(candidates, key=lambda r: (len(r['models']), r['mae']))
+
+
+def select_ensemble_subsets(source='oof', start_date=None, end_date=None, use_tuned_params=False, cpu_budget=None,
+                            slate_size=300, max_mae_increase=MAX_MAE_INCREASE, write=True, output_path=None,
+                            refit_oof=False):
+    print("="*70)
+    print("ENSEMBLE SUBSET SELECTION")
+    print("="*70)
+    print(f"Source: {'out-of-fold predictions' if source == 'oof' else 'stored predictions with actuals'}\n")
+
+    if source == 'oof':
+        by_stat = load_oof_predictions(use_tuned_params, cpu_budget, refit_oof)
+    else:
+        by_stat = load_history_predictions(start_date, end_date)
+
+    costs = measure_inference_costs(slate_size=slate_size)
+
+    report = {
+        'generated_at': datetime.now().isoformat(),
+        'source': source,
+        'slate_size': slate_size,
+        'max_mae_increase': max_mae_increase,
+        'targets': {}
+    }
+    recommended = {}
+
+    for target_name, (actual, family_predictions) in by_stat.items():
+        if len(actual) == 0:
+            print(f"{target_name}: no rows with all {len(ENSEMBLE_FAMILIES)} families, keeping every model")
+            recommended[target_name] = list(ENSEMBLE_FAMILIES)
+            continue
+
+        family_costs = {m: costs.get((m, target_name)) for m in ENSEMBLE_FAMILIES}
+        rows = sorted(score_subsets(actual, family_predictions, family_costs), key=lambda r: r['mae'])
+        choice = recommend_subset(rows, max_mae_increase)
+        recommended[target_name] = choice['models']
+
+        full = next(r for r in rows if len(r['models']) == len(ENSEMBLE_FAMILIES))
+        report['targets'][target_name] = {
+            'rows': int(len(actual)),
+            'recommended': choice['models'],
+            'full_ensemble': full,
+            'subsets': rows
+        }
+
+        print(f"{target_name.upper()} ({len(actual)} rows)")
+        print(f"  {'Models':<45}{'MAE':>8}{'Slate (s)':>11}")
+        for r in rows:
+            seconds = f"{r['slate_seconds']:.2f}" if r['slate_seconds'] is not None else 'n/a'
+            marker = '  <- recommended' if r is choice else ''
+            print(f"  {'+'.join(r['models']):<45}{r['mae']:>8.3f}{seconds:>11}{marker}")
+        print()
+
+    output_path = output_path or os.path.join(get_project_root(), 'data', 'evaluation', 'ensemble_subsets_report.json')
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to {output_path}")
+
+    if write:
+        subsets_path = save_ensemble_subsets(recommended, source=source, generated_at=report['generated_at'],
+                                             max_mae_increase=max_mae_increase)
+        print(f"Recommended subsets saved to {subsets_path}")
+
+    return recommended
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Score every subset of the 4 model families per stat on MAE and cost')
+    parser.add_argument('--source', choices=['oof', 'history'], default='oof',
+                       help='Out-of-fold predictions on the season folds, or stored predictions with actuals')
+    parser.add_argument('--from', dest='start_date', default=None, help='With --source history: first prediction date')
+    parser.add_argument('--to', dest='end_date', default=None, help='With --source history: last prediction date')
+    parser.add_argument('--use-tuned-params', action='store_true',
+                       help='With --source oof: fold models use tuned hyperparameters')
+    parser.add_argument('--cpu-budget', type=int, default=None,
+                       help='Total CPUs for the out-of-fold models (default: all)')
+    parser.add_argument('--slate-size', type=int, default=300,
+                       help='Rows to predict one at a time when timing each model')
+    parser.add_argument('--max-mae-increase', type=float, default=MAX_MAE_INCREASE,
+                       help='Relative MAE increase over the best subset allowed for the recommendation')
+    parser.add_argument('--no-write', action='store_true',
+                       help='Do not write data/models/ensemble_subsets.json')
+    parser.add_argument('--refit-oof', action='store_true',
+                       help='With --source oof: refit the fold models instead of using saved predictions')
+    args = parser.parse_args()
+    select_ensemble_subsets(
+        source=args.source,
+        start_date=args.start_date,
+        end_date=args.end_date,
+        use_tuned_params=args.use_tuned_params,
+        cpu_budget=args.cpu_budget,
+        slate_size=args.slate_size,
+        max_mae_increase=args.max_mae_increase,
+        write=not args.no_write,
+        refit_oof=args.refit_oof
+    )
@@ -1,7 +1,9 @@
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from data_collection.utils import get_db_connection
+from data_collection.utils import get_analytics_connection
+from data_collection.bulk_read import read_sql_copy
+from profiling import profiled, mark, annotate, start_run, add_profile_argument
 from feature_engineering.team_stats_calculator import (
     calculate_team_ratings_as_of_date,
     calculate_team_defensive_stats_as_of_date,
@@ -17,11 +19,33 @@ warnings.filterwarnings('ignore', message='pandas only supports SQLAlchemy')
 warnings.filterwarnings('ignore', category=pd.errors.PerformanceWarning)
 warnings.filterwarnings('ignore', category=FutureWarning)
 
+GAME_STAT_COLUMNS = [
+    'points', 'rebounds_total', 'assists', 'steals', 'blocks', 'turnovers', 'three_pointers_made',
+    'minutes_played', 'field_goals_made', 'field_goals_attempted', 'three_pointers_attempted',
+    'free_throws_made', 'free_throws_attempted', 'usage_rate', 'true_shooting_pct',
+    'offensive_rating', 'defensive_rating'
+]
+PLAYER_GAME_DTYPES = {
+    'player_id': 'int64',
+    'team_id': 'int64',
+    'game_id': str,
+    **{col: 'float64' for col in GAME_STAT_COLUMNS},
+    # Nullable column: 'boolean' keeps NULLs as <NA> on both read paths; filled as not starting below.
+    'is_starter': 'boolean',
+    'season': str,
+    'game_type': str,
+    'home_team_id': 'int64',
+    'away_team_id': 'int64',
+    'position': str,
+}
+
+@profiled('build_features')
 def build_features_for_training():
     print("Building features for model training...\n")
     
-    conn = get_db_connection()
+    conn = get_analytics_connection()
     
+    mark('load_player_game_stats')
     print("Loading player game stats...")
     query = """
         SELECT 
@@ -59,7 +83,7 @@ def build_features_for_training():
         ORDER BY pgs.player_id, g.game_date
     """
     
-    df = pd.read_sql(query, conn)
+    df = read_sql_copy(query, conn, dtypes=PLAYER_GAME_DTYPES, parse_dates=['game_date'])
     print(f"Loaded {len(df)} records\n")
     
     print("Calculating features...")
@@ -72,9 +96,11 @@ def build_features_for_training():
         weights = weights / weights.sum()
         return np.sum(series * weights)
     
+    mark('playoff_indicator')
     print("  - Playoff indicator")
     df['is_playoff'] = (df['game_type'] == 'playoff').astype(int)
     
+    mark('recent_form')
     print("  - Recent form (L5, L10, L20) - unweighted")
     for window in [5, 10, 20]:
         for stat in ['points', 'rebounds_total', 'assists', 'steals', 'blocks', 'turnovers', 'three_pointers_made']:
@@ -82,6 +108,7 @@ def build_features_for_training():
                 lambda x: x.rolling(window=window, min_periods=1).mean().shift(1)
             )
     
+    mark('recent_form_weighted')
     print("  - Recent form (L5, L10, L20) - exponentially weighted")
     for window in [5, 10, 20]:
         for stat in ['points', 'rebounds_total', 'assists', 'steals', 'blocks', 'turnovers', 'three_pointers_made']:
@@ -89,6 +116,7 @@ def build_features_for_training():
                 lambda x: x.rolling(window=window, min_periods=1).apply(exp_weighted_mean, raw=True).shift(1)
             )
     
+    mark('minutes')
     print("  - Minutes played features")
     for window in [5, 10, 20]:
         df[f'minutes_played_l{window}'] = df.groupby('player_id')['minutes_played'].transform(
@@ -98,12 +126,13 @@ def build_features_for_training():
             lambda x: x.rolling(window=window, min_periods=1).apply(exp_weighted_mean, raw=True).shift(1)
         )
     
-    df['is_starter'] = df['is_starter'].astype(int)
+    df['is_starter'] = df['is_starter'].fillna(False).astype(int)
     for window in [5, 10]:
         df[f'is_starter_l{window}'] = df.groupby('player_id')['is_starter'].transform(
             lambda x: x.rolling(window=window, min_periods=1).mean().shift(1)
         )
     
+    mark('minutes_trend')
     print("  - Minutes trend")
     def calc_minutes_trend(group):
         shifted = group.shift(1)
@@ -118,6 +147,7 @@ def build_features_for_training():
     
     df['minutes_trend'] = df.groupby('player_id')['minutes_played'].transform(calc_minutes_trend)
     
+    mark('position_encoding')
     print("  - Position encoding")
     df['position'] = df['position'].fillna('G')
     position_map = {
@@ -142,6 +172,7 @@ def build_features_for_training():
     df['position_forward'] = position_encoded.apply(lambda x: x[1])
     df['position_center'] = position_encoded.apply(lambda x: x[2])
     
+    mark('usage_rate')
     print("  - Usage rate features")
     for window in [5, 10, 20]:
         df[f'usage_rate_l{window}'] = df.groupby('player_id')['usage_rate'].transform(
@@ -151,6 +182,7 @@ def build_features_for_training():
             lambda x: x.rolling(window=window, min_periods=1).apply(exp_weighted_mean, raw=True).shift(1)
         )
     
+    mark('advanced_stats')
     print("  - Player-level advanced stats")
     for window in [5, 10, 20]:
         for stat in ['offensive_rating', 'defensive_rating']:
@@ -161,6 +193,7 @@ def build_features_for_training():
     for window in [5, 10, 20]:
         df[f'net_rating_l{window}'] = df[f'offensive_rating_l{window}'] - df[f'defensive_rating_l{window}']
     
+    mark('shooting_pct')
     print("  - Shooting percentage features")
     for window in [5, 10, 20]:
         fgm_sum = df.groupby('player_id')['field_goals_made'].transform(lambda x: x.shift(1).rolling(window=window, min_periods=1).sum())
@@ -179,6 +212,7 @@ def build_features_for_training():
             lambda x: x.rolling(window=window, min_periods=1).mean().shift(1)
         )
     
+    mark('per_36')
     print("  - Per-minute rate features (per 36 minutes)")
     for stat in ['points', 'rebounds_total', 'assists', 'steals', 'blocks', 'turnovers', 'three_pointers_made']:
         for window in [5, 10, 20]:
@@ -186,6 +220,7 @@ def build_features_for_training():
             min_sum = df.groupby('player_id')['minutes_played'].transform(lambda x: x.shift(1).rolling(window=window, min_periods=1).sum())
             df[f'{stat}_per_36_l{window}'] = np.where(min_sum > 0, (stat_sum / min_sum) * 36, 0)
     
+    mark('cross_stat_ratios')
     print("  - Cross-stat ratio features")
     for window in [5, 10, 20]:
         ast_sum = df.groupby('player_id')['assists'].transform(lambda x: x.shift(1).rolling(window=window, min_periods=1).sum())
@@ -204,6 +239,7 @@ def build_features_for_training():
         min_sum_reb = df.groupby('player_id')['minutes_played'].transform(lambda x: x.shift(1).rolling(window=window, min_periods=1).sum())
         df[f'reb_rate_l{window}'] = np.where(min_sum_reb > 0, reb_sum / (min_sum_reb / 36), 0)
     
+    mark('teammate_dependency')
     print("  - Teammate dependency features")
     df['star_teammate_out'] = 0
     df['star_teammate_ppg'] = 0.0
@@ -237,30 +273,36 @@ def build_features_for_training():
         cumsum = player_data['star_teammate_out'].cumsum()
         df.loc[df['player_id'] == player_id, 'games_without_star'] = cumsum
     
+    mark('playoff_experience')
     print("  - Playoff experience")
     df['playoff_games_career'] = df.groupby('player_id')['is_playoff'].cumsum()
     
+    mark('playoff_boost')
     print("  - Playoff performance boost")
     playoff_stats = df[df['is_playoff'] == 1].groupby('player_id')['points'].mean()
     regular_stats = df[df['is_playoff'] == 0].groupby('player_id')['points'].mean()
     playoff_boost = (playoff_stats - regular_stats).fillna(0)
     df['playoff_performance_boost'] = df['player_id'].map(playoff_boost).fillna(0)
     
+    mark('home_away')
     print("  - Home/away")
     df['is_home'] = (df['team_id'] == df['home_team_id']).astype(int)
     
+    mark('days_rest')
     print("  - Days rest")
     df['game_date'] = pd.to_datetime(df['game_date'])
     df['days_rest'] = df.groupby('player_id')['game_date'].diff().dt.days
     df['days_rest'] = df['days_rest'].fillna(3)
     df['is_back_to_back'] = (df['days_rest'] == 1).astype(int)
     
+    mark('opponent_id')
     print("  - Opponent ID")
     df['opponent_id'] = df.apply(
         lambda row: row['away_team_id'] if row['is_home'] == 1 else row['home_team_id'],
         axis=1
     )
     
+    mark('schedule_density')
     print("  - Schedule density features")
     df = df.sort_values(['player_id', 'game_date']).reset_index(drop=True)
     
@@ -293,6 +335,7 @@ def build_features_for_training():
     df['consecutive_games'] = df['consecutive_games'].fillna(1)
     df['consecutive_games'] = df.groupby('player_id')['consecutive_games'].shift(1).fillna(0)
     
+    mark('season_period')
     print("  - Season period features")
     season_starts = df.groupby('season')['game_date'].transform('min')
     df['season_progress'] = (df['game_date'] - season_starts).dt.days / 180.0
@@ -312,6 +355,7 @@ def build_features_for_training():
     df['games_remaining'] = df['games_remaining'].clip(lower=0)
     df = df.drop(columns=['team_games_played'], errors='ignore')
     
+    mark('timezone_travel')
     print("  - Timezone travel features")
     teams_tz = pd.read_sql("""
         SELECT team_id, timezone
@@ -342,6 +386,7 @@ def build_features_for_training():
     df['west_to_east'] = ((df['is_home'] == 0) & (df['tz_difference'] > 0)).astype(int)
     df['east_to_west'] = ((df['is_home'] == 0) & (df['tz_difference'] < 0)).astype(int)
     
+    mark('all_star_break')
     print("  - All-Star break features")
     all_star_breaks = {
         '2020-21': '2021-03-07',
@@ -360,9 +405,11 @@ def build_features_for_training():
     df['post_asb_bounce'] = ((df['days_since_asb'] > 0) & (df['days_since_asb'] <= 14)).astype(int)
     df = df.drop(columns=['asb_date'], errors='ignore')
     
+    mark('defense_position')
     print("  - Defense position mapping")
     df['defense_position'] = df['position'].apply(map_position_to_defense_position)
     
+    mark('team_ratings')
     print("  - Team ratings")
     print("     This may take a few minutes...")
     
@@ -399,6 +446,7 @@ def build_features_for_training():
         df['defensive_rating_team'] = None
         df['pace_team'] = None
     
+    mark('opponent_ratings')
     print("  - Opponent ratings (calculating as-of each game date)...")
     opp_date_combos = df[['opponent_id', 'season', 'game_date']].drop_duplicates()
     opp_ratings_list = []
@@ -433,6 +481,7 @@ def build_features_for_training():
         df['defensive_rating_opp'] = None
         df['pace_opp'] = None
     
+    mark('opponent_defense')
     print("  - Opponent defense stats (calculating as-of each game date)...")
     opp_def_date_combos = df[['opponent_id', 'season', 'game_date']].drop_duplicates()
     opp_def_list = []
@@ -463,6 +512,7 @@ def build_features_for_training():
         df['opp_team_turnovers_per_game'] = None
         df['opp_team_steals_per_game'] = None
     
+    mark('position_defense')
     print("  - Position-specific opponent defense (calculating as-of each game date)...")
     pos_def_combos = df[['opponent_id', 'season', 'defense_position', 'game_date']].drop_duplicates()
     pos_def_list = []
@@ -497,6 +547,7 @@ def build_features_for_training():
         df['opp_position_turnovers_vs_team'] = None
         df['opp_position_steals_vs_team'] = None
     
+    mark('opponent_turnovers')
     print("  - Opponent team turnover stats by position (calculating as-of each game date)...")
     opp_turnover_combos = df[['opponent_id', 'season', 'defense_position', 'game_date']].drop_duplicates()
     opp_turnover_list = []
@@ -528,6 +579,7 @@ def build_features_for_training():
     
     df = df.drop(columns=['defense_position'], errors='ignore')
     
+    mark('altitude')
     print("  - Altitude")
     teams_altitude = pd.read_sql("""
         SELECT team_id, arena_altitude
@@ -551,8 +603,10 @@ def build_features_for_training():
     print("="*50)
     print(f"Total columns: {len(df.columns)}")
     print(f"Total records: {len(df)}")
+    annotate(rows=len(df), columns=len(df.columns))
     print(f"Records with star teammate out: {df['star_teammate_out'].sum()}")
     
+    mark('save_csv')
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(os.path.dirname(script_dir))
     output_path = os.path.join(project_root, 'data', 'processed', 'training_features.csv')
@@ -563,4 +617,9 @@ def build_features_for_training():
     return df
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Build the training feature CSV from the database')
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    start_run('build_features', profile=args.profile or None)
     build_features_for_training()
\ No newline at end of file
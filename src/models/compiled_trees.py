@@ -0,0 +1,128 @@
+import os
+import json
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# Only NumPy is needed here: compiled models are scored without importing
+# xgboost, lightgbm, catboost or scikit-learn.
+
+__all__ = [
+    'COMPILED_DIRNAME',
+    'CompiledForest',
+    'get_compiled_dir',
+    'get_compiled_path',
+    'save_compiled',
+    'load_compiled',
+    'load_compiled_models',
+]
+
+COMPILED_DIRNAME = 'compiled'
+
+
+@dataclass
+class CompiledForest:
+    """A tree ensemble flattened into arrays, evaluated on raw (unscaled) features.
+
+    Node i is a leaf when feature[i] < 0. Otherwise a row goes to left[i] when
+    x[feature[i]] < threshold[i] and to right[i] otherwise. The StandardScaler is
+    already folded into the thresholds, kept in float64 so raw values that sit exactly
+    on a split boundary are sent the same way as by the library. The prediction is
+    link(base_score + tree_scale * sum of the leaf values reached in each tree).
+    """
+    feature_names: List[str]
+    feature: np.ndarray
+    threshold: np.ndarray
+    left: np.ndarray
+    right: np.ndarray
+    value: np.ndarray
+    roots: np.ndarray
+    max_depth: int
+    base_score: float = 0.0
+    tree_scale: float = 1.0
+    link: str = 'identity'
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def predict(self, X) -> np.ndarray:
+        if hasattr(X, 'columns'):
+            X = X[self.feature_names].to_numpy()
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        rows = np.arange(len(X))[:, None]
+        idx = np.broadcast_to(self.roots, (len(X), self.n_trees)).copy()
+        for _ in range(self.max_depth):
+            feature = self.feature[idx]
+            is_leaf = feature < 0
+            if is_leaf.all():
+                break
+            go_left = X[rows, np.where(is_leaf, 0, feature)] < self.threshold[idx]
+            idx = np.where(is_leaf, idx, np.where(go_left, self.left[idx], self.right[idx]))
+
+        raw = self.base_score + self.tree_scale * self.value[idx].sum(axis=1, dtype=np.float64)
+        if self.link == 'exp':
+            return np.exp(raw)
+        return raw
+
+
+def get_compiled_dir(models_dir: Optional[str] = None) -> str:
+    if models_dir is None:
+        project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        models_dir = os.path.join(project_root, 'data', 'models')
+    return os.path.join(models_dir, COMPILED_DIRNAME)
+
+
+def get_compiled_path(model_type: str, target_name: str, models_dir: Optional[str] = None) -> str:
+    return os.path.join(get_compiled_dir(models_dir), f'{model_type}_{target_name}.npz')
+
+
+def save_compiled(forest: CompiledForest, path: str) -> str:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    meta = {
+        'max_depth': forest.max_depth,
+        'base_score': forest.base_score,
+        'tree_scale': forest.tree_scale,
+        'link': forest.link
+    }
+    np.savez_compressed(
+        path,
+        feature_names=np.array(forest.feature_names),
+        feature=forest.feature.astype(np.int32),
+        threshold=forest.threshold.astype(np.float64),
+        left=forest.left.astype(np.int32),
+        right=forest.right.astype(np.int32),
+        value=forest.value.astype(np.float32),
+        roots=forest.roots.astype(np.int32),
+        meta=np.array(json.dumps(meta))
+    )
+    return path
+
+
+def load_compiled(path: str) -> CompiledForest:
+    with np.load(path, allow_pickle=False) as arrays:
+        meta = json.loads(str(arrays['meta']))
+        return CompiledForest(
+            feature_names=[str(name) for name in arrays['feature_names']],
+            feature=arrays['feature'],
+            threshold=arrays['threshold'],
+            left=arrays['left'],
+            right=arrays['right'],
+            value=arrays['value'],
+            roots=arrays['roots'],
+            **meta
+        )
+
+
+def load_compiled_models(model_types: List[str], target_names: List[str],
+                         models_dir: Optional[str] = None) -> Dict[tuple, CompiledForest]:
+    compiled = {}
+    for model_type in model_types:
+        for target_name in target_names:
+            path = get_compiled_path(model_type, target_name, models_dir)
+            if os.path.exists(path):
+                compiled[(model_type, target_name)] = load_compiled(path)
+    return compiled
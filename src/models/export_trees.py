@@ -0,0 +1,397 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# RUN THIS (after training):
+# python src/models/export_trees.py
+# To also time slate scoring against the original libraries:
+# python src/models/export_trees.py --benchmark
+
+import time
+import json
+import numpy as np
+import pandas as pd
+import joblib
+from datetime import datetime
+
+import warnings
+warnings.filterwarnings('ignore', category=FutureWarning)
+from training_data import TARGETS, get_project_root, get_models_dir, get_scaler_path, load_scaler, prepare_training_data
+from compiled_trees import CompiledForest, get_compiled_path, save_compiled
+from model_bundle import fill_missing, save_model_bundle
+
+EXPORT_FAMILIES = ['xgboost', 'lightgbm', 'catboost', 'random_forest']
+EXPORT_TOLERANCE = 1e-4
+
+
+def _tree(feature, threshold, left, right, value):
+    return {
+        'feature': np.asarray(feature, dtype=np.int64),
+        'threshold': np.asarray(threshold, dtype=np.float64),
+        'left': np.asarray(left, dtype=np.int64),
+        'right': np.asarray(right, dtype=np.int64),
+        'value': np.asarray(value, dtype=np.float64)
+    }
+
+
+def _xgboost_trees(model):
+    booster = model.get_booster()
+    config = json.loads(booster.save_config())
+    base_score = float(config['learner']['learner_model_param']['base_score'].strip('[]'))
+    objective = config['learner']['objective']['name']
+
+    trees = []
+    for tree in json.loads(booster.save_raw('json'))['learner']['gradient_booster']['model']['trees']:
+        left = np.array(tree['left_children'])
+        is_leaf = left == -1
+        # Leaves keep their weight in split_conditions. Splits are stored as float32.
+        trees.append(_tree(
+            np.where(is_leaf, -1, tree['split_indices']),
+            np.float32(tree['split_conditions']),
+            left,
+            tree['right_children'],
+            np.where(is_leaf, tree['split_conditions'], 0.0)
+        ))
+
+    if hasattr(model, 'best_iteration') and model.best_iteration is not None:
+        trees = trees[:model.best_iteration + 1]
+
+    if objective == 'count:poisson':
+        return trees, float(np.log(base_score)), 1.0, 'exp', list(booster.feature_names)
+    if objective != 'reg:squarederror':
+        raise ValueError(f"Unsupported XGBoost objective: {objective}")
+    return trees, base_score, 1.0, 'identity', list(booster.feature_names)
+
+
+def _lightgbm_trees(model):
+    dump = model.booster_.dump_model()
+    trees = []
+    for info in dump['tree_info']:
+        feature, threshold, left, right, value = [], [], [], [], []
+
+        def add(node):
+            i = len(feature)
+            feature.append(-1)
+            threshold.append(0.0)
+            left.append(-1)
+            right.append(-1)
+            value.append(0.0)
+            if 'leaf_value' in node:
+                value[i] = node['leaf_value']
+                return i
+            if node['decision_type'] != '<=' or node.get('missing_type') == 'Zero':
+                raise ValueError(f"Unsupported LightGBM split: {node['decision_type']}, missing {node.get('missing_type')}")
+            feature[i] = node['split_feature']
+            threshold[i] = node['threshold']
+            left[i] = add(node['left_child'])
+            right[i] = add(node['right_child'])
+            return i
+
+        add(info['tree_structure'])
+        trees.append(_tree(feature, threshold, left, right, value))
+
+    best_iteration = getattr(model, 'best_iteration_', None)
+    if best_iteration:
+        trees = trees[:best_iteration]
+
+    link = 'exp' if dump['objective'].startswith('poisson') else 'identity'
+    if link == 'identity' and not dump['objective'].startswith('regression'):
+        raise ValueError(f"Unsupported LightGBM objective: {dump['objective']}")
+    return trees, 0.0, 1.0, link, list(dump['feature_names'])
+
+
+def _catboost_trees(model):
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_path = os.path.join(tmp_dir, 'model.json')
+        model.save_model(json_path, format='json')
+        with open(json_path, 'r') as f:
+            dump = json.load(f)
+
+    trees = []
+    for tree in dump['oblivious_trees']:
+        splits = tree['splits']
+        depth = len(splits)
+        leaf_values = tree['leaf_values']
+        feature, threshold, left, right, value = [], [], [], [], []
+
+        # Oblivious tree: leaf index bit i is set when x > border of splits[i].
+        # Expanded into a binary tree that tests splits[depth - 1] at the root.
+        def add(level, leaf_index):
+            i = len(feature)
+            feature.append(-1)
+            threshold.append(0.0)
+            left.append(-1)
+            right.append(-1)
+            value.append(0.0)
+            if level < 0:
+                value[i] = leaf_values[leaf_index]
+                return i
+            split = splits[level]
+            if split['split_type'] != 'FloatFeature':
+                raise ValueError(f"Unsupported CatBoost split: {split['split_type']}")
+            feature[i] = split['float_feature_index']
+            threshold[i] = np.float32(split['border'])
+            left[i] = add(level - 1, leaf_index)
+            right[i] = add(level - 1, leaf_index | (1 << level))
+            return i
+
+        add(depth - 1, 0)
+        trees.append(_tree(feature, threshold, left, right, value))
+
+    scale, bias = dump['scale_and_bias']
+    bias = bias[0] if isinstance(bias, list) else bias
+    link = 'exp' if model.get_params().get('loss_function') == 'Poisson' else 'identity'
+    return trees, float(bias), float(scale), link, list(model.feature_names_)
+
+
+def _random_forest_trees(model):
+    trees = []
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+        trees.append(_tree(
+            np.where(is_leaf, -1, tree.feature),
+            tree.threshold,
+            tree.children_left,
+            tree.children_right,
+            np.where(is_leaf, tree.value[:, 0, 0], 0.0)
+        ))
+    return trees, 0.0, 1.0 / len(trees), 'identity', list(model.feature_names_in_)
+
+
+# model_type -> (extractor, rows go left on x < threshold, library compares float32 inputs)
+EXTRACTORS = {
+    'xgboost': (_xgboost_trees, True, True),
+    'lightgbm': (_lightgbm_trees, False, False),
+    'catboost': (_catboost_trees, False, True),
+    'random_forest': (_random_forest_trees, False, True)
+}
+
+
+def fold_thresholds(thresholds, mean, scale, strict, float32_inputs):
+    """Raw-space thresholds b such that x < b reproduces the library's split on scaled x.
+
+    Rows go right when z >= t (strict libraries) or z > t, with z = (x - mean) / scale
+    computed like StandardScaler.transform and rounded to float32 when the library does.
+    The boundary is found by bisection, so splits sitting exactly on a data value
+    (common for integer features) send it the same way as the original model.
+    """
+    t = np.asarray(thresholds, dtype=np.float64)
+    mean = np.asarray(mean, dtype=np.float64)
+    scale = np.asarray(scale, dtype=np.float64)
+
+    def goes_right(x):
+        z = (x - mean) / scale
+        if float32_inputs:
+            z = z.astype(np.float32).astype(np.float64)
+        return z >= t if strict else z > t
+
+    guess = t * scale + mean
+    step = np.maximum(np.abs(guess), 1.0) * 1e-6
+    lo, hi = guess - step, guess + step
+    for _ in range(64):
+        need_lo, need_hi = goes_right(lo), ~goes_right(hi)
+        if not (need_lo.any() or need_hi.any()):
+            break
+        lo = np.where(need_lo, lo - step, lo)
+        hi = np.where(need_hi, hi + step, hi)
+        step *= 2
+
+    for _ in range(128):
+        mid = lo + (hi - lo) / 2
+        done = (mid <= lo) | (mid >= hi)
+        if done.all():
+            break
+        right = goes_right(mid)
+        hi = np.where(~done & right, mid, hi)
+        lo = np.where(~done & ~right, mid, lo)
+
+    return hi
+
+
+def export_model(model_type, model, scaler):
+    extractor, strict, float32_inputs = EXTRACTORS[model_type]
+    trees, base_score, tree_scale, link, model_features = extractor(model)
+
+    scaler_features = list(scaler.feature_names_in_)
+    order = [scaler_features.index(name) for name in model_features]
+    mean = scaler.mean_[order] if scaler.mean_ is not None else np.zeros(len(order))
+    scale = scaler.scale_[order] if scaler.scale_ is not None else np.ones(len(order))
+
+    feature, threshold, left, right, value, roots = [], [], [], [], [], []
+    max_depth = 0
+    offset = 0
+    for tree in trees:
+        n_nodes = len(tree['feature'])
+        is_leaf = tree['feature'] < 0
+        node_ids = np.arange(n_nodes) + offset
+
+        feature.append(tree['feature'])
+        threshold.append(tree['threshold'])
+        left.append(np.where(is_leaf, node_ids, tree['left'] + offset))
+        right.append(np.where(is_leaf, node_ids, tree['right'] + offset))
+        value.append(tree['value'])
+        roots.append(offset)
+
+        depth = np.zeros(n_nodes, dtype=np.int64)
+        for i in range(n_nodes):
+            if not is_leaf[i]:
+                depth[tree['left'][i]] = depth[i] + 1
+                depth[tree['right'][i]] = depth[i] + 1
+        max_depth = max(max_depth, int(depth.max()))
+        offset += n_nodes
+
+    feature = np.concatenate(feature)
+    threshold = np.concatenate(threshold)
+    split = feature >= 0
+    folded = np.zeros(len(feature), dtype=np.float64)
+    folded[split] = fold_thresholds(threshold[split], mean[feature[split]], scale[feature[split]],
+                                    strict, float32_inputs)
+
+    return CompiledForest(
+        feature_names=model_features,
+        feature=feature.astype(np.int32),
+        threshold=folded,
+        left=np.concatenate(left).astype(np.int32),
+        right=np.concatenate(right).astype(np.int32),
+        value=np.concatenate(value).astype(np.float32),
+        roots=np.array(roots, dtype=np.int32),
+        max_depth=max_depth,
+        base_score=base_score,
+        tree_scale=tree_scale,
+        link=link
+    )
+
+
+def _original_predict(model, scaler, X_raw):
+    # As served by ModelBundle.predict_matrix: missing values are zeroed after scaling.
+    X_scaled = pd.DataFrame(scaler.transform(X_raw), columns=X_raw.columns).fillna(0)
+    return np.asarray(model.predict(X_scaled), dtype=np.float64)
+
+
+def _with_missing_rows(X):
+    # Serving rows can miss features; check they take the same path as in the library.
+    missing = X.iloc[:2].copy()
+    missing.iloc[0, :] = np.nan
+    missing.iloc[1, ::2] = np.nan
+    return pd.concat([X, missing])
+
+
+def export_all_models(model_types=None, tolerance=EXPORT_TOLERANCE, sample_rows=5000, benchmark=False,
+                      slate_size=300, output_path=None):
+    print("="*70)
+    print("EXPORTING COMPILED TREE MODELS")
+    print("="*70)
+
+    model_types = model_types or EXPORT_FAMILIES
+    models_dir = get_models_dir()
+    data = prepare_training_data()
+    check_rows = min(sample_rows, len(data.X))
+    slate_rows = min(slate_size, len(data.X))
+
+    results = {}
+    for model_type in model_types:
+        scaler = load_scaler(model_type, models_dir)
+        if scaler is None:
+            print(f"Skipping {model_type}: scaler not found ({get_scaler_path(models_dir, model_type)}). "
+                  f"Train the models first.")
+            continue
+        X_raw = data.X[list(scaler.feature_names_in_)]
+        X_check = _with_missing_rows(X_raw.sample(n=check_rows, random_state=42))
+        X_slate = X_raw.sample(n=slate_rows, random_state=7)
+
+        for target_name in TARGETS:
+            model_path = os.path.join(models_dir, f'{model_type}_{target_name}.pkl')
+            if not os.path.exists(model_path):
+                print(f"Skipping {model_type}-{target_name}: model not found")
+                continue
+            model = joblib.load(model_path)
+
+            try:
+                compiled = export_model(model_type, model, scaler)
+            except ValueError as e:
+                # Unsupported splits/objectives, or a model saved for other features than the scaler.
+                print(f"Skipping {model_type}-{target_name}: {e}")
+                results[f'{model_type}_{target_name}'] = {'error': str(e), 'within_tolerance': False}
+                continue
+            expected = _original_predict(model, scaler, X_check)
+            max_diff = float(np.max(np.abs(compiled.predict(fill_missing(X_check, scaler)) - expected)))
+
+            result = {
+                'trees': compiled.n_trees,
+                'nodes': int(len(compiled.feature)),
+                'max_abs_diff': max_diff,
+                'within_tolerance': max_diff <= tolerance
+            }
+
+            if max_diff <= tolerance:
+                result['path'] = save_compiled(compiled, get_compiled_path(model_type, target_name, models_dir))
+                status = 'OK'
+            else:
+                status = 'MISMATCH, not saved'
+
+            if benchmark:
+                start = time.perf_counter()
+                _original_predict(model, scaler, X_slate)
+                result['library_slate_seconds'] = time.perf_counter() - start
+                start = time.perf_counter()
+                compiled.predict(X_slate)
+                result['compiled_slate_seconds'] = time.perf_counter() - start
+
+            results[f'{model_type}_{target_name}'] = result
+            print(f"{model_type}-{target_name}: {compiled.n_trees} trees, max |diff| = {max_diff:.2e} ({status})")
+
+    if benchmark and results:
+        library = sum(r.get('library_slate_seconds', 0) for r in results.values())
+        compiled_total = sum(r.get('compiled_slate_seconds', 0) for r in results.values())
+        print(f"\nSlate of {slate_rows} rows, all exported models: "
+              f"library {library:.3f}s vs compiled {compiled_total:.3f}s")
+
+    report = {
+        'generated_at': datetime.now().isoformat(),
+        'tolerance': tolerance,
+        'check_rows': check_rows + 2,
+        'slate_size': slate_rows if benchmark else None,
+        'models': results
+    }
+    output_path = output_path or os.path.join(get_project_root(), 'data', 'evaluation', 'compiled_trees_report.json')
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport saved to {output_path}")
+
+    # Bundles carry the compiled arrays, so refresh them for the families just exported.
+    for model_type in model_types:
+        bundle_path = save_model_bundle(model_type, models_dir)
+        if bundle_path:
+            print(f"Updated bundle: {bundle_path}")
+
+    failed = [name for name, r in results.items() if not r['within_tolerance']]
+    if failed:
+        print(f"WARNING: {len(failed)} models were not exported (error or no match within {tolerance}): {', '.join(failed)}")
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Export trained tree models to compiled NumPy arrays')
+    parser.add_argument('--models', nargs='+', default=EXPORT_FAMILIES, choices=EXPORT_FAMILIES,
+                       help='Model families to export')
+    parser.add_argument('--tolerance', type=float, default=EXPORT_TOLERANCE,
+                       help='Maximum absolute difference from the original predictions')
+    parser.add_argument('--sample-rows', type=int, default=5000,
+                       help='Training rows used to check exported predictions')
+    parser.add_argument('--benchmark', action='store_true',
+                       help='Time slate scoring with the libraries vs the compiled arrays')
+    parser.add_argument('--slate-size', type=int, default=300,
+                       help='Rows in the benchmark slate')
+    args = parser.parse_args()
+    report = export_all_models(
+        model_types=args.models,
+        tolerance=args.tolerance,
+        sample_rows=args.sample_rows,
+        benchmark=args.benchmark,
+        slate_size=args.slate_size
+    )
+    sys.exit(0 if report and all(r['within_tolerance'] for r in report['models'].values()) else 1)
@@ -0,0 +1,176 @@
+import os
+import hashlib
+import threading
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from training_data import get_project_root
+
+# Native per-fold training sets for tune_hyperparameters.py, where every trial refits the same folds.
+# Training fits each fold once with the sklearn estimators and does not use them.
+
+__all__ = [
+    'NATIVE_FAMILIES',
+    'FoldDataset',
+    'get_fold_dataset_dir',
+    'array_digest',
+    'build_fold_datasets',
+    'fit_predict_native',
+]
+
+NATIVE_FAMILIES = ('xgboost', 'lightgbm', 'catboost')
+
+FOLD_DATASET_EXTENSIONS = {
+    'xgboost': '.npz',
+    'lightgbm': '.lgb.bin',
+    'catboost': '.cbp'
+}
+
+_xgb_lock = threading.Lock()
+
+
+def get_fold_dataset_dir() -> str:
+    return os.path.join(get_project_root(), 'data', 'processed', 'fold_datasets')
+
+
+def array_digest(*arrays) -> str:
+    h = hashlib.sha1()
+    for arr in arrays:
+        arr = np.ascontiguousarray(arr)
+        h.update(str(arr.shape).encode())
+        h.update(str(arr.dtype).encode())
+        h.update(arr.data)
+    return h.hexdigest()
+
+
+@dataclass
+class FoldDataset:
+    model_type: str
+    fold: int
+    train_path: str
+    X_val: np.ndarray
+    y_val: np.ndarray
+    _cached: Dict = field(default_factory=dict, repr=False)
+
+    def train_set(self):
+        if self.model_type == 'xgboost':
+            # QuantileDMatrix cannot be serialized, so the sketch is built once per process
+            # from the saved arrays and shared by every trial in that process.
+            with _xgb_lock:
+                if 'dtrain' not in self._cached:
+                    import xgboost as xgb
+                    arrays = np.load(self.train_path)
+                    self._cached['dtrain'] = xgb.QuantileDMatrix(arrays['X'], arrays['y'])
+                return self._cached['dtrain']
+
+        if self.model_type == 'lightgbm':
+            import lightgbm as lgb
+            # lgb.train mutates its Dataset, so each call gets a fresh handle on the binned file.
+            return lgb.Dataset(self.train_path, params={'verbose': -1})
+
+        if self.model_type == 'catboost':
+            from catboost import Pool
+            return Pool(f'quantized://{self.train_path}')
+
+        raise ValueError(f"No native dataset format for {self.model_type}")
+
+
+def _save_train_set(model_type: str, X_train: np.ndarray, y_train: np.ndarray, path: str) -> None:
+    tmp_path = path + '.tmp'
+
+    if model_type == 'xgboost':
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, X=X_train, y=y_train)
+    elif model_type == 'lightgbm':
+        import lightgbm as lgb
+        dataset = lgb.Dataset(X_train, y_train, params={'verbose': -1}, free_raw_data=False)
+        dataset.construct()
+        dataset.save_binary(tmp_path)
+    elif model_type == 'catboost':
+        from catboost import Pool
+        pool = Pool(X_train, y_train)
+        pool.quantize()
+        pool.save(tmp_path)
+    else:
+        raise ValueError(f"No native dataset format for {model_type}")
+
+    os.replace(tmp_path, path)
+
+
+def _remove_stale(target_dir: str, keep: List[str]) -> None:
+    keep = set(os.path.basename(p) for p in keep)
+    for name in os.listdir(target_dir):
+        if name not in keep:
+            try:
+                os.remove(os.path.join(target_dir, name))
+            except OSError:
+                pass
+
+
+def build_fold_datasets(model_type: str, target_name: str, X, y, split_indices: List[Tuple[np.ndarray, np.ndarray]],
+                        cache_dir: Optional[str] = None, X_digest: Optional[str] = None) -> List[FoldDataset]:
+    if model_type not in NATIVE_FAMILIES:
+        raise ValueError(f"No native dataset format for {model_type}")
+
+    X_values = np.ascontiguousarray(np.asarray(X, dtype=np.float32))
+    y_values = np.ascontiguousarray(np.asarray(y, dtype=np.float64))
+    X_digest = X_digest or array_digest(X_values)
+
+    target_dir = os.path.join(cache_dir or get_fold_dataset_dir(), model_type, target_name)
+    os.makedirs(target_dir, exist_ok=True)
+
+    datasets = []
+    built = 0
+    for fold, (train_idx, val_idx) in enumerate(split_indices, 1):
+        key = array_digest(np.frombuffer(X_digest.encode(), dtype=np.uint8), y_values, train_idx)[:16]
+        path = os.path.join(target_dir, f'fold{fold}_{key}{FOLD_DATASET_EXTENSIONS[model_type]}')
+
+        if not os.path.exists(path):
+            _save_train_set(model_type, X_values[train_idx], y_values[train_idx], path)
+            built += 1
+
+        datasets.append(FoldDataset(
+            model_type=model_type,
+            fold=fold,
+            train_path=path,
+            X_val=X_values[val_idx],
+            y_val=y_values[val_idx]
+        ))
+
+    _remove_stale(target_dir, [ds.train_path for ds in datasets])
+    print(f"Fold datasets for {model_type}-{target_name}: {built} built, {len(datasets) - built} reused ({target_dir})")
+    return datasets
+
+
+def fit_predict_native(model_type: str, params: Dict, fold_dataset: FoldDataset) -> np.ndarray:
+    """Fit on a cached fold dataset with the library's native API and predict the validation season.
+
+    params are the sklearn-style estimator params used everywhere else; the native calls
+    reproduce what XGBRegressor / LGBMRegressor / CatBoostRegressor would fit on the same data.
+    """
+    params = dict(params)
+    train_set = fold_dataset.train_set()
+
+    if model_type == 'xgboost':
+        import xgboost as xgb
+        num_boost_round = params.pop('n_estimators', 100)
+        params['seed'] = params.pop('random_state', 42)
+        params['nthread'] = params.pop('n_jobs', 1)
+        params.setdefault('tree_method', 'hist')
+        booster = xgb.train(params, train_set, num_boost_round=num_boost_round)
+        return booster.inplace_predict(fold_dataset.X_val)
+
+    if model_type == 'lightgbm':
+        import lightgbm as lgb
+        num_boost_round = params.pop('n_estimators', 100)
+        booster = lgb.train(params, train_set, num_boost_round=num_boost_round)
+        return booster.predict(fold_dataset.X_val)
+
+    if model_type == 'catboost':
+        from catboost import CatBoostRegressor
+        model = CatBoostRegressor(**params)
+        model.fit(train_set)
+        return model.predict(fold_dataset.X_val)
+
+    raise ValueError(f"No native dataset format for {model_type}")
@@ -0,0 +1,171 @@
+import os
+import numpy as np
+import pandas as pd
+import joblib
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from training_data import TARGETS, get_models_dir, load_scaler, load_imputation, load_feature_schema
+from compiled_trees import CompiledForest, get_compiled_path, load_compiled
+
+__all__ = [
+    'BUNDLE_FILENAME_TEMPLATE',
+    'ModelBundle',
+    'fill_missing',
+    'get_bundle_path',
+    'build_model_bundle',
+    'save_model_bundle',
+    'load_model_bundle',
+]
+
+BUNDLE_FILENAME_TEMPLATE = 'bundle_{model_type}.pkl'
+TUNING_CONFIG_USED_FILENAME = 'selective_tuning_config_used.py'
+
+
+def fill_missing(X: pd.DataFrame, scaler) -> pd.DataFrame:
+    """Raw rows with the missing values the library path zeroes after scaling.
+
+    A scaled 0 is the training mean, so compiled trees (which take raw values, with the
+    scaler folded into their thresholds) get the scaler's means in those cells.
+    """
+    if scaler is None or getattr(scaler, 'mean_', None) is None:
+        return X.fillna(0)
+    return X.fillna(pd.Series(scaler.mean_, index=list(scaler.feature_names_in_)))
+
+
+@dataclass
+class ModelBundle:
+    """Everything needed to predict every stat with one model family.
+
+    feature_names is the column order the scaler and models were fitted on, and
+    league_means are the imputation values from the same training run.
+    """
+    model_type: str
+    feature_names: List[str]
+    models: Dict[str, object]
+    scaler: Optional[object] = None
+    league_means: Dict[str, float] = field(default_factory=dict)
+    maes: Dict[str, float] = field(default_factory=dict)
+    importances: Dict[str, pd.DataFrame] = field(default_factory=dict)
+    compiled: Dict[str, CompiledForest] = field(default_factory=dict)
+    metadata: Dict = field(default_factory=dict)
+
+    @property
+    def targets(self) -> List[str]:
+        return list(self.models.keys())
+
+    def predict_matrix(self, X, targets: Optional[List[str]] = None, use_compiled: bool = False) -> pd.DataFrame:
+        """Predictions for raw (unscaled) feature rows, one column per stat.
+
+        X is a DataFrame with at least feature_names, or an array already in that order.
+        With use_compiled, stats that have exported NumPy trees skip the scaler and the library.
+        """
+        targets = targets or self.targets
+        if hasattr(X, 'columns'):
+            X = X[self.feature_names]
+        else:
+            X = pd.DataFrame(np.asarray(X, dtype=np.float64).reshape(-1, len(self.feature_names)),
+                             columns=self.feature_names)
+
+        X_scaled = None
+        X_filled = None
+        predictions = {}
+        for target_name in targets:
+            if use_compiled and target_name in self.compiled:
+                if X_filled is None:
+                    X_filled = fill_missing(X, self.scaler)
+                predictions[target_name] = self.compiled[target_name].predict(X_filled)
+                continue
+            if X_scaled is None:
+                if self.scaler is not None:
+                    X_scaled = pd.DataFrame(self.scaler.transform(X), columns=self.feature_names,
+                                            index=X.index).fillna(0)
+                else:
+                    X_scaled = X
+            predictions[target_name] = np.asarray(self.models[target_name].predict(X_scaled), dtype=np.float64)
+
+        return pd.DataFrame(predictions, index=X.index)
+
+
+def _as_dict(obj) -> Dict:
+    # Shallow, unlike dataclasses.asdict, so the fitted models are not deep-copied.
+    return {f.name: getattr(obj, f.name) for f in fields(obj)}
+
+
+def get_bundle_path(model_type: str, models_dir: Optional[str] = None) -> str:
+    return os.path.join(models_dir or get_models_dir(), BUNDLE_FILENAME_TEMPLATE.format(model_type=model_type))
+
+
+def build_model_bundle(model_type: str, models_dir: Optional[str] = None) -> Optional[ModelBundle]:
+    """Collect the per-stat artifacts written by training into one ModelBundle."""
+    models_dir = models_dir or get_models_dir()
+    scaler = load_scaler(model_type, models_dir)
+    if scaler is None:
+        return None
+
+    models, maes, importances, compiled = {}, {}, {}, {}
+    for target_name in TARGETS:
+        model_path = os.path.join(models_dir, f'{model_type}_{target_name}.pkl')
+        if not os.path.exists(model_path):
+            continue
+        models[target_name] = joblib.load(model_path)
+
+        mae_path = os.path.join(models_dir, f'{model_type}_{target_name}_mae.txt')
+        if os.path.exists(mae_path):
+            with open(mae_path, 'r') as f:
+                maes[target_name] = float(f.read().strip())
+
+        importance_path = os.path.join(models_dir, f'feature_importance_{model_type}_{target_name}.csv')
+        if os.path.exists(importance_path):
+            importances[target_name] = pd.read_csv(importance_path)
+
+        compiled_path = get_compiled_path(model_type, target_name, models_dir)
+        if os.path.exists(compiled_path) and os.path.getmtime(compiled_path) >= os.path.getmtime(model_path):
+            compiled[target_name] = load_compiled(compiled_path)
+
+    if not models:
+        return None
+
+    imputation = load_imputation(models_dir) or {}
+    metadata = {
+        'created_at': datetime.now().isoformat(),
+        'pruned_schema': load_feature_schema(models_dir) is not None
+    }
+    config_path = os.path.join(models_dir, TUNING_CONFIG_USED_FILENAME)
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            metadata['tuning_config'] = f.read()
+
+    return ModelBundle(
+        model_type=model_type,
+        feature_names=list(scaler.feature_names_in_),
+        models=models,
+        scaler=scaler,
+        league_means=imputation.get('league_means', {}),
+        maes=maes,
+        importances=importances,
+        compiled=compiled,
+        metadata=metadata
+    )
+
+
+def save_model_bundle(model_type: str, models_dir: Optional[str] = None) -> Optional[str]:
+    bundle = build_model_bundle(model_type, models_dir)
+    if bundle is None:
+        return None
+    # Stored as plain dicts so loading does not depend on how this module was imported.
+    contents = _as_dict(bundle)
+    contents['compiled'] = {t: _as_dict(forest) for t, forest in bundle.compiled.items()}
+    bundle_path = get_bundle_path(model_type, models_dir)
+    joblib.dump(contents, bundle_path)
+    return bundle_path
+
+
+def load_model_bundle(model_type: str, models_dir: Optional[str] = None) -> Optional[ModelBundle]:
+    bundle_path = get_bundle_path(model_type, models_dir)
+    if not os.path.exists(bundle_path):
+        return None
+    contents = joblib.load(bundle_path)
+    contents['compiled'] = {t: CompiledForest(**forest) for t, forest in contents['compiled'].items()}
+    return ModelBundle(**contents)
@@ -0,0 +1,205 @@
+import os
+import json
+import hashlib
+import weakref
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from training_data import TARGETS, TrainingData, get_models_dir
+from fold_datasets import array_digest
+
+# Out-of-fold predictions from the season CV, kept so ensemble weighting, calibration,
+# distillation and subset studies read validation predictions instead of refitting the
+# fold models. One Parquet file per (family, stat) under data/models/oof/, plus a manifest
+# recording the feature set, training data and tuning config each file was produced with.
+
+__all__ = [
+    'get_oof_dir',
+    'save_oof_predictions',
+    'save_oof_from_results',
+    'load_oof_frame',
+    'load_oof_matrix',
+    'get_oof_predictions',
+]
+
+OOF_DIRNAME = 'oof'
+MANIFEST_FILENAME = 'manifest.json'
+
+
+def get_oof_dir(models_dir: Optional[str] = None) -> str:
+    return os.path.join(models_dir or get_models_dir(), OOF_DIRNAME)
+
+
+def _oof_path(model_type: str, target_name: str, models_dir: Optional[str] = None) -> str:
+    return os.path.join(get_oof_dir(models_dir), f'{model_type}_{target_name}.parquet')
+
+
+def _features_hash(feature_cols: List[str]) -> str:
+    return hashlib.sha1('\n'.join(feature_cols).encode('utf-8')).hexdigest()[:16]
+
+
+_X_digest_cache = (None, None)
+
+
+def _data_digest(data: TrainingData, target_name: str) -> str:
+    """Hash of the feature values, target and season folds the fold models were fitted on."""
+    global _X_digest_cache
+    # Every (family, stat) of a training run shares data.X, so it is only hashed once.
+    X_ref, X_digest = _X_digest_cache
+    if X_ref is None or X_ref() is not data.X:
+        X_digest = array_digest(data.X.to_numpy(dtype=np.float32))
+        _X_digest_cache = (weakref.ref(data.X), X_digest)
+    return array_digest(np.frombuffer(X_digest.encode(), dtype=np.uint8),
+                        data.target(target_name).to_numpy(dtype=np.float32),
+                        *[idx for split in data.split_indices for idx in split])[:16]
+
+
+def _load_manifest(models_dir: Optional[str] = None) -> Dict:
+    path = os.path.join(get_oof_dir(models_dir), MANIFEST_FILENAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _save_manifest(manifest: Dict, models_dir: Optional[str] = None):
+    path = os.path.join(get_oof_dir(models_dir), MANIFEST_FILENAME)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def save_oof_predictions(data: TrainingData, model_type: str, target_name: str,
+                         fold_predictions: Dict[int, np.ndarray], use_tuned_params: bool = False,
+                         use_selective: bool = True, early_stopping: bool = False,
+                         models_dir: Optional[str] = None) -> str:
+    """Write the held-out predictions of every fold for one (family, stat).
+
+    fold_predictions maps the 1-based fold number to predictions aligned with that fold's
+    validation rows in data.split_indices.
+    """
+    frames = []
+    target = data.target(target_name).to_numpy(dtype=np.float64)
+    for fold, predictions in sorted(fold_predictions.items()):
+        val_idx = data.split_indices[fold - 1][1]
+        rows = data.df.iloc[val_idx]
+        frames.append(pd.DataFrame({
+            'row_id': rows.index.to_numpy(dtype=np.int64),
+            'player_id': rows['player_id'].to_numpy(dtype=np.int64),
+            'game_id': rows['game_id'].astype(str).to_numpy(),
+            'season': rows['season'].astype(str).to_numpy(),
+            'fold': np.int8(fold),
+            'actual': target[val_idx].astype(np.float32),
+            'prediction': np.asarray(predictions, dtype=np.float64),
+        }))
+    oof = pd.concat(frames, ignore_index=True)
+    oof['season'] = oof['season'].astype('category')
+
+    os.makedirs(get_oof_dir(models_dir), exist_ok=True)
+    path = _oof_path(model_type, target_name, models_dir)
+    oof.to_parquet(path + '.tmp', index=False, compression='zstd')
+    os.replace(path + '.tmp', path)
+
+    manifest = _load_manifest(models_dir)
+    manifest[f'{model_type}_{target_name}'] = {
+        'features_hash': _features_hash(data.feature_cols),
+        'n_features': len(data.feature_cols),
+        'data_digest': _data_digest(data, target_name),
+        'data_rows': len(data.df),
+        'use_tuned_params': use_tuned_params,
+        'use_selective': use_selective,
+        'early_stopping': early_stopping,
+        'folds': len(fold_predictions),
+        'rows': len(oof),
+        'saved_at': datetime.now().isoformat(),
+    }
+    _save_manifest(manifest, models_dir)
+    return path
+
+
+def save_oof_from_results(data: TrainingData, task_results: List[Dict], use_tuned_params: bool = False,
+                          use_selective: bool = True, early_stopping: bool = False,
+                          models_dir: Optional[str] = None) -> List[str]:
+    """Save the fold predictions in parallel_training task results, one file per (family, stat)."""
+    by_key = {}
+    for result in task_results:
+        if 'predictions' in result:
+            by_key.setdefault((result['model_type'], result['target']), {})[result['fold']] = result['predictions']
+    return [save_oof_predictions(data, model_type, target_name, folds, use_tuned_params, use_selective,
+                                 early_stopping, models_dir)
+            for (model_type, target_name), folds in sorted(by_key.items())]
+
+
+def load_oof_frame(model_type: str, target_name: str, models_dir: Optional[str] = None) -> Optional[pd.DataFrame]:
+    path = _oof_path(model_type, target_name, models_dir)
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path)
+
+
+def _is_current(entry: Optional[Dict], data: TrainingData, target_name: str, use_tuned_params: bool,
+                use_selective: bool, early_stopping: bool) -> bool:
+    if not entry:
+        return False
+    if entry['features_hash'] != _features_hash(data.feature_cols):
+        return False
+    # Same columns are not enough: new games or rebuilt features change what the folds were fitted on.
+    if entry.get('data_rows') != len(data.df) or entry.get('data_digest') != _data_digest(data, target_name):
+        return False
+    if entry['use_tuned_params'] != use_tuned_params or entry.get('early_stopping', False) != early_stopping:
+        return False
+    return not use_tuned_params or entry['use_selective'] == use_selective
+
+
+def load_oof_matrix(data: TrainingData, model_types: List[str], use_tuned_params: bool = False,
+                    use_selective: bool = True, early_stopping: bool = False, models_dir: Optional[str] = None
+                    ) -> Optional[Tuple[np.ndarray, Dict[Tuple[str, str], np.ndarray]]]:
+    """Saved predictions in the layout of compute_oof_predictions, or None if any are missing or stale.
+
+    A file is current when it was fitted on exactly this data (see _data_digest) with the same
+    tuning and early stopping settings; rows are then matched by (player_id, game_id).
+    """
+    manifest = _load_manifest(models_dir)
+    oof_idx = np.unique(np.concatenate([val_idx for _, val_idx in data.split_indices]))
+    held_out = data.df.iloc[oof_idx]
+    keys = pd.MultiIndex.from_arrays([held_out['player_id'].to_numpy(dtype=np.int64),
+                                      held_out['game_id'].astype(str).to_numpy()])
+
+    oof_predictions = {}
+    for model_type in model_types:
+        for target_name in TARGETS:
+            entry = manifest.get(f'{model_type}_{target_name}')
+            if not _is_current(entry, data, target_name, use_tuned_params, use_selective, early_stopping):
+                return None
+            frame = load_oof_frame(model_type, target_name, models_dir)
+            if frame is None:
+                return None
+            saved = pd.Series(frame['prediction'].to_numpy(),
+                              index=pd.MultiIndex.from_arrays([frame['player_id'].to_numpy(dtype=np.int64),
+                                                               frame['game_id'].astype(str).to_numpy()]))
+            saved = saved[~saved.index.duplicated(keep='last')]
+            aligned = saved.reindex(keys).to_numpy(dtype=np.float64)
+            if np.isnan(aligned).any():
+                return None
+            oof_predictions[(model_type, target_name)] = aligned
+
+    return oof_idx, oof_predictions
+
+
+def get_oof_predictions(data: TrainingData, model_types: List[str], use_tuned_params: bool = False,
+                        use_selective: bool = True, cpu_budget: Optional[int] = None,
+                        refit: bool = False) -> Tuple[np.ndarray, Dict[Tuple[str, str], np.ndarray]]:
+    """Saved out-of-fold predictions when they are current, otherwise fit the fold models (and save them).
+
+    compute_oof_predictions fits without early stopping, so only files saved that way are reused.
+    """
+    if not refit:
+        loaded = load_oof_matrix(data, model_types, use_tuned_params, use_selective, early_stopping=False)
+        if loaded is not None:
+            print(f"Using saved out-of-fold predictions: {get_oof_dir()}")
+            return loaded
+
+    from parallel_training import compute_oof_predictions
+    return compute_oof_predictions(data, model_types, use_tuned_params, use_selective, cpu_budget)
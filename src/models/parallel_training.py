@@ -0,0 +1,321 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import shutil
+import time
+import importlib
+import numpy as np
+import pandas as pd
+from collections import defaultdict
+from sklearn.metrics import mean_absolute_error, mean_squared_error
+from joblib import Parallel, delayed, parallel_backend, cpu_count
+
+import warnings
+warnings.filterwarnings('ignore', category=FutureWarning)
+from training_data import TARGETS, prepare_training_data, get_models_dir, save_scaler, save_imputation, save_target_artifacts, EARLY_STOPPING_ROUNDS
+from model_bundle import save_model_bundle
+from oof_store import save_oof_from_results
+
+# model_type -> (display name, module, build function, fit function)
+MODEL_FAMILIES = {
+    'xgboost': ('XGBoost', 'train_xgboost', 'build_xgboost_model', 'fit_xgboost_model'),
+    'lightgbm': ('LightGBM', 'train_lightgbm', 'build_lightgbm_model', 'fit_lightgbm_model'),
+    'catboost': ('CatBoost', 'train_catboost', 'build_catboost_model', 'fit_catboost_model'),
+    'random_forest': ('Random Forest', 'train_random_forest', 'build_random_forest_model', 'fit_random_forest_model')
+}
+
+# Families that can pick their number of boosting rounds on the held-out season
+EARLY_STOPPING_FAMILIES = ('xgboost', 'lightgbm', 'catboost')
+
+FINAL_FOLD = 0
+
+
+def plan_cpu_budget(n_tasks, cpu_budget=None):
+    """Split a CPU budget into outer worker processes and inner library threads.
+
+    outer * inner never exceeds the budget, so running tasks in parallel does not
+    oversubscribe the machine the way n_jobs=-1 inside every task would.
+    """
+    budget = cpu_budget or cpu_count()
+    budget = max(1, budget)
+    outer = max(1, min(n_tasks, budget))
+    inner = max(1, budget // outer)
+    return outer, inner
+
+
+def _get_family_functions(model_type):
+    _, module_name, build_name, fit_name = MODEL_FAMILIES[model_type]
+    module = importlib.import_module(module_name)
+    return module, getattr(module, build_name), getattr(module, fit_name)
+
+
+def _run_task(model_type, target_name, fold, X_values, y_values, feature_names,
+              train_idx, val_idx, tuned_params, n_jobs, early_stopping_rounds=None, n_estimators=None):
+    module, build_fn, fit_fn = _get_family_functions(model_type)
+    if model_type in EARLY_STOPPING_FAMILIES:
+        model = build_fn(target_name, tuned_params, n_jobs=n_jobs, n_estimators=n_estimators)
+    else:
+        model = build_fn(target_name, tuned_params, n_jobs=n_jobs)
+        early_stopping_rounds = None
+
+    start = time.perf_counter()
+
+    if fold == FINAL_FOLD:
+        X_train = pd.DataFrame(X_values, columns=feature_names)
+        fit_fn(model, X_train, y_values)
+        return {
+            'model_type': model_type,
+            'target': target_name,
+            'fold': fold,
+            'model': model,
+            'seconds': time.perf_counter() - start
+        }
+
+    X_train = pd.DataFrame(X_values[train_idx], columns=feature_names)
+    X_val = pd.DataFrame(X_values[val_idx], columns=feature_names)
+    y_train, y_val = y_values[train_idx], y_values[val_idx]
+
+    best_iteration = None
+    if early_stopping_rounds:
+        fit_fn(model, X_train, y_train, (X_val, y_val), early_stopping_rounds)
+        best_iteration = getattr(module, f'get_{model_type}_best_iteration')(model)
+    else:
+        fit_fn(model, X_train, y_train)
+    y_pred = model.predict(X_val)
+
+    return {
+        'model_type': model_type,
+        'target': target_name,
+        'fold': fold,
+        'mae': mean_absolute_error(y_val, y_pred),
+        'rmse': np.sqrt(mean_squared_error(y_val, y_pred)),
+        'importance': np.asarray(model.feature_importances_, dtype=float),
+        'predictions': np.asarray(y_pred, dtype=float),
+        'best_iteration': best_iteration,
+        'seconds': time.perf_counter() - start
+    }
+
+
+def build_tasks(model_types, split_indices, use_tuned_params=False, use_selective=True):
+    tasks = []
+    for model_type in model_types:
+        module, _, _ = _get_family_functions(model_type)
+        for target_name in TARGETS:
+            tuned_params = None
+            if use_tuned_params:
+                tuned_params = module.load_tuned_params(model_type, target_name, use_selective)
+
+            for fold, (train_idx, val_idx) in enumerate(split_indices, 1):
+                tasks.append((model_type, target_name, fold, train_idx, val_idx, tuned_params))
+            tasks.append((model_type, target_name, FINAL_FOLD, None, None, tuned_params))
+
+    # Final models train on every row, so start them first to keep the tail short.
+    tasks.sort(key=lambda task: task[2] != FINAL_FOLD)
+    return tasks
+
+
+def run_tasks(tasks, X_values, targets_values, feature_names, outer, inner, verbose=0,
+              early_stopping_rounds=None, final_rounds=None):
+    final_rounds = final_rounds or {}
+    with parallel_backend('loky', inner_max_num_threads=inner):
+        return Parallel(n_jobs=outer, verbose=verbose)(
+            delayed(_run_task)(
+                model_type, target_name, fold, X_values, targets_values[target_name],
+                feature_names, train_idx, val_idx, tuned_params, inner,
+                early_stopping_rounds=early_stopping_rounds if fold != FINAL_FOLD else None,
+                n_estimators=final_rounds.get((model_type, target_name)) if fold == FINAL_FOLD else None
+            )
+            for model_type, target_name, fold, train_idx, val_idx, tuned_params in tasks
+        )
+
+
+def run_all_tasks(tasks, X_values, targets_values, feature_names, outer, inner, early_stopping_rounds=None):
+    if not early_stopping_rounds:
+        return run_tasks(tasks, X_values, targets_values, feature_names, outer, inner)
+
+    # Final models need the median best iteration of their folds, so folds run first.
+    fold_tasks = [task for task in tasks if task[2] != FINAL_FOLD]
+    final_tasks = [task for task in tasks if task[2] == FINAL_FOLD]
+    fold_results = run_tasks(fold_tasks, X_values, targets_values, feature_names, outer, inner,
+                             early_stopping_rounds=early_stopping_rounds)
+
+    best_iterations = defaultdict(list)
+    for result in fold_results:
+        if result['best_iteration'] is not None:
+            best_iterations[(result['model_type'], result['target'])].append(result['best_iteration'])
+    final_rounds = {key: max(1, int(np.median(iters))) for key, iters in best_iterations.items()}
+
+    # Fewer final tasks than folds, so spread the same budget over them again. A single worker
+    # (the sequential comparison) stays a single worker.
+    if outer > 1:
+        outer, inner = plan_cpu_budget(len(final_tasks), outer * inner)
+    final_results = run_tasks(final_tasks, X_values, targets_values, feature_names, outer, inner,
+                              final_rounds=final_rounds)
+    return fold_results + final_results
+
+
+def compute_oof_predictions(data, model_types=None, use_tuned_params=False, use_selective=True, cpu_budget=None):
+    """Out-of-fold predictions of each (family, stat) on the season folds.
+
+    Returns the row positions held out in some fold and a dict mapping
+    (model_type, target) to predictions aligned with those rows.
+    """
+    model_types = model_types or list(MODEL_FAMILIES.keys())
+    X_scaled = data.scaled()
+    feature_names = list(X_scaled.columns)
+    X_values = np.ascontiguousarray(X_scaled.to_numpy(dtype=np.float64))
+    targets_values = {name: data.target(name).to_numpy() for name in TARGETS}
+
+    tasks = [task for task in build_tasks(model_types, data.split_indices, use_tuned_params, use_selective)
+             if task[2] != FINAL_FOLD]
+    outer, inner = plan_cpu_budget(len(tasks), cpu_budget)
+    print(f"Computing out-of-fold predictions: {len(tasks)} fold models ({outer} workers x {inner} threads)...")
+    task_results = run_tasks(tasks, X_values, targets_values, feature_names, outer, inner)
+
+    oof_idx = np.unique(np.concatenate([val_idx for _, val_idx in data.split_indices]))
+    positions = np.searchsorted(oof_idx, np.arange(len(X_values)))
+
+    oof_predictions = defaultdict(lambda: np.full(len(oof_idx), np.nan))
+    for result in task_results:
+        val_idx = data.split_indices[result['fold'] - 1][1]
+        oof_predictions[(result['model_type'], result['target'])][positions[val_idx]] = result['predictions']
+
+    save_oof_from_results(data, task_results, use_tuned_params, use_selective)
+    return oof_idx, dict(oof_predictions)
+
+
+def collect_results(task_results, feature_names, models_dir):
+    by_key = defaultdict(list)
+    final_models = {}
+    for result in task_results:
+        key = (result['model_type'], result['target'])
+        if result['fold'] == FINAL_FOLD:
+            final_models[key] = result['model']
+        else:
+            by_key[key].append(result)
+
+    results = defaultdict(dict)
+    for (model_type, target_name), fold_results in by_key.items():
+        fold_results.sort(key=lambda r: r['fold'])
+
+        print("="*50)
+        print(f"{MODEL_FAMILIES[model_type][0]}: {target_name.upper()}")
+        print("="*50)
+        for r in fold_results:
+            if r['best_iteration'] is not None:
+                print(f"Fold {r['fold']}: MAE={r['mae']:.2f}, RMSE={r['rmse']:.2f}, rounds={r['best_iteration']}")
+            else:
+                print(f"Fold {r['fold']}: MAE={r['mae']:.2f}, RMSE={r['rmse']:.2f}")
+
+        fold_maes = [r['mae'] for r in fold_results]
+        avg_mae = np.mean(fold_maes)
+        print(f"\nAverage MAE: {avg_mae:.2f} (Best: {min(fold_maes):.2f})\n")
+
+        avg_importance = np.mean([r['importance'] for r in fold_results], axis=0)
+        top_features = [feature_names[i] for i in np.argsort(avg_importance)[::-1][:5]]
+        print(f"Top 20 features: {', '.join(top_features)}...")
+
+        paths = save_target_artifacts(model_type, target_name, final_models[(model_type, target_name)],
+                                      feature_names, avg_mae, models_dir)
+        print(f"Saved: {paths['model']}\n")
+
+        results[model_type][target_name] = avg_mae
+
+    return dict(results)
+
+
+def train_models_parallel(model_types=None, use_tuned_params=False, use_selective=True, data=None,
+                          cpu_budget=None, compare_sequential=False, early_stopping=False,
+                          early_stopping_rounds=EARLY_STOPPING_ROUNDS):
+    model_types = model_types or list(MODEL_FAMILIES.keys())
+
+    if data is None:
+        data = prepare_training_data()
+
+    models_dir = get_models_dir()
+    X_scaled = data.scaled()
+    for model_type in model_types:
+        scaler_path = save_scaler(data, model_type, models_dir)
+        print(f"Saved scaler: {scaler_path}")
+    imputation_path = save_imputation(data, models_dir)
+    print(f"Saved imputation values: {imputation_path}\n")
+
+    feature_names = list(X_scaled.columns)
+    X_values = np.ascontiguousarray(X_scaled.to_numpy(dtype=np.float64))
+    targets_values = {name: data.target(name).to_numpy() for name in TARGETS}
+
+    tasks = build_tasks(model_types, data.split_indices, use_tuned_params, use_selective)
+    budget = cpu_budget or cpu_count()
+    outer, inner = plan_cpu_budget(len(tasks), budget)
+
+    print(f"Training {len(tasks)} tasks ({len(model_types)} families x {len(TARGETS)} targets x "
+          f"{len(data.split_indices)} folds + final) with CPU budget {budget}: "
+          f"{outer} workers x {inner} threads\n")
+
+    early_stopping_rounds = early_stopping_rounds if early_stopping else None
+
+    start = time.perf_counter()
+    task_results = run_all_tasks(tasks, X_values, targets_values, feature_names, outer, inner, early_stopping_rounds)
+    parallel_seconds = time.perf_counter() - start
+    print(f"Parallel training wall-clock: {parallel_seconds:.1f}s\n")
+
+    results = collect_results(task_results, feature_names, models_dir)
+    oof_paths = save_oof_from_results(data, task_results, use_tuned_params, use_selective,
+                                      early_stopping_rounds is not None, models_dir)
+    print(f"Saved {len(oof_paths)} out-of-fold prediction files\n")
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    config_source = os.path.join(script_dir, 'selective_tuning_config.py')
+    if os.path.exists(config_source) and ({'xgboost', 'catboost'} & set(model_types)):
+        shutil.copy(config_source, os.path.join(models_dir, 'selective_tuning_config_used.py'))
+
+    for model_type in model_types:
+        bundle_path = save_model_bundle(model_type, models_dir)
+        if bundle_path:
+            print(f"Saved bundle: {bundle_path}")
+
+    if compare_sequential:
+        print("Timing sequential path (1 worker, all threads per model)...")
+        start = time.perf_counter()
+        run_all_tasks(tasks, X_values, targets_values, feature_names, 1, budget, early_stopping_rounds)
+        sequential_seconds = time.perf_counter() - start
+        speedup = sequential_seconds / parallel_seconds if parallel_seconds > 0 else float('nan')
+        print(f"Sequential wall-clock: {sequential_seconds:.1f}s")
+        print(f"Parallel wall-clock:   {parallel_seconds:.1f}s")
+        print(f"Speedup: {speedup:.2f}x on {budget} CPUs\n")
+        results['timing'] = {
+            'cpu_budget': budget,
+            'outer_workers': outer,
+            'inner_threads': inner,
+            'parallel_seconds': parallel_seconds,
+            'sequential_seconds': sequential_seconds,
+            'speedup': speedup
+        }
+
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Train model families in parallel across targets and CV folds')
+    parser.add_argument('--models', nargs='+', default=list(MODEL_FAMILIES.keys()),
+                       choices=list(MODEL_FAMILIES.keys()), help='Model families to train')
+    parser.add_argument('--cpu-budget', type=int, default=None,
+                       help='Total CPUs to use across workers and library threads (default: all)')
+    parser.add_argument('--compare-sequential', action='store_true',
+                       help='Also time the sequential path and report the speedup')
+    parser.add_argument('--use-tuned-params', action='store_true',
+                       help='Use hyperparameters from tune_hyperparameters.py')
+    parser.add_argument('--use-all-tuned', action='store_true',
+                       help='Use all tuned params (ignore selective config)')
+    parser.add_argument('--early-stopping', action='store_true',
+                       help='Pick boosting rounds on each held-out season; final model uses the median')
+    args = parser.parse_args()
+    train_models_parallel(
+        model_types=args.models,
+        use_tuned_params=args.use_tuned_params,
+        use_selective=not args.use_all_tuned,
+        cpu_budget=args.cpu_budget,
+        compare_sequential=args.compare_sequential,
+        early_stopping=args.early_stopping
+    )
@@ -0,0 +1,279 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# RUN THIS (after training once so the full feature set is known):
+# python src/models/prune_features.py
+# To write the schema for the chosen K (training and predictions then use only those features):
+# python src/models/prune_features.py --write-schema
+# To go back to the full feature set:
+# python src/models/prune_features.py --clear-schema
+
+import time
+import json
+import numpy as np
+import pandas as pd
+from collections import defaultdict
+from datetime import datetime
+from joblib import cpu_count
+
+import warnings
+warnings.filterwarnings('ignore', message='pandas only supports SQLAlchemy')
+warnings.filterwarnings('ignore', category=FutureWarning)
+from training_data import (TARGETS, get_project_root, get_models_dir, prepare_training_data,
+                           get_feature_schema_path, save_feature_schema)
+from parallel_training import MODEL_FAMILIES, FINAL_FOLD, build_tasks, run_tasks, plan_cpu_budget
+
+DEFAULT_K_VALUES = [20, 40, 60, 80, 100]
+EVAL_MODEL_TYPE = 'lightgbm'
+MAX_MAE_INCREASE = 0.005
+
+
+def _normalize(importance):
+    importance = np.asarray(importance, dtype=float)
+    total = importance.sum()
+    return importance / total if total > 0 else importance
+
+
+def rank_features(data, model_types=None, cpu_budget=None):
+    """Average normalized importance over every (family, stat, fold) model on the season folds."""
+    model_types = model_types or list(MODEL_FAMILIES.keys())
+    X_scaled = data.scaled()
+    feature_names = list(X_scaled.columns)
+    X_values = np.ascontiguousarray(X_scaled.to_numpy(dtype=np.float64))
+    targets_values = {name: data.target(name).to_numpy() for name in TARGETS}
+
+    tasks = [task for task in build_tasks(model_types, data.split_indices) if task[2] != FINAL_FOLD]
+    outer, inner = plan_cpu_budget(len(tasks), cpu_budget)
+    print(f"Ranking {len(feature_names)} features from {len(tasks)} fold models ({outer} workers x {inner} threads)...")
+    task_results = run_tasks(tasks, X_values, targets_values, feature_names, outer, inner)
+
+    importance = np.mean([_normalize(r['importance']) for r in task_results], axis=0)
+    return pd.DataFrame({'feature': feature_names, 'importance': importance}) \
+        .sort_values('importance', ascending=False).reset_index(drop=True)
+
+
+def rank_features_from_saved(feature_cols, model_types=None, models_dir=None):
+    """Average normalized importance from the saved feature_importance_{model}_{stat}.csv files."""
+    model_types = model_types or list(MODEL_FAMILIES.keys())
+    models_dir = models_dir or get_models_dir()
+
+    totals = pd.Series(0.0, index=feature_cols)
+    n_files = 0
+    for model_type in model_types:
+        for target_name in TARGETS:
+            importance_path = os.path.join(models_dir, f'feature_importance_{model_type}_{target_name}.csv')
+            if not os.path.exists(importance_path):
+                continue
+            importance_df = pd.read_csv(importance_path).set_index('feature')['importance']
+            importance_df = importance_df.reindex(feature_cols).fillna(0)
+            totals += _normalize(importance_df.to_numpy())
+            n_files += 1
+
+    if n_files == 0:
+        raise FileNotFoundError(f"No feature importance files found in {models_dir}; train the models first")
+
+    print(f"Ranking {len(feature_cols)} features from {n_files} saved importance files...")
+    return pd.DataFrame({'feature': feature_cols, 'importance': (totals / n_files).to_numpy()}) \
+        .sort_values('importance', ascending=False).reset_index(drop=True)
+
+
+def _time_slate(models, X_slate):
+    start = time.perf_counter()
+    for i in range(len(X_slate)):
+        row = X_slate.iloc[[i]]
+        for model in models:
+            model.predict(row)
+    return time.perf_counter() - start
+
+
+def evaluate_feature_set(data, features, model_type=EVAL_MODEL_TYPE, cpu_budget=None, slate_size=300):
+    """Season-fold MAE, training time and slate predict time for one family on a feature subset."""
+    X_subset = data.scaled()[features]
+    X_values = np.ascontiguousarray(X_subset.to_numpy(dtype=np.float64))
+    targets_values = {name: data.target(name).to_numpy() for name in TARGETS}
+
+    tasks = build_tasks([model_type], data.split_indices)
+    outer, inner = plan_cpu_budget(len(tasks), cpu_budget)
+    task_results = run_tasks(tasks, X_values, targets_values, features, outer, inner)
+
+    fold_maes = defaultdict(list)
+    train_seconds = 0.0
+    final_models = []
+    for result in task_results:
+        if result['fold'] == FINAL_FOLD:
+            final_models.append(result['model'])
+        else:
+            fold_maes[result['target']].append(result['mae'])
+            train_seconds += result['seconds']
+
+    X_slate = X_subset.sample(n=min(slate_size, len(X_subset)), random_state=42)
+    mae = {t: float(np.mean(fold_maes[t])) for t in TARGETS}
+    return {
+        'mae': mae,
+        'mean_mae': float(np.mean(list(mae.values()))),
+        'train_seconds': train_seconds,
+        'slate_predict_seconds': _time_slate(final_models, X_slate)
+    }
+
+
+def time_feature_build(df, feature_schema=None, sample_size=25):
+    """Seconds per player for build_features_for_player, or None when the database is unavailable."""
+    try:
+        from data_collection.utils import get_analytics_connection
+        from predictions.predict_games import build_features_for_player
+        conn = get_analytics_connection()
+    except Exception as e:
+        print(f"Skipping feature build timing (no database): {e}")
+        return None
+
+    sample = df.sample(n=min(sample_size, len(df)), random_state=42)
+    try:
+        start = time.perf_counter()
+        for _, row in sample.iterrows():
+            build_features_for_player(
+                conn, int(row['player_id']), int(row['team_id']), int(row['opponent_id']),
+                int(row['is_home']), row['season'], str(row['game_date'])[:10], row['game_type'],
+                feature_schema
+            )
+        return (time.perf_counter() - start) / len(sample)
+    finally:
+        conn.close()
+
+
+def choose_k(results, max_mae_increase=MAX_MAE_INCREASE):
+    """Smallest K whose mean MAE is within max_mae_increase (relative) of the full feature set."""
+    baseline = next(r for r in results if r['k'] is None)['mean_mae']
+    candidates = [r['k'] for r in results if r['k'] is not None
+                  and r['mean_mae'] <= baseline * (1 + max_mae_increase)]
+    return min(candidates) if candidates else None
+
+
+def prune_features(k_values=None, model_types=None, eval_model_type=EVAL_MODEL_TYPE, use_saved_importance=False,
+                   cpu_budget=None, slate_size=300, build_sample=25, max_mae_increase=MAX_MAE_INCREASE,
+                   write_schema=False, output_path=None):
+    print("="*70)
+    print("FEATURE PRUNING")
+    print("="*70)
+    print(f"Started at: {datetime.now()}\n")
+
+    # Rank and evaluate on every feature, not on a previously written schema.
+    data = prepare_training_data(use_schema=False)
+    all_features = list(data.feature_cols)
+    cpu_budget = cpu_budget or cpu_count()
+
+    if use_saved_importance:
+        ranking = rank_features_from_saved(all_features, model_types)
+    else:
+        ranking = rank_features(data, model_types, cpu_budget)
+    ranked = list(ranking['feature'])
+
+    k_values = sorted(k for k in set(k_values or DEFAULT_K_VALUES) if 0 < k < len(ranked))
+    results = []
+    for k in k_values + [None]:
+        features = ranked[:k] if k is not None else all_features
+        label = f"top {k}" if k is not None else f"all {len(all_features)}"
+        print(f"\nEvaluating {label} features with {MODEL_FAMILIES[eval_model_type][0]}...")
+
+        result = evaluate_feature_set(data, features, eval_model_type, cpu_budget, slate_size)
+        result['k'] = k
+        result['n_features'] = len(features)
+        result['build_seconds_per_player'] = time_feature_build(
+            data.df, features if k is not None else None, build_sample
+        ) if build_sample else None
+        results.append(result)
+
+        print(f"  Mean MAE: {result['mean_mae']:.4f}, CV train: {result['train_seconds']:.1f}s, "
+              f"slate predict: {result['slate_predict_seconds']:.2f}s")
+
+    chosen_k = choose_k(results, max_mae_increase)
+
+    print("\n" + "="*70)
+    print("FEATURE PRUNING REPORT")
+    print("="*70)
+    print(f"{'Features':<10}{'Mean MAE':>10}{'CV train (s)':>14}{'Slate (s)':>11}{'Build/player (s)':>18}")
+    for r in results:
+        build = f"{r['build_seconds_per_player']:.3f}" if r['build_seconds_per_player'] is not None else 'n/a'
+        marker = '  <- chosen' if r['k'] is not None and r['k'] == chosen_k else ''
+        print(f"{r['n_features']:<10}{r['mean_mae']:>10.4f}{r['train_seconds']:>14.1f}"
+              f"{r['slate_predict_seconds']:>11.2f}{build:>18}{marker}")
+
+    if chosen_k is None:
+        print(f"\nNo K stays within {max_mae_increase:.1%} of the full feature set MAE; keeping all features")
+    else:
+        print(f"\nChosen K: {chosen_k} (within {max_mae_increase:.1%} of the full feature set MAE)")
+
+    report = {
+        'generated_at': datetime.now().isoformat(),
+        'rows': len(data.df),
+        'folds': len(data.split_indices),
+        'eval_model_type': eval_model_type,
+        'ranking_source': 'saved_importance' if use_saved_importance else 'fold_models',
+        'ranking_model_types': model_types or list(MODEL_FAMILIES.keys()),
+        'slate_size': slate_size,
+        'max_mae_increase': max_mae_increase,
+        'chosen_k': chosen_k,
+        'results': results,
+        'ranking': ranking.to_dict(orient='records')
+    }
+
+    output_path = output_path or os.path.join(get_project_root(), 'data', 'evaluation', 'feature_pruning_report.json')
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to {output_path}")
+
+    if write_schema and chosen_k is not None:
+        schema_path = save_feature_schema(ranked[:chosen_k], k=chosen_k, generated_at=report['generated_at'],
+                                          report=output_path)
+        print(f"Feature schema saved to {schema_path}")
+        print("Retrain the models (train_all_models.py) so they use the pruned features")
+
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Rank features by importance and compare top-K feature sets')
+    parser.add_argument('--k-values', type=int, nargs='+', default=DEFAULT_K_VALUES,
+                       help='Feature counts to evaluate')
+    parser.add_argument('--models', nargs='+', default=list(MODEL_FAMILIES.keys()),
+                       choices=list(MODEL_FAMILIES.keys()), help='Model families whose importances are aggregated')
+    parser.add_argument('--eval-model', default=EVAL_MODEL_TYPE, choices=list(MODEL_FAMILIES.keys()),
+                       help='Model family retrained at each K')
+    parser.add_argument('--from-saved', action='store_true',
+                       help='Rank from the saved feature_importance_*.csv files instead of fold models')
+    parser.add_argument('--cpu-budget', type=int, default=None,
+                       help='Total CPUs to use across workers and library threads (default: all)')
+    parser.add_argument('--slate-size', type=int, default=300,
+                       help='Rows to predict one at a time in the latency measurement')
+    parser.add_argument('--build-sample', type=int, default=25,
+                       help='Players to build features for when timing (0 to skip, needs the database)')
+    parser.add_argument('--max-mae-increase', type=float, default=MAX_MAE_INCREASE,
+                       help='Relative MAE increase over the full feature set allowed for the chosen K')
+    parser.add_argument('--write-schema', action='store_true',
+                       help='Write data/models/feature_schema.json for the chosen K')
+    parser.add_argument('--clear-schema', action='store_true',
+                       help='Remove the feature schema and go back to the full feature set')
+    args = parser.parse_args()
+
+    if args.clear_schema:
+        schema_path = get_feature_schema_path()
+        if os.path.exists(schema_path):
+            os.remove(schema_path)
+            print(f"Removed {schema_path}")
+        else:
+            print("No feature schema to remove")
+        sys.exit(0)
+
+    prune_features(
+        k_values=args.k_values,
+        model_types=args.models,
+        eval_model_type=args.eval_model,
+        use_saved_importance=args.from_saved,
+        cpu_budget=args.cpu_budget,
+        slate_size=args.slate_size,
+        build_sample=args.build_sample,
+        max_mae_increase=args.max_mae_increase,
+        write_schema=args.write_schema
+    )
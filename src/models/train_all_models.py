@@ -10,11 +10,25 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # python src/models/train_all_models.py --use-tuned-params
 # or (if you already built features):
 # python src/models/train_all_models.py --skip-features --use-tuned-params
+# To train every family/target/fold in parallel under a CPU budget:
+# python src/models/train_all_models.py --skip-features --parallel --cpu-budget 8
+# To let boosted models pick their number of rounds on the held-out seasons:
+# python src/models/train_all_models.py --skip-features --early-stopping
+# To also distill the ensemble into one fast LightGBM per stat:
+# python src/models/train_all_models.py --skip-features --distill
 
 import subprocess
+import importlib
+import traceback
 from datetime import datetime
+from training_data import prepare_training_data
+from parallel_training import MODEL_FAMILIES, EARLY_STOPPING_FAMILIES, train_models_parallel
+from update_models import record_full_train
+from profiling import profiled, mark, annotate, start_run, add_profile_argument
 
-def train_all_models(build_features_first=True, use_tuned_params=False):
+@profiled('train_all_models')
+def train_all_models(build_features_first=True, use_tuned_params=False, parallel=False, cpu_budget=None,
+                     compare_sequential=False, early_stopping=False, multi_output=False, distill=False):
     print("="*70)
     print("TRAINING ALL MODELS")
     print("="*70)
@@ -24,6 +38,7 @@ def train_all_models(build_features_first=True, use_tuned_params=False):
     project_root = os.path.dirname(os.path.dirname(script_dir))
     
     if build_features_first:
+        mark('build_features')
         print("="*70)
         print("STEP 1: Building training features...")
         print("="*70)
@@ -46,42 +61,98 @@ def train_all_models(build_features_first=True, use_tuned_params=False):
         print("="*70 + "\n")
     
     models = [
-        ('XGBoost', 'train_xgboost.py'),
-        ('LightGBM', 'train_lightgbm.py'),
-        ('CatBoost', 'train_catboost.py'),
-        ('Random Forest', 'train_random_forest.py')
+        ('XGBoost', 'train_xgboost', 'train_xgboost_models'),
+        ('LightGBM', 'train_lightgbm', 'train_lightgbm_models'),
+        ('CatBoost', 'train_catboost', 'train_catboost_models'),
+        ('Random Forest', 'train_random_forest', 'train_random_forest_models')
     ]
     
+    mark('prepare_training_data')
+    print("="*70)
+    print("Preparing shared training matrix...")
+    print("="*70)
+    data = prepare_training_data()
+    annotate(rows=len(data.df), cpu_budget=cpu_budget)
+    
     results = {}
     
-    for model_name, script_name in models:
+    mark('train')
+    if parallel:
         print("\n" + "="*70)
-        print(f"Training {model_name}...")
+        print("Training all models in parallel...")
         print("="*70)
         
-        model_script = os.path.join(script_dir, script_name)
-        
-        cmd = [sys.executable, model_script]
-        if use_tuned_params:
-            cmd.append('--use-tuned-params')
+        try:
+            train_models_parallel(
+                use_tuned_params=use_tuned_params,
+                data=data,
+                cpu_budget=cpu_budget,
+                compare_sequential=compare_sequential,
+                early_stopping=early_stopping
+            )
+        except Exception as e:
+            print(f"\nERROR: parallel training failed: {e}")
+            traceback.print_exc()
+            status = 'FAILED'
+        else:
+            status = 'SUCCESS'
         
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True
-        )
+        for model_name, _, _, _ in MODEL_FAMILIES.values():
+            results[model_name] = status
+    else:
+        for model_name, module_name, function_name in models:
+            print("\n" + "="*70)
+            print(f"Training {model_name}...")
+            print("="*70)
+            
+            try:
+                module = importlib.import_module(module_name)
+                train_fn = getattr(module, function_name)
+                kwargs = {'use_tuned_params': use_tuned_params, 'data': data}
+                if early_stopping and module_name in [MODEL_FAMILIES[m][1] for m in EARLY_STOPPING_FAMILIES]:
+                    kwargs['early_stopping'] = True
+                train_fn(**kwargs)
+            except Exception as e:
+                print(f"\nERROR: {model_name} training failed: {e}")
+                traceback.print_exc()
+                results[model_name] = 'FAILED'
+            else:
+                print(f"\n{model_name} training completed successfully!")
+                results[model_name] = 'SUCCESS'
+    
+    if multi_output:
+        print("\n" + "="*70)
+        print("Training Multi-Output...")
+        print("="*70)
         
-        print(result.stdout)
-        if result.stderr:
-            print("WARNINGS:", result.stderr)
+        try:
+            module = importlib.import_module('train_multi_output')
+            module.train_multi_output_models(data=data)
+        except Exception as e:
+            print(f"\nERROR: Multi-Output training failed: {e}")
+            traceback.print_exc()
+            results['Multi-Output'] = 'FAILED'
+        else:
+            print("\nMulti-Output training completed successfully!")
+            results['Multi-Output'] = 'SUCCESS'
+    
+    if distill:
+        print("\n" + "="*70)
+        print("Training Distilled...")
+        print("="*70)
         
-        if result.returncode != 0:
-            print(f"\nERROR: {model_name} training failed!")
-            results[model_name] = 'FAILED'
+        try:
+            module = importlib.import_module('train_distilled')
+            module.train_distilled_models(use_tuned_params=use_tuned_params, data=data, cpu_budget=cpu_budget)
+        except Exception as e:
+            print(f"\nERROR: Distilled training failed: {e}")
+            traceback.print_exc()
+            results['Distilled'] = 'FAILED'
         else:
-            print(f"\n{model_name} training completed successfully!")
-            results[model_name] = 'SUCCESS'
+            print("\nDistilled training completed successfully!")
+            results['Distilled'] = 'SUCCESS'
     
+    mark('summary')
     print("\n" + "="*70)
     print("TRAINING SUMMARY")
     print("="*70)
@@ -93,6 +164,8 @@ def train_all_models(build_features_first=True, use_tuned_params=False):
     all_success = all(status == 'SUCCESS' for status in results.values())
     
     if all_success:
+        state = record_full_train(data.df)
+        print(f"\nDaily updates will continue from games after {state['last_game_date']}")
         print("\n" + "="*70)
         print("ALL MODELS TRAINED SUCCESSFULLY!")
         print("="*70)
@@ -117,9 +190,51 @@ if __name__ == "__main__":
         action='store_true',
         help='Use hyperparameters from tune_hyperparameters.py'
     )
+    parser.add_argument(
+        '--parallel',
+        action='store_true',
+        help='Train all families, targets and CV folds in parallel'
+    )
+    parser.add_argument(
+        '--cpu-budget',
+        type=int,
+        default=None,
+        help='Total CPUs for parallel training (default: all)'
+    )
+    parser.add_argument(
+        '--compare-sequential',
+        action='store_true',
+        help='With --parallel, also time the sequential path and report the speedup'
+    )
+    parser.add_argument(
+        '--early-stopping',
+        action='store_true',
+        help='Boosted models pick their rounds on each held-out season; final models use the median'
+    )
+    parser.add_argument(
+        '--multi-output',
+        action='store_true',
+        help='Also train the multi-output model that predicts all stats at once'
+    )
+    parser.add_argument(
+        '--distill',
+        action='store_true',
+        help='Also distill the four-model ensemble into one LightGBM per stat'
+    )
     
+    add_profile_argument(parser)
     args = parser.parse_args()
+    start_run('train_all_models', profile=args.profile or None)
     
     build_features = not args.skip_features
-    train_all_models(build_features_first=build_features, use_tuned_params=args.use_tuned_params)
+    train_all_models(
+        build_features_first=build_features,
+        use_tuned_params=args.use_tuned_params,
+        parallel=args.parallel,
+        cpu_budget=args.cpu_budget,
+        compare_sequential=args.compare_sequential,
+        early_stopping=args.early_stopping,
+        multi_output=args.multi_output,
+        distill=args.distill
+    )
 
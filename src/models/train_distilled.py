@@ -0,0 +1,220 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# RUN THIS (after the four families are trained):
+# python src/models/train_distilled.py
+# Predictions are stored under model_version 'distilled':
+# python src/predictions/predict_games.py YYYY-MM-DD distilled
+
+import time
+import json
+import numpy as np
+from sklearn.metrics import mean_absolute_error
+import lightgbm as lgb
+import joblib
+from datetime import datetime
+from joblib import cpu_count
+
+import warnings
+warnings.filterwarnings('ignore', message='pandas only supports SQLAlchemy')
+warnings.filterwarnings('ignore', category=FutureWarning)
+from training_data import (TARGETS, get_project_root, prepare_training_data, get_models_dir, save_scaler,
+                           save_imputation, save_target_artifacts, create_season_splits)
+from oof_store import get_oof_predictions
+from model_bundle import save_model_bundle
+from profiling import profiled, mark, start_run, add_profile_argument
+
+DISTILLED_MODEL_TYPE = 'distilled'
+
+# The teacher is the simple average of these families, as on the Home page.
+TEACHER_FAMILIES = ('xgboost', 'lightgbm', 'catboost', 'random_forest')
+
+
+def build_distilled_model(n_jobs=-1):
+    # Teacher predictions are smooth averages, so a plain L2 objective fits them for every stat.
+    return lgb.LGBMRegressor(
+        n_estimators=200,
+        num_leaves=31,
+        max_depth=6,
+        learning_rate=0.05,
+        subsample=0.8,
+        subsample_freq=1,
+        colsample_bytree=0.8,
+        random_state=42,
+        n_jobs=n_jobs,
+        verbose=-1,
+        objective='regression'
+    )
+
+
+def compute_teacher_predictions(data, use_tuned_params=False, use_selective=True, cpu_budget=None, refit_oof=False):
+    """Out-of-fold ensemble predictions on the season folds.
+
+    Returns the row positions that were held out in some fold and, per stat, the
+    average of the teacher families' predictions for those rows. Saved predictions
+    from the last training run are used when they match the current features.
+    """
+    oof_idx, oof_predictions = get_oof_predictions(data, TEACHER_FAMILIES, use_tuned_params,
+                                                   use_selective, cpu_budget, refit=refit_oof)
+    teacher = {
+        t: np.mean([oof_predictions[(model_type, t)] for model_type in TEACHER_FAMILIES], axis=0)
+        for t in TARGETS
+    }
+    return oof_idx, teacher
+
+
+def _time_slate(models, X_slate):
+    start = time.perf_counter()
+    for i in range(len(X_slate)):
+        row = X_slate.iloc[[i]]
+        for model in models:
+            model.predict(row)
+    return time.perf_counter() - start
+
+
+@profiled('train_distilled')
+def train_distilled_models(use_tuned_params=False, use_selective=True, data=None, cpu_budget=None,
+                           slate_size=300, output_path=None, refit_oof=False):
+    print("Training distilled LightGBM models from the four-model ensemble...\n")
+
+    mark('prepare_training_data')
+    if data is None:
+        data = prepare_training_data()
+
+    models_dir = get_models_dir()
+    cpu_budget = cpu_budget or cpu_count()
+
+    X_scaled = data.scaled()
+    scaler_path = save_scaler(data, DISTILLED_MODEL_TYPE, models_dir)
+    print(f"Saved scaler: {scaler_path}")
+    imputation_path = save_imputation(data, models_dir)
+    print(f"Saved imputation values: {imputation_path}\n")
+
+    mark('teacher_predictions')
+    oof_idx, teacher = compute_teacher_predictions(data, use_tuned_params, use_selective, cpu_budget, refit_oof)
+    X_oof = X_scaled.iloc[oof_idx]
+    df_oof = data.df.iloc[oof_idx]
+    print(f"Distilling on {len(oof_idx)} held-out rows\n")
+
+    # Students are validated the same way as everything else: forward in time over the
+    # held-out seasons, trained on teacher predictions and scored against actual stats.
+    student_splits = create_season_splits(df_oof)
+
+    results = {}
+    final_models = {}
+    for target_name in TARGETS:
+        y_actual = df_oof[TARGETS[target_name]].to_numpy()
+        y_teacher = teacher[target_name]
+
+        print("="*50)
+        print(f"DISTILLED: {target_name.upper()}")
+        print("="*50)
+
+        mark(f'{target_name}/cv')
+        student_maes, teacher_maes, fidelity = [], [], []
+        for fold, (train_idx, val_idx) in enumerate(student_splits, 1):
+            model = build_distilled_model(cpu_budget)
+            model.fit(X_oof.iloc[train_idx], y_teacher[train_idx])
+            y_pred = model.predict(X_oof.iloc[val_idx])
+
+            student_maes.append(mean_absolute_error(y_actual[val_idx], y_pred))
+            teacher_maes.append(mean_absolute_error(y_actual[val_idx], y_teacher[val_idx]))
+            fidelity.append(mean_absolute_error(y_teacher[val_idx], y_pred))
+            print(f"Fold {fold}: student MAE={student_maes[-1]:.2f}, ensemble MAE={teacher_maes[-1]:.2f}, "
+                  f"student vs ensemble={fidelity[-1]:.2f}")
+
+        mark(f'{target_name}/final_fit')
+        final_model = build_distilled_model(cpu_budget)
+        final_model.fit(X_oof, y_teacher)
+        final_models[target_name] = final_model
+
+        avg_mae = np.mean(student_maes)
+        paths = save_target_artifacts(DISTILLED_MODEL_TYPE, target_name, final_model, X_oof.columns, avg_mae, models_dir)
+        print(f"\nAverage MAE: {avg_mae:.2f} (ensemble: {np.mean(teacher_maes):.2f})")
+        print(f"Saved: {paths['model']}\n")
+
+        results[target_name] = {
+            'student_mae': float(avg_mae),
+            'ensemble_mae': float(np.mean(teacher_maes)),
+            'student_vs_ensemble_mae': float(np.mean(fidelity))
+        }
+
+    mark('save_bundle')
+    bundle_path = save_model_bundle(DISTILLED_MODEL_TYPE, models_dir)
+    print(f"Saved bundle: {bundle_path}\n")
+
+    mark('latency_comparison')
+    X_slate = X_scaled.sample(n=min(slate_size, len(X_scaled)), random_state=42)
+    distilled_seconds = _time_slate(list(final_models.values()), X_slate)
+
+    ensemble_models = []
+    for model_type in TEACHER_FAMILIES:
+        for target_name in TARGETS:
+            model_path = os.path.join(models_dir, f'{model_type}_{target_name}.pkl')
+            if os.path.exists(model_path):
+                ensemble_models.append(joblib.load(model_path))
+    ensemble_seconds = None
+    if len(ensemble_models) == len(TEACHER_FAMILIES) * len(TARGETS):
+        try:
+            ensemble_seconds = _time_slate(ensemble_models, X_slate)
+        except Exception as e:
+            print(f"Warning: Could not time the saved ensemble models (retrain them on the current features): {e}")
+
+    report = {
+        'generated_at': datetime.now().isoformat(),
+        'model_version': DISTILLED_MODEL_TYPE,
+        'teacher_families': list(TEACHER_FAMILIES),
+        'distill_rows': len(oof_idx),
+        'student_folds': len(student_splits),
+        'slate_size': len(X_slate),
+        'slate_predict_seconds': {
+            'distilled': distilled_seconds,
+            'ensemble': ensemble_seconds
+        },
+        'targets': results
+    }
+
+    print("="*50)
+    print("DISTILLED MODELS TRAINED!")
+    print("="*50)
+    for target_name, r in results.items():
+        print(f"{target_name.capitalize()}: MAE = {r['student_mae']:.2f} (ensemble {r['ensemble_mae']:.2f})")
+    if ensemble_seconds is not None:
+        print(f"\nSlate predict: distilled {distilled_seconds:.2f}s vs ensemble {ensemble_seconds:.2f}s "
+              f"({distilled_seconds / ensemble_seconds:.0%} of the ensemble cost)")
+    else:
+        print(f"\nSlate predict: distilled {distilled_seconds:.2f}s (ensemble models not all saved, skipped)")
+
+    output_path = output_path or os.path.join(get_project_root(), 'data', 'evaluation', 'distillation_report.json')
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to {output_path}")
+
+    return {t: r['student_mae'] for t, r in results.items()}
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Distill the four-model ensemble into one LightGBM per stat')
+    parser.add_argument('--use-tuned-params', action='store_true',
+                       help='Teacher families use hyperparameters from tune_hyperparameters.py')
+    parser.add_argument('--use-all-tuned', action='store_true',
+                       help='Use all tuned params (ignore selective config)')
+    parser.add_argument('--cpu-budget', type=int, default=None,
+                       help='Total CPUs to use across workers and library threads (default: all)')
+    parser.add_argument('--slate-size', type=int, default=300,
+                       help='Rows to predict one at a time in the latency comparison')
+    parser.add_argument('--refit-oof', action='store_true',
+                       help='Refit the teacher fold models instead of using saved out-of-fold predictions')
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    start_run('train_distilled', profile=args.profile or None)
+    train_distilled_models(
+        use_tuned_params=args.use_tuned_params,
+        use_selective=not args.use_all_tuned,
+        cpu_budget=args.cpu_budget,
+        slate_size=args.slate_size,
+        refit_oof=args.refit_oof
+    )
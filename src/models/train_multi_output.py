@@ -0,0 +1,220 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import time
+import json
+import numpy as np
+from sklearn.metrics import mean_absolute_error
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.compose import TransformedTargetRegressor
+from sklearn.preprocessing import StandardScaler
+import joblib
+from datetime import datetime
+
+import warnings
+warnings.filterwarnings('ignore', message='pandas only supports SQLAlchemy')
+warnings.filterwarnings('ignore', category=FutureWarning)
+from training_data import (TARGETS, get_project_root, prepare_training_data, get_models_dir, save_scaler,
+                           save_imputation, save_target_artifacts)
+from train_random_forest import build_random_forest_model, fit_random_forest_model
+from profiling import profiled, mark, start_run, add_profile_argument
+
+MULTI_OUTPUT_MODEL_TYPE = 'multi_output'
+MULTI_OUTPUT_FILENAME = 'multi_output.pkl'
+
+def build_multi_output_model(n_jobs=-1):
+    # One forest predicts all seven stats. Targets are standardized so the split
+    # criterion is not dominated by points, which has the largest variance.
+    return TransformedTargetRegressor(
+        regressor=RandomForestRegressor(
+            n_estimators=100,
+            max_depth=10,
+            min_samples_split=5,
+            min_samples_leaf=2,
+            random_state=42,
+            n_jobs=n_jobs,
+            verbose=0
+        ),
+        transformer=StandardScaler()
+    )
+
+def get_multi_output_path(models_dir=None):
+    return os.path.join(models_dir or get_models_dir(), MULTI_OUTPUT_FILENAME)
+
+def load_multi_output_model(models_dir=None):
+    bundle_path = get_multi_output_path(models_dir)
+    if not os.path.exists(bundle_path):
+        return None
+    return joblib.load(bundle_path)
+
+@profiled('train_multi_output')
+def train_multi_output_models(use_tuned_params=False, use_selective=True, data=None, n_jobs=-1):
+    print("Training multi-output model for NBA player predictions...\n")
+    if use_tuned_params:
+        print("  No tuned params for the multi-output model, using defaults")
+
+    mark('prepare_training_data')
+    if data is None:
+        data = prepare_training_data()
+
+    target_names = list(TARGETS.keys())
+    Y = data.df[[TARGETS[t] for t in target_names]]
+    X = data.X
+    split_indices = data.split_indices
+
+    models_dir = get_models_dir()
+
+    X_scaled = data.scaled()
+    scaler_path = save_scaler(data, MULTI_OUTPUT_MODEL_TYPE, models_dir)
+    print(f"Saved scaler: {scaler_path}")
+    imputation_path = save_imputation(data, models_dir)
+    print(f"Saved imputation values: {imputation_path}\n")
+
+    fold_maes = {t: [] for t in target_names}
+
+    mark('cv')
+    for fold, (train_idx, val_idx) in enumerate(split_indices, 1):
+        X_train, X_val = X_scaled.iloc[train_idx], X_scaled.iloc[val_idx]
+        Y_train, Y_val = Y.iloc[train_idx], Y.iloc[val_idx]
+
+        model = build_multi_output_model(n_jobs)
+        model.fit(X_train, Y_train)
+        Y_pred = model.predict(X_val)
+
+        fold_summary = []
+        for i, target_name in enumerate(target_names):
+            mae = mean_absolute_error(Y_val.iloc[:, i], Y_pred[:, i])
+            fold_maes[target_name].append(mae)
+            fold_summary.append(f"{target_name}={mae:.2f}")
+        print(f"Fold {fold}: MAE {', '.join(fold_summary)}")
+
+    mark('final_fit')
+    print("\nTraining final model on all data...")
+    final_model = build_multi_output_model(n_jobs)
+    final_model.fit(X_scaled, Y)
+
+    mark('save')
+    bundle_path = get_multi_output_path(models_dir)
+    joblib.dump({'model': final_model, 'targets': target_names}, bundle_path)
+    print(f"Saved: {bundle_path}\n")
+
+    # Per-stat MAE and importance files keep ensemble weighting, confidence scoring
+    # and feature explanations working the same way as for the per-stat families.
+    results = {}
+    for target_name in target_names:
+        avg_mae = np.mean(fold_maes[target_name])
+        results[target_name] = avg_mae
+        save_target_artifacts(MULTI_OUTPUT_MODEL_TYPE, target_name, final_model.regressor_,
+                              X.columns, avg_mae, models_dir, save_model=False)
+
+    print("="*50)
+    print("MULTI-OUTPUT MODEL TRAINED!")
+    print("="*50)
+    for target, mae in results.items():
+        print(f"{target.capitalize()}: MAE = {mae:.2f}")
+
+    return results
+
+def _time_slate(predict_fns, X_slate):
+    start = time.perf_counter()
+    for i in range(len(X_slate)):
+        row = X_slate.iloc[[i]]
+        for predict in predict_fns:
+            predict(row)
+    return time.perf_counter() - start
+
+def benchmark_multi_output(data=None, slate_size=300, n_jobs=-1, output_path=None):
+    """Compare per-stat Random Forests with the multi-output forest on the season folds.
+
+    Reports total CV training time, MAE per stat, and the time to predict a slate
+    one player at a time (as predict_games.py does) with 7 models vs 1.
+    """
+    if data is None:
+        data = prepare_training_data()
+
+    target_names = list(TARGETS.keys())
+    Y = data.df[[TARGETS[t] for t in target_names]]
+    X_scaled = data.scaled()
+
+    per_stat_maes = {t: [] for t in target_names}
+    multi_maes = {t: [] for t in target_names}
+    per_stat_seconds = 0.0
+    multi_seconds = 0.0
+    per_stat_models = {}
+    multi_model = None
+
+    for fold, (train_idx, val_idx) in enumerate(data.split_indices, 1):
+        X_train, X_val = X_scaled.iloc[train_idx], X_scaled.iloc[val_idx]
+        Y_train, Y_val = Y.iloc[train_idx], Y.iloc[val_idx]
+
+        for i, target_name in enumerate(target_names):
+            start = time.perf_counter()
+            model = build_random_forest_model(target_name, n_jobs=n_jobs)
+            fit_random_forest_model(model, X_train, Y_train.iloc[:, i])
+            per_stat_seconds += time.perf_counter() - start
+            per_stat_maes[target_name].append(mean_absolute_error(Y_val.iloc[:, i], model.predict(X_val)))
+            per_stat_models[target_name] = model
+
+        start = time.perf_counter()
+        multi_model = build_multi_output_model(n_jobs)
+        multi_model.fit(X_train, Y_train)
+        multi_seconds += time.perf_counter() - start
+        Y_pred = multi_model.predict(X_val)
+        for i, target_name in enumerate(target_names):
+            multi_maes[target_name].append(mean_absolute_error(Y_val.iloc[:, i], Y_pred[:, i]))
+
+        print(f"Fold {fold}: per-stat {per_stat_seconds:.1f}s, multi-output {multi_seconds:.1f}s (cumulative)")
+
+    X_slate = X_scaled.sample(n=min(slate_size, len(X_scaled)), random_state=42)
+    per_stat_latency = _time_slate([m.predict for m in per_stat_models.values()], X_slate)
+    multi_latency = _time_slate([multi_model.predict], X_slate)
+
+    report = {
+        'generated_at': datetime.now().isoformat(),
+        'rows': len(X_scaled),
+        'features': X_scaled.shape[1],
+        'folds': len(data.split_indices),
+        'slate_size': len(X_slate),
+        'per_stat_random_forest': {
+            'train_seconds': per_stat_seconds,
+            'slate_predict_seconds': per_stat_latency,
+            'mae': {t: float(np.mean(v)) for t, v in per_stat_maes.items()}
+        },
+        'multi_output': {
+            'train_seconds': multi_seconds,
+            'slate_predict_seconds': multi_latency,
+            'mae': {t: float(np.mean(v)) for t, v in multi_maes.items()}
+        }
+    }
+
+    print("\n" + "="*70)
+    print("MULTI-OUTPUT BENCHMARK")
+    print("="*70)
+    print(f"{'':<22}{'Per-stat RF':>15}{'Multi-output':>15}")
+    print(f"{'CV train time (s)':<22}{per_stat_seconds:>15.1f}{multi_seconds:>15.1f}")
+    print(f"{'Slate predict (s)':<22}{per_stat_latency:>15.2f}{multi_latency:>15.2f}")
+    for t in target_names:
+        print(f"{t + ' MAE':<22}{report['per_stat_random_forest']['mae'][t]:>15.3f}{report['multi_output']['mae'][t]:>15.3f}")
+
+    output_path = output_path or os.path.join(get_project_root(), 'data', 'evaluation', 'multi_output_benchmark.json')
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nBenchmark saved to {output_path}")
+
+    return report
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--benchmark', action='store_true',
+                       help='Compare against per-stat Random Forests instead of training')
+    parser.add_argument('--slate-size', type=int, default=300,
+                       help='Rows to predict one at a time in the latency benchmark')
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    start_run('train_multi_output', profile=args.profile or None)
+    if args.benchmark:
+        benchmark_multi_output(slate_size=args.slate_size)
+    else:
+        train_multi_output_models()
@@ -1,13 +1,9 @@
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-import pandas as pd
 import numpy as np
-from sklearn.model_selection import TimeSeriesSplit
 from sklearn.metrics import mean_absolute_error, mean_squared_error
-from sklearn.preprocessing import StandardScaler
 import xgboost as xgb
-import joblib
 from collections import defaultdict
 
 import warnings
@@ -16,6 +12,10 @@ warnings.filterwarnings('ignore', category=FutureWarning)
 import json
 from pathlib import Path
 from selective_tuning_config import should_use_tuned_params
+from training_data import TARGETS, prepare_training_data, get_models_dir, save_scaler, save_imputation, save_target_artifacts, EARLY_STOPPING_ROUNDS
+from model_bundle import save_model_bundle
+from oof_store import save_oof_predictions
+from profiling import profiled, mark, start_run, add_profile_argument
 
 def load_tuned_params(model_type, target_name, use_selective=True):
     if not should_use_tuned_params(model_type, target_name, use_selective):
@@ -28,81 +28,63 @@ def load_tuned_params(model_type, target_name, use_selective=True):
         return tuned_params
     return None
 
-def train_xgboost_models(use_tuned_params=False, use_selective=True):
-    print("Training XGBoost models for NBA player predictions...\n")
-    
-    print("Loading features...")
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(os.path.dirname(script_dir))
-    features_path = os.path.join(project_root, 'data', 'processed', 'training_features.csv')
-    df = pd.read_csv(features_path)
-    print(f"Loaded {len(df)} records\n")
-    
-    df = df.dropna(subset=['points_l5', 'points_l10'])
-    print(f"After removing NaN: {len(df)} records\n")
-    
-    feature_cols = [col for col in df.columns if any(x in col for x in 
-               ['_l5', '_l10', '_l20', '_weighted', 'is_', 'days_rest', 'games_played',
-                'offensive_rating', 'defensive_rating', 'net_rating', 'pace', 'opp_', 'altitude', 'playoff',
-                'star_teammate', 'games_without_star', 'usage_rate', 'minutes_played', 'minutes_trend',
-                'per_36', '_pct', '_ratio', 'pts_per', 'ast_to', 'reb_rate', 'position_',
-                'games_in_last', 'is_heavy', 'is_well', 'consecutive_games', 'season_progress',
-                'is_early', 'is_mid', 'is_late', 'games_remaining', 'tz_difference', 'west_to_east',
-                'east_to_west', 'days_since_asb', 'post_asb'])]
+def build_xgboost_model(target_name, tuned_params=None, n_jobs=-1, n_estimators=None):
+    objective = 'count:poisson' if target_name in ['blocks', 'steals'] else 'reg:squarederror'
     
-    feature_cols = [col for col in feature_cols if 'team_id' not in col and 'player_id' not in col and 'game_id' not in col]
+    if tuned_params:
+        params = tuned_params.copy()
+        params['random_state'] = 42
+        params['n_jobs'] = n_jobs
+        params['objective'] = objective
+        if n_estimators:
+            params['n_estimators'] = n_estimators
+        return xgb.XGBRegressor(**params)
     
-    raw_leakage_cols = ['offensive_rating', 'defensive_rating', 'usage_rate', 'true_shooting_pct', 
-                        'points', 'rebounds_total', 'assists', 'steals', 'blocks', 'turnovers', 
-                        'three_pointers_made', 'minutes_played', 'is_starter', 'field_goals_made',
-                        'field_goals_attempted', 'three_pointers_attempted', 'free_throws_made',
-                        'free_throws_attempted']
-    feature_cols = [col for col in feature_cols if col not in raw_leakage_cols]
-    
-    print("Calculating imputation values for NaN handling...")
-    league_means = {}
-    for col in feature_cols:
-        if col in df.columns:
-            if 'team' in col or 'opp' in col or 'pace' in col:
-                league_means[col] = df[col].mean()
-            elif col.startswith('is_') or col.startswith('position_'):
-                league_means[col] = 0
-            elif 'trend' in col or col in ['west_to_east', 'east_to_west', 'post_asb_bounce']:
-                league_means[col] = 0
-            else:
-                league_means[col] = df[col].mean()
+    return xgb.XGBRegressor(
+        n_estimators=n_estimators or 100,
+        max_depth=6,
+        learning_rate=0.1,
+        subsample=0.8,
+        colsample_bytree=0.8,
+        random_state=42,
+        n_jobs=n_jobs,
+        objective=objective
+    )
+
+def fit_xgboost_model(model, X_train, y_train, eval_set=None, early_stopping_rounds=None):
+    if eval_set is not None and early_stopping_rounds:
+        model.set_params(early_stopping_rounds=early_stopping_rounds, eval_metric='mae')
+        model.fit(X_train, y_train, eval_set=[eval_set], verbose=False)
+        return model
     
-    X = df[feature_cols].copy()
-    player_means = {}
-    for col in feature_cols:
-        if col in X.columns:
-            if 'team' in col or 'opp' in col or 'pace' in col:
-                X[col] = X[col].fillna(league_means.get(col, 0))
-            elif col.startswith('is_') or col.startswith('position_') or 'trend' in col or col in ['west_to_east', 'east_to_west', 'post_asb_bounce']:
-                X[col] = X[col].fillna(league_means.get(col, 0))
-            else:
-                if col not in player_means:
-                    player_means[col] = df.groupby('player_id')[col].transform(
-                        lambda x: x.expanding().mean().shift(1)
-                    ).fillna(league_means.get(col, 0))
-                X[col] = X[col].fillna(player_means[col])
+    model.fit(X_train, y_train, verbose=False)
+    return model
+
+def get_xgboost_best_iteration(model):
+    return model.best_iteration + 1
+
+@profiled('train_xgboost')
+def train_xgboost_models(use_tuned_params=False, use_selective=True, data=None, early_stopping=False,
+                         early_stopping_rounds=EARLY_STOPPING_ROUNDS):
+    print("Training XGBoost models for NBA player predictions...\n")
     
-    X = X.fillna(0)
+    mark('prepare_training_data')
+    if data is None:
+        data = prepare_training_data()
     
-    targets = {
-        'points': 'points',
-        'rebounds': 'rebounds_total',
-        'assists': 'assists',
-        'steals': 'steals',
-        'blocks': 'blocks',
-        'turnovers': 'turnovers',
-        'three_pointers_made': 'three_pointers_made'
-    }
+    df = data.df
+    X = data.X
+    split_indices = data.split_indices
+    targets = TARGETS
     
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(os.path.dirname(script_dir))
-    models_dir = os.path.join(project_root, 'data', 'models')
-    os.makedirs(models_dir, exist_ok=True)
+    models_dir = get_models_dir()
+    
+    X_scaled = data.scaled()
+    scaler_path = save_scaler(data, 'xgboost', models_dir)
+    print(f"Saved scaler: {scaler_path}")
+    imputation_path = save_imputation(data, models_dir)
+    print(f"Saved imputation values: {imputation_path}\n")
     
     results = {}
     
@@ -113,33 +95,12 @@ def train_xgboost_models(use_tuned_params=False, use_selective=True):
         
         y = df[target_col]
         
-        print("Fitting StandardScaler...")
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)
-        X_scaled = pd.DataFrame(X_scaled, columns=X.columns, index=X.index)
-        
-        seasons = df['season'].values
-        unique_seasons = sorted(df['season'].unique())
-        n_seasons = len(unique_seasons)
-        
-        if n_seasons > 2:
-            split_indices = []
-            for i, test_season in enumerate(unique_seasons[2:], start=2):
-                train_seasons = unique_seasons[:i]
-                train_mask = df['season'].isin(train_seasons)
-                test_mask = df['season'] == test_season
-                train_idx = np.where(train_mask)[0]
-                val_idx = np.where(test_mask)[0]
-                if len(train_idx) > 0 and len(val_idx) > 0:
-                    split_indices.append((train_idx, val_idx))
-        else:
-            tscv = TimeSeriesSplit(n_splits=3)
-            split_indices = list(tscv.split(X_scaled))
-        
         best_model = None
         best_score = float('inf')
         feature_importance_scores = defaultdict(float)
         fold_maes = []
+        fold_predictions = {}
+        best_iterations = []
         
         tuned_params = None
         if use_tuned_params:
@@ -149,38 +110,28 @@ def train_xgboost_models(use_tuned_params=False, use_selective=True):
             else:
                 print(f"  Using DEFAULT params for xgboost-{target_name}")
         
+        mark(f'{target_name}/cv')
         for fold, (train_idx, val_idx) in enumerate(split_indices, 1):
             X_train, X_val = X_scaled.iloc[train_idx], X_scaled.iloc[val_idx]
             y_train, y_val = y.iloc[train_idx], y.iloc[val_idx]
             
-            objective = 'count:poisson' if target_name in ['blocks', 'steals'] else 'reg:squarederror'
-            
-            if tuned_params:
-                params = tuned_params.copy()
-                params['random_state'] = 42
-                params['n_jobs'] = -1
-                params['objective'] = objective
-                model = xgb.XGBRegressor(**params)
+            model = build_xgboost_model(target_name, tuned_params)
+            if early_stopping:
+                fit_xgboost_model(model, X_train, y_train, (X_val, y_val), early_stopping_rounds)
+                best_iterations.append(get_xgboost_best_iteration(model))
             else:
-                model = xgb.XGBRegressor(
-                    n_estimators=100,
-                    max_depth=6,
-                    learning_rate=0.1,
-                    subsample=0.8,
-                    colsample_bytree=0.8,
-                    random_state=42,
-                    n_jobs=-1,
-                    objective=objective
-                )
-            
-            model.fit(X_train, y_train, verbose=False)
+                fit_xgboost_model(model, X_train, y_train)
             
             y_pred = model.predict(X_val)
+            fold_predictions[fold] = y_pred
             
             mae = mean_absolute_error(y_val, y_pred)
             rmse = np.sqrt(mean_squared_error(y_val, y_pred))
             
-            print(f"Fold {fold}: MAE={mae:.2f}, RMSE={rmse:.2f}")
+            if early_stopping:
+                print(f"Fold {fold}: MAE={mae:.2f}, RMSE={rmse:.2f}, rounds={best_iterations[-1]}")
+            else:
+                print(f"Fold {fold}: MAE={mae:.2f}, RMSE={rmse:.2f}")
             
             fold_maes.append(mae)
             importance = model.feature_importances_
@@ -200,59 +151,23 @@ def train_xgboost_models(use_tuned_params=False, use_selective=True):
         top_features = [f[0] for f in sorted_features[:20]]
         print(f"Top 20 features: {', '.join(top_features[:5])}...")
         
+        mark(f'{target_name}/final_fit')
         print("Training final model on all data...")
-        objective = 'count:poisson' if target_name in ['blocks', 'steals'] else 'reg:squarederror'
-        
-        tuned_params = None
-        if use_tuned_params:
-            tuned_params = load_tuned_params('xgboost', target_name, use_selective)
-            if tuned_params:
-                print(f"  Using TUNED params for final xgboost-{target_name} model")
-            else:
-                print(f"  Using DEFAULT params for final xgboost-{target_name} model")
-        
-        if tuned_params:
-            params = tuned_params.copy()
-            params['random_state'] = 42
-            params['n_jobs'] = -1
-            params['objective'] = objective
-            final_model = xgb.XGBRegressor(**params)
-        else:
-            final_model = xgb.XGBRegressor(
-                n_estimators=100,
-                max_depth=6,
-                learning_rate=0.1,
-                subsample=0.8,
-                colsample_bytree=0.8,
-                random_state=42,
-                n_jobs=-1,
-                objective=objective
-            )
-        
-        final_model.fit(X_scaled, y, verbose=False)
-        
-        final_importance = final_model.feature_importances_
-        importance_df = pd.DataFrame({
-            'feature': X.columns,
-            'importance': final_importance
-        }).sort_values('importance', ascending=False)
-        
-        importance_path = os.path.join(models_dir, f'feature_importance_xgboost_{target_name}.csv')
-        importance_df.to_csv(importance_path, index=False)
-        
-        model_path = os.path.join(models_dir, f'xgboost_{target_name}.pkl')
-        scaler_path = os.path.join(models_dir, f'scaler_xgboost_{target_name}.pkl')
-        mae_path = os.path.join(models_dir, f'xgboost_{target_name}_mae.txt')
-        
-        joblib.dump(final_model, model_path)
-        joblib.dump(scaler, scaler_path)
-        with open(mae_path, 'w') as f:
-            f.write(str(avg_mae))
-        
-        print(f"Saved: {model_path}")
-        print(f"Saved: {scaler_path}")
-        print(f"Saved: {importance_path}")
-        print(f"Saved: {mae_path}\n")
+        n_estimators = None
+        if early_stopping:
+            n_estimators = max(1, int(np.median(best_iterations)))
+            print(f"  Early stopping: final model uses {n_estimators} rounds (median of {best_iterations})")
+        final_model = build_xgboost_model(target_name, tuned_params, n_estimators=n_estimators)
+        fit_xgboost_model(final_model, X_scaled, y)
+        
+        mark(f'{target_name}/save')
+        paths = save_target_artifacts('xgboost', target_name, final_model, X.columns, avg_mae, models_dir)
+        
+        print(f"Saved: {paths['model']}")
+        print(f"Saved: {paths['importance']}")
+        print(f"Saved: {paths['mae']}")
+        oof_path = save_oof_predictions(data, 'xgboost', target_name, fold_predictions, use_tuned_params, use_selective, early_stopping)
+        print(f"Saved: {oof_path}\n")
         
         import shutil
         config_source = os.path.join(script_dir, 'selective_tuning_config.py')
@@ -260,6 +175,11 @@ def train_xgboost_models(use_tuned_params=False, use_selective=True):
         if os.path.exists(config_source):
             shutil.copy(config_source, config_dest)
     
+    mark('save_bundle')
+    bundle_path = save_model_bundle('xgboost', models_dir)
+    if bundle_path:
+        print(f"Saved bundle: {bundle_path}\n")
+    
     print("="*50)
     print("ALL MODELS TRAINED!")
     print("="*50)
@@ -275,5 +195,10 @@ if __name__ == "__main__":
                        help='Use hyperparameters from tune_hyperparameters.py')
     parser.add_argument('--use-all-tuned', action='store_true',
                        help='Use all tuned params (ignore selective config)')
+    parser.add_argument('--early-stopping', action='store_true',
+                       help='Pick boosting rounds on each held-out season; final model uses the median')
+    add_profile_argument(parser)
     args = parser.parse_args()
-    train_xgboost_models(use_tuned_params=args.use_tuned_params, use_selective=not args.use_all_tuned)
\ No newline at end of file
+    start_run('train_xgboost', profile=args.profile or None)
+    train_xgboost_models(use_tuned_params=args.use_tuned_params, use_selective=not args.use_all_tuned,
+                         early_stopping=args.early_stopping)
\ No newline at end of file
@@ -0,0 +1,401 @@
+import os
+import json
+import pandas as pd
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from sklearn.model_selection import TimeSeriesSplit
+from sklearn.preprocessing import StandardScaler
+import joblib
+
+__all__ = [
+    'TARGETS',
+    'FEATURE_PATTERNS',
+    'RAW_LEAKAGE_COLS',
+    'SCALER_FILENAME',
+    'FAMILY_SCALER_FILENAME_TEMPLATE',
+    'IMPUTATION_FILENAME',
+    'IMPUTED_CACHE_FILENAME',
+    'FEATURE_SCHEMA_FILENAME',
+    'ENSEMBLE_SUBSETS_FILENAME',
+    'EARLY_STOPPING_ROUNDS',
+    'TrainingData',
+    'get_project_root',
+    'get_features_path',
+    'get_models_dir',
+    'get_scaler_path',
+    'save_scaler',
+    'load_scaler',
+    'save_imputation',
+    'load_imputation',
+    'get_feature_schema_path',
+    'load_feature_schema',
+    'save_feature_schema',
+    'load_ensemble_subsets',
+    'save_ensemble_subsets',
+    'save_target_artifacts',
+    'load_training_features',
+    'select_feature_cols',
+    'compute_league_means',
+    'compute_prior_player_means',
+    'impute_features',
+    'get_imputed_cache_path',
+    'load_imputed_features',
+    'save_imputed_features',
+    'create_season_splits',
+    'prepare_training_data',
+]
+
+TARGETS = {
+    'points': 'points',
+    'rebounds': 'rebounds_total',
+    'assists': 'assists',
+    'steals': 'steals',
+    'blocks': 'blocks',
+    'turnovers': 'turnovers',
+    'three_pointers_made': 'three_pointers_made'
+}
+
+FEATURE_PATTERNS = [
+    '_l5', '_l10', '_l20', '_weighted', 'is_', 'days_rest', 'games_played',
+    'offensive_rating', 'defensive_rating', 'net_rating', 'pace', 'opp_', 'altitude', 'playoff',
+    'star_teammate', 'games_without_star', 'usage_rate', 'minutes_played', 'minutes_trend',
+    'per_36', '_pct', '_ratio', 'pts_per', 'ast_to', 'reb_rate', 'position_',
+    'games_in_last', 'is_heavy', 'is_well', 'consecutive_games', 'season_progress',
+    'is_early', 'is_mid', 'is_late', 'games_remaining', 'tz_difference', 'west_to_east',
+    'east_to_west', 'days_since_asb', 'post_asb'
+]
+
+RAW_LEAKAGE_COLS = [
+    'offensive_rating', 'defensive_rating', 'usage_rate', 'true_shooting_pct',
+    'points', 'rebounds_total', 'assists', 'steals', 'blocks', 'turnovers',
+    'three_pointers_made', 'minutes_played', 'is_starter', 'field_goals_made',
+    'field_goals_attempted', 'three_pointers_attempted', 'free_throws_made',
+    'free_throws_attempted'
+]
+
+ZERO_FILL_COLS = ['west_to_east', 'east_to_west', 'post_asb_bounce']
+
+SCALER_FILENAME = 'scaler.pkl'
+FAMILY_SCALER_FILENAME_TEMPLATE = 'scaler_{model_type}.pkl'
+IMPUTATION_FILENAME = 'imputation.pkl'
+IMPUTED_CACHE_FILENAME = 'training_features_imputed.pkl'
+FEATURE_SCHEMA_FILENAME = 'feature_schema.json'
+ENSEMBLE_SUBSETS_FILENAME = 'ensemble_subsets.json'
+EARLY_STOPPING_ROUNDS = 20
+
+
+@dataclass
+class TrainingData:
+    df: pd.DataFrame
+    X: pd.DataFrame
+    feature_cols: List[str]
+    league_means: Dict[str, float]
+    split_indices: List[Tuple[np.ndarray, np.ndarray]] = field(default_factory=list)
+    scaler: Optional[StandardScaler] = None
+    X_scaled: Optional[pd.DataFrame] = None
+
+    def target(self, target_name: str) -> pd.Series:
+        return self.df[TARGETS.get(target_name, target_name)]
+
+    def scaled(self) -> pd.DataFrame:
+        if self.X_scaled is None:
+            print("Fitting StandardScaler...")
+            self.scaler = StandardScaler()
+            X_scaled = self.scaler.fit_transform(self.X)
+            self.X_scaled = pd.DataFrame(X_scaled, columns=self.X.columns, index=self.X.index)
+        return self.X_scaled
+
+
+def get_project_root() -> str:
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.dirname(os.path.dirname(script_dir))
+
+
+def get_features_path() -> str:
+    return os.path.join(get_project_root(), 'data', 'processed', 'training_features.csv')
+
+
+def get_models_dir() -> str:
+    models_dir = os.path.join(get_project_root(), 'data', 'models')
+    os.makedirs(models_dir, exist_ok=True)
+    return models_dir
+
+
+def get_scaler_path(models_dir: Optional[str] = None, model_type: Optional[str] = None) -> str:
+    # Each family saves its own scaler, so retraining one family can't change how another's
+    # inputs are scaled. Without model_type this is the shared scaler.pkl older trainings wrote.
+    filename = FAMILY_SCALER_FILENAME_TEMPLATE.format(model_type=model_type) if model_type else SCALER_FILENAME
+    return os.path.join(models_dir or get_models_dir(), filename)
+
+
+def save_scaler(data: TrainingData, model_type: str, models_dir: Optional[str] = None) -> str:
+    data.scaled()
+    scaler_path = get_scaler_path(models_dir, model_type)
+    joblib.dump(data.scaler, scaler_path)
+    return scaler_path
+
+
+def load_scaler(model_type: str, models_dir: Optional[str] = None) -> Optional[StandardScaler]:
+    """The scaler model_type was trained with, falling back to the shared scaler.pkl of older trainings."""
+    for scaler_path in (get_scaler_path(models_dir, model_type), get_scaler_path(models_dir)):
+        if os.path.exists(scaler_path):
+            return joblib.load(scaler_path)
+    return None
+
+
+def save_imputation(data: TrainingData, models_dir: Optional[str] = None) -> str:
+    imputation_path = os.path.join(models_dir or get_models_dir(), IMPUTATION_FILENAME)
+    joblib.dump({
+        'feature_cols': data.feature_cols,
+        'league_means': data.league_means
+    }, imputation_path)
+    return imputation_path
+
+
+def load_imputation(models_dir: Optional[str] = None) -> Optional[Dict]:
+    imputation_path = os.path.join(models_dir or get_models_dir(), IMPUTATION_FILENAME)
+    if not os.path.exists(imputation_path):
+        return None
+    return joblib.load(imputation_path)
+
+
+def get_feature_schema_path(models_dir: Optional[str] = None) -> str:
+    return os.path.join(models_dir or get_models_dir(), FEATURE_SCHEMA_FILENAME)
+
+
+def load_feature_schema(models_dir: Optional[str] = None) -> Optional[List[str]]:
+    schema_path = get_feature_schema_path(models_dir)
+    if not os.path.exists(schema_path):
+        return None
+    with open(schema_path, 'r') as f:
+        return json.load(f)['features']
+
+
+def save_feature_schema(features: List[str], models_dir: Optional[str] = None, **metadata) -> str:
+    schema_path = get_feature_schema_path(models_dir)
+    with open(schema_path, 'w') as f:
+        json.dump({'features': list(features), **metadata}, f, indent=2)
+    return schema_path
+
+
+def load_ensemble_subsets(models_dir: Optional[str] = None) -> Optional[Dict[str, List[str]]]:
+    subsets_path = os.path.join(models_dir or get_models_dir(), ENSEMBLE_SUBSETS_FILENAME)
+    if not os.path.exists(subsets_path):
+        return None
+    with open(subsets_path, 'r') as f:
+        return json.load(f)['subsets']
+
+
+def save_ensemble_subsets(subsets: Dict[str, List[str]], models_dir: Optional[str] = None, **metadata) -> str:
+    subsets_path = os.path.join(models_dir or get_models_dir(), ENSEMBLE_SUBSETS_FILENAME)
+    with open(subsets_path, 'w') as f:
+        json.dump({'subsets': subsets, **metadata}, f, indent=2)
+    return subsets_path
+
+
+def save_target_artifacts(model_type: str, target_name: str, final_model, feature_names: List[str],
+                          avg_mae: float, models_dir: Optional[str] = None, save_model: bool = True) -> Dict[str, str]:
+    models_dir = models_dir or get_models_dir()
+
+    importance_df = pd.DataFrame({
+        'feature': feature_names,
+        'importance': final_model.feature_importances_
+    }).sort_values('importance', ascending=False)
+
+    paths = {
+        'importance': os.path.join(models_dir, f'feature_importance_{model_type}_{target_name}.csv'),
+        'model': os.path.join(models_dir, f'{model_type}_{target_name}.pkl'),
+        'mae': os.path.join(models_dir, f'{model_type}_{target_name}_mae.txt')
+    }
+
+    importance_df.to_csv(paths['importance'], index=False)
+    if save_model:
+        joblib.dump(final_model, paths['model'])
+    else:
+        del paths['model']
+    with open(paths['mae'], 'w') as f:
+        f.write(str(avg_mae))
+
+    return paths
+
+
+def load_training_features(features_path: Optional[str] = None) -> pd.DataFrame:
+    print("Loading features...")
+    df = pd.read_csv(features_path or get_features_path())
+    print(f"Loaded {len(df)} records\n")
+
+    df = df.dropna(subset=['points_l5', 'points_l10'])
+    print(f"After removing NaN: {len(df)} records\n")
+    return df
+
+
+def select_feature_cols(df: pd.DataFrame, feature_schema: Optional[List[str]] = None) -> List[str]:
+    feature_cols = [col for col in df.columns if any(x in col for x in FEATURE_PATTERNS)]
+    feature_cols = [col for col in feature_cols if 'team_id' not in col and 'player_id' not in col and 'game_id' not in col]
+    feature_cols = [col for col in feature_cols if col not in RAW_LEAKAGE_COLS]
+    if feature_schema is not None:
+        schema = set(feature_schema)
+        feature_cols = [col for col in feature_cols if col in schema]
+    return feature_cols
+
+
+def _is_league_fill(col: str) -> bool:
+    return 'team' in col or 'opp' in col or 'pace' in col
+
+
+def _is_zero_fill(col: str) -> bool:
+    return col.startswith('is_') or col.startswith('position_') or 'trend' in col or col in ZERO_FILL_COLS
+
+
+def compute_league_means(df: pd.DataFrame, feature_cols: List[str]) -> Dict[str, float]:
+    league_means = {}
+    for col in feature_cols:
+        if col not in df.columns:
+            continue
+        if _is_league_fill(col):
+            league_means[col] = df[col].mean()
+        elif _is_zero_fill(col):
+            league_means[col] = 0
+        else:
+            league_means[col] = df[col].mean()
+    return league_means
+
+
+def compute_prior_player_means(df: pd.DataFrame, cols: List[str]) -> pd.DataFrame:
+    # Equivalent to groupby('player_id')[col].transform(lambda x: x.expanding().mean().shift(1))
+    # for every column at once: exclusive grouped cumulative sums divided by exclusive counts.
+    values = df[cols].to_numpy(dtype=float)
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+
+    groups = df['player_id'].to_numpy()
+    sums = pd.DataFrame(filled, index=df.index).groupby(groups).cumsum().to_numpy() - filled
+    counts = pd.DataFrame(present.astype(np.int64), index=df.index).groupby(groups).cumsum().to_numpy() - present
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+    return pd.DataFrame(means, columns=cols, index=df.index)
+
+
+def impute_features(df: pd.DataFrame, feature_cols: List[str], league_means: Dict[str, float]) -> pd.DataFrame:
+    X = df[feature_cols].copy()
+
+    direct_fill = [col for col in feature_cols if _is_league_fill(col) or _is_zero_fill(col)]
+    player_fill = [col for col in feature_cols if col not in direct_fill]
+
+    if direct_fill:
+        X[direct_fill] = X[direct_fill].fillna({col: league_means.get(col, 0) for col in direct_fill})
+
+    if player_fill:
+        player_means = compute_prior_player_means(df, player_fill)
+        player_means = player_means.fillna({col: league_means.get(col, 0) for col in player_fill})
+        X[player_fill] = X[player_fill].fillna(player_means)
+
+    return X.fillna(0)
+
+
+def get_imputed_cache_path(features_path: Optional[str] = None) -> str:
+    features_path = features_path or get_features_path()
+    return os.path.join(os.path.dirname(features_path), IMPUTED_CACHE_FILENAME)
+
+
+def _source_signature(features_path: str) -> Dict:
+    stat = os.stat(features_path)
+    return {
+        'path': os.path.abspath(features_path),
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size
+    }
+
+
+def load_imputed_features(df: pd.DataFrame, feature_cols: List[str],
+                          features_path: Optional[str] = None) -> Optional[Tuple[pd.DataFrame, Dict[str, float]]]:
+    features_path = features_path or get_features_path()
+    cache_path = get_imputed_cache_path(features_path)
+    if not os.path.exists(cache_path):
+        return None
+
+    try:
+        cached = joblib.load(cache_path)
+    except Exception as e:
+        print(f"Warning: Could not read imputation cache {cache_path}: {e}")
+        return None
+
+    if cached.get('signature') != _source_signature(features_path):
+        return None
+    if cached.get('feature_cols') != feature_cols or not cached['X'].index.equals(df.index):
+        return None
+
+    return cached['X'], cached['league_means']
+
+
+def save_imputed_features(X: pd.DataFrame, feature_cols: List[str], league_means: Dict[str, float],
+                          features_path: Optional[str] = None) -> str:
+    features_path = features_path or get_features_path()
+    cache_path = get_imputed_cache_path(features_path)
+    joblib.dump({
+        'signature': _source_signature(features_path),
+        'feature_cols': feature_cols,
+        'league_means': league_means,
+        'X': X
+    }, cache_path)
+    return cache_path
+
+
+def create_season_splits(df: pd.DataFrame) -> List[Tuple[np.ndarray, np.ndarray]]:
+    unique_seasons = sorted(df['season'].unique())
+
+    if len(unique_seasons) <= 2:
+        tscv = TimeSeriesSplit(n_splits=3)
+        return list(tscv.split(df))
+
+    split_indices = []
+    for i, test_season in enumerate(unique_seasons[2:], start=2):
+        train_seasons = unique_seasons[:i]
+        train_idx = np.where(df['season'].isin(train_seasons))[0]
+        val_idx = np.where(df['season'] == test_season)[0]
+        if len(train_idx) > 0 and len(val_idx) > 0:
+            split_indices.append((train_idx, val_idx))
+
+    return split_indices
+
+
+def prepare_training_data(features_path: Optional[str] = None, use_cache: bool = True,
+                          use_schema: bool = True) -> TrainingData:
+    features_path = features_path or get_features_path()
+    df = load_training_features(features_path)
+    # Imputation is per column, so the cache always holds the full feature set and
+    # a pruned schema only selects from it.
+    feature_cols = select_feature_cols(df)
+
+    cached = load_imputed_features(df, feature_cols, features_path) if use_cache else None
+    if cached is not None:
+        print(f"Using cached imputed features: {get_imputed_cache_path(features_path)}")
+        X, league_means = cached
+    else:
+        print("Calculating imputation values for NaN handling...")
+        league_means = compute_league_means(df, feature_cols)
+        X = impute_features(df, feature_cols, league_means)
+        if use_cache:
+            cache_path = save_imputed_features(X, feature_cols, league_means, features_path)
+            print(f"Saved imputed features cache: {cache_path}")
+
+    feature_schema = load_feature_schema() if use_schema else None
+    if feature_schema is not None:
+        feature_cols = select_feature_cols(df, feature_schema)
+        X = X[feature_cols]
+        league_means = {col: league_means[col] for col in feature_cols if col in league_means}
+        print(f"Using pruned feature schema: {get_feature_schema_path()}")
+
+    split_indices = create_season_splits(df)
+    print(f"Prepared {len(feature_cols)} features and {len(split_indices)} season CV folds\n")
+
+    return TrainingData(
+        df=df,
+        X=X,
+        feature_cols=feature_cols,
+        league_means=league_means,
+        split_indices=split_indices
+    )
@@ -3,18 +3,19 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import optuna
 import numpy as np
-import pandas as pd
 from xgboost import XGBRegressor
 from lightgbm import LGBMRegressor
 from catboost import CatBoostRegressor
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error
-from sklearn.preprocessing import StandardScaler
 import joblib
 import json
 from pathlib import Path
 import warnings
 warnings.filterwarnings('ignore')
+from training_data import prepare_training_data
+from parallel_training import plan_cpu_budget
+from fold_datasets import NATIVE_FAMILIES, array_digest, build_fold_datasets, fit_predict_native
 
 def create_cv_splits(df):
     unique_seasons = sorted(df['season'].unique())
@@ -38,7 +39,7 @@ def create_cv_splits(df):
     
     return split_indices
 
-def create_objective(model_type, X, y, split_indices, target_name):
+def create_objective(model_type, X, y, split_indices, target_name, fold_datasets=None):
     def objective(trial):
         if model_type == 'xgboost':
             params = {
@@ -93,6 +94,7 @@ def create_objective(model_type, X, y, split_indices, target_name):
                 'colsample_bylevel': trial.suggest_float('colsample_bylevel', 0.6, 1.0),
                 'reg_lambda': trial.suggest_float('reg_lambda', 0, 10.0),
                 'random_state': 42,
+                'thread_count': 1,
                 'verbose': False
             }
             
@@ -117,40 +119,132 @@ def create_objective(model_type, X, y, split_indices, target_name):
             model = RandomForestRegressor(**params)
         
         fold_maes = []
-        for train_idx, val_idx in split_indices:
-            X_fold_train = X.iloc[train_idx]
-            X_fold_val = X.iloc[val_idx]
-            y_fold_train = y.iloc[train_idx]
-            y_fold_val = y.iloc[val_idx]
-            
-            model.fit(X_fold_train, y_fold_train)
-            y_pred = model.predict(X_fold_val)
-            mae = mean_absolute_error(y_fold_val, y_pred)
+        for step, (train_idx, val_idx) in enumerate(split_indices):
+            if fold_datasets:
+                fold_dataset = fold_datasets[step]
+                y_pred = fit_predict_native(model_type, params, fold_dataset)
+                mae = mean_absolute_error(fold_dataset.y_val, y_pred)
+            else:
+                X_fold_train = X.iloc[train_idx]
+                X_fold_val = X.iloc[val_idx]
+                y_fold_train = y.iloc[train_idx]
+                y_fold_val = y.iloc[val_idx]
+                
+                model.fit(X_fold_train, y_fold_train)
+                y_pred = model.predict(X_fold_val)
+                mae = mean_absolute_error(y_fold_val, y_pred)
             fold_maes.append(mae)
+            
+            # Every trial sees the folds in the same season order, so the running mean
+            # after fold k is comparable across trials and the pruner can stop early.
+            trial.report(np.mean(fold_maes), step)
+            if trial.should_prune():
+                raise optuna.TrialPruned()
         
         return np.mean(fold_maes)
     
     return objective
 
-def tune_model(model_type, target_name, X, y, split_indices, n_trials=30):
+def get_default_storage():
+    params_dir = Path('data/models/best_params')
+    params_dir.mkdir(parents=True, exist_ok=True)
+    return str(params_dir / 'optuna_journal.log')
+
+def open_study_storage(storage_spec):
+    if '://' in storage_spec:
+        return storage_spec
+    
+    try:
+        from optuna.storages.journal import JournalFileBackend
+    except ImportError:
+        from optuna.storages import JournalFileStorage as JournalFileBackend
+    return optuna.storages.JournalStorage(JournalFileBackend(storage_spec))
+
+def create_pruner(pruner_name):
+    if pruner_name == 'median':
+        return optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=0)
+    if pruner_name == 'halving':
+        return optuna.pruners.SuccessiveHalvingPruner()
+    return optuna.pruners.NopPruner()
+
+def get_study_name(model_type, target_name, X, y, split_indices, X_digest=None):
+    # Studies are keyed on the data they were tuned on: after features or rows change, a re-run
+    # starts a new study instead of resuming one whose trials (and best params) are stale.
+    X_digest = X_digest or array_digest(X.to_numpy(dtype=np.float32))
+    data_digest = array_digest(np.frombuffer(X_digest.encode(), dtype=np.uint8),
+                               y.to_numpy(dtype=np.float32),
+                               *[idx for split in split_indices for idx in split])
+    return f"{model_type}_{target_name}_{data_digest[:12]}"
+
+def _optimize_worker(study_name, storage_spec, pruner_name, model_type, X, y, split_indices, target_name,
+                     fold_datasets, n_trials):
+    warnings.filterwarnings('ignore')
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    
+    study = optuna.load_study(
+        study_name=study_name,
+        storage=open_study_storage(storage_spec),
+        pruner=create_pruner(pruner_name)
+    )
+    objective = create_objective(model_type, X, y, split_indices, target_name, fold_datasets)
+    
+    # The trial budget is shared through storage, so resumed runs and parallel
+    # workers stop once n_trials have finished in total.
+    finished = (optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED)
+    study.optimize(
+        objective,
+        n_trials=n_trials,
+        callbacks=[optuna.study.MaxTrialsCallback(n_trials, states=finished)]
+    )
+
+def tune_model(model_type, target_name, X, y, split_indices, n_trials=30, n_jobs=8, use_dataset_cache=True,
+               X_digest=None, storage=None, pruner='median', fresh=False):
     print(f"\n{'='*70}")
     print(f"Tuning {model_type} for {target_name}")
     print(f"{'='*70}")
-    print(f"Running {n_trials} trials with {len(split_indices)}-fold season-aware CV")
     
-    objective = create_objective(model_type, X, y, split_indices, target_name)
+    fold_datasets = None
+    if use_dataset_cache and model_type in NATIVE_FAMILIES:
+        fold_datasets = build_fold_datasets(model_type, target_name, X, y, split_indices, X_digest=X_digest)
+    
+    storage_spec = storage or get_default_storage()
+    study_name = get_study_name(model_type, target_name, X, y, split_indices, X_digest)
+    
+    if fresh:
+        try:
+            optuna.delete_study(study_name=study_name, storage=open_study_storage(storage_spec))
+        except KeyError:
+            pass
     
     study = optuna.create_study(
         direction='minimize',
-        study_name=f"{model_type}_{target_name}"
+        study_name=study_name,
+        storage=open_study_storage(storage_spec),
+        pruner=create_pruner(pruner),
+        load_if_exists=True
     )
     
-    study.optimize(
-        objective,
-        n_trials=n_trials,
-        n_jobs=8,
-        show_progress_bar=True
-    )
+    finished = [t for t in study.trials if t.state in (optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED)]
+    remaining = max(0, n_trials - len(finished))
+    workers = max(1, min(n_jobs, remaining))
+    print(f"Running {remaining} of {n_trials} trials with {len(split_indices)}-fold season-aware CV "
+          f"({workers} worker processes, {pruner} pruner, {len(finished)} already finished)")
+    print(f"Study: {study_name} (storage: {storage_spec})")
+    
+    if remaining > 0:
+        worker_args = (study_name, storage_spec, pruner, model_type, X, y, split_indices, target_name,
+                       fold_datasets, n_trials)
+        if workers == 1:
+            _optimize_worker(*worker_args)
+        else:
+            joblib.Parallel(n_jobs=workers, backend='loky')(
+                joblib.delayed(_optimize_worker)(*worker_args) for _ in range(workers)
+            )
+    
+    study = optuna.load_study(study_name=study_name, storage=open_study_storage(storage_spec))
+    states = [t.state for t in study.trials]
+    print(f"\nTrials: {states.count(optuna.trial.TrialState.COMPLETE)} complete, "
+          f"{states.count(optuna.trial.TrialState.PRUNED)} pruned")
     
     print(f"\nBest MAE: {study.best_value:.4f}")
     print(f"Best parameters:")
@@ -181,72 +275,33 @@ def main():
                        default=['points', 'rebounds_total', 'assists', 'steals', 
                                'blocks', 'turnovers', 'three_pointers_made'],
                        help='Stats to tune for')
+    parser.add_argument('--cpu-budget', type=int, default=None,
+                       help='Total CPUs to use; each trial fits single-threaded models (default: all)')
+    parser.add_argument('--no-dataset-cache', action='store_true',
+                       help='Fit on pandas folds instead of cached native fold datasets')
+    parser.add_argument('--pruner', choices=['median', 'halving', 'none'], default='median',
+                       help='Stop unpromising trials after each season fold')
+    parser.add_argument('--storage', default=None,
+                       help='Optuna storage: journal file path or database URL '
+                            '(default: data/models/best_params/optuna_journal.log)')
+    parser.add_argument('--fresh', action='store_true',
+                       help='Discard existing studies for the current data instead of resuming them')
     
     args = parser.parse_args()
     
     print("Loading training features...")
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(os.path.dirname(script_dir))
-    features_path = os.path.join(project_root, 'data', 'processed', 'training_features.csv')
-    df = pd.read_csv(features_path)
-    
-    df = df.dropna(subset=['points_l5', 'points_l10'])
-    print(f"Loaded {len(df)} records\n")
-    
-    feature_cols = [col for col in df.columns if any(x in col for x in 
-        ['_l5', '_l10', '_l20', '_weighted', 'is_', 'days_rest', 'games_played',
-         'offensive_rating', 'defensive_rating', 'net_rating', 'pace', 'opp_',
-         'altitude', 'playoff', 'star_teammate', 'games_without_star',
-         'usage_rate', 'minutes_played', 'minutes_trend', 'per_36',
-         '_pct', '_ratio', 'pts_per', 'ast_to', 'reb_rate', 'position_'])]
-    
-    feature_cols = [col for col in feature_cols 
-                    if 'team_id' not in col and 'player_id' not in col and 'game_id' not in col]
-    
-    raw_leakage_cols = ['offensive_rating', 'defensive_rating', 'usage_rate', 'true_shooting_pct',
-                        'points', 'rebounds_total', 'assists', 'steals', 'blocks', 'turnovers',
-                        'three_pointers_made', 'minutes_played', 'is_starter', 'field_goals_made',
-                        'field_goals_attempted', 'three_pointers_attempted', 'free_throws_made',
-                        'free_throws_attempted']
-    feature_cols = [col for col in feature_cols if col not in raw_leakage_cols]
-    
-    print("Calculating imputation values for NaN handling...")
-    league_means = {}
-    for col in feature_cols:
-        if col in df.columns:
-            if 'team' in col or 'opp' in col or 'pace' in col:
-                league_means[col] = df[col].mean()
-            elif col.startswith('is_') or col.startswith('position_'):
-                league_means[col] = 0
-            elif 'trend' in col:
-                league_means[col] = 0
-            else:
-                league_means[col] = df[col].mean()
-    
-    X = df[feature_cols].copy()
-    player_means = {}
-    for col in feature_cols:
-        if col in X.columns:
-            if 'team' in col or 'opp' in col or 'pace' in col:
-                X[col] = X[col].fillna(league_means.get(col, 0))
-            elif col.startswith('is_') or col.startswith('position_') or 'trend' in col:
-                X[col] = X[col].fillna(league_means.get(col, 0))
-            else:
-                if col not in player_means:
-                    player_means[col] = df.groupby('player_id')[col].transform(
-                        lambda x: x.expanding().mean().shift(1)
-                    ).fillna(league_means.get(col, 0))
-                X[col] = X[col].fillna(player_means[col])
-    
-    X = X.fillna(0)
+    data = prepare_training_data()
+    df = data.df
     
     print("Creating season-aware CV splits...")
     split_indices = create_cv_splits(df)
     print(f"Created {len(split_indices)} CV folds\n")
     
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
-    X_scaled = pd.DataFrame(X_scaled, columns=X.columns, index=X.index)
+    X_scaled = data.scaled()
+    
+    # Trial models are pinned to one thread, so the whole budget goes to worker processes.
+    n_jobs, _ = plan_cpu_budget(args.n_trials, args.cpu_budget)
+    X_digest = array_digest(X_scaled.to_numpy(dtype=np.float32))
     
     results = {}
     
@@ -257,7 +312,9 @@ def main():
             y = df[target_name]
             
             best_params, best_value = tune_model(
-                model_type, target_name, X_scaled, y, split_indices, args.n_trials
+                model_type, target_name, X_scaled, y, split_indices, args.n_trials, n_jobs,
+                use_dataset_cache=not args.no_dataset_cache, X_digest=X_digest,
+                storage=args.storage, pruner=args.pruner, fresh=args.fresh
             )
             
             results[model_type][target_name] = {
@@ -0,0 +1,309 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# RUN THIS (after yesterday's games are collected):
+# python src/models/update_models.py
+# or (if you already built features):
+# python src/models/update_models.py --skip-features
+# To let a due full retrain (schedule, drift, changed features) run instead of skipping the update:
+# python src/models/update_models.py --allow-full-retrain
+# To force the fallback full retrain:
+# python src/models/update_models.py --full-retrain
+
+import json
+import subprocess
+import numpy as np
+import pandas as pd
+import joblib
+from datetime import datetime, date
+from sklearn.metrics import mean_absolute_error
+
+import warnings
+warnings.filterwarnings('ignore', category=FutureWarning)
+from training_data import (TARGETS, get_models_dir, load_scaler, load_imputation, load_training_features,
+                           load_feature_schema, select_feature_cols, compute_league_means, impute_features)
+from model_bundle import save_model_bundle
+from profiling import profiled, mark, start_run, add_profile_argument
+
+UPDATE_STATE_FILENAME = 'update_state.json'
+
+# Boosted families can append trees to an existing model; Random Forest keeps its last full fit.
+WARM_START_FAMILIES = ('xgboost', 'lightgbm', 'catboost')
+
+UPDATE_ROUNDS = 10
+MIN_NEW_ROWS = 50
+FULL_RETRAIN_DAYS = 7
+DRIFT_THRESHOLD = 1.15
+
+
+def get_update_state_path(models_dir=None):
+    return os.path.join(models_dir or get_models_dir(), UPDATE_STATE_FILENAME)
+
+
+def load_update_state(models_dir=None):
+    state_path = get_update_state_path(models_dir)
+    if not os.path.exists(state_path):
+        return None
+    with open(state_path, 'r') as f:
+        return json.load(f)
+
+
+def save_update_state(state, models_dir=None):
+    state_path = get_update_state_path(models_dir)
+    with open(state_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    return state_path
+
+
+def record_full_train(df, models_dir=None):
+    today = date.today().isoformat()
+    state = {
+        'last_full_train': today,
+        'last_update': today,
+        'last_game_date': str(pd.to_datetime(df['game_date']).max().date()),
+        'updates_since_full': 0,
+        'rows_since_full': 0
+    }
+    save_update_state(state, models_dir)
+    return state
+
+
+def prepare_new_rows(df, last_game_date, imputation):
+    feature_cols = imputation['feature_cols']
+    league_means = imputation['league_means']
+
+    # Player means need each player's history, so impute over all rows with the
+    # league means frozen at the last full train, then keep only the new games.
+    X_all = impute_features(df, feature_cols, league_means)
+    new_mask = (pd.to_datetime(df['game_date']) > pd.to_datetime(last_game_date)).to_numpy()
+    return df[new_mask], X_all[new_mask]
+
+
+def scale_new_rows(X_new, scaler):
+    X_new = X_new[list(scaler.feature_names_in_)]
+    return pd.DataFrame(scaler.transform(X_new), columns=X_new.columns, index=X_new.index)
+
+
+def warm_start_model(model_type, model, X_new, y_new, rounds=UPDATE_ROUNDS):
+    params = model.get_params()
+
+    if model_type == 'xgboost':
+        import xgboost as xgb
+        params['n_estimators'] = rounds
+        params['early_stopping_rounds'] = None
+        updated = xgb.XGBRegressor(**params)
+        updated.fit(X_new, y_new, xgb_model=model.get_booster(), verbose=False)
+        return updated
+
+    if model_type == 'lightgbm':
+        import lightgbm as lgb
+        params['n_estimators'] = rounds
+        updated = lgb.LGBMRegressor(**params)
+        updated.fit(X_new, y_new, init_model=model.booster_)
+        return updated
+
+    if model_type == 'catboost':
+        from catboost import CatBoostRegressor
+        params['iterations'] = rounds
+        updated = CatBoostRegressor(**params)
+        updated.fit(X_new, y_new, init_model=model)
+        return updated
+
+    raise ValueError(f"Warm-start not supported for {model_type}")
+
+
+def load_cv_mae(models_dir, model_type, target_name):
+    mae_path = os.path.join(models_dir, f'{model_type}_{target_name}_mae.txt')
+    if not os.path.exists(mae_path):
+        return None
+    with open(mae_path, 'r') as f:
+        return float(f.read().strip())
+
+
+def measure_drift(models, X_new_by_family, df_new, models_dir):
+    """Ratio of each model's MAE on the new games to its cross-validated MAE."""
+    ratios = {}
+    for (model_type, target_name), model in models.items():
+        cv_mae = load_cv_mae(models_dir, model_type, target_name)
+        if not cv_mae:
+            continue
+        y_new = df_new[TARGETS[target_name]]
+        new_mae = mean_absolute_error(y_new, model.predict(X_new_by_family[model_type]))
+        ratios[(model_type, target_name)] = new_mae / cv_mae
+    return ratios
+
+
+def get_full_retrain_reason(state, drift_ratios, full_retrain_days=FULL_RETRAIN_DAYS,
+                            drift_threshold=DRIFT_THRESHOLD):
+    if state is None:
+        return "no update state (models have not been fully trained with train_all_models.py)"
+
+    days_since_full = (date.today() - date.fromisoformat(state['last_full_train'])).days
+    if days_since_full >= full_retrain_days:
+        return f"last full retrain was {days_since_full} days ago (schedule: every {full_retrain_days} days)"
+
+    if drift_ratios:
+        mean_ratio = float(np.mean(list(drift_ratios.values())))
+        if mean_ratio > drift_threshold:
+            return f"MAE on new games is {mean_ratio:.2f}x the CV MAE (threshold {drift_threshold:.2f}x)"
+
+    return None
+
+
+def run_full_retrain(use_tuned_params=False):
+    from train_all_models import train_all_models
+    return train_all_models(build_features_first=False, use_tuned_params=use_tuned_params)
+
+
+def fall_back_to_full_retrain(reason, allow_full_retrain, use_tuned_params=False):
+    """Run the full retrain for reason, or skip the update when full retrains weren't allowed."""
+    if not allow_full_retrain:
+        print(f"Full retrain needed: {reason}")
+        print("Skipping update (run train_all_models.py or update_models.py --allow-full-retrain)")
+        return True
+    print(f"Falling back to full retrain: {reason}\n")
+    return run_full_retrain(use_tuned_params)
+
+
+@profiled('update_models')
+def update_models(build_features_first=True, rounds=UPDATE_ROUNDS, min_new_rows=MIN_NEW_ROWS,
+                  full_retrain_days=FULL_RETRAIN_DAYS, drift_threshold=DRIFT_THRESHOLD,
+                  force_full_retrain=False, allow_full_retrain=False, use_tuned_params=False):
+    print("="*70)
+    print("UPDATING MODELS")
+    print("="*70)
+    print(f"Started at: {datetime.now()}\n")
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(os.path.dirname(script_dir))
+    models_dir = get_models_dir()
+    state = load_update_state(models_dir)
+
+    # Without a full train to start from there is nothing to warm-start, and a retrain of every
+    # model is too expensive to trigger implicitly; it only runs when asked for with --full-retrain.
+    if state is None and not force_full_retrain:
+        print(f"Skipping update: {get_full_retrain_reason(state, None)}")
+        print("Run train_all_models.py (or update_models.py --full-retrain) first")
+        return True
+
+    if build_features_first:
+        mark('build_features')
+        print("Building training features...\n")
+        features_script = os.path.join(project_root, 'src', 'feature_engineering', 'build_features.py')
+        result = subprocess.run([sys.executable, '-u', features_script], text=True)
+        if result.returncode != 0:
+            print("\nERROR: Feature building failed!")
+            return False
+
+    if force_full_retrain:
+        print("Full retrain requested\n")
+        return run_full_retrain(use_tuned_params)
+
+    mark('load_features')
+    # Each family's new rows are scaled with the scaler it was trained with.
+    scalers = {model_type: load_scaler(model_type, models_dir) for model_type in WARM_START_FAMILIES}
+    scalers = {model_type: scaler for model_type, scaler in scalers.items() if scaler is not None}
+    if not scalers:
+        return fall_back_to_full_retrain("no scaler found for the boosted models", allow_full_retrain,
+                                         use_tuned_params)
+
+    df = load_training_features()
+    feature_schema = load_feature_schema(models_dir)
+    imputation = load_imputation(models_dir)
+    if imputation is None:
+        history = df[pd.to_datetime(df['game_date']) <= pd.to_datetime(state['last_game_date'])]
+        feature_cols = select_feature_cols(history, feature_schema)
+        imputation = {'feature_cols': feature_cols, 'league_means': compute_league_means(history, feature_cols)}
+
+    feature_cols = set(select_feature_cols(df, feature_schema))
+    if any(feature_cols != set(scaler.feature_names_in_) for scaler in scalers.values()):
+        return fall_back_to_full_retrain("feature columns changed since the last full train",
+                                         allow_full_retrain, use_tuned_params)
+
+    df_new, X_new = prepare_new_rows(df, state['last_game_date'], imputation)
+    X_new_by_family = {model_type: scale_new_rows(X_new, scaler) for model_type, scaler in scalers.items()}
+    print(f"New games since {state['last_game_date']}: {len(df_new)} player rows")
+
+    mark('drift')
+    models = {}
+    for model_type in scalers:
+        for target_name in TARGETS:
+            model_path = os.path.join(models_dir, f'{model_type}_{target_name}.pkl')
+            if os.path.exists(model_path):
+                models[(model_type, target_name)] = joblib.load(model_path)
+
+    drift_ratios = measure_drift(models, X_new_by_family, df_new, models_dir) if len(df_new) > 0 else {}
+    if drift_ratios:
+        print("\nMAE on new games vs CV MAE:")
+        for (model_type, target_name), ratio in sorted(drift_ratios.items()):
+            print(f"  {model_type}-{target_name}: {ratio:.2f}x")
+
+    reason = get_full_retrain_reason(state, drift_ratios, full_retrain_days, drift_threshold)
+    if reason:
+        print()
+        return fall_back_to_full_retrain(reason, allow_full_retrain, use_tuned_params)
+
+    if len(df_new) < min_new_rows:
+        print(f"\nOnly {len(df_new)} new rows (minimum {min_new_rows}), skipping update")
+        return True
+
+    mark('warm_start')
+    print(f"\nAppending {rounds} rounds to {len(models)} models...")
+    for (model_type, target_name), model in models.items():
+        y_new = df_new[TARGETS[target_name]]
+        updated = warm_start_model(model_type, model, X_new_by_family[model_type], y_new, rounds)
+        joblib.dump(updated, os.path.join(models_dir, f'{model_type}_{target_name}.pkl'))
+        print(f"  Updated {model_type}-{target_name}")
+
+    for model_type in sorted({model_type for model_type, _ in models}):
+        save_model_bundle(model_type, models_dir)
+
+    state['last_update'] = date.today().isoformat()
+    state['last_game_date'] = str(pd.to_datetime(df_new['game_date']).max().date())
+    state['updates_since_full'] += 1
+    state['rows_since_full'] += len(df_new)
+    save_update_state(state, models_dir)
+
+    print("\n" + "="*70)
+    print(f"MODELS UPDATED THROUGH {state['last_game_date']}")
+    print("="*70)
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Warm-start boosted models on games since the last update')
+    parser.add_argument('--skip-features', action='store_true',
+                       help='Skip building features (assumes features already exist)')
+    parser.add_argument('--rounds', type=int, default=UPDATE_ROUNDS,
+                       help='Boosting rounds to append per model')
+    parser.add_argument('--min-new-rows', type=int, default=MIN_NEW_ROWS,
+                       help='Skip the update when fewer new player rows are available')
+    parser.add_argument('--full-retrain-days', type=int, default=FULL_RETRAIN_DAYS,
+                       help='Fall back to a full retrain when the last one is this many days old')
+    parser.add_argument('--drift-threshold', type=float, default=DRIFT_THRESHOLD,
+                       help='Fall back to a full retrain when new-game MAE exceeds CV MAE by this ratio')
+    parser.add_argument('--allow-full-retrain', action='store_true',
+                       help='Run the full retrain when one is due (schedule, drift, changed features) '
+                            'instead of skipping the update')
+    parser.add_argument('--full-retrain', action='store_true',
+                       help='Run a full retrain instead of an update')
+    parser.add_argument('--use-tuned-params', action='store_true',
+                       help='Use tuned hyperparameters if a full retrain runs')
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    start_run('update_models', profile=args.profile or None)
+
+    success = update_models(
+        build_features_first=not args.skip_features,
+        rounds=args.rounds,
+        min_new_rows=args.min_new_rows,
+        full_retrain_days=args.full_retrain_days,
+        drift_threshold=args.drift_threshold,
+        force_full_retrain=args.full_retrain,
+        allow_full_retrain=args.allow_full_retrain,
+        use_tuned_params=args.use_tuned_params
+    )
+    sys.exit(0 if success else 1)
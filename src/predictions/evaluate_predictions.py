@@ -1,7 +1,9 @@
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from data_collection.utils import get_db_connection, ensure_connection
+from data_collection.utils import get_db_connection
+from predictions.prediction_metrics import refresh_prediction_metrics
+from profiling import profiled, stage, start_run, add_profile_argument
 import pandas as pd
 from datetime import datetime, timedelta
 
@@ -9,217 +11,200 @@ import warnings
 warnings.filterwarnings('ignore', message='pandas only supports SQLAlchemy')
 warnings.filterwarnings('ignore', category=FutureWarning)
 
-def evaluate_predictions(target_date=None):
+# RUN THIS (evaluates yesterday's predictions):
+# python src/predictions/evaluate_predictions.py
+# One date:
+# python src/predictions/evaluate_predictions.py 2024-12-15
+# Backfill a range:
+# python src/predictions/evaluate_predictions.py --from 2024-11-01 --to 2024-12-15
+
+# (prediction column, player_game_stats column, actual column) for each evaluated stat
+EVALUATED_STATS = [
+    ('predicted_points', 'points', 'actual_points'),
+    ('predicted_rebounds', 'rebounds_total', 'actual_rebounds'),
+    ('predicted_assists', 'assists', 'actual_assists'),
+    ('predicted_steals', 'steals', 'actual_steals'),
+    ('predicted_blocks', 'blocks', 'actual_blocks'),
+    ('predicted_turnovers', 'turnovers', 'actual_turnovers'),
+    ('predicted_three_pointers_made', 'three_pointers_made', 'actual_three_pointers_made'),
+]
+
+# Matches a prediction to its completed game's box score. Predictions are made for the date of
+# the game, so the range is on prediction_date; end is exclusive (the day after --to).
+MATCHED_PREDICTIONS = """
+    p.prediction_date >= %s
+    AND p.prediction_date < %s
+    AND p.model_version IS NOT NULL
+    AND s.game_id = p.game_id
+    AND s.player_id = p.player_id
+    AND g.game_id = p.game_id
+    AND g.game_status = 'completed'
+"""
+
+
+def _parse_date(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    return value
+
+
+def update_actuals(cur, start_date, end_date) -> int:
+    """Fill actual_* and prediction_error for every prediction in [start_date, end_date] in one statement.
+
+    prediction_error is the mean absolute error over the seven stats, rounded to 2 decimals.
+    """
+    set_actuals = ',\n        '.join(f"{actual} = s.{stat}" for _, stat, actual in EVALUATED_STATS)
+    abs_errors = ' + '.join(f"ABS(p.{predicted} - s.{stat})" for predicted, stat, _ in EVALUATED_STATS)
+    cur.execute(f"""
+        UPDATE predictions AS p SET
+        {set_actuals},
+        prediction_error = ROUND(({abs_errors}) / 7.0, 2)
+        FROM player_game_stats s, games g
+        WHERE {MATCHED_PREDICTIONS}
+    """, (start_date, end_date + timedelta(days=1)))
+    return cur.rowcount
+
+
+def count_unmatched(cur, start_date, end_date) -> int:
+    """Predictions for completed games with no box score for the player (did not play)."""
+    cur.execute("""
+        SELECT COUNT(*)
+        FROM predictions p
+        JOIN games g ON p.game_id = g.game_id
+        WHERE p.prediction_date >= %s
+        AND p.prediction_date < %s
+        AND p.model_version IS NOT NULL
+        AND g.game_status = 'completed'
+        AND NOT EXISTS (
+            SELECT 1 FROM player_game_stats s
+            WHERE s.game_id = p.game_id AND s.player_id = p.player_id
+        )
+    """, (start_date, end_date + timedelta(days=1)))
+    return cur.fetchone()[0]
+
+
+def fetch_metrics(cur, start_date, end_date):
+    mae_columns = ',\n            '.join(f"AVG(ABS({predicted} - {actual}))"
+                                         for predicted, _, actual in EVALUATED_STATS)
+    cur.execute(f"""
+        SELECT
+            model_version,
+            COUNT(*),
+            COUNT(DISTINCT prediction_date),
+            {mae_columns},
+            AVG(prediction_error)
+        FROM predictions
+        WHERE prediction_date >= %s
+        AND prediction_date < %s
+        AND model_version IS NOT NULL
+        AND actual_points IS NOT NULL
+        GROUP BY model_version
+    """, (start_date, end_date + timedelta(days=1)))
+
+    all_metrics = {}
+    for row in cur.fetchall():
+        model_version, n_predictions, n_dates = row[0], row[1], row[2]
+        values = [float(v) if v is not None else None for v in row[3:]]
+        all_metrics[model_version] = {
+            'predictions': n_predictions,
+            'dates': n_dates,
+            'points': values[0],
+            'rebounds': values[1],
+            'assists': values[2],
+            'steals': values[3],
+            'blocks': values[4],
+            'turnovers': values[5],
+            'three_pointers': values[6],
+            'overall': values[7]
+        }
+    return all_metrics
+
+
+@profiled('evaluate_predictions')
+def evaluate_predictions(target_date=None, end_date=None):
+    """Evaluate one date (default: yesterday), or every date from target_date through end_date."""
     print("Evaluating prediction accuracy...\n")
-    
+
     if target_date is None:
         target_date = (datetime.now() - timedelta(days=1)).date()
+    start_date = _parse_date(target_date)
+    end_date = _parse_date(end_date) or start_date
+    if end_date < start_date:
+        raise ValueError(f"--to ({end_date}) is before --from ({start_date})")
+
+    if start_date == end_date:
+        print(f"Evaluating predictions for: {start_date}\n")
     else:
-        target_date = datetime.strptime(target_date, '%Y-%m-%d').date()
-    
-    print(f"Evaluating predictions for: {target_date}\n")
-    
+        print(f"Evaluating predictions from {start_date} to {end_date}\n")
+
     conn = get_db_connection()
     cur = conn.cursor()
-    
-    cur.execute("""
-        SELECT DISTINCT model_version
-        FROM predictions
-        WHERE prediction_date = %s
-        AND model_version IS NOT NULL
-    """, (target_date,))
-    
-    model_versions = [row[0] for row in cur.fetchall()]
-    
-    if len(model_versions) == 0:
-        print(f"No predictions found for {target_date}")
-        cur.close()
-        conn.close()
-        return
-    
-    print(f"Found models to evaluate: {', '.join(model_versions)}\n")
-    
-    all_metrics = {}
-    
-    for model_version in model_versions:
-        print(f"{'='*50}")
-        print(f"Evaluating: {model_version.upper()}")
-        print(f"{'='*50}\n")
-        
-        conn, cur = ensure_connection(conn, cur)
-        
-        cur.execute("""
-            SELECT 
-                p.prediction_id,
-                p.game_id,
-                p.player_id,
-                p.predicted_points,
-                p.predicted_rebounds,
-                p.predicted_assists,
-                p.predicted_steals,
-                p.predicted_blocks,
-                p.predicted_turnovers,
-                p.predicted_three_pointers_made
-            FROM predictions p
-            JOIN games g ON p.game_id = g.game_id
-            WHERE p.prediction_date = %s
-            AND p.model_version = %s
-            AND g.game_status = 'completed'
-        """, (target_date, model_version))
-        
-        predictions = cur.fetchall()
-        
-        if len(predictions) == 0:
-            print(f"No completed games found with {model_version} predictions for {target_date}\n")
-            continue
-        
-        print(f"Found {len(predictions)} predictions to evaluate\n")
-        
-        updated = 0
-        errors = 0
-        
-        for pred in predictions:
-            (prediction_id, game_id, player_id, pred_points, pred_rebounds, pred_assists, 
-             pred_steals, pred_blocks, pred_turnovers, pred_threes) = pred
-            
-            try:
-                conn, cur = ensure_connection(conn, cur)
-                
-                cur.execute("""
-                    SELECT points, rebounds_total, assists, steals, blocks, turnovers, three_pointers_made
-                    FROM player_game_stats
-                    WHERE game_id = %s AND player_id = %s
-                """, (game_id, player_id))
-                
-                actual = cur.fetchone()
-                
-                if not actual:
-                    print(f"  No stats found for player {player_id} in game {game_id}")
-                    continue
-                
-                (actual_points, actual_rebounds, actual_assists, actual_steals, 
-                 actual_blocks, actual_turnovers, actual_threes) = actual
-                
-                point_error = abs(pred_points - actual_points)
-                rebound_error = abs(pred_rebounds - actual_rebounds)
-                assist_error = abs(pred_assists - actual_assists)
-                steal_error = abs(pred_steals - actual_steals)
-                block_error = abs(pred_blocks - actual_blocks)
-                turnover_error = abs(pred_turnovers - actual_turnovers)
-                three_error = abs(pred_threes - actual_threes)
-                
-                avg_error = (point_error + rebound_error + assist_error + 
-                            steal_error + block_error + turnover_error + three_error) / 7
-                
-                cur.execute("""
-                    UPDATE predictions SET
-                        actual_points = %s,
-                        actual_rebounds = %s,
-                        actual_assists = %s,
-                        actual_steals = %s,
-                        actual_blocks = %s,
-                        actual_turnovers = %s,
-                        actual_three_pointers_made = %s,
-                        prediction_error = %s
-                    WHERE prediction_id = %s
-                """, (
-                    actual_points, actual_rebounds, actual_assists,
-                    actual_steals, actual_blocks, actual_turnovers, actual_threes,
-                    round(avg_error, 2),
-                    prediction_id
-                ))
-                
-                updated += 1
-                
-                if updated % 10 == 0:
-                    print(f"Progress: {updated}/{len(predictions)} evaluated")
-                    try:
-                        conn.commit()
-                    except Exception as commit_error:
-                        print(f"  Commit error, reconnecting: {commit_error}")
-                        conn, cur = ensure_connection(conn, cur)
-                        conn.commit()
-                
-            except Exception as e:
-                print(f"  Error evaluating prediction {prediction_id}: {e}")
-                errors += 1
-                if "connection" in str(e).lower() or "cursor" in str(e).lower():
-                    conn, cur = ensure_connection(conn, cur)
-                continue
-        
-        try:
-            conn.commit()
-        except Exception as commit_error:
-            print(f"  Final commit error: {commit_error}")
-            conn, cur = ensure_connection(conn, cur)
+    try:
+        with stage('update_actuals'):
+            updated = update_actuals(cur, start_date, end_date)
             conn.commit()
-        
-        conn, cur = ensure_connection(conn, cur)
-        
-        cur.execute("""
-            SELECT 
-                AVG(ABS(predicted_points - actual_points)) as points_mae,
-                AVG(ABS(predicted_rebounds - actual_rebounds)) as rebounds_mae,
-                AVG(ABS(predicted_assists - actual_assists)) as assists_mae,
-                AVG(ABS(predicted_steals - actual_steals)) as steals_mae,
-                AVG(ABS(predicted_blocks - actual_blocks)) as blocks_mae,
-                AVG(ABS(predicted_turnovers - actual_turnovers)) as turnovers_mae,
-                AVG(ABS(predicted_three_pointers_made - actual_three_pointers_made)) as threes_mae,
-                AVG(prediction_error) as overall_mae
-            FROM predictions
-            WHERE prediction_date = %s
-            AND model_version = %s
-            AND actual_points IS NOT NULL
-        """, (target_date, model_version))
-        
-        metrics = cur.fetchone()
-        
-        print(f"\nUpdated: {updated}")
-        print(f"Errors: {errors}")
-        
-        if metrics and metrics[0]:
-            all_metrics[model_version] = {
-                'points': metrics[0],
-                'rebounds': metrics[1],
-                'assists': metrics[2],
-                'steals': metrics[3],
-                'blocks': metrics[4],
-                'turnovers': metrics[5],
-                'three_pointers': metrics[6],
-                'overall': metrics[7]
-            }
-            print(f"\n{model_version.upper()} Metrics (MAE):")
-            print(f"  Points:       {metrics[0]:.2f}")
-            print(f"  Rebounds:     {metrics[1]:.2f}")
-            print(f"  Assists:      {metrics[2]:.2f}")
-            print(f"  Steals:       {metrics[3]:.2f}")
-            print(f"  Blocks:       {metrics[4]:.2f}")
-            print(f"  Turnovers:    {metrics[5]:.2f}")
-            print(f"  3-Pointers:   {metrics[6]:.2f}")
-            print(f"  Overall:      {metrics[7]:.2f}")
-        print()
-    
+        with stage('fetch_metrics'):
+            unmatched = count_unmatched(cur, start_date, end_date)
+            all_metrics = fetch_metrics(cur, start_date, end_date)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
     try:
-        if cur:
-            cur.close()
-        if conn:
-            conn.close()
-    except:
-        pass
-    
-    if all_metrics:
-        print(f"\n{'='*50}")
-        print("EVALUATION COMPLETE - SUMMARY")
-        print(f"{'='*50}")
-        print(f"\n{'Model':<20} {'Points':<10} {'Rebounds':<10} {'Assists':<10} {'Overall':<10}")
-        print("-" * 60)
-        for model, metrics in sorted(all_metrics.items(), key=lambda x: x[1]['overall']):
-            print(f"{model:<20} {metrics['points']:<10.2f} {metrics['rebounds']:<10.2f} {metrics['assists']:<10.2f} {metrics['overall']:<10.2f}")
-        print("\n(Lower is better - sorted by Overall MAE)")
+        # The Model Performance page reads these aggregates instead of the prediction rows.
+        with stage('refresh_prediction_metrics'):
+            metric_rows = refresh_prediction_metrics(conn, start_date, end_date)
+    finally:
+        conn.close()
+
+    print(f"Updated: {updated}")
+    print(f"Metric aggregates refreshed: {metric_rows} rows")
+    if unmatched:
+        print(f"No stats found (did not play): {unmatched}")
+
+    if not all_metrics:
+        print(f"\nNo predictions for completed games found between {start_date} and {end_date}")
+        return all_metrics
+
+    for model_version, metrics in sorted(all_metrics.items()):
+        dates = f" over {metrics['dates']} dates" if start_date != end_date else ''
+        print(f"\n{model_version.upper()} Metrics (MAE, {metrics['predictions']} predictions{dates}):")
+        print(f"  Points:       {metrics['points']:.2f}")
+        print(f"  Rebounds:     {metrics['rebounds']:.2f}")
+        print(f"  Assists:      {metrics['assists']:.2f}")
+        print(f"  Steals:       {metrics['steals']:.2f}")
+        print(f"  Blocks:       {metrics['blocks']:.2f}")
+        print(f"  Turnovers:    {metrics['turnovers']:.2f}")
+        print(f"  3-Pointers:   {metrics['three_pointers']:.2f}")
+        print(f"  Overall:      {metrics['overall']:.2f}")
+
+    print(f"\n{'='*50}")
+    print("EVALUATION COMPLETE - SUMMARY")
+    print(f"{'='*50}")
+    print(f"\n{'Model':<20} {'Points':<10} {'Rebounds':<10} {'Assists':<10} {'Overall':<10}")
+    print("-" * 60)
+    for model, metrics in sorted(all_metrics.items(), key=lambda x: x[1]['overall']):
+        print(f"{model:<20} {metrics['points']:<10.2f} {metrics['rebounds']:<10.2f} {metrics['assists']:<10.2f} {metrics['overall']:<10.2f}")
+    print("\n(Lower is better - sorted by Overall MAE)")
+
+    return all_metrics
+
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        target_date = sys.argv[1]
-        evaluate_predictions(target_date)
+    import argparse
+    parser = argparse.ArgumentParser(description='Fill actual stats and errors for completed games')
+    parser.add_argument('date', nargs='?', default=None, help='Date to evaluate, YYYY-MM-DD (default: yesterday)')
+    parser.add_argument('--from', dest='start', default=None, help='First date of a range to evaluate')
+    parser.add_argument('--to', dest='end', default=None, help='Last date of the range (default: --from)')
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    start_run('evaluate_predictions', profile=args.profile or None)
+
+    if args.start or args.end:
+        evaluate_predictions(args.start or args.end, args.end)
     else:
-        evaluate_predictions()
\ No newline at end of file
+        evaluate_predictions(args.date)
@@ -2,6 +2,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from data_collection.utils import get_db_connection, ensure_connection
+from data_collection.bulk_read import read_sql_copy
 from feature_engineering.team_stats_calculator import (
     calculate_team_defensive_stats_as_of_date,
     calculate_position_defense_stats_as_of_date,
@@ -24,6 +25,10 @@ from predictions.confidence_helpers import (
     collect_player_stats_for_variance,
     get_available_features
 )
+from models.training_data import load_ensemble_subsets, load_scaler, TARGETS, ZERO_FILL_COLS
+from profiling import profiled, stage, mark, start_run, pop_profile_flag
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models'))
+from model_bundle import load_model_bundle
 import pandas as pd
 import numpy as np
 import joblib
@@ -295,6 +300,7 @@ def calculate_confidence(features_df, recent_games_df, conn=None, player_id=None
     return int(max(0, min(100, score)))
 
 
+@profiled('confidence')
 def calculate_confidence_new(
     predictions_by_model: Dict[str, Dict[str, float]],
     selected_models: List[str],
@@ -423,6 +429,96 @@ def calculate_confidence_new(
         old_score = calculate_confidence(features_df, recent_games, conn, player_id, target_date, season)
         return old_score, {}
 
+def get_model_feature_names(model, features):
+    if hasattr(model, 'get_booster'):
+        model_feature_names = model.get_booster().feature_names
+    elif hasattr(model, 'feature_name_'):
+        model_feature_names = model.feature_name_
+    elif hasattr(model, 'feature_names_in_'):
+        model_feature_names = model.feature_names_in_
+    elif hasattr(model, 'feature_names_'):
+        model_feature_names = model.feature_names_
+    else:
+        model_feature_names = features.columns.tolist()
+    return list(model_feature_names)
+
+def get_recorded_feature_names(model):
+    """Feature names a fitted model recorded at training time, or None when it doesn't keep them."""
+    if hasattr(model, 'get_booster'):
+        names = model.get_booster().feature_names
+    else:
+        names = next((getattr(model, attr) for attr in ('feature_name_', 'feature_names_in_', 'feature_names_')
+                      if getattr(model, attr, None) is not None), None)
+    return list(names) if names is not None else None
+
+def get_serving_feature_names(bundle=None, family_scaler=None, models=None):
+    """Features the loaded models were trained on, for build_features_for_player to compute.
+
+    Taken from the models themselves rather than feature_schema.json, which prune_features.py can
+    rewrite before the models are retrained on it. None (compute every feature) when unknown.
+    """
+    if bundle is not None:
+        return list(bundle.feature_names)
+    if family_scaler is not None and hasattr(family_scaler, 'feature_names_in_'):
+        return list(family_scaler.feature_names_in_)
+    
+    feature_names = []
+    for model in (models or {}).values():
+        if model is None:
+            continue
+        names = get_recorded_feature_names(model)
+        if names is None:
+            return None
+        feature_names.extend(name for name in names if name not in feature_names)
+    return feature_names or None
+
+# Box-score stats whose feature columns (e.g. points_l5) fall back to the player's recent average.
+RECENT_GAME_STATS = ['points', 'rebounds_total', 'assists', 'steals', 'blocks', 'turnovers', 'three_pointers_made']
+RECENT_GAME_RATES = ['usage_rate', 'offensive_rating', 'defensive_rating']
+
+
+def get_recent_games_column(col):
+    """recent_games column whose mean stands in for a missing player feature, or None."""
+    for stat in RECENT_GAME_STATS:
+        if col.startswith(f'{stat}_'):
+            return stat
+    if 'minutes_played' in col and 'per_36' not in col:
+        return 'minutes_played'
+    for rate in RECENT_GAME_RATES:
+        if rate in col:
+            return rate
+    return None
+
+
+def get_fill_value(col, recent_games, league_means):
+    if 'team' in col or 'opp' in col or 'pace' in col:
+        return league_means.get(col, 0)
+    if col.startswith('is_') or col.startswith('position_') or 'trend' in col or col in ZERO_FILL_COLS:
+        return 0
+
+    value = league_means.get(col, 0)
+    source = get_recent_games_column(col)
+    if source is not None and recent_games is not None and len(recent_games) > 0 and source in recent_games.columns:
+        value = recent_games[source].mean()
+    if pd.isna(value):
+        value = league_means.get(col, 0)
+    return value
+
+
+def align_features_for_model(features, model_feature_names, recent_games, league_means):
+    features_ordered = features[[col for col in model_feature_names if col in features.columns]].copy()
+
+    for col in model_feature_names:
+        if col in features_ordered.columns:
+            if features_ordered[col].isna().any():
+                features_ordered[col] = features_ordered[col].fillna(get_fill_value(col, recent_games, league_means))
+        elif 'team_id' not in col and 'player_id' not in col and 'game_id' not in col:
+            features_ordered[col] = get_fill_value(col, recent_games, league_means)
+
+    features_ordered = features_ordered[[col for col in model_feature_names if col in features_ordered.columns]]
+    return features_ordered.fillna(0)
+
+@profiled('predict_upcoming_games')
 def predict_upcoming_games(target_date=None, model_type='xgboost'):
     print(f"Predicting player performance for upcoming games using {model_type}...\n")
     
@@ -439,6 +535,7 @@ def predict_upcoming_games(target_date=None, model_type='xgboost'):
     conn = get_db_connection()
     cur = conn.cursor()
     
+    mark('load_games')
     print("Loading upcoming games...")
     games_query = f"""
         SELECT game_id, game_date, game_type, home_team_id, away_team_id, season
@@ -457,14 +554,22 @@ def predict_upcoming_games(target_date=None, model_type='xgboost'):
     
     print(f"Found {len(games_df)} games\n")
     
+    mark('load_models')
     print("Loading models and scalers...")
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(os.path.dirname(script_dir))
     models_dir = os.path.join(project_root, 'data', 'models')
     features_path = os.path.join(project_root, 'data', 'processed', 'training_features.csv')
     
+    # One read gives every stat's model, the scaler, feature order and imputation values.
+    bundle = load_model_bundle(model_type, models_dir) if model_type != 'multi_output' else None
+    if bundle is not None:
+        print(f"Using model bundle: {model_type} ({len(bundle.targets)} stats)")
+    
     league_means = {}
-    if os.path.exists(features_path):
+    if bundle is not None and bundle.league_means:
+        league_means = dict(bundle.league_means)
+    elif os.path.exists(features_path):
         training_df = pd.read_csv(features_path)
         feature_cols = [col for col in training_df.columns if any(x in col for x in 
                    ['_l5', '_l10', '_l20', '_weighted', 'is_', 'days_rest', 'games_played',
@@ -497,13 +602,39 @@ def predict_upcoming_games(target_date=None, model_type='xgboost'):
         'three_pointers_made': 'three_pointers_made'
     }
     
+    # One scaler per family, fitted in the same training run as its models.
+    family_scaler = load_scaler(model_type, models_dir)
+    
+    # The multi-output family is one model for all stats, saved as a single bundle.
+    multi_output_bundle = None
+    if model_type == 'multi_output':
+        bundle_path = os.path.join(models_dir, 'multi_output.pkl')
+        if os.path.exists(bundle_path):
+            multi_output_bundle = joblib.load(bundle_path)
+        else:
+            print(f"Warning: Model not found: {bundle_path}")
+    
     for stat_name in targets.keys():
+        if bundle is not None:
+            models[stat_name] = bundle.models.get(stat_name)
+            scalers[stat_name] = bundle.scaler
+            continue
+        if model_type == 'multi_output':
+            if multi_output_bundle is not None and stat_name in multi_output_bundle['targets']:
+                models[stat_name] = multi_output_bundle['model']
+                scalers[stat_name] = family_scaler
+            else:
+                models[stat_name] = None
+            continue
+        
         model_path = os.path.join(models_dir, f'{model_type}_{stat_name}.pkl')
         scaler_path = os.path.join(models_dir, f'scaler_{model_type}_{stat_name}.pkl')
         
         if os.path.exists(model_path):
             models[stat_name] = joblib.load(model_path)
-            if os.path.exists(scaler_path):
+            if family_scaler is not None:
+                scalers[stat_name] = family_scaler
+            elif os.path.exists(scaler_path):
                 scalers[stat_name] = joblib.load(scaler_path)
             else:
                 print(f"Warning: Scaler not found for {model_type}_{stat_name}, predictions may be inaccurate")
@@ -518,11 +649,17 @@ def predict_upcoming_games(target_date=None, model_type='xgboost'):
         conn.close()
         return
     
+    # Lookups for features these models weren't trained on (e.g. after feature pruning) are skipped.
+    feature_schema = get_serving_feature_names(bundle, family_scaler, models)
+    if feature_schema is not None:
+        print(f"Computing the {len(feature_schema)} features the {model_type} models were trained on")
+    
     model_version = model_type
     
     all_predictions = []
     predictions_inserted = 0
     
+    mark('predict_players')
     for _, game in games_df.iterrows():
         conn, cur = ensure_connection(conn, cur)
         
@@ -640,150 +777,68 @@ def predict_upcoming_games(target_date=None, model_type='xgboost'):
             for player_id in players['player_id']:
                 features, recent_games = build_features_for_player(
                     conn, player_id, team_id, opponent_id, 
-                    is_home, season, target_date, game_type
+                    is_home, season, target_date, game_type, feature_schema
                 )
                 
                 if features is None:
                     continue
                 
                 predictions = {}
+                multi_output_row = None
+                
+                if bundle is not None:
+                    try:
+                        features_ordered = align_features_for_model(
+                            features, bundle.feature_names, recent_games, league_means
+                        )
+                        bundle_row = bundle.predict_matrix(features_ordered).iloc[0]
+                        for stat_name, pred in bundle_row.items():
+                            predictions[stat_name] = float(round(max(0.0, pred), 1))
+                    except Exception as e:
+                        print(f"Warning: Error predicting with {model_type} bundle for player {player_id}: {e}")
+                        predictions = {stat_name: 0.0 for stat_name in bundle.targets}
+                
+                shared_features_scaled = None
+                if bundle is None and family_scaler is not None:
+                    try:
+                        features_ordered = align_features_for_model(
+                            features, list(family_scaler.feature_names_in_), recent_games, league_means
+                        )
+                        shared_features_scaled = pd.DataFrame(
+                            family_scaler.transform(features_ordered),
+                            columns=features_ordered.columns
+                        ).fillna(0)
+                    except Exception as e:
+                        print(f"Warning: Error applying scaler for player {player_id}: {e}")
                 
                 for stat_name, model in models.items():
-                    if model is None:
+                    if model is None or stat_name in predictions:
                         continue
                     
                     try:
-                        if hasattr(model, 'get_booster'):
-                            model_feature_names = model.get_booster().feature_names
-                        elif hasattr(model, 'feature_name_'):
-                            model_feature_names = model.feature_name_
-                        elif hasattr(model, 'feature_names_in_'):
-                            model_feature_names = model.feature_names_in_
-                        elif hasattr(model, 'feature_names_'):
-                            model_feature_names = model.feature_names_
+                        if shared_features_scaled is not None:
+                            features_scaled = shared_features_scaled
                         else:
-                            model_feature_names = features.columns.tolist()
-                        
-                        features_ordered = features[[col for col in model_feature_names if col in features.columns]].copy()
-                        
-                        for col in model_feature_names:
-                            if col not in features_ordered.columns:
-                                if 'team_id' not in col and 'player_id' not in col and 'game_id' not in col:
-                                    if 'team' in col or 'opp' in col or 'pace' in col:
-                                        features_ordered[col] = league_means.get(col, 0)
-                                    elif col.startswith('is_') or col.startswith('position_') or 'trend' in col or col in ['west_to_east', 'east_to_west', 'post_asb_bounce']:
-                                        features_ordered[col] = 0
-                                    else:
-                                        player_avg = league_means.get(col, 0)
-                                        if recent_games is not None and len(recent_games) > 0:
-                                            if col.startswith('points_'):
-                                                player_avg = recent_games['points'].mean() if len(recent_games) > 0 else league_means.get(col, 0)
-                                            elif col.startswith('rebounds_total_'):
-                                                player_avg = recent_games['rebounds_total'].mean() if len(recent_games) > 0 else league_means.get(col, 0)
-                                            elif col.startswith('assists_'):
-                                                player_avg = recent_games['assists'].mean() if len(recent_games) > 0 else league_means.get(col, 0)
-                                            elif col.startswith('steals_'):
-                                                player_avg = recent_games['steals'].mean() if len(recent_games) > 0 else league_means.get(col, 0)
-                                            elif col.startswith('blocks_'):
-                                                player_avg = recent_games['blocks'].mean() if len(recent_games) > 0 else league_means.get(col, 0)
-                                            elif col.startswith('turnovers_'):
-                                                player_avg = recent_games['turnovers'].mean() if len(recent_games) > 0 else league_means.get(col, 0)
-                                            elif col.startswith('three_pointers_made_'):
-                                                player_avg = recent_games['three_pointers_made'].mean() if len(recent_games) > 0 else league_means.get(col, 0)
-                                            elif 'minutes_played' in col and 'per_36' not in col:
-                                                player_avg = recent_games['minutes_played'].mean() if len(recent_games) > 0 else league_means.get(col, 0)
-                                            elif 'usage_rate' in col:
-                                                player_avg = recent_games['usage_rate'].mean() if 'usage_rate' in recent_games.columns and len(recent_games) > 0 else league_means.get(col, 0)
-                                            elif 'offensive_rating' in col and 'team' not in col and 'opp' not in col:
-                                                player_avg = recent_games['offensive_rating'].mean() if 'offensive_rating' in recent_games.columns and len(recent_games) > 0 else league_means.get(col, 0)
-                                            elif 'defensive_rating' in col and 'team' not in col and 'opp' not in col:
-                                                player_avg = recent_games['defensive_rating'].mean() if 'defensive_rating' in recent_games.columns and len(recent_games) > 0 else league_means.get(col, 0)
-                                        if pd.isna(player_avg):
-                                            player_avg = league_means.get(col, 0)
-                                        features_ordered[col] = player_avg
-                        
-                        features_ordered = features_ordered[[col for col in model_feature_names if col in features_ordered.columns]]
-                        
-                        for col in features_ordered.columns:
-                            if features_ordered[col].isna().any():
-                                if 'team' in col or 'opp' in col or 'pace' in col:
-                                    features_ordered[col] = features_ordered[col].fillna(league_means.get(col, 0))
-                                elif col.startswith('is_') or col.startswith('position_') or 'trend' in col:
-                                    features_ordered[col] = features_ordered[col].fillna(0)
-                                else:
-                                    player_avg = league_means.get(col, 0)
-                                    if recent_games is not None and len(recent_games) > 0:
-                                        if col.startswith('points_'):
-                                            player_avg = recent_games['points'].mean()
-                                        elif col.startswith('rebounds_total_'):
-                                            player_avg = recent_games['rebounds_total'].mean()
-                                        elif col.startswith('assists_'):
-                                            player_avg = recent_games['assists'].mean()
-                                        elif col.startswith('steals_'):
-                                            player_avg = recent_games['steals'].mean()
-                                        elif col.startswith('blocks_'):
-                                            player_avg = recent_games['blocks'].mean()
-                                        elif col.startswith('turnovers_'):
-                                            player_avg = recent_games['turnovers'].mean()
-                                        elif col.startswith('three_pointers_made_'):
-                                            player_avg = recent_games['three_pointers_made'].mean()
-                                        elif 'minutes_played' in col and 'per_36' not in col:
-                                            player_avg = recent_games['minutes_played'].mean()
-                                        elif 'usage_rate' in col:
-                                            player_avg = recent_games['usage_rate'].mean() if 'usage_rate' in recent_games.columns else league_means.get(col, 0)
-                                        elif 'offensive_rating' in col and 'team' not in col and 'opp' not in col:
-                                            player_avg = recent_games['offensive_rating'].mean() if 'offensive_rating' in recent_games.columns else league_means.get(col, 0)
-                                        elif 'defensive_rating' in col and 'team' not in col and 'opp' not in col:
-                                            player_avg = recent_games['defensive_rating'].mean() if 'defensive_rating' in recent_games.columns else league_means.get(col, 0)
-                                    features_ordered[col] = features_ordered[col].fillna(player_avg)
-                        
-                        for col in features_ordered.columns:
-                            if features_ordered[col].isna().any():
-                                if 'team' in col or 'opp' in col or 'pace' in col:
-                                    features_ordered[col] = features_ordered[col].fillna(league_means.get(col, 0))
-                                elif col.startswith('is_') or col.startswith('position_') or 'trend' in col or col in ['west_to_east', 'east_to_west', 'post_asb_bounce']:
-                                    features_ordered[col] = features_ordered[col].fillna(0)
-                                else:
-                                    player_avg = league_means.get(col, 0)
-                                    if recent_games is not None and len(recent_games) > 0:
-                                        if col.startswith('points_'):
-                                            player_avg = recent_games['points'].mean() if len(recent_games) > 0 else league_means.get(col, 0)
-                                        elif col.startswith('rebounds_total_'):
-                                            player_avg = recent_games['rebounds_total'].mean() if len(recent_games) > 0 else league_means.get(col, 0)
-                                        elif col.startswith('assists_'):
-                                            player_avg = recent_games['assists'].mean() if len(recent_games) > 0 else league_means.get(col, 0)
-                                        elif col.startswith('steals_'):
-                                            player_avg = recent_games['steals'].mean() if len(recent_games) > 0 else league_means.get(col, 0)
-                                        elif col.startswith('blocks_'):
-                                            player_avg = recent_games['blocks'].mean() if len(recent_games) > 0 else league_means.get(col, 0)
-                                        elif col.startswith('turnovers_'):
-                                            player_avg = recent_games['turnovers'].mean() if len(recent_games) > 0 else league_means.get(col, 0)
-                                        elif col.startswith('three_pointers_made_'):
-                                            player_avg = recent_games['three_pointers_made'].mean() if len(recent_games) > 0 else league_means.get(col, 0)
-                                        elif 'minutes_played' in col and 'per_36' not in col:
-                                            player_avg = recent_games['minutes_played'].mean() if len(recent_games) > 0 else league_means.get(col, 0)
-                                        elif 'usage_rate' in col:
-                                            player_avg = recent_games['usage_rate'].mean() if 'usage_rate' in recent_games.columns and len(recent_games) > 0 else league_means.get(col, 0)
-                                        elif 'offensive_rating' in col and 'team' not in col and 'opp' not in col:
-                                            player_avg = recent_games['offensive_rating'].mean() if 'offensive_rating' in recent_games.columns and len(recent_games) > 0 else league_means.get(col, 0)
-                                        elif 'defensive_rating' in col and 'team' not in col and 'opp' not in col:
-                                            player_avg = recent_games['defensive_rating'].mean() if 'defensive_rating' in recent_games.columns and len(recent_games) > 0 else league_means.get(col, 0)
-                                    if pd.isna(player_avg):
-                                        player_avg = league_means.get(col, 0)
-                                    features_ordered[col] = features_ordered[col].fillna(player_avg)
-                        
-                        features_ordered = features_ordered.fillna(0)
-                        
-                        if scalers[stat_name] is not None:
-                            features_scaled = pd.DataFrame(
-                                scalers[stat_name].transform(features_ordered),
-                                columns=features_ordered.columns
+                            model_feature_names = get_model_feature_names(model, features)
+                            features_ordered = align_features_for_model(
+                                features, model_feature_names, recent_games, league_means
                             )
-                            features_scaled = features_scaled.fillna(0)
-                        else:
-                            features_scaled = features_ordered
+                            
+                            if scalers[stat_name] is not None:
+                                features_scaled = pd.DataFrame(
+                                    scalers[stat_name].transform(features_ordered),
+                                    columns=features_ordered.columns
+                                )
+                                features_scaled = features_scaled.fillna(0)
+                            else:
+                                features_scaled = features_ordered
                         
-                        pred = model.predict(features_scaled)[0]
+                        if multi_output_bundle is not None:
+                            if multi_output_row is None:
+                                multi_output_row = model.predict(features_scaled)[0]
+                            pred = multi_output_row[multi_output_bundle['targets'].index(stat_name)]
+                        else:
+                            pred = model.predict(features_scaled)[0]
                         pred = max(0.0, pred)
                         predictions[stat_name] = float(round(pred, 1))
                         
@@ -851,15 +906,16 @@ def predict_upcoming_games(target_date=None, model_type='xgboost'):
                 else:
                     features_dict = features
                 
-                for stat_name in predictions.keys():
-                    top_features = get_top_features_with_impact(
-                        features_dict,
-                        model_type,
-                        stat_name,
-                        league_means,
-                        top_n=15
-                    )
-                    feature_explanations[stat_name] = top_features
+                with stage('explanations'):
+                    for stat_name in predictions.keys():
+                        top_features = get_top_features_with_impact(
+                            features_dict,
+                            model_type,
+                            stat_name,
+                            league_means,
+                            top_n=15
+                        )
+                        feature_explanations[stat_name] = top_features
                 
                 try:
                     conn, cur = ensure_connection(conn, cur)
@@ -970,6 +1026,7 @@ def predict_upcoming_games(target_date=None, model_type='xgboost'):
                     **predictions
                 })
     
+    mark('save')
     try:
         conn.commit()
     except Exception as commit_error:
@@ -1012,8 +1069,26 @@ def predict_upcoming_games(target_date=None, model_type='xgboost'):
     
     return pred_df
 
+def load_serving_feature_names(models_dir, model_types=('xgboost', 'lightgbm', 'random_forest', 'catboost')):
+    """Union of the features every family's bundle was trained on, or None if a bundle is missing."""
+    feature_names = []
+    for model_type in model_types:
+        bundle = load_model_bundle(model_type, models_dir)
+        if bundle is None:
+            return None
+        feature_names.extend(name for name in bundle.feature_names if name not in feature_names)
+    return feature_names
+
+@profiled('build_features_for_player')
 def build_features_for_player(conn, player_id, team_id, opponent_id, 
-                               is_home, season, target_date, game_type):
+                               is_home, season, target_date, game_type, feature_schema=None):
+    
+    # With the models' feature names (see get_serving_feature_names), lookups for features they
+    # weren't trained on are skipped.
+    schema = set(feature_schema) if feature_schema is not None else None
+    
+    def needs(*cols):
+        return schema is None or any(col in schema for col in cols)
     
     query = f"""
         SELECT 
@@ -1221,7 +1296,7 @@ def build_features_for_player(conn, player_id, team_id, opponent_id,
             features[f'pts_per_ast_l{window}'] = 0
             features[f'reb_rate_l{window}'] = 0
     
-    if game_type == 'playoff':
+    if game_type == 'playoff' and needs('playoff_games_career', 'playoff_performance_boost'):
         playoff_games_query = f"""
             SELECT COUNT(*) as playoff_games
             FROM player_game_stats pgs
@@ -1305,66 +1380,69 @@ def build_features_for_player(conn, player_id, team_id, opponent_id,
     else:
         features['consecutive_games'] = 0
     
-    season_start_query = f"""
-        SELECT MIN(game_date) as season_start
-        FROM games
-        WHERE season = '{season}'
-        AND game_status = 'completed'
-    """
-    season_start_df = pd.read_sql(season_start_query, conn)
-    if len(season_start_df) > 0 and season_start_df.iloc[0]['season_start']:
-        season_start = pd.to_datetime(season_start_df.iloc[0]['season_start'])
-        target_dt = pd.to_datetime(target_date)
-        days_elapsed = (target_dt - season_start).days
-        features['season_progress'] = min(1.0, max(0.0, days_elapsed / 180.0))
-    else:
-        features['season_progress'] = 0.5
+    if needs('season_progress'):
+        season_start_query = f"""
+            SELECT MIN(game_date) as season_start
+            FROM games
+            WHERE season = '{season}'
+            AND game_status = 'completed'
+        """
+        season_start_df = pd.read_sql(season_start_query, conn)
+        if len(season_start_df) > 0 and season_start_df.iloc[0]['season_start']:
+            season_start = pd.to_datetime(season_start_df.iloc[0]['season_start'])
+            target_dt = pd.to_datetime(target_date)
+            days_elapsed = (target_dt - season_start).days
+            features['season_progress'] = min(1.0, max(0.0, days_elapsed / 180.0))
+        else:
+            features['season_progress'] = 0.5
     
     games_played = features.get('games_played_season', 0)
     features['is_early_season'] = 1 if games_played <= 20 else 0
     features['is_mid_season'] = 1 if 20 < games_played <= 60 else 0
     features['is_late_season'] = 1 if games_played > 60 else 0
     
-    team_games_query = f"""
-        SELECT COUNT(*) as team_games
-        FROM games
-        WHERE season = '{season}'
-        AND game_status = 'completed'
-        AND (home_team_id = {team_id} OR away_team_id = {team_id})
-        AND game_date < '{target_date}'
-    """
-    team_games_df = pd.read_sql(team_games_query, conn)
-    team_games_played = team_games_df.iloc[0]['team_games'] if len(team_games_df) > 0 else 0
-    features['games_remaining'] = max(0, 82 - team_games_played)
-    
-    teams_tz = pd.read_sql("""
-        SELECT team_id, timezone
-        FROM teams
-        WHERE timezone IS NOT NULL
-    """, conn)
-    
-    tz_to_offset = {
-        'America/New_York': -5,
-        'America/Chicago': -6,
-        'America/Denver': -7,
-        'America/Los_Angeles': -8,
-        'America/Phoenix': -7,
-        'America/Anchorage': -9,
-        'Pacific/Honolulu': -10,
-        'America/Toronto': -5
-    }
-    
-    teams_tz['tz_offset'] = teams_tz['timezone'].map(tz_to_offset).fillna(-6)
-    
-    team_tz_row = teams_tz[teams_tz['team_id'] == team_id]
-    opp_tz_row = teams_tz[teams_tz['team_id'] == opponent_id]
-    
-    tz_offset_team = team_tz_row.iloc[0]['tz_offset'] if len(team_tz_row) > 0 else -6
-    tz_offset_opp = opp_tz_row.iloc[0]['tz_offset'] if len(opp_tz_row) > 0 else -6
-    
-    features['tz_difference'] = tz_offset_opp - tz_offset_team
-    features['west_to_east'] = 1 if (is_home == 0 and features['tz_difference'] > 0) else 0
-    features['east_to_west'] = 1 if (is_home == 0 and features['tz_difference'] < 0) else 0
+    if needs('games_remaining'):
+        team_games_query = f"""
+            SELECT COUNT(*) as team_games
+            FROM games
+            WHERE season = '{season}'
+            AND game_status = 'completed'
+            AND (home_team_id = {team_id} OR away_team_id = {team_id})
+            AND game_date < '{target_date}'
+        """
+        team_games_df = pd.read_sql(team_games_query, conn)
+        team_games_played = team_games_df.iloc[0]['team_games'] if len(team_games_df) > 0 else 0
+        features['games_remaining'] = max(0, 82 - team_games_played)
+    
+    if needs('tz_difference', 'west_to_east', 'east_to_west'):
+        teams_tz = pd.read_sql("""
+            SELECT team_id, timezone
+            FROM teams
+            WHERE timezone IS NOT NULL
+        """, conn)
+        
+        tz_to_offset = {
+            'America/New_York': -5,
+            'America/Chicago': -6,
+            'America/Denver': -7,
+            'America/Los_Angeles': -8,
+            'America/Phoenix': -7,
+            'America/Anchorage': -9,
+            'Pacific/Honolulu': -10,
+            'America/Toronto': -5
+        }
+        
+        teams_tz['tz_offset'] = teams_tz['timezone'].map(tz_to_offset).fillna(-6)
+        
+        team_tz_row = teams_tz[teams_tz['team_id'] == team_id]
+        opp_tz_row = teams_tz[teams_tz['team_id'] == opponent_id]
+        
+        tz_offset_team = team_tz_row.iloc[0]['tz_offset'] if len(team_tz_row) > 0 else -6
+        tz_offset_opp = opp_tz_row.iloc[0]['tz_offset'] if len(opp_tz_row) > 0 else -6
+        
+        features['tz_difference'] = tz_offset_opp - tz_offset_team
+        features['west_to_east'] = 1 if (is_home == 0 and features['tz_difference'] > 0) else 0
+        features['east_to_west'] = 1 if (is_home == 0 and features['tz_difference'] < 0) else 0
     
     all_star_breaks = {
         '2020-21': '2021-03-07',
@@ -1390,17 +1468,19 @@ def build_features_for_player(conn, player_id, team_id, opponent_id,
         features['days_since_asb'] = 0
         features['post_asb_bounce'] = 0
     
-    team_ratings = pd.read_sql(f"""
-        SELECT offensive_rating, defensive_rating, pace
-        FROM team_ratings
-        WHERE team_id = {team_id} AND season = '{season}'
-    """, conn)
-    
-    if len(team_ratings) > 0:
-        features['offensive_rating_team'] = team_ratings.iloc[0]['offensive_rating']
-        features['defensive_rating_team'] = team_ratings.iloc[0]['defensive_rating']
-        features['pace_team'] = team_ratings.iloc[0]['pace']
+    if needs('offensive_rating_team', 'defensive_rating_team', 'pace_team'):
+        team_ratings = pd.read_sql(f"""
+            SELECT offensive_rating, defensive_rating, pace
+            FROM team_ratings
+            WHERE team_id = {team_id} AND season = '{season}'
+        """, conn)
+        
+        if len(team_ratings) > 0:
+            features['offensive_rating_team'] = team_ratings.iloc[0]['offensive_rating']
+            features['defensive_rating_team'] = team_ratings.iloc[0]['defensive_rating']
+            features['pace_team'] = team_ratings.iloc[0]['pace']
     
+    # Opponent ratings are always loaded: confidence scoring reads defensive_rating_opp.
     opp_ratings = pd.read_sql(f"""
         SELECT offensive_rating, defensive_rating, pace
         FROM team_ratings
@@ -1412,25 +1492,27 @@ def build_features_for_player(conn, player_id, team_id, opponent_id,
         features['defensive_rating_opp'] = opp_ratings.iloc[0]['defensive_rating']
         features['pace_opp'] = opp_ratings.iloc[0]['pace']
     
-    opp_defense = pd.read_sql(f"""
-        SELECT opp_field_goal_pct, opp_three_point_pct
-        FROM team_defensive_stats
-        WHERE team_id = {opponent_id} AND season = '{season}'
-    """, conn)
-    
-    if len(opp_defense) > 0:
-        features['opp_field_goal_pct'] = opp_defense.iloc[0]['opp_field_goal_pct']
-        features['opp_three_point_pct'] = opp_defense.iloc[0]['opp_three_point_pct']
+    if needs('opp_field_goal_pct', 'opp_three_point_pct'):
+        opp_defense = pd.read_sql(f"""
+            SELECT opp_field_goal_pct, opp_three_point_pct
+            FROM team_defensive_stats
+            WHERE team_id = {opponent_id} AND season = '{season}'
+        """, conn)
+        
+        if len(opp_defense) > 0:
+            features['opp_field_goal_pct'] = opp_defense.iloc[0]['opp_field_goal_pct']
+            features['opp_three_point_pct'] = opp_defense.iloc[0]['opp_three_point_pct']
     
-    opp_defense_stats = calculate_team_defensive_stats_as_of_date(
-        conn, opponent_id, season, target_date
-    )
-    if opp_defense_stats:
-        features['opp_team_turnovers_per_game'] = opp_defense_stats.get('opp_team_turnovers_per_game', 14.0)
-        features['opp_team_steals_per_game'] = opp_defense_stats.get('opp_team_steals_per_game', 7.0)
-    else:
-        features['opp_team_turnovers_per_game'] = 14.0
-        features['opp_team_steals_per_game'] = 7.0
+    if needs('opp_team_turnovers_per_game', 'opp_team_steals_per_game'):
+        opp_defense_stats = calculate_team_defensive_stats_as_of_date(
+            conn, opponent_id, season, target_date
+        )
+        if opp_defense_stats:
+            features['opp_team_turnovers_per_game'] = opp_defense_stats.get('opp_team_turnovers_per_game', 14.0)
+            features['opp_team_steals_per_game'] = opp_defense_stats.get('opp_team_steals_per_game', 7.0)
+        else:
+            features['opp_team_turnovers_per_game'] = 14.0
+            features['opp_team_steals_per_game'] = 7.0
     
     player_position_query = pd.read_sql(f"""
         SELECT position
@@ -1466,61 +1548,67 @@ def build_features_for_player(conn, player_id, team_id, opponent_id,
         features['position_forward'] = 0
         features['position_center'] = 0
     
-    pos_defense = pd.read_sql(f"""
-        SELECT points_allowed_per_game,
-               rebounds_allowed_per_game,
-               assists_allowed_per_game,
-               blocks_allowed_per_game,
-               turnovers_forced_per_game,
-               three_pointers_made_allowed_per_game
-        FROM position_defense_stats
-        WHERE team_id = {opponent_id} AND season = '{season}' AND position = '{defense_position}'
-    """, conn)
-    
-    if len(pos_defense) > 0:
-        features['opp_points_allowed_to_position'] = pos_defense.iloc[0]['points_allowed_per_game']
-        features['opp_rebounds_allowed_to_position'] = pos_defense.iloc[0]['rebounds_allowed_per_game']
-        features['opp_assists_allowed_to_position'] = pos_defense.iloc[0]['assists_allowed_per_game']
-        features['opp_blocks_allowed_to_position'] = pos_defense.iloc[0]['blocks_allowed_per_game']
-        features['opp_three_pointers_allowed_to_position'] = pos_defense.iloc[0]['three_pointers_made_allowed_per_game']
-    
-    pos_defense_stats = calculate_position_defense_stats_as_of_date(
-        conn, opponent_id, season, defense_position, target_date
-    )
-    if pos_defense_stats:
-        features['opp_position_turnovers_vs_team'] = pos_defense_stats.get('opp_position_turnovers_vs_team', 0)
-        features['opp_position_steals_vs_team'] = pos_defense_stats.get('opp_position_steals_vs_team', 0)
-    else:
-        features['opp_position_turnovers_vs_team'] = 0
-        features['opp_position_steals_vs_team'] = 0
-    
-    opp_turnover_stats = calculate_opponent_team_turnover_stats_as_of_date(
-        conn, opponent_id, season, defense_position, target_date
-    )
-    if opp_turnover_stats:
-        features['opp_position_turnovers_overall'] = opp_turnover_stats.get('opp_position_turnovers_overall', 0)
-        features['opp_position_steals_overall'] = opp_turnover_stats.get('opp_position_steals_overall', 0)
-    else:
-        features['opp_position_turnovers_overall'] = 0
-        features['opp_position_steals_overall'] = 0
-    
-    altitude_query = pd.read_sql(f"""
-        SELECT arena_altitude
-        FROM teams
-        WHERE team_id = {opponent_id}
-    """, conn)
+    if needs('opp_points_allowed_to_position', 'opp_rebounds_allowed_to_position',
+             'opp_assists_allowed_to_position', 'opp_blocks_allowed_to_position',
+             'opp_three_pointers_allowed_to_position'):
+        pos_defense = pd.read_sql(f"""
+            SELECT points_allowed_per_game,
+                   rebounds_allowed_per_game,
+                   assists_allowed_per_game,
+                   blocks_allowed_per_game,
+                   turnovers_forced_per_game,
+                   three_pointers_made_allowed_per_game
+            FROM position_defense_stats
+            WHERE team_id = {opponent_id} AND season = '{season}' AND position = '{defense_position}'
+        """, conn)
+        
+        if len(pos_defense) > 0:
+            features['opp_points_allowed_to_position'] = pos_defense.iloc[0]['points_allowed_per_game']
+            features['opp_rebounds_allowed_to_position'] = pos_defense.iloc[0]['rebounds_allowed_per_game']
+            features['opp_assists_allowed_to_position'] = pos_defense.iloc[0]['assists_allowed_per_game']
+            features['opp_blocks_allowed_to_position'] = pos_defense.iloc[0]['blocks_allowed_per_game']
+            features['opp_three_pointers_allowed_to_position'] = pos_defense.iloc[0]['three_pointers_made_allowed_per_game']
+    
+    if needs('opp_position_turnovers_vs_team', 'opp_position_steals_vs_team'):
+        pos_defense_stats = calculate_position_defense_stats_as_of_date(
+            conn, opponent_id, season, defense_position, target_date
+        )
+        if pos_defense_stats:
+            features['opp_position_turnovers_vs_team'] = pos_defense_stats.get('opp_position_turnovers_vs_team', 0)
+            features['opp_position_steals_vs_team'] = pos_defense_stats.get('opp_position_steals_vs_team', 0)
+        else:
+            features['opp_position_turnovers_vs_team'] = 0
+            features['opp_position_steals_vs_team'] = 0
     
-    if len(altitude_query) > 0:
-        altitude = altitude_query.iloc[0]['arena_altitude']
-        if altitude and pd.notna(altitude):
-            features['arena_altitude'] = altitude
-            features['altitude_away'] = 1 if (is_home == 0 and altitude > 3000) else 0
+    if needs('opp_position_turnovers_overall', 'opp_position_steals_overall'):
+        opp_turnover_stats = calculate_opponent_team_turnover_stats_as_of_date(
+            conn, opponent_id, season, defense_position, target_date
+        )
+        if opp_turnover_stats:
+            features['opp_position_turnovers_overall'] = opp_turnover_stats.get('opp_position_turnovers_overall', 0)
+            features['opp_position_steals_overall'] = opp_turnover_stats.get('opp_position_steals_overall', 0)
+        else:
+            features['opp_position_turnovers_overall'] = 0
+            features['opp_position_steals_overall'] = 0
+    
+    if needs('arena_altitude', 'altitude_away'):
+        altitude_query = pd.read_sql(f"""
+            SELECT arena_altitude
+            FROM teams
+            WHERE team_id = {opponent_id}
+        """, conn)
+        
+        if len(altitude_query) > 0:
+            altitude = altitude_query.iloc[0]['arena_altitude']
+            if altitude and pd.notna(altitude):
+                features['arena_altitude'] = altitude
+                features['altitude_away'] = 1 if (is_home == 0 and altitude > 3000) else 0
+            else:
+                features['arena_altitude'] = None
+                features['altitude_away'] = 0
         else:
             features['arena_altitude'] = None
             features['altitude_away'] = 0
-    else:
-        features['arena_altitude'] = None
-        features['altitude_away'] = 0
     
     star_query = f"""
         SELECT DISTINCT pgs2.player_id, AVG(pgs2.points) as ppg
@@ -1535,7 +1623,7 @@ def build_features_for_player(conn, player_id, team_id, opponent_id,
         HAVING AVG(pgs2.points) >= 20
     """
     
-    star_teammates = pd.read_sql(star_query, conn)
+    star_teammates = pd.read_sql(star_query, conn) if needs('star_teammate_out', 'star_teammate_ppg', 'games_without_star') else pd.DataFrame()
     
     features['star_teammate_out'] = 0
     features['star_teammate_ppg'] = 0.0
@@ -1644,6 +1732,7 @@ def build_features_for_player(conn, player_id, team_id, opponent_id,
     
     return features_df, recent_games
 
+@profiled('recalculate_confidence')
 def recalculate_all_confidence_scores(prediction_date):
     if isinstance(prediction_date, str):
         prediction_date = datetime.strptime(prediction_date, '%Y-%m-%d').date()
@@ -1661,6 +1750,7 @@ def recalculate_all_confidence_scores(prediction_date):
     try:
         script_dir = os.path.dirname(os.path.abspath(__file__))
         project_root = os.path.dirname(os.path.dirname(script_dir))
+        feature_schema = load_serving_feature_names(os.path.join(project_root, 'data', 'models'))
         
         date_str = prediction_date.strftime('%Y-%m-%d')
         
@@ -1688,7 +1778,17 @@ def recalculate_all_confidence_scores(prediction_date):
             ORDER BY p.player_id, p.game_id, p.model_version
         """
         
-        all_predictions_df = pd.read_sql(query, conn)
+        all_predictions_df = read_sql_copy(query, conn, dtypes={
+            'player_id': 'int64',
+            'game_id': str,
+            'model_version': str,
+            **{f'predicted_{t}': 'float64' for t in TARGETS},
+            'prediction_id': 'int64',
+            'season': str,
+            'home_team_id': 'int64',
+            'away_team_id': 'int64',
+            'game_type': str
+        })
         
         if len(all_predictions_df) == 0:
             print("No predictions found for this date.")
@@ -1792,7 +1892,7 @@ def recalculate_all_confidence_scores(prediction_date):
                 
                 features_df, recent_games = build_features_for_player(
                     conn, player_id, team_id, opponent_id,
-                    is_home, season, prediction_date, game_type
+                    is_home, season, prediction_date, game_type, feature_schema
                 )
                 
                 if features_df is None or len(features_df) == 0:
@@ -1901,7 +2001,15 @@ def recalculate_all_confidence_scores(prediction_date):
         conn.close()
 
 
-def predict_all_models(target_date=None):
+def get_recommended_model_types(model_types, subsets=None):
+    """Families in at least one stat's recommended subset (select_ensemble_subsets.py), or all of them."""
+    subsets = subsets if subsets is not None else load_ensemble_subsets()
+    if not subsets:
+        return list(model_types)
+    recommended = {m for members in subsets.values() for m in members}
+    return [m for m in model_types if m in recommended] or list(model_types)
+
+def predict_all_models(target_date=None, use_recommended=True):
     if target_date is None:
         target_date = datetime.now().date()
     elif isinstance(target_date, str):
@@ -1909,9 +2017,20 @@ def predict_all_models(target_date=None):
     
     model_types = ['xgboost', 'lightgbm', 'random_forest', 'catboost']
     
+    # A family outside every stat's recommended subset never reaches the ensemble, so don't predict with it.
+    # Families that stay predict all seven stats: every predictions row carries all of them, and the
+    # per-player features and confidence cost far more than the skipped model calls would save.
+    if use_recommended:
+        recommended = get_recommended_model_types(model_types)
+        skipped = [m for m in model_types if m not in recommended]
+        if skipped:
+            print(f"Skipping {', '.join(skipped)}: not in any recommended subset (data/models/ensemble_subsets.json)")
+        model_types = recommended
+    
     for model_type in model_types:
         try:
-            predict_upcoming_games(target_date, model_type)
+            with stage(model_type):
+                predict_upcoming_games(target_date, model_type)
         except Exception as e:
             print(f"Error predicting with {model_type}: {e}")
             continue
@@ -1929,6 +2048,7 @@ def predict_all_models(target_date=None):
 
 if __name__ == "__main__":
     import sys
+    start_run('predict_games', profile=pop_profile_flag())
     if len(sys.argv) > 1:
         target_date = sys.argv[1]
         if len(sys.argv) > 2 and sys.argv[2] == '--recalculate-only':
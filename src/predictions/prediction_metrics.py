@@ -0,0 +1,354 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# RUN THIS (once, to build the aggregates for predictions evaluated before the table existed):
+# python src/predictions/prediction_metrics.py --rebuild
+# Refresh a range (evaluate_predictions.py does this for the dates it evaluates):
+# python src/predictions/prediction_metrics.py --from 2024-11-01 --to 2024-12-15
+
+import numpy as np
+import pandas as pd
+from datetime import date, datetime, timedelta
+from itertools import combinations
+from typing import Dict, List, Optional, Sequence
+
+try:
+    from data_collection.schema import create_table_sql, get_column_names
+    from data_collection.bulk_read import read_sql_copy
+    from data_collection.query_stats import raw_connection
+except ImportError:
+    from src.data_collection.schema import create_table_sql, get_column_names
+    from src.data_collection.bulk_read import read_sql_copy
+    from src.data_collection.query_stats import raw_connection
+
+import warnings
+warnings.filterwarnings('ignore', message='pandas only supports SQLAlchemy')
+
+# Per (date, model_version, stat) sums of evaluated predictions. Every metric on the Model
+# Performance page is a ratio of these sums, so any date range rolls up with one GROUP BY
+# instead of loading every prediction.
+
+__all__ = [
+    'METRICS_TABLE',
+    'METRIC_STATS',
+    'HIT_THRESHOLDS',
+    'ENSEMBLE_MEMBERS',
+    'ensemble_key',
+    'compute_metric_rows',
+    'ensure_metrics_table',
+    'refresh_prediction_metrics',
+    'load_metric_rollup',
+    'load_metric_trend',
+    'find_unaggregated_dates',
+    'rollup_metrics',
+]
+
+METRICS_TABLE = 'prediction_metrics'
+
+# Page stat name -> (prediction column, actual column)
+METRIC_STATS = {
+    'points': ('predicted_points', 'actual_points'),
+    'rebounds': ('predicted_rebounds', 'actual_rebounds'),
+    'assists': ('predicted_assists', 'actual_assists'),
+    'steals': ('predicted_steals', 'actual_steals'),
+    'blocks': ('predicted_blocks', 'actual_blocks'),
+    'turnovers': ('predicted_turnovers', 'actual_turnovers'),
+    'three_pointers': ('predicted_three_pointers_made', 'actual_three_pointers_made'),
+}
+OVERALL = 'overall'
+
+HIT_THRESHOLDS = (1, 2, 5)
+
+# Models the page can average. Every subset of two or more gets its own rows, because an
+# ensemble's errors come from averaged predictions and can't be rolled up from its members' sums.
+ENSEMBLE_MEMBERS = ['xgboost', 'lightgbm', 'random_forest', 'catboost', 'distilled']
+
+SUM_COLUMNS = ['n_predictions', 'sum_abs_error', 'sum_squared_error', 'sum_error',
+               'sum_accuracy', 'n_accuracy'] + [f'hits_within_{t}' for t in HIT_THRESHOLDS]
+
+
+def ensemble_key(models: Sequence[str]) -> str:
+    """model_version under which the average of these models is stored."""
+    models = sorted(set(models))
+    if len(models) == 1:
+        return models[0]
+    return 'ensemble:' + '+'.join(models)
+
+
+def _accuracy(predicted: np.ndarray, actual: np.ndarray) -> np.ndarray:
+    # The page's accuracy: 100 minus the percentage error, floored at 0. Rows with an actual of 0
+    # only count when the prediction is also 0 (100%); missing values are treated as 0.
+    predicted = np.nan_to_num(predicted)
+    actual = np.nan_to_num(actual)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pct = np.maximum(0.0, 100.0 - np.abs(predicted - actual) / actual * 100.0)
+    return np.where(actual > 0, pct, np.where(predicted == 0, 100.0, np.nan))
+
+
+def _stat_sums(dates: pd.Series, predicted: np.ndarray, actual: np.ndarray,
+               errors: Optional[np.ndarray] = None) -> pd.DataFrame:
+    signed = predicted - actual if errors is None else errors
+    valid = ~np.isnan(signed)
+    abs_error = np.abs(signed)
+    accuracy = _accuracy(predicted, actual) if errors is None else np.full(len(signed), np.nan)
+
+    frame = pd.DataFrame({
+        'metric_date': dates.to_numpy(),
+        'n_predictions': valid.astype(np.int64),
+        'sum_abs_error': np.where(valid, abs_error, 0.0),
+        'sum_squared_error': np.where(valid, signed ** 2, 0.0),
+        'sum_error': np.where(valid, signed, 0.0),
+        'sum_accuracy': np.nan_to_num(accuracy),
+        'n_accuracy': (~np.isnan(accuracy)).astype(np.int64),
+        **{f'hits_within_{t}': (valid & (abs_error <= t)).astype(np.int64) for t in HIT_THRESHOLDS},
+    })
+    return frame.groupby('metric_date', as_index=False).sum()
+
+
+def _version_rows(frame: pd.DataFrame, model_version: str, overall_errors: Optional[np.ndarray] = None) -> List[pd.DataFrame]:
+    rows = []
+    for stat, (pred_col, actual_col) in METRIC_STATS.items():
+        sums = _stat_sums(frame['metric_date'], frame[pred_col].to_numpy(dtype=float),
+                          frame[actual_col].to_numpy(dtype=float))
+        rows.append(sums.assign(model_version=model_version, stat=stat))
+
+    # Overall is the per-prediction mean absolute error over the seven stats (prediction_error).
+    if overall_errors is None:
+        overall_errors = np.mean([np.abs(frame[p].to_numpy(dtype=float) - frame[a].to_numpy(dtype=float))
+                                  for p, a in METRIC_STATS.values()], axis=0)
+    sums = _stat_sums(frame['metric_date'], overall_errors, overall_errors, errors=overall_errors)
+    rows.append(sums.assign(model_version=model_version, stat=OVERALL))
+    return rows
+
+
+def compute_metric_rows(df: pd.DataFrame, ensembles: bool = True) -> pd.DataFrame:
+    """Aggregate rows for evaluated predictions.
+
+    df has one row per prediction with metric_date, player_id, game_id, model_version and the
+    predicted_*/actual_*/prediction_error columns.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=['metric_date', 'model_version', 'stat'] + SUM_COLUMNS)
+
+    rows = []
+    for model_version, frame in df.groupby('model_version'):
+        overall = frame['prediction_error'].to_numpy(dtype=float) if 'prediction_error' in frame else None
+        rows.extend(_version_rows(frame, model_version, overall))
+
+    members = [m for m in ENSEMBLE_MEMBERS if m in set(df['model_version'])]
+    if ensembles and len(members) > 1:
+        keys = ['metric_date', 'player_id', 'game_id']
+        pred_cols = [p for p, _ in METRIC_STATS.values()]
+        actual_cols = [a for _, a in METRIC_STATS.values()]
+        member_rows = df[df['model_version'].isin(members)]
+        wide = member_rows.pivot_table(index=keys, columns='model_version', values=pred_cols, aggfunc='first')
+        actuals = member_rows.groupby(keys)[actual_cols].first().reindex(wide.index)
+
+        for size in range(2, len(members) + 1):
+            for subset in combinations(members, size):
+                # Same as the page: mean of whichever members predicted the player, rounded like a prediction.
+                averaged = pd.DataFrame({
+                    col: wide[col].reindex(columns=list(subset)).mean(axis=1).round(1) for col in pred_cols
+                })
+                has_prediction = averaged.notna().any(axis=1)
+                frame = pd.concat([averaged, actuals], axis=1)[has_prediction].reset_index()
+                rows.extend(_version_rows(frame, ensemble_key(subset)))
+
+    return pd.concat(rows, ignore_index=True)[['metric_date', 'model_version', 'stat'] + SUM_COLUMNS]
+
+
+def _dialect(conn) -> str:
+    return getattr(conn, 'backend', 'postgres')
+
+
+def ensure_metrics_table(conn):
+    cur = conn.cursor()
+    cur.execute(create_table_sql(METRICS_TABLE, _dialect(conn)))
+    conn.commit()
+    cur.close()
+
+
+def _read_evaluated_predictions(conn, start_date, end_date) -> pd.DataFrame:
+    columns = ['player_id', 'game_id', 'model_version', 'prediction_error'] + \
+              [c for pair in METRIC_STATS.values() for c in pair]
+    query = f"""
+        SELECT prediction_date AS metric_date, {', '.join(columns)}
+        FROM predictions
+        WHERE prediction_date >= %s
+        AND prediction_date < %s
+        AND model_version IS NOT NULL
+        AND actual_points IS NOT NULL
+    """
+    dtypes = {'player_id': 'int64', 'game_id': str, 'model_version': str,
+              **{c: 'float64' for c in columns[3:]}}
+    df = read_sql_copy(query, conn, params=(start_date, end_date + timedelta(days=1)), dtypes=dtypes,
+                       parse_dates=['metric_date'])
+    df['metric_date'] = pd.to_datetime(df['metric_date']).dt.date
+    return df
+
+
+def _insert_rows(conn, cur, rows: pd.DataFrame):
+    columns = get_column_names(METRICS_TABLE)
+    rows = rows.reindex(columns=columns)
+    values = [tuple(None if pd.isna(v) else (v.item() if hasattr(v, 'item') else v) for v in row)
+              for row in rows.itertuples(index=False)]
+    if type(raw_connection(conn)).__module__.startswith('psycopg2'):
+        from psycopg2.extras import execute_values
+        execute_values(cur, f"INSERT INTO {METRICS_TABLE} ({', '.join(columns)}) VALUES %s", values, page_size=1000)
+    else:
+        placeholders = ', '.join(['%s'] * len(columns))
+        cur.executemany(f"INSERT INTO {METRICS_TABLE} ({', '.join(columns)}) VALUES ({placeholders})", values)
+
+
+def refresh_prediction_metrics(conn, start_date, end_date) -> int:
+    """Recompute the aggregates for every date in [start_date, end_date] and replace them."""
+    ensure_metrics_table(conn)
+    df = _read_evaluated_predictions(conn, start_date, end_date)
+    rows = compute_metric_rows(df)
+    rows['updated_at'] = datetime.now()
+
+    cur = conn.cursor()
+    try:
+        cur.execute(f"DELETE FROM {METRICS_TABLE} WHERE metric_date >= %s AND metric_date <= %s",
+                    (start_date, end_date))
+        if len(rows):
+            _insert_rows(conn, cur, rows)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return len(rows)
+
+
+def _range_filter(start_date, end_date):
+    conditions, params = [], []
+    if start_date:
+        conditions.append("metric_date >= %s")
+        params.append(start_date)
+    if end_date:
+        conditions.append("metric_date <= %s")
+        params.append(end_date)
+    return conditions, params
+
+
+def rollup_metrics(sums: pd.DataFrame) -> Dict[str, Dict[str, float]]:
+    """Metrics per stat from summed rows (one row per stat)."""
+    metrics = {}
+    for row in sums.itertuples(index=False):
+        n = row.n_predictions
+        if not n:
+            continue
+        metrics[row.stat] = {
+            'n': int(n),
+            'mae': row.sum_abs_error / n,
+            'rmse': float(np.sqrt(row.sum_squared_error / n)),
+            'bias': row.sum_error / n,
+            'accuracy': row.sum_accuracy / row.n_accuracy if row.n_accuracy else 0.0,
+            **{f'within_{t}': getattr(row, f'hits_within_{t}') / n for t in HIT_THRESHOLDS},
+        }
+    return metrics
+
+
+def load_metric_rollup(conn, model_version: str, start_date=None, end_date=None) -> pd.DataFrame:
+    """Sums per stat over a date range (an empty frame when nothing is aggregated)."""
+    conditions, params = _range_filter(start_date, end_date)
+    conditions.append("model_version = %s")
+    params.append(model_version)
+    query = f"""
+        SELECT stat, {', '.join(f'SUM({c}) AS {c}' for c in SUM_COLUMNS)}
+        FROM {METRICS_TABLE}
+        WHERE {' AND '.join(conditions)}
+        GROUP BY stat
+    """
+    df = pd.read_sql(query, conn, params=tuple(params))
+    return df.astype({c: 'float64' for c in SUM_COLUMNS})
+
+
+def load_metric_trend(conn, model_version: str, start_date=None, end_date=None, stat: str = OVERALL) -> pd.DataFrame:
+    """Daily sums for one stat, for grouping into daily/weekly/monthly trends."""
+    conditions, params = _range_filter(start_date, end_date)
+    conditions += ["model_version = %s", "stat = %s"]
+    params += [model_version, stat]
+    query = f"""
+        SELECT metric_date, n_predictions, sum_abs_error
+        FROM {METRICS_TABLE}
+        WHERE {' AND '.join(conditions)}
+        ORDER BY metric_date
+    """
+    df = pd.read_sql(query, conn, params=tuple(params))
+    df['metric_date'] = pd.to_datetime(df['metric_date'])
+    return df.astype({'n_predictions': 'float64', 'sum_abs_error': 'float64'})
+
+
+def find_unaggregated_dates(conn, start_date=None, end_date=None) -> List[date]:
+    """Dates with evaluated predictions but no aggregates, which a rollup over the range would miss.
+
+    Aggregates are refreshed per date for every model version at once, so a date either has
+    its rows or was never refreshed (e.g. evaluated before the table existed).
+    """
+    conditions = ["model_version IS NOT NULL", "actual_points IS NOT NULL"]
+    params = []
+    if start_date:
+        conditions.append("prediction_date >= %s")
+        params.append(start_date)
+    if end_date:
+        conditions.append("prediction_date < %s")
+        params.append(pd.Timestamp(end_date).date() + timedelta(days=1))
+    evaluated = pd.read_sql(f"""
+        SELECT DISTINCT prediction_date AS metric_date
+        FROM predictions
+        WHERE {' AND '.join(conditions)}
+    """, conn, params=tuple(params))
+
+    conditions, params = _range_filter(start_date, end_date)
+    aggregated = pd.read_sql(f"""
+        SELECT DISTINCT metric_date
+        FROM {METRICS_TABLE}
+        {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+    """, conn, params=tuple(params))
+
+    evaluated_dates = set(pd.to_datetime(evaluated['metric_date']).dt.date)
+    aggregated_dates = set(pd.to_datetime(aggregated['metric_date']).dt.date)
+    return sorted(evaluated_dates - aggregated_dates)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from data_collection.utils import get_db_connection
+
+    parser = argparse.ArgumentParser(description='Rebuild the prediction_metrics aggregates')
+    parser.add_argument('--from', dest='start', default=None, help='First date to refresh')
+    parser.add_argument('--to', dest='end', default=None, help='Last date to refresh (default: --from)')
+    parser.add_argument('--rebuild', action='store_true', help='Refresh every date with evaluated predictions')
+    args = parser.parse_args()
+
+    if not args.rebuild and not args.start:
+        parser.error('give --from/--to or --rebuild')
+
+    conn = get_db_connection()
+    try:
+        if args.rebuild:
+            cur = conn.cursor()
+            cur.execute("SELECT MIN(prediction_date), MAX(prediction_date) FROM predictions WHERE actual_points IS NOT NULL")
+            first, last = cur.fetchone()
+            cur.close()
+            if first is None:
+                print("No evaluated predictions")
+                sys.exit(0)
+            start_date, end_date = pd.Timestamp(first).date(), pd.Timestamp(last).date()
+        else:
+            start_date = datetime.strptime(args.start, '%Y-%m-%d').date()
+            end_date = datetime.strptime(args.end, '%Y-%m-%d').date() if args.end else start_date
+
+        print("="*50)
+        print(f"REFRESHING PREDICTION METRICS: {start_date} to {end_date}")
+        print("="*50)
+        start = time.time()
+        n_rows = refresh_prediction_metrics(conn, start_date, end_date)
+        print(f"{n_rows} aggregate rows written in {time.time() - start:.1f}s")
+    finally:
+        conn.close()
@@ -0,0 +1,327 @@
+import os
+import io
+import sys
+import json
+import time
+import atexit
+import pstats
+import cProfile
+import tracemalloc
+from datetime import datetime
+from functools import wraps
+
+# Per-stage timings for the pipeline entry points. A script calls start_run() once; after that,
+# stage('name') blocks (and @profiled functions) are timed, nested stages get '/'-joined names,
+# and repeated stages are aggregated. At exit the run writes a JSON report to data/profiles/ whose
+# 'results' use the layout of the benchmark reports, so compare_benchmarks.py --files can diff two
+# runs. With --profile (or PROFILE=1) the run also records tracemalloc peaks per stage and a
+# cProfile dump. Without start_run() every hook is a no-op, so library callers pay nothing.
+
+__all__ = [
+    'Profiler',
+    'start_run',
+    'get_profiler',
+    'stage',
+    'mark',
+    'annotate',
+    'profiled',
+    'add_profile_argument',
+    'pop_profile_flag',
+    'get_profile_dir',
+    'PROFILE_ENV',
+    'PROFILE_DIR_ENV',
+]
+
+PROFILE_ENV = 'PROFILE'
+PROFILE_DIR_ENV = 'PROFILE_DIR'
+TOP_FUNCTIONS = 30
+MB = 1024 * 1024
+
+_profiler = None
+
+
+def get_profile_dir():
+    """PROFILE_DIR if set (the daily pipeline points its steps at one directory), else data/profiles."""
+    if os.environ.get(PROFILE_DIR_ENV):
+        return os.environ[PROFILE_DIR_ENV]
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(project_root, 'data', 'profiles')
+
+
+def _profile_from_env():
+    return os.environ.get(PROFILE_ENV, '').lower() in ('1', 'true', 'yes')
+
+
+class _Frame:
+    __slots__ = ('path', 'start', 'cpu_start', 'mem_start', 'peak', 'is_mark')
+
+    def __init__(self, path, is_mark, trace_memory):
+        self.path = path
+        self.is_mark = is_mark
+        self.start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        self.mem_start = tracemalloc.get_traced_memory()[0] if trace_memory else 0
+        self.peak = self.mem_start
+
+
+class Profiler:
+    """Aggregated wall time, CPU time and (when profiling) peak traced memory per named stage."""
+
+    def __init__(self, run_name, profile=False, output_dir=None):
+        self.run_name = run_name
+        self.profile = profile
+        self.output_dir = output_dir or get_profile_dir()
+        self.started_at = datetime.now()
+        self.pid = os.getpid()
+        self.results = {}
+        self.metadata = {}
+        self._order = {}
+        self._stack = []
+        self._start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self._cprofile = None
+        self._peak = 0
+        self._finished = False
+
+        if profile:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    # -- stages -------------------------------------------------------------------------
+
+    def _push(self, name, is_mark=False):
+        if self.profile:
+            # Fold the peak so far into the enclosing stage, then measure the new one from here.
+            if self._stack:
+                parent = self._stack[-1]
+                parent.peak = max(parent.peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        parent_path = self._stack[-1].path + '/' if self._stack else ''
+        frame = _Frame(parent_path + name, is_mark, self.profile)
+        self._order.setdefault(frame.path, len(self._order))
+        self._stack.append(frame)
+        return frame
+
+    def _pop(self):
+        frame = self._stack.pop()
+        seconds = time.perf_counter() - frame.start
+        cpu_seconds = time.process_time() - frame.cpu_start
+
+        entry = self.results.get(frame.path)
+        if entry is None:
+            entry = self.results[frame.path] = {'seconds': 0.0, 'calls': 0, 'cpu_seconds': 0.0, 'max_seconds': 0.0}
+        entry['seconds'] += seconds
+        entry['calls'] += 1
+        entry['cpu_seconds'] += cpu_seconds
+        entry['max_seconds'] = max(entry['max_seconds'], seconds)
+
+        if self.profile:
+            peak = max(frame.peak, tracemalloc.get_traced_memory()[1])
+            entry['peak_mb'] = max(entry.get('peak_mb', 0.0), (peak - frame.mem_start) / MB)
+            if self._stack:
+                self._stack[-1].peak = max(self._stack[-1].peak, peak)
+            self._peak = max(self._peak, peak)
+            tracemalloc.reset_peak()
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def annotate(self, **values):
+        """Record run details in the report, e.g. rows processed or cpu_budget."""
+        self.metadata.update(values)
+
+    def mark(self, name):
+        """End the current marked step (if any) and start the next one inside the enclosing stage.
+
+        Suits long linear functions whose sections are just consecutive blocks of code; the last
+        step ends with the enclosing stage.
+        """
+        if self._stack and self._stack[-1].is_mark:
+            self._pop()
+        self._push(name, is_mark=True)
+
+    # -- report -------------------------------------------------------------------------
+
+    def _top_functions(self, prof_path):
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        stats = pstats.Stats(prof_path, stream=io.StringIO())
+        rows = []
+        for (filename, line, function), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+            if filename.startswith(project_root):
+                filename = os.path.relpath(filename, project_root)
+            rows.append({
+                'function': f"{filename}:{line}({function})",
+                'calls': ncalls,
+                'tottime': round(tottime, 4),
+                'cumtime': round(cumtime, 4),
+            })
+        rows.sort(key=lambda r: r['cumtime'], reverse=True)
+        return rows[:TOP_FUNCTIONS]
+
+    def report(self):
+        # Stages in the order they first started, so the report reads like the run.
+        results = {name: {k: round(v, 4) if isinstance(v, float) else v for k, v in entry.items()}
+                   for name, entry in sorted(self.results.items(), key=lambda x: self._order[x[0]])}
+        total_seconds = time.perf_counter() - self._start
+        results['total'] = {
+            'seconds': round(total_seconds, 4),
+            'calls': 1,
+            'cpu_seconds': round(time.process_time() - self._cpu_start, 4),
+            'max_seconds': round(total_seconds, 4),
+        }
+        if self.profile:
+            results['total']['peak_mb'] = round(max(self._peak, tracemalloc.get_traced_memory()[1]) / MB, 4)
+        return {
+            'run': self.run_name,
+            'timestamp': self.started_at.isoformat(),
+            'argv': sys.argv,
+            'profile': self.profile,
+            # Top-level like the benchmark reports, which compare_benchmarks.py prints; set via annotate().
+            'rows': self.metadata.get('rows'),
+            'cpu_budget': self.metadata.get('cpu_budget'),
+            'metadata': self.metadata,
+            'results': results,
+        }
+
+    def finish(self):
+        """Close open stages, write the report (and cProfile dump) and print the stage summary."""
+        if self._finished or os.getpid() != self.pid:
+            return None
+        self._finished = True
+        while self._stack:
+            self._pop()
+
+        stamp = self.started_at.strftime('%Y%m%d_%H%M%S')
+        os.makedirs(self.output_dir, exist_ok=True)
+        report_path = os.path.join(self.output_dir, f'{self.run_name}_{stamp}.json')
+
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            prof_path = os.path.join(self.output_dir, f'{self.run_name}_{stamp}.prof')
+            self._cprofile.dump_stats(prof_path)
+            report = self.report()
+            report['cprofile'] = prof_path
+            report['top_functions'] = self._top_functions(prof_path)
+        else:
+            report = self.report()
+
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+        print("\n" + "="*70)
+        print(f"TIMING REPORT: {self.run_name}")
+        print("="*70)
+        memory_header = f" {'Peak MB':>10}" if self.profile else ''
+        print(f"{'Stage':<60} {'Calls':>6} {'Seconds':>10}{memory_header}")
+        for name, entry in report['results'].items():
+            memory = f" {entry['peak_mb']:>10.1f}" if self.profile else ''
+            print(f"{name[:60]:<60} {entry['calls']:>6} {entry['seconds']:>10.2f}{memory}")
+        print(f"\nTiming report saved to {report_path}")
+        if self._cprofile is not None:
+            print(f"cProfile stats saved to {report['cprofile']} (open with: python -m pstats)")
+        return report_path
+
+
+class _Stage:
+    __slots__ = ('profiler', 'name', 'frame')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.frame = self.profiler._push(self.name)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        stack = self.profiler._stack
+        if self.frame in stack:
+            while stack[-1] is not self.frame:
+                self.profiler._pop()
+            self.profiler._pop()
+        return False
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def start_run(run_name, profile=None, output_dir=None):
+    """Start timing this process as run_name; the report is written when the process exits.
+
+    profile=None follows the PROFILE environment variable, which the daily pipeline sets for its
+    steps when it is run with --profile.
+    """
+    global _profiler
+    if _profiler is not None:
+        return _profiler
+    if profile is None:
+        profile = _profile_from_env()
+    elif profile:
+        # Scripts this run starts (build_features from train_all_models, the pipeline steps) profile too.
+        os.environ[PROFILE_ENV] = '1'
+    _profiler = Profiler(run_name, profile=profile, output_dir=output_dir)
+    atexit.register(_profiler.finish)
+    return _profiler
+
+
+def get_profiler():
+    return _profiler
+
+
+def stage(name):
+    """Context manager timing one named stage (a no-op unless start_run() was called)."""
+    if _profiler is None or os.getpid() != _profiler.pid:
+        return _NO_STAGE
+    return _profiler.stage(name)
+
+
+def mark(name):
+    """Start the next step of a linear stage; see Profiler.mark."""
+    if _profiler is not None and os.getpid() == _profiler.pid:
+        _profiler.mark(name)
+
+
+def annotate(**values):
+    """Record run details in the report (a no-op unless start_run() was called)."""
+    if _profiler is not None:
+        _profiler.annotate(**values)
+
+
+def profiled(name=None):
+    """Decorator timing every call of a function as a stage (default name: the function name)."""
+    def decorator(fn):
+        stage_name = name or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def add_profile_argument(parser):
+    parser.add_argument('--profile', action='store_true',
+                       help='Also record cProfile stats and tracemalloc peaks per stage (slower; see data/profiles/)')
+    return parser
+
+
+def pop_profile_flag(argv=None):
+    """Remove --profile from argv (default sys.argv) for scripts that parse positional arguments by hand."""
+    argv = sys.argv if argv is None else argv
+    if '--profile' in argv:
+        argv.remove('--profile')
+        return True
+    return None
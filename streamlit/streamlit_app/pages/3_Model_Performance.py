@@ -3,16 +3,24 @@ import pandas as pd
 import psycopg2
 from datetime import datetime, timedelta
 import os
+import logging
 from dotenv import load_dotenv
 import plotly.graph_objects as go
 import plotly.express as px
 import numpy as np
-from utils import get_ensemble_selection
+from utils import get_ensemble_selection, get_recommended_models
+from src.data_collection.bulk_read import read_sql_copy
+from src.predictions.prediction_metrics import (
+    METRIC_STATS, HIT_THRESHOLDS, ensemble_key, compute_metric_rows,
+    load_metric_rollup, load_metric_trend, rollup_metrics, find_unaggregated_dates
+)
 
 import warnings
 warnings.filterwarnings('ignore', message='pandas only supports SQLAlchemy')
 warnings.filterwarnings('ignore', category=FutureWarning)
 
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 
 st.set_page_config(
@@ -301,8 +309,20 @@ def get_predictions_with_actuals(start_date=None, end_date=None, model_version=N
         ORDER BY g.game_date DESC
     """
     
+    stats = ['points', 'rebounds', 'assists', 'steals', 'blocks', 'turnovers', 'three_pointers_made']
+    dtypes = {
+        'prediction_id': 'int64',
+        'player_id': 'int64',
+        'game_id': str,
+        'model_version': str,
+        **{f'predicted_{stat}': 'float64' for stat in stats},
+        **{f'actual_{stat}': 'float64' for stat in stats},
+        'prediction_error': 'float64',
+        'confidence_score': 'float64'
+    }
+    
     try:
-        df = pd.read_sql(query, conn, params=tuple(params))
+        df = read_sql_copy(query, conn, params=tuple(params), dtypes=dtypes, parse_dates=['game_date'])
         conn.close()
         return df
     except Exception as e:
@@ -328,57 +348,64 @@ def calculate_mae_metrics(df):
     
     return metrics
 
-def calculate_accuracy_percentage(df):
-    if df.empty:
-        return {}
-    
-    stats = {
-        'points': ('predicted_points', 'actual_points'),
-        'rebounds': ('predicted_rebounds', 'actual_rebounds'),
-        'assists': ('predicted_assists', 'actual_assists'),
-        'steals': ('predicted_steals', 'actual_steals'),
-        'blocks': ('predicted_blocks', 'actual_blocks'),
-        'turnovers': ('predicted_turnovers', 'actual_turnovers'),
-        'three_pointers': ('predicted_three_pointers_made', 'actual_three_pointers_made')
-    }
-    
-    accuracy = {}
-    for stat_name, (pred_col, actual_col) in stats.items():
-        stat_accuracies = []
-        for idx, row in df.iterrows():
-            pred_val = row[pred_col] if pd.notna(row[pred_col]) else 0
-            actual_val = row[actual_col] if pd.notna(row[actual_col]) else 0
-            
-            if actual_val > 0:
-                error_pct = abs(pred_val - actual_val) / actual_val * 100
-                stat_accuracy = max(0, 100 - error_pct)
-                stat_accuracies.append(stat_accuracy)
-            elif actual_val == 0 and pred_val == 0:
-                stat_accuracies.append(100)
-        
-        accuracy[stat_name] = np.mean(stat_accuracies) if stat_accuracies else 0
-    
-    return accuracy
+def get_metric_sums(start_date, end_date, model_version, ensemble_models=None):
+    """Per-stat sums and the daily overall trend from the prediction_metrics aggregates.
 
-def get_performance_over_time(df, period='daily'):
+    Falls back to aggregating the prediction rows when any evaluated date in the range has not
+    been aggregated yet (before the first run of src/predictions/prediction_metrics.py --rebuild),
+    so the page never reports on a subset of the range.
+    """
+    metric_version = ensemble_key(ensemble_models) if model_version == 'Ensemble' else model_version
+    try:
+        conn = get_db_connection()
+        try:
+            missing_dates = find_unaggregated_dates(conn, start_date, end_date)
+            if not missing_dates:
+                sums = load_metric_rollup(conn, metric_version, start_date, end_date)
+                trend = load_metric_trend(conn, metric_version, start_date, end_date)
+        finally:
+            conn.close()
+        if missing_dates:
+            st.info(f"{len(missing_dates)} evaluated date(s) in this range have no metric aggregates yet "
+                    f"(first: {missing_dates[0]}), so metrics are computed from the predictions. "
+                    f"Run src/predictions/prediction_metrics.py --rebuild to speed this up.")
+        elif not sums.empty:
+            return sums, trend
+    except Exception as e:
+        logger.warning("Falling back to prediction rows, metric aggregates failed: %s", e, exc_info=True)
+        st.warning(f"Could not read the metric aggregates ({e}); computing metrics from the predictions.")
+
+    df = get_predictions_with_actuals(start_date=start_date, end_date=end_date, model_version=model_version,
+                                      ensemble_models=ensemble_models)
     if df.empty:
+        return pd.DataFrame(), pd.DataFrame()
+    rows = compute_metric_rows(df.rename(columns={'game_date': 'metric_date'}), ensembles=model_version == 'Ensemble')
+    rows = rows[rows['model_version'] == metric_version]
+    sums = rows.drop(columns=['metric_date', 'model_version']).groupby('stat', as_index=False).sum()
+    trend = rows[rows['stat'] == 'overall'][['metric_date', 'n_predictions', 'sum_abs_error']]
+    return sums, trend
+
+def get_performance_over_time(trend, period='daily'):
+    if trend.empty:
         return pd.DataFrame()
     
-    df['game_date'] = pd.to_datetime(df['game_date'])
+    trend = trend.copy()
+    trend['metric_date'] = pd.to_datetime(trend['metric_date'])
     
     if period == 'daily':
-        df['period'] = df['game_date'].dt.date
+        trend['period'] = trend['metric_date'].dt.date
     elif period == 'weekly':
-        df['period'] = df['game_date'].dt.to_period('W').dt.start_time.dt.date
+        trend['period'] = trend['metric_date'].dt.to_period('W').dt.start_time.dt.date
     elif period == 'monthly':
-        df['period'] = df['game_date'].dt.to_period('M').dt.start_time.dt.date
+        trend['period'] = trend['metric_date'].dt.to_period('M').dt.start_time.dt.date
     
-    grouped = df.groupby('period').agg({
-        'prediction_error': 'mean',
-        'predicted_points': 'count'
+    grouped = trend.groupby('period').agg({
+        'sum_abs_error': 'sum',
+        'n_predictions': 'sum'
     }).reset_index()
     
-    grouped.columns = ['period', 'avg_error', 'num_predictions']
+    grouped['avg_error'] = grouped['sum_abs_error'] / grouped['n_predictions']
+    grouped = grouped.rename(columns={'n_predictions': 'num_predictions'})[['period', 'avg_error', 'num_predictions']]
     
     return grouped.sort_values('period')
 
@@ -576,17 +603,19 @@ def main():
     st.markdown("Select which models to include in your ensemble. This selection will be used across all pages.")
     
     model_versions = get_model_versions()
-    available_models = ['xgboost', 'lightgbm', 'random_forest', 'catboost']
+    available_models = ['xgboost', 'lightgbm', 'random_forest', 'catboost', 'distilled']
     available_models = [m for m in available_models if m in model_versions]
     
+    # The distilled model approximates the full ensemble, so it is opt-in rather than averaged in by default.
     if 'ensemble_models' not in st.session_state:
-        st.session_state.ensemble_models = available_models if len(available_models) > 0 else ['xgboost']
+        default_models = get_recommended_models([m for m in available_models if m != 'distilled'])
+        st.session_state.ensemble_models = default_models if len(default_models) > 0 else ['xgboost']
     
     selected_models = st.multiselect(
         "Select Models for Ensemble",
         available_models,
         default=st.session_state.ensemble_models,
-        help="Select one or more models. Predictions will be averaged from selected models."
+        help="Select one or more models. Predictions will be averaged from selected models. Defaults to the models select_ensemble_subsets.py recommends for at least one stat. Select 'distilled' alone to compare the single distilled model against the full ensemble."
     )
     
     if len(selected_models) == 0:
@@ -659,42 +688,9 @@ def main():
     available_for_default = [m for m in all_models if m in model_versions]
     ensemble_models_for_filter = st.session_state.get('ensemble_models', available_for_default if len(available_for_default) > 0 else ['xgboost'])
     
-    if selected_version == 'Ensemble':
-        df = get_predictions_with_actuals(start_date=start_date, end_date=end_date, model_version='Ensemble', ensemble_models=ensemble_models_for_filter)
-        
-        if not df.empty and len(ensemble_models_for_filter) > 1:
-            df = df.groupby(['player_id', 'game_id', 'game_date']).agg({
-                'predicted_points': 'mean',
-                'predicted_rebounds': 'mean',
-                'predicted_assists': 'mean',
-                'predicted_steals': 'mean',
-                'predicted_blocks': 'mean',
-                'predicted_turnovers': 'mean',
-                'predicted_three_pointers_made': 'mean',
-                'actual_points': 'first',
-                'actual_rebounds': 'first',
-                'actual_assists': 'first',
-                'actual_steals': 'first',
-                'actual_blocks': 'first',
-                'actual_turnovers': 'first',
-                'actual_three_pointers_made': 'first',
-                'prediction_error': 'first',
-                'confidence_score': 'mean',
-                'model_version': 'first'
-            }).reset_index()
-            
-            df['predicted_points'] = df['predicted_points'].round(1)
-            df['predicted_rebounds'] = df['predicted_rebounds'].round(1)
-            df['predicted_assists'] = df['predicted_assists'].round(1)
-            df['predicted_steals'] = df['predicted_steals'].round(1)
-            df['predicted_blocks'] = df['predicted_blocks'].round(1)
-            df['predicted_turnovers'] = df['predicted_turnovers'].round(1)
-            df['predicted_three_pointers_made'] = df['predicted_three_pointers_made'].round(1)
-            df['confidence_score'] = df['confidence_score'].round(0).astype(int)
-    else:
-        df = get_predictions_with_actuals(start_date=start_date, end_date=end_date, model_version=selected_version)
+    sums, trend = get_metric_sums(start_date, end_date, selected_version, ensemble_models_for_filter)
     
-    if df.empty:
+    if sums.empty:
         st.warning("No prediction data available for the selected filters.")
         return
     
@@ -702,8 +698,9 @@ def main():
     
     st.markdown("### Overall Accuracy Metrics")
     
-    mae_metrics = calculate_mae_metrics(df)
-    accuracy_pct = calculate_accuracy_percentage(df)
+    stat_metrics = rollup_metrics(sums)
+    mae_metrics = {stat: values['mae'] for stat, values in stat_metrics.items()}
+    accuracy_pct = {stat: stat_metrics[stat]['accuracy'] for stat in METRIC_STATS if stat in stat_metrics}
     
     overall_accuracy = np.mean(list(accuracy_pct.values())) if accuracy_pct else 0
     
@@ -728,12 +725,23 @@ def main():
                 </div>
             """, unsafe_allow_html=True)
     
+    hit_rates = pd.DataFrame([
+        {
+            'Stat': stat_name,
+            **{f'Within ±{t}': f"{stat_metrics[stat_key][f'within_{t}'] * 100:.1f}%" for t in HIT_THRESHOLDS},
+            'RMSE': f"{stat_metrics[stat_key]['rmse']:.2f}",
+            'Bias': f"{stat_metrics[stat_key]['bias']:+.2f}"
+        }
+        for stat_name, stat_key in zip(stat_names[:-1], stat_keys[:-1]) if stat_key in stat_metrics
+    ])
+    st.dataframe(hit_rates, use_container_width=True, hide_index=True)
+    
     st.markdown("---")
     
     st.markdown("### Performance Over Time")
     
     period_map = {'Daily': 'daily', 'Weekly': 'weekly', 'Monthly': 'monthly'}
-    performance_df = get_performance_over_time(df, period=period_map[period_grouping])
+    performance_df = get_performance_over_time(trend, period=period_map[period_grouping])
     
     if not performance_df.empty:
         trend_fig = create_performance_trend(performance_df)
@@ -763,6 +771,42 @@ def main():
     
     stat_key = stat_map[selected_stat]
     
+    # The scatter and error distribution need the individual predictions.
+    if selected_version == 'Ensemble':
+        df = get_predictions_with_actuals(start_date=start_date, end_date=end_date, model_version='Ensemble', ensemble_models=ensemble_models_for_filter)
+        
+        if not df.empty and len(ensemble_models_for_filter) > 1:
+            df = df.groupby(['player_id', 'game_id', 'game_date']).agg({
+                'predicted_points': 'mean',
+                'predicted_rebounds': 'mean',
+                'predicted_assists': 'mean',
+                'predicted_steals': 'mean',
+                'predicted_blocks': 'mean',
+                'predicted_turnovers': 'mean',
+                'predicted_three_pointers_made': 'mean',
+                'actual_points': 'first',
+                'actual_rebounds': 'first',
+                'actual_assists': 'first',
+                'actual_steals': 'first',
+                'actual_blocks': 'first',
+                'actual_turnovers': 'first',
+                'actual_three_pointers_made': 'first',
+                'prediction_error': 'first',
+                'confidence_score': 'mean',
+                'model_version': 'first'
+            }).reset_index()
+            
+            df['predicted_points'] = df['predicted_points'].round(1)
+            df['predicted_rebounds'] = df['predicted_rebounds'].round(1)
+            df['predicted_assists'] = df['predicted_assists'].round(1)
+            df['predicted_steals'] = df['predicted_steals'].round(1)
+            df['predicted_blocks'] = df['predicted_blocks'].round(1)
+            df['predicted_turnovers'] = df['predicted_turnovers'].round(1)
+            df['predicted_three_pointers_made'] = df['predicted_three_pointers_made'].round(1)
+            df['confidence_score'] = df['confidence_score'].round(0).astype(int)
+    else:
+        df = get_predictions_with_actuals(start_date=start_date, end_date=end_date, model_version=selected_version)
+    
     col_chart1, col_chart2 = st.columns([1, 1])
     
     with col_chart1:
@@ -3,9 +3,24 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from src.data_collection.utils import get_db_connection
+from src.models.training_data import load_ensemble_subsets
 import pandas as pd
 import numpy as np
 
+def get_recommended_subsets():
+    # Per-stat ensemble members from select_ensemble_subsets.py; None until it has been run.
+    try:
+        return load_ensemble_subsets()
+    except (OSError, ValueError, KeyError):
+        return None
+
+def get_recommended_models(models):
+    subsets = get_recommended_subsets()
+    if not subsets:
+        return list(models)
+    recommended = {m for members in subsets.values() for m in members}
+    return [m for m in models if m in recommended] or list(models)
+
 def get_ensemble_selection():
     if 'ensemble_models' not in st.session_state:
         all_models = ['xgboost', 'lightgbm', 'random_forest', 'catboost']
@@ -18,7 +33,8 @@ def get_ensemble_selection():
             """
             df = pd.read_sql(query, conn)
             available_models = df['model_version'].tolist() if not df.empty else []
-            st.session_state.ensemble_models = [m for m in all_models if m in available_models] or ['xgboost']
+            available_models = [m for m in all_models if m in available_models]
+            st.session_state.ensemble_models = get_recommended_models(available_models) or ['xgboost']
         except:
             st.session_state.ensemble_models = all_models
         finally: